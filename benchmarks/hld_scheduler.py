@@ -0,0 +1,176 @@
+"""
+hld_scheduler.py - compares get_hld's fixed chunks (create_id_queue) against a
+ChunkScheduler (adaptive=True), in wall time and in how far apart the threads
+finish their last page.
+
+The pull is simulated, so that it runs in seconds: each page sleeps for a fixed
+per-request time plus a time per detection of its hosts, all scaled by --scale.
+Most hosts have a few detections, but --heavy of them, in one block of IDs, have
+hundreds, as hosts of a badly patched subnet would. The IDs come in clusters
+with gaps between them. Both runs page through the IDs the way the API does
+(truncation_limit hosts from id_min on), and are checked to pull every host
+exactly once.
+
+Usage, from the repository root (PYTHONPATH=. puts qualysdk on the path):
+    PYTHONPATH=. python benchmarks/hld_scheduler.py --hosts 20000 --heavy 3000 --threads 5 --scale 0.01
+"""
+
+from argparse import ArgumentParser
+from bisect import bisect_left, bisect_right
+from queue import Empty, Queue
+from random import Random
+from threading import Lock, Thread
+from time import perf_counter, sleep
+
+from qualysdk.vmdr.base.chunk_scheduler import ChunkScheduler
+
+# Seconds, before --scale:
+REQUEST_SECONDS = 2.0
+DETECTION_SECONDS = 0.0005
+# The API's default truncation_limit:
+DEFAULT_LIMIT = 1000
+
+
+class SimulatedAPI:
+    """
+    Pages through ids=low-high the way get_hld's API does, sleeping for each page.
+    """
+
+    def __init__(self, ids: list[int], detections: dict, scale: float):
+        self.ids = ids
+        self.detections = detections
+        self.scale = scale
+        self.requests = 0
+        self.pulled = []
+        self.lock = Lock()
+
+    def page(self, low: int, high: int, id_min: int, limit: int) -> tuple:
+        start = bisect_left(self.ids, max(low, id_min))
+        end = bisect_right(self.ids, high)
+        hosts = self.ids[start : min(end, start + limit)]
+        sleep(
+            self.scale
+            * (
+                REQUEST_SECONDS
+                + DETECTION_SECONDS * sum(self.detections[i] for i in hosts)
+            )
+        )
+        with self.lock:
+            self.requests += 1
+            self.pulled.extend(hosts)
+        more = start + limit < end
+        return hosts, (hosts[-1] + 1 if more else None)
+
+
+def fixed_worker(api: SimulatedAPI, queue: Queue, finished: list):
+    last = perf_counter()
+    while True:
+        try:
+            ids = queue.get_nowait()
+        except Empty:
+            break
+        id_min = ids[0]
+        while id_min is not None:
+            _, id_min = api.page(ids[0], ids[-1], id_min, DEFAULT_LIMIT)
+            last = perf_counter()
+    finished.append(last)
+
+
+def scheduled_worker(api: SimulatedAPI, scheduler: ChunkScheduler, finished: list):
+    last = perf_counter()
+    while True:
+        chunk = scheduler.take()
+        if chunk is None:
+            break
+        id_min = chunk.low
+        while id_min is not None:
+            params = chunk.params()
+            low, _, high = params["ids"].partition("-")
+            start = perf_counter()
+            hosts, id_min = api.page(
+                int(low),
+                int(high or low),
+                id_min,
+                params.get("truncation_limit", DEFAULT_LIMIT),
+            )
+            chunk.page_done(
+                len(hosts),
+                perf_counter() - start,
+                None if id_min is None else str(id_min),
+            )
+            last = perf_counter()
+        scheduler.done(chunk)
+    finished.append(last)
+
+
+def run(api: SimulatedAPI, threads: int, target, work) -> tuple[float, float]:
+    finished = []
+    start = perf_counter()
+    pool = [Thread(target=target, args=(api, work, finished)) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    if sorted(api.pulled) != api.ids:
+        raise AssertionError("The hosts were not all pulled exactly once.")
+    return max(finished) - start, max(finished) - min(finished)
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--hosts", type=int, default=20000)
+    parser.add_argument("--heavy", type=int, default=3000)
+    parser.add_argument("--threads", type=int, default=5)
+    parser.add_argument("--chunk-size", type=int, default=3000)
+    parser.add_argument("--page-seconds", type=float, default=30.0)
+    parser.add_argument("--scale", type=float, default=0.01)
+    args = parser.parse_args()
+
+    r = Random(7)
+    ids = []
+    next_id = 1000
+    while len(ids) < args.hosts:
+        # Clusters of IDs, with gaps between them:
+        size = min(r.randint(200, 2000), args.hosts - len(ids))
+        ids.extend(range(next_id, next_id + size))
+        next_id += size + r.choice((10, 1000, 1_000_000))
+    heavy_start = r.randrange(0, args.hosts - args.heavy)
+    detections = {
+        i: (
+            r.randint(300, 600)
+            if heavy_start <= n < heavy_start + args.heavy
+            else r.randint(5, 40)
+        )
+        for n, i in enumerate(ids)
+    }
+
+    queue = Queue()
+    for i in range(0, len(ids), args.chunk_size):
+        queue.put(ids[i : i + args.chunk_size])
+    fixed = SimulatedAPI(ids, detections, args.scale)
+    fixed_time, fixed_spread = run(fixed, args.threads, fixed_worker, queue)
+
+    # page_seconds is scaled like the pages are:
+    scheduler = ChunkScheduler(
+        ids,
+        chunk_size=args.chunk_size,
+        threads=args.threads,
+        page_seconds=args.page_seconds * args.scale,
+    )
+    adaptive = SimulatedAPI(ids, detections, args.scale)
+    adaptive_time, adaptive_spread = run(
+        adaptive, args.threads, scheduled_worker, scheduler
+    )
+
+    print(f"{'chunks':<9} {'requests':>9} {'wall (s)':>9} {'finish spread (s)':>18}")
+    print(f"{'fixed':<9} {fixed.requests:>9} {fixed_time:>9.2f} {fixed_spread:>18.2f}")
+    print(
+        f"{'adaptive':<9} {adaptive.requests:>9} {adaptive_time:>9.2f} {adaptive_spread:>18.2f}"
+    )
+    print(
+        f"speedup {fixed_time / adaptive_time:.2f}x. Scheduler: {scheduler.summary()}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+http2_vs_http1.py - compares pooled HTTP/1.1 (SessionManager) against multiplexed
+HTTP/2 (HTTP2Transport) for many small concurrent gateway requests, like
+lookup_host_uuids chunks or get_container_details calls.
+
+Both transports are pointed at local stand-in servers that wait --latency seconds
+before answering each request, to stand in for Qualys' processing time. The HTTP/2
+server speaks cleartext HTTP/2 (h2c), so it is run with prior knowledge.
+
+Requires httpx and h2: pip install qualysdk[http2]
+
+Usage, from the repository root (PYTHONPATH=. puts qualysdk on the path):
+    PYTHONPATH=. python benchmarks/http2_vs_http1.py --requests 2000 --threads 32 --latency 0.02
+"""
+
+import asyncio
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Event, Thread
+from time import perf_counter, sleep
+
+import h2.config
+import h2.connection
+import h2.events
+import httpx
+
+from qualysdk.base.session import HTTP2Transport, SessionManager
+
+BODY = b'{"hostUuid": "8f8ef3c1-3a8c-4b5c-9f1e-6d4a8b6f0e21", "hostId": 12345}' * 8
+
+
+class HTTP1Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    connections = set()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        HTTP1Handler.connections.add(self.client_address)
+        sleep(self.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+
+class H2Server:
+    """
+    A minimal cleartext HTTP/2 server that answers every request with BODY after a delay.
+    """
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.connections = 0
+        self.port = None
+        self._ready = Event()
+        Thread(target=asyncio.run, args=(self._serve(),), daemon=True).start()
+        self._ready.wait()
+
+    async def _serve(self):
+        server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        async with server:
+            await server.serve_forever()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        conn = h2.connection.H2Connection(
+            h2.config.H2Configuration(client_side=False, header_encoding="utf-8")
+        )
+        conn.initiate_connection()
+        writer.write(conn.data_to_send())
+        pending = {}  # stream id -> body left to send
+
+        def flush():
+            # Send as much of each pending body as flow control allows:
+            for stream_id in list(pending):
+                body = pending[stream_id]
+                size = min(
+                    conn.local_flow_control_window(stream_id),
+                    conn.max_outbound_frame_size,
+                    len(body),
+                )
+                if size:
+                    conn.send_data(stream_id, body[:size], end_stream=size == len(body))
+                    body = body[size:]
+                    if body:
+                        pending[stream_id] = body
+                    else:
+                        del pending[stream_id]
+            writer.write(conn.data_to_send())
+
+        async def respond(stream_id):
+            await asyncio.sleep(self.latency)
+            conn.send_headers(
+                stream_id,
+                [
+                    (":status", "200"),
+                    ("content-type", "application/json"),
+                    ("content-length", str(len(BODY))),
+                ],
+            )
+            pending[stream_id] = BODY
+            flush()
+
+        while data := await reader.read(65536):
+            for event in conn.receive_data(data):
+                if isinstance(event, h2.events.StreamEnded):
+                    asyncio.create_task(respond(event.stream_id))
+            if pending:
+                flush()
+            writer.write(conn.data_to_send())
+            await writer.drain()
+        writer.close()
+
+
+class PriorKnowledgeHTTP2Transport(HTTP2Transport):
+    """
+    HTTP2Transport negotiates HTTP/2 with TLS ALPN. The local server has no TLS,
+    so its clients are told to speak HTTP/2 from the start instead.
+    """
+
+    def get_async_client(self, url_type):
+        clients = self._async_clients.setdefault(asyncio.get_running_loop(), {})
+        if url_type not in clients:
+            clients[url_type] = httpx.AsyncClient(
+                http1=False,
+                http2=True,
+                limits=httpx.Limits(max_connections=self.max_connections),
+                timeout=None,
+            )
+        return clients[url_type]
+
+
+def run(transport, url: str, requests: int, threads: int) -> float:
+    def call(_):
+        response = transport.request("gateway", "GET", url)
+        assert response.content == BODY
+
+    start = perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(call, range(requests)))
+    return perf_counter() - start
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument(
+        "--latency", type=float, default=0.02, help="Server-side delay per request."
+    )
+    args = parser.parse_args()
+
+    HTTP1Handler.latency = args.latency
+    http1 = ThreadingHTTPServer(("127.0.0.1", 0), HTTP1Handler)
+    Thread(target=http1.serve_forever, daemon=True).start()
+    h2_server = H2Server(args.latency)
+
+    results = {}
+
+    sm = SessionManager(pool_size=args.threads)
+    results["HTTP/1.1 pooled"] = (
+        run(
+            sm,
+            f"http://127.0.0.1:{http1.server_address[1]}/",
+            args.requests,
+            args.threads,
+        ),
+        len(HTTP1Handler.connections),
+    )
+    sm.close()
+
+    h2t = PriorKnowledgeHTTP2Transport(max_connections=2, transport=SessionManager())
+    results["HTTP/2 multiplexed"] = (
+        run(h2t, f"http://127.0.0.1:{h2_server.port}/", args.requests, args.threads),
+        h2_server.connections,
+    )
+    h2t.close()
+
+    print(
+        f"{args.requests} requests, {args.threads} threads, {args.latency * 1000:.0f} ms server latency"
+    )
+    print(f"{'transport':<20} {'seconds':>8} {'req/s':>8} {'connections':>12}")
+    for name, (seconds, connections) in results.items():
+        print(
+            f"{name:<20} {seconds:>8.2f} {args.requests / seconds:>8.0f} {connections:>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
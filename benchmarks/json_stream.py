@@ -0,0 +1,105 @@
+"""
+json_stream.py - compares decoding a page of GAV assets with response.json()
+against JSONRecordStream, in time and peak memory, while building a Host from
+each asset.
+
+The page holds --assets assets (300, the largest page size GAV allows), each with
+--software software entries. Both paths are checked to build the same Hosts
+before timing.
+
+Usage, from the repository root (PYTHONPATH=. puts qualysdk on the path):
+    PYTHONPATH=. python benchmarks/json_stream.py --assets 300 --software 200 --repeat 5
+"""
+
+from argparse import ArgumentParser
+from json import dumps, loads
+from random import Random
+from time import perf_counter
+from tracemalloc import get_traced_memory, start, stop
+
+from qualysdk.base.base_list import BaseList
+from qualysdk.base.json_stream import JSONRecordStream
+from qualysdk.gav.hosts import Host
+
+
+def gav_page(assets: int, software: int) -> bytes:
+    r = Random(4)
+    return dumps(
+        {
+            "responseMessage": "Valid API Access",
+            "count": assets,
+            "responseCode": "SUCCESS",
+            "lastSeenAssetId": assets,
+            "hasMore": 1,
+            "assetListData": {
+                "asset": [
+                    {
+                        "assetId": i,
+                        "assetName": f"host{i}",
+                        "address": f"10.0.{i // 256}.{i % 256}",
+                        "softwareListData": {
+                            "software": [
+                                {
+                                    "fullName": f"Vendor Product {s} {r.randint(1, 20)}.{r.randint(0, 9)}",
+                                    "softwareType": "Application",
+                                    "lastUpdated": "2024-02-01T00:00:00.000Z",
+                                }
+                                for s in range(software)
+                            ]
+                        },
+                    }
+                    for i in range(1, assets + 1)
+                ]
+            },
+        }
+    ).encode()
+
+
+def via_json(document: bytes) -> BaseList:
+    # As get_all_assets did with response.json():
+    j = loads(document)
+    return BaseList(Host(**record) for record in j["assetListData"]["asset"])
+
+
+def via_stream(document: bytes) -> BaseList:
+    stream = JSONRecordStream(document, ("assetListData", "asset"))
+    return BaseList(Host(**record) for record in stream)
+
+
+def measure(func, document: bytes, repeat: int) -> tuple[float, int]:
+    times = []
+    for _ in range(repeat):
+        begin = perf_counter()
+        func(document)
+        times.append(perf_counter() - begin)
+
+    start()
+    hosts = func(document)
+    _, peak = get_traced_memory()
+    stop()
+    del hosts
+    return min(times), peak
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--assets", type=int, default=300)
+    parser.add_argument("--software", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    document = gav_page(args.assets, args.software)
+    if [repr(vars(h)) for h in via_json(document)] != [
+        repr(vars(h)) for h in via_stream(document)
+    ]:
+        raise AssertionError("The streamed Hosts differ from response.json()'s.")
+
+    print(f"page: {args.assets} assets, {len(document) / 1e6:.1f} MB")
+    print(f"{'path':<16} {'seconds':>8} {'peak MB':>8}")
+    for name, func in (("response.json()", via_json), ("JSONRecordStream", via_stream)):
+        seconds, peak = measure(func, document, args.repeat)
+        print(f"{name:<16} {seconds:>8.3f} {peak / 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+typed_json.py - compares building data classes from JSON pages the current way
+(JSONRecordStream, then model(**record)) against StructDecoder, in records per
+second.
+
+Each page holds --records records (GAV assets carry --software software entries
+each, which __post_init__ converts either way). Both paths decode the same bytes,
+and their records are checked to be equal, field by field, before timing.
+Requires msgspec: pip install qualysdk[typed].
+
+Usage, from the repository root (PYTHONPATH=. puts qualysdk on the path):
+    PYTHONPATH=. python benchmarks/typed_json.py --records 1000 --software 20 --repeat 5
+"""
+
+from argparse import ArgumentParser
+from dataclasses import fields, is_dataclass
+from json import dumps
+from random import Random
+from time import perf_counter
+
+from qualysdk.base.base_list import BaseList
+from qualysdk.base.json_stream import JSONRecordStream
+from qualysdk.gav.hosts import HOST_DECODER, Host
+from qualysdk.pm.base.assets_patches_threading_backend import (
+    ASSET_DECODER,
+    PATCH_DECODER,
+)
+from qualysdk.pm.data_classes.Patch import Patch
+from qualysdk.pm.data_classes.PMAsset import Asset
+from qualysdk.totalcloud.data_classes.AWSResources import AWSEC2Instance
+from qualysdk.totalcloud.get_inventory import resource_decoder
+
+
+def gav_page(records: int, software: int) -> bytes:
+    r = Random(4)
+    return dumps(
+        {
+            "responseMessage": "Valid API Access",
+            "count": records,
+            "responseCode": "SUCCESS",
+            "lastSeenAssetId": records,
+            "hasMore": 1,
+            "assetListData": {
+                "asset": [
+                    {
+                        "assetId": i,
+                        "assetUUID": f"{i:08x}-0000-4000-8000-000000000000",
+                        "hostId": 1000 + i,
+                        "lastModifiedDate": "2024-02-01T10:20:30.123Z",
+                        "agentId": f"{i:08x}-1111-4000-8000-000000000000",
+                        "createdDate": "2023-05-06T07:08:09.000Z",
+                        "sensorLastUpdatedDate": "2024-02-01T10:00:00.000Z",
+                        "assetType": "HOST",
+                        "address": f"10.0.{i // 256}.{i % 256}",
+                        "dnsName": f"host{i}.example.com",
+                        "assetName": f"host{i}",
+                        "netbiosName": f"HOST{i}",
+                        "timeZone": "+00:00",
+                        "biosDescription": "Example BIOS 1.2.3",
+                        "lastBoot": "2024-01-30T06:00:00.000Z",
+                        "totalMemory": 16384,
+                        "cpuCount": 8,
+                        "lastLoggedOnUser": "admin",
+                        "domainRole": "Member Server",
+                        "hwUUID": f"{i:032x}",
+                        "biosSerialNumber": f"SN{i}",
+                        "biosAssetTag": "",
+                        "isContainerHost": False,
+                        "riskScore": r.randint(0, 1000),
+                        "operatingSystem": {
+                            "osName": "Windows Server 2019",
+                            "fullName": "Microsoft Windows Server 2019 Datacenter",
+                            "category1": "Windows",
+                            "category2": "Server",
+                            "publisher": "Microsoft",
+                            "edition": "Datacenter",
+                            "version": "1809",
+                            "architecture": "64-Bit",
+                            "installDate": "2023-05-06T07:08:09.000Z",
+                        },
+                        "hardware": {
+                            "fullName": "Example Server",
+                            "manufacturer": "Example",
+                            "model": "X1",
+                        },
+                        "agent": {
+                            "version": "5.0.0.1",
+                            "configurationProfile": "Default",
+                            "activations": [{"key": "abc", "status": "ACTIVE"}],
+                            "lastActivity": 1706781630123,
+                            "lastCheckedIn": 1706781630123,
+                        },
+                        "tagList": {
+                            "tag": [
+                                {"tagId": t, "tagName": f"tag{t}"} for t in range(5)
+                            ]
+                        },
+                        "openPortListData": {
+                            "openPort": [
+                                {
+                                    "port": port,
+                                    "protocol": "TCP",
+                                    "detectedService": "svc",
+                                }
+                                for port in (22, 80, 443)
+                            ]
+                        },
+                        "softwareListData": {
+                            "software": [
+                                {
+                                    "fullName": f"Vendor Product {s} {r.randint(1, 20)}.{r.randint(0, 9)}",
+                                    "softwareType": "Application",
+                                    "lastUpdated": "2024-02-01T00:00:00.000Z",
+                                }
+                                for s in range(software)
+                            ]
+                        },
+                    }
+                    for i in range(1, records + 1)
+                ]
+            },
+        }
+    ).encode()
+
+
+def patch_page(records: int) -> bytes:
+    return dumps(
+        [
+            {
+                "id": f"{i:08x}-2222-4000-8000-000000000000",
+                "title": f"Cumulative Update {i}",
+                "vendor": "Microsoft",
+                "category": "Security Updates",
+                "vendorSeverity": "Critical",
+                "kb": f"KB{5000000 + i}",
+                "isSecurity": True,
+                "isSuperseded": False,
+                "rebootRequired": True,
+                "enabled": True,
+                "missingCount": i % 7,
+                "installedCount": i % 11,
+                "modifiedDate": 1706781630123,
+                "publishedDate": 1706781630123,
+                "architecture": ["X64"],
+                "qid": [str(90000 + i)],
+            }
+            for i in range(records)
+        ]
+    ).encode()
+
+
+def asset_page(records: int) -> bytes:
+    return dumps(
+        [
+            {
+                "id": f"{i:08x}-3333-4000-8000-000000000000",
+                "name": f"host{i}",
+                "operatingSystem": "Windows Server 2019",
+                "version": "1809",
+                "osIdentifier": "windows",
+                "scanStatus": "Completed",
+                "status": "Active",
+                "statusCode": 0,
+                "installedPatchCount": 120,
+                "missingPatchCount": i % 9,
+                "nonSupersededMissingPatchCount": i % 5,
+                "lastLoggedOnUser": "admin",
+                "architecture": "X64",
+                "scanDateTime": 1706781630123,
+                "activatedModules": ["PM", "VM"],
+            }
+            for i in range(records)
+        ]
+    ).encode()
+
+
+def ec2_page(records: int) -> bytes:
+    return dumps(
+        {
+            "content": [
+                {
+                    "resourceId": f"i-{i:017x}",
+                    "name": f"instance{i}",
+                    "created": "2024-02-01T10:20:30.123+00:00",
+                    "cloudAccountId": 123456789012,
+                    "uuid": f"{i:08x}-4444-4000-8000-000000000000",
+                    "connectorUuid": "conn",
+                    "createdOn": "2024-02-01T10:20:30.123+00:00",
+                    "remediationEnabled": False,
+                    "lastUpdated": "2024-02-02T10:20:30.123+00:00",
+                    "cloudType": "AWS",
+                    "region": "us-east-1",
+                    "resourceType": "EC2_INSTANCE",
+                    "accountAlias": "prod",
+                    "controlsFailed": i % 4,
+                    "subnetId": "subnet-1",
+                    "arsScore": 500,
+                    "availabilityZone": "us-east-1a",
+                    "instanceId": f"i-{i:017x}",
+                    "instanceState": "RUNNING",
+                    "vpcId": "vpc-1",
+                    "imageId": "ami-1",
+                    "publicIpAddress": "",
+                    "instanceType": "m5.large",
+                    "ipAddress": f"10.1.{i // 256}.{i % 256}",
+                    "privateIpAddress": f"10.1.{i // 256}.{i % 256}",
+                    "privateDnsName": f"ip-10-1-{i // 256}-{i % 256}.ec2.internal",
+                    "criticalityScore": 3,
+                }
+                for i in range(records)
+            ],
+            "empty": False,
+        }
+    ).encode()
+
+
+def via_dicts(model: type, path: tuple, platform: str = None):
+    def parse(document: bytes) -> BaseList:
+        result = BaseList()
+        for record in JSONRecordStream(document, path):
+            if platform:
+                record["platform"] = platform
+            result.append(model(**record))
+        return result
+
+    return parse
+
+
+def contents(value):
+    if is_dataclass(value):
+        return (
+            type(value),
+            tuple(contents(getattr(value, f.name)) for f in fields(value)),
+        )
+    if isinstance(value, list):
+        return (type(value), tuple(contents(item) for item in value))
+    if isinstance(value, dict):
+        return tuple((key, contents(item)) for key, item in value.items())
+    return (type(value), value)
+
+
+def best(func, document: bytes, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        func(document)
+        times.append(perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--records", type=int, default=1000)
+    parser.add_argument("--software", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    ec2_decoder = resource_decoder(AWSEC2Instance)
+    # name -> (document, the dict path, the decoder path):
+    cases = {
+        "GAV Host": (
+            gav_page(args.records, args.software),
+            via_dicts(Host, ("assetListData", "asset")),
+            lambda document: HOST_DECODER(document)[0],
+        ),
+        "PM Patch": (
+            patch_page(args.records),
+            via_dicts(Patch, (), "Windows"),
+            lambda document: PATCH_DECODER(document, platform="Windows")[0],
+        ),
+        "PM Asset": (
+            asset_page(args.records),
+            via_dicts(Asset, (), "Windows"),
+            lambda document: ASSET_DECODER(document, platform="Windows")[0],
+        ),
+        "TC EC2": (
+            ec2_page(args.records),
+            via_dicts(AWSEC2Instance, ("content",)),
+            lambda document: ec2_decoder(document)[0],
+        ),
+    }
+
+    print(
+        f"{'document':<10} {'records':>8} {'MB':>6} {'dicts (rec/s)':>14} {'typed (rec/s)':>14} {'speedup':>8}"
+    )
+    for name, (document, dicts, typed) in cases.items():
+        if contents(dicts(document)) != contents(typed(document)):
+            raise AssertionError(f"The decoded records differ on the {name} page.")
+
+        before = best(dicts, document, args.repeat)
+        after = best(typed, document, args.repeat)
+        print(
+            f"{name:<10} {args.records:>8} {len(document) / 1e6:>6.1f} {args.records / before:>14,.0f} {args.records / after:>14,.0f} {before / after:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+xml_decoder.py - compares building data classes through the dict tree (xml_parser,
+then from_dict) against building them straight from the XML with XMLDecoder, in
+records per second.
+
+The HLD fixture is a single page of --hosts hosts with --detections detections
+each (100,000 detections by default). The KB and Cloud Agent pages come from
+xml_parsers.py. Both paths parse the same bytes, and their records are checked to
+be equal, field by field, before timing.
+
+Usage, from the repository root (PYTHONPATH=. puts qualysdk on the path):
+    PYTHONPATH=. python benchmarks/xml_decoder.py --hosts 5000 --detections 20 --repeat 3
+"""
+
+from argparse import ArgumentParser
+from dataclasses import fields, is_dataclass
+from time import perf_counter
+
+from xml_parsers import agent_page, hld_page, kb_page
+
+from qualysdk.base.base_list import BaseList
+from qualysdk.base.xml_parser import xml_parser
+from qualysdk.base.xml_stream import XMLRecordStream
+from qualysdk.cloud_agent.calls import LIST_AGENTS_SPEC, _parse_agents_page
+from qualysdk.cloud_agent.data_classes.Agent import CloudAgent
+from qualysdk.vmdr.base.helpers import HOST_SPEC, _parse_detection_page
+from qualysdk.vmdr.data_classes.hosts import VMDRHost
+from qualysdk.vmdr.data_classes.kb_entry import KBEntry
+from qualysdk.vmdr.query_kb import KB_SPEC, _parse_kb_page
+
+
+def hld_via_dicts(document: bytes) -> BaseList:
+    return BaseList(
+        VMDRHost.from_dict(host)
+        for host in XMLRecordStream(document, "HOST", "HOST_LIST", HOST_SPEC)
+    )
+
+
+def kb_via_dicts(document: bytes) -> BaseList:
+    response = xml_parser(document, spec=KB_SPEC)["KNOWLEDGE_BASE_VULN_LIST_OUTPUT"]
+    return BaseList(
+        KBEntry.from_dict(vuln) for vuln in response["RESPONSE"]["VULN_LIST"]["VULN"]
+    )
+
+
+def agents_via_dicts(document: bytes) -> BaseList:
+    response = xml_parser(document, spec=LIST_AGENTS_SPEC)["ServiceResponse"]
+    return BaseList(CloudAgent(**agent) for agent in response["data"]["HostAsset"])
+
+
+def contents(value):
+    # Data classes compare only some of their fields (KBEntry only its QID):
+    if is_dataclass(value):
+        return (
+            type(value),
+            tuple(contents(getattr(value, f.name)) for f in fields(value)),
+        )
+    if isinstance(value, list):
+        return (type(value), tuple(contents(item) for item in value))
+    if isinstance(value, dict):
+        return tuple((key, contents(item)) for key, item in value.items())
+    return (type(value), value)
+
+
+def best(func, document: bytes, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        func(document)
+        times.append(perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--hosts", type=int, default=5000)
+    parser.add_argument("--detections", type=int, default=20)
+    parser.add_argument("--records", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # name -> (document, records on it, the dict path, the decoder path):
+    cases = {
+        "HLD": (
+            hld_page(args.hosts, args.detections),
+            args.hosts * args.detections,
+            hld_via_dicts,
+            lambda document: _parse_detection_page(document, "get_hld")[0],
+        ),
+        "KB": (
+            kb_page(args.records),
+            args.records,
+            kb_via_dicts,
+            lambda document: _parse_kb_page(document)[0],
+        ),
+        "Cloud Agent": (
+            agent_page(args.records),
+            args.records,
+            agents_via_dicts,
+            lambda document: _parse_agents_page(document)[0],
+        ),
+    }
+
+    print(
+        f"{'document':<12} {'records':>8} {'MB':>6} {'dicts (rec/s)':>14} {'decoder (rec/s)':>16} {'speedup':>8}"
+    )
+    for name, (document, records, via_dicts, decoded) in cases.items():
+        if contents(via_dicts(document)) != contents(decoded(document)):
+            raise AssertionError(f"The decoded records differ on the {name} page.")
+
+        before = best(via_dicts, document, args.repeat)
+        after = best(decoded, document, args.repeat)
+        print(
+            f"{name:<12} {records:>8} {len(document) / 1e6:>6.1f} {records / before:>14,.0f} {records / after:>16,.0f} {before / after:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+xml_parsers.py - compares qualysdk's xml_parser against its previous recursive
+converter and against xmltodict, on generated KB, host list detection (HLD) and
+Cloud Agent pages.
+
+All three parse the same bytes. The previous converter is kept below as
+recursive_element_to_dict, and its output is checked against xml_parser's before
+timing. xmltodict's output differs slightly (it keeps whitespace-only text, for
+example), so it is timed only.
+
+Usage, from the repository root (PYTHONPATH=. puts qualysdk on the path):
+    PYTHONPATH=. python benchmarks/xml_parsers.py --records 1000 --repeat 5
+"""
+
+from argparse import ArgumentParser
+from random import Random
+from time import perf_counter
+
+import xmltodict
+from defusedxml.lxml import fromstring
+from lxml.etree import _Comment
+
+from qualysdk.base.xml_parser import xml_parser
+
+
+def recursive_element_to_dict(element, attr_prefix="@", cdata_key="#text"):
+    # xml_parser's converter before it was made iterative:
+    parsed_dict = {}
+    for key, value in element.attrib.items():
+        parsed_dict[attr_prefix + key] = value
+    for child in element:
+        if isinstance(child, _Comment):
+            continue
+        child_dict = recursive_element_to_dict(child, attr_prefix, cdata_key)
+        if child.tag in parsed_dict:
+            if not isinstance(parsed_dict[child.tag], list):
+                parsed_dict[child.tag] = [parsed_dict[child.tag]]
+            parsed_dict[child.tag].append(child_dict)
+        else:
+            parsed_dict[child.tag] = child_dict
+    text = (element.text or "").strip()
+    if text:
+        if parsed_dict:
+            parsed_dict[cdata_key] = text
+        else:
+            parsed_dict = text
+    return parsed_dict
+
+
+def recursive_xml_parser(xml_string: bytes) -> dict:
+    root = fromstring(xml_string)
+    return {root.tag: recursive_element_to_dict(root)}
+
+
+def kb_page(records: int) -> bytes:
+    r = Random(1)
+    vulns = "".join(
+        f"<VULN><QID>{qid}</QID><VULN_TYPE>Vulnerability</VULN_TYPE><SEVERITY_LEVEL>{r.randint(1, 5)}</SEVERITY_LEVEL>"
+        f"<TITLE><![CDATA[Vendor Product Multiple Vulnerabilities ({qid})]]></TITLE><CATEGORY>Local</CATEGORY>"
+        "<LAST_SERVICE_MODIFICATION_DATETIME>2024-02-01T00:00:00Z</LAST_SERVICE_MODIFICATION_DATETIME>"
+        "<PUBLISHED_DATETIME>2023-11-01T00:00:00Z</PUBLISHED_DATETIME><PATCHABLE>1</PATCHABLE>"
+        + "".join(
+            f"<SOFTWARE><PRODUCT><![CDATA[product{s}]]></PRODUCT><VENDOR><![CDATA[vendor]]></VENDOR></SOFTWARE>"
+            for s in range(r.randint(1, 3))
+        ).join(("<SOFTWARE_LIST>", "</SOFTWARE_LIST>"))
+        + "".join(
+            f"<CVE><ID><![CDATA[CVE-2024-{qid % 10000 + c}]]></ID><URL><![CDATA[https://nvd.nist.gov/vuln/detail/CVE-2024-{qid % 10000 + c}]]></URL></CVE>"
+            for c in range(r.randint(1, 6))
+        ).join(("<CVE_LIST>", "</CVE_LIST>"))
+        + "<DIAGNOSIS><![CDATA[A <b>long</b> HTML description of the issue. "
+        + "Lorem ipsum dolor sit amet. " * 10
+        + "]]></DIAGNOSIS><SOLUTION><![CDATA[Apply the vendor's patch.]]></SOLUTION>"
+        '<THREAT_INTELLIGENCE><THREAT_INTEL id="5"><![CDATA[High_Lateral_Movement]]></THREAT_INTEL></THREAT_INTELLIGENCE>'
+        "<DISCOVERY><REMOTE>0</REMOTE><AUTH_TYPE_LIST><AUTH_TYPE>Windows</AUTH_TYPE></AUTH_TYPE_LIST></DISCOVERY></VULN>"
+        for qid in range(10000, 10000 + records)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8" ?>\n<!-- generated -->'
+        f"<KNOWLEDGE_BASE_VULN_LIST_OUTPUT><RESPONSE><DATETIME>2024-02-01T00:00:00Z</DATETIME>"
+        f"<VULN_LIST>{vulns}</VULN_LIST></RESPONSE></KNOWLEDGE_BASE_VULN_LIST_OUTPUT>"
+    ).encode()
+
+
+def hld_page(records: int, detections: int = 20) -> bytes:
+    r = Random(2)
+    hosts = "".join(
+        f"<HOST><ID>{i}</ID><ASSET_ID>{i + 5000}</ASSET_ID><IP>10.0.{i // 256 % 256}.{i % 256}</IP>"
+        f"<TRACKING_METHOD>IP</TRACKING_METHOD><OS><![CDATA[Windows Server 2019]]></OS>"
+        f"<DNS><![CDATA[host{i}.example.com]]></DNS><LAST_SCAN_DATETIME>2024-02-01T00:00:00Z</LAST_SCAN_DATETIME>"
+        + "".join(
+            f"<TAG><TAG_ID>{t}</TAG_ID><NAME><![CDATA[Tag {t}]]></NAME></TAG>"
+            for t in range(r.randint(1, 3))
+        ).join(("<TAGS>", "</TAGS>"))
+        + "".join(
+            f"<DETECTION><UNIQUE_VULN_ID>{i * 1000 + d}</UNIQUE_VULN_ID><QID>{r.randint(10000, 400000)}</QID>"
+            f"<TYPE>Confirmed</TYPE><SEVERITY>{r.randint(1, 5)}</SEVERITY><PORT>443</PORT><PROTOCOL>tcp</PROTOCOL>"
+            f"<SSL>1</SSL><RESULTS><![CDATA[Some result text {d}]]></RESULTS><STATUS>Active</STATUS>"
+            "<FIRST_FOUND_DATETIME>2024-01-01T00:00:00Z</FIRST_FOUND_DATETIME>"
+            "<LAST_FOUND_DATETIME>2024-02-01T00:00:00Z</LAST_FOUND_DATETIME>"
+            f'<QDS severity="HIGH">{r.randint(1, 100)}</QDS><TIMES_FOUND>{r.randint(1, 50)}</TIMES_FOUND>'
+            "<IS_IGNORED>0</IS_IGNORED><IS_DISABLED>0</IS_DISABLED></DETECTION>"
+            for d in range(detections)
+        ).join(("<DETECTION_LIST>", "</DETECTION_LIST>"))
+        + "</HOST>"
+        for i in range(1, records + 1)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8" ?>\n'
+        "<HOST_LIST_VM_DETECTION_OUTPUT><RESPONSE><DATETIME>2024-02-01T00:00:00Z</DATETIME>"
+        f"<HOST_LIST>{hosts}</HOST_LIST></RESPONSE></HOST_LIST_VM_DETECTION_OUTPUT>"
+    ).encode()
+
+
+def agent_page(records: int) -> bytes:
+    r = Random(3)
+    assets = "".join(
+        f"<HostAsset><id>{i}</id><name>host{i}</name><created>2024-01-01T00:00:00Z</created>"
+        f"<modified>2024-02-01T00:00:00Z</modified><type>HOST</type><os>Microsoft Windows 10</os>"
+        f"<dnsHostName>host{i}.example.com</dnsHostName><qwebHostId>{i + 100}</qwebHostId>"
+        f"<agentInfo><agentVersion>6.1.0.28</agentVersion><agentId>{i:08x}-aaaa-bbbb-cccc-dddddddddddd</agentId>"
+        "<status>STATUS_ACTIVE</status><platform>Windows</platform></agentInfo>"
+        + "".join(
+            f"<TagSimple><id>{t}</id><name>Tag {t}</name></TagSimple>"
+            for t in range(r.randint(1, 4))
+        ).join(("<tags><list>", "</list></tags>"))
+        + "".join(
+            f"<HostAssetSoftware><name>Software {s}</name><version>1.{s}</version></HostAssetSoftware>"
+            for s in range(r.randint(10, 40))
+        ).join(("<software><list>", "</list></software>"))
+        + "".join(
+            f"<HostAssetOpenPort><port>{p}</port><protocol>TCP</protocol></HostAssetOpenPort>"
+            for p in (135, 139, 445)
+        ).join(("<openPort><list>", "</list></openPort>"))
+        + "</HostAsset>"
+        for i in range(1, records + 1)
+    )
+    return (
+        "<?xml version='1.0' encoding='UTF-8'?><ServiceResponse><responseCode>SUCCESS</responseCode>"
+        f"<count>{records}</count><hasMoreRecords>false</hasMoreRecords>"
+        f"<data>{assets}</data></ServiceResponse>"
+    ).encode()
+
+
+def best(func, document: bytes, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        func(document)
+        times.append(perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--records", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    documents = {
+        "KB": kb_page(args.records),
+        "HLD": hld_page(args.records),
+        "Cloud Agent": agent_page(args.records),
+    }
+    parsers = {
+        "xml_parser": xml_parser,
+        "previous (recursive)": recursive_xml_parser,
+        "xmltodict": xmltodict.parse,
+    }
+
+    print(
+        f"{'document':<12} {'MB':>6} "
+        + " ".join(f"{name:>21}" for name in parsers)
+        + f" {'speedup':>8}"
+    )
+    for name, document in documents.items():
+        if repr(xml_parser(document)) != repr(recursive_xml_parser(document)):
+            raise AssertionError(f"xml_parser's output differs on the {name} page.")
+
+        seconds = {p: best(func, document, args.repeat) for p, func in parsers.items()}
+        print(
+            f"{name:<12} {len(document) / 1e6:>6.1f} "
+            + " ".join(f"{seconds[p]:>20.3f}s" for p in parsers)
+            + f" {seconds['previous (recursive)'] / seconds['xml_parser']:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
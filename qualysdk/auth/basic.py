@@ -3,11 +3,20 @@ basic.py - contains the BasicAuth class, which handles API endpoints that requir
 """
 
 from dataclasses import dataclass, field
+from time import monotonic
 from typing import Literal, Union
 
-from requests import get
-
 from .base import BaseAuthentication
+from ..base.session import (
+    Transport,
+    SessionManager,
+    DEFAULT_POOL_SIZE,
+    DEFAULT_TIMEOUT,
+)
+from ..base.ratelimit import RateLimiter, get_rate_limiter
+from ..base.ledger import SharedLedger, get_ledger
+from ..base.retry import RetryPolicy
+from ..base.hooks import HookRegistry
 from ..exceptions import AuthenticationError
 
 
@@ -21,11 +30,43 @@ class BasicAuth(BaseAuthentication):
     Attributes:
     ```
     platform: str - the platform for the basic authentication. Defaults to "qg3", but can be "qg[1-4]"
+    pool_size: Union[int, dict] - the maximum number of keep-alive connections kept per host. Either an int, or a dict of url_type: int, e.g. {"api": 10, "gateway": 20}. Defaults to 10.
+    timeout: Union[float, tuple] - the timeout for every HTTP request, in seconds. Either one number, or a (connect, read) tuple. Defaults to (10, 300).
+    session_manager: SessionManager - the pooled HTTP sessions used by every API call made with this object.
+    transport: Transport - what every HTTP request made with this object goes through. Defaults to session_manager. Pass a RecordingTransport, ReplayTransport or CachingTransport (see qualysdk.base.transport) to record, replay or cache API responses.
+    rate_limits: dict - fixed rate limit budgets for APIs that do not send X-RateLimit headers, such as Patch Management. Keys are a module or "module.endpoint", values are (calls, window_seconds), e.g. {"pm": (300, 60)}. Defaults to None.
+    rate_limiter: RateLimiter - the client-side rate limiter shared by every auth object for this username and platform.
+    ledger: Union[bool, str, SharedLedger] - optional SQLite ledger that shares rate limits and concurrency slots with other processes on the machine. True for the default file, a file path, or a SharedLedger. Defaults to None.
+    retry_policy: RetryPolicy - how API calls that fail for transient reasons (connection errors, timeouts, 502/503/504) are retried. Defaults to RetryPolicy().
+    hooks: HookRegistry - callbacks that receive a RequestEvent for every API call and a ParseEvent for every parsed response. See qualysdk.base.hooks.
+    lazy_login: bool - whether to skip the test login when the object is created. Credentials are then checked by the first API call. Defaults to True.
+    ratelimit_ttl: float - how many seconds get_ratelimit() caches the subscription's rate and concurrency limits for. Defaults to 3600.
     ```
     Other attributes are inherited from BaseAuthentication - AKA username, password, token, and auth_type
     """
 
     platform: Literal["qg1", "qg2", "qg3", "qg4"] = field(default="qg3", init=True)
+    pool_size: Union[int, dict] = field(
+        default=DEFAULT_POOL_SIZE, repr=False, compare=False
+    )
+    timeout: Union[float, tuple] = field(
+        default=DEFAULT_TIMEOUT, repr=False, compare=False
+    )
+    session_manager: SessionManager = field(init=False, repr=False, compare=False)
+    transport: Transport = field(default=None, repr=False, compare=False)
+    rate_limits: dict = field(default=None, repr=False, compare=False)
+    rate_limiter: RateLimiter = field(init=False, repr=False, compare=False)
+    ledger: Union[bool, str, SharedLedger] = field(
+        default=None, repr=False, compare=False
+    )
+    retry_policy: RetryPolicy = field(
+        default_factory=RetryPolicy, repr=False, compare=False
+    )
+    hooks: HookRegistry = field(
+        default_factory=HookRegistry, init=False, repr=False, compare=False
+    )
+    lazy_login: bool = field(default=True, repr=False, compare=False)
+    ratelimit_ttl: float = field(default=3600, repr=False, compare=False)
 
     def __post_init__(self) -> None:
         """
@@ -34,10 +75,24 @@ class BasicAuth(BaseAuthentication):
         if self.platform not in ["qg1", "qg2", "qg3", "qg4"]:
             raise ValueError("Platform must be one of 'qg1', 'qg2', 'qg3', or 'qg4'.")
 
+        self.session_manager = SessionManager(self.pool_size, self.timeout)
+        if self.transport is None:
+            self.transport = self.session_manager
+        else:
+            self.transport.bind(self.session_manager)
+        self.ledger = get_ledger(self.ledger)
+        self.rate_limiter = get_rate_limiter(
+            self.username, self.platform, self.rate_limits, self.ledger
+        )
+
+        # Rate limit details from the last about.php call, and when they were fetched:
+        self._ratelimit = None
+        self._ratelimit_fetched = 0.0
+
         super().__post_init__()
         self.validate_type()
         # self.auth_type = "basic"
-        if self.auth_type == "basic":  # account for TokenAuth
+        if self.auth_type == "basic" and not self.lazy_login:  # account for TokenAuth
             self.test_login()
 
     def __str__(self) -> str:
@@ -62,7 +117,8 @@ class BasicAuth(BaseAuthentication):
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
-        pass
+        self.transport.close()
+        self.session_manager.close()
 
     def test_login(self, return_ratelimit: bool = False) -> Union[dict, None]:
         """
@@ -98,7 +154,9 @@ class BasicAuth(BaseAuthentication):
             url = "https://qualysapi.qualys.com/msp/about.php"
 
         """Requires basic auth. JWT is not supported for this endpoint."""
-        r = get(url, auth=(self.username, self.password))
+        r = self.transport.request(
+            "api", "GET", url, auth=(self.username, self.password)
+        )
 
         if r.status_code != 200:
             raise AuthenticationError(
@@ -111,11 +169,21 @@ class BasicAuth(BaseAuthentication):
             "X-Concurrency-Limit-Limit": int(r.headers["X-Concurrency-Limit-Limit"]),
             # "X-RateLimit-ToWait-Sec": int(r.headers["X-RateLimit-ToWait-Sec"]),
         }
+        self._ratelimit = rl
+        self._ratelimit_fetched = monotonic()
         print(f"Success. Rate limit details: {rl}") if not return_ratelimit else None
         return rl if return_ratelimit else None
 
-    def get_ratelimit(self) -> dict:
+    def get_ratelimit(self, refresh: bool = False) -> dict:
         """
         Return ratelimit details for the API.
+
+        The details are cached for ratelimit_ttl seconds. Pass refresh=True to fetch them again.
         """
-        return self.test_login(return_ratelimit=True)
+        if (
+            refresh
+            or self._ratelimit is None
+            or monotonic() - self._ratelimit_fetched > self.ratelimit_ttl
+        ):
+            return self.test_login(return_ratelimit=True)
+        return dict(self._ratelimit)
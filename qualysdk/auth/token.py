@@ -2,14 +2,51 @@
 token.py - contains the TokenAuth class, which handles API endpoints that require JWT authentication
 """
 
+from base64 import urlsafe_b64decode
 from dataclasses import dataclass, field
-from datetime import datetime
-
-from requests import post
+from datetime import datetime, timedelta
+from json import loads
+from threading import Lock, Timer
+from weakref import ref
 
 from .basic import BasicAuth
 from ..exceptions import AuthenticationError
 
+# Qualys tokens expire 4 hours after they are generated. Used if the token has no exp claim:
+TOKEN_LIFETIME = timedelta(hours=4)
+# Seconds to wait before retrying a failed background refresh:
+REFRESH_RETRY = 60
+
+
+def _token_expiry(token: str, generated_on: datetime) -> datetime:
+    """
+    Return when a JWT expires, from its exp claim.
+    Falls back to TOKEN_LIFETIME after generated_on if the token cannot be decoded.
+    """
+    try:
+        payload = token.split(".")[1]
+        claims = loads(urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return datetime.fromtimestamp(int(claims["exp"]))
+    except (IndexError, KeyError, TypeError, ValueError):
+        return generated_on + TOKEN_LIFETIME
+
+
+def _background_refresh(auth_ref: ref) -> None:
+    """
+    Timer target for TokenAuth's proactive refresh. Holds a weak reference so
+    that a pending timer does not keep the auth object alive.
+    """
+    auth = auth_ref()
+    if auth is None:
+        return
+    try:
+        auth.refresh_if_needed()
+    except Exception as e:
+        print(
+            f"Warning: Background token refresh failed: {e}. Retrying in {REFRESH_RETRY} seconds."
+        )
+        auth._schedule_refresh(REFRESH_RETRY)
+
 
 @dataclass
 class TokenAuth(BasicAuth):
@@ -21,13 +58,21 @@ class TokenAuth(BasicAuth):
     ```
     token: str - the JWT token for the API
     generated_on: datetime - the datetime the token was generated. Tokens are valid for 4 hours.
+    expires_on: datetime - the datetime the token expires, from its exp claim.
+    refresh_margin: int - how many seconds before expires_on the token is refreshed. Defaults to 300.
+    auto_refresh: bool - whether to refresh the token in a background thread before it expires, rather than on the first call after. Defaults to True.
     ```
+    Refreshes are single-flight: when many threads find the token expiring at once, one of them
+    requests a new token and the others wait for it.
     Subclass of .basic.BasicAuth - provides the JWT authentication for the API
     """
 
     # JWT token
     token: str = field(init=False, repr=False)
     generated_on: datetime = field(init=False, default=datetime)
+    expires_on: datetime = field(init=False, default=None, repr=False)
+    refresh_margin: int = field(default=300, repr=False, compare=False)
+    auto_refresh: bool = field(default=True, repr=False, compare=False)
 
     def __post_init__(self):
         """
@@ -35,8 +80,11 @@ class TokenAuth(BasicAuth):
         """
         self.auth_type = "token"
         self.token = "placeholder"
+        self._token_lock = Lock()
+        self._refresh_timer = None
         super().__post_init__()
-        self.token = self.get_token()
+        with self._token_lock:
+            self._set_token(self.get_token())
 
     def get_token(self) -> str:
         """
@@ -55,7 +103,9 @@ class TokenAuth(BasicAuth):
 
         print(f"Generating token for {self.username} on {self.platform} platform.")
 
-        r = post(url, headers=headers, data=payload)
+        r = self.transport.request(
+            "gateway", "POST", url, headers=headers, data=payload
+        )
 
         if r.status_code != 201:
             raise AuthenticationError(
@@ -65,6 +115,75 @@ class TokenAuth(BasicAuth):
         self.generated_on = datetime.now()
         return r.text
 
+    def _set_token(self, token: str) -> None:
+        # Caller holds _token_lock.
+        self.token = token
+        self.expires_on = _token_expiry(token, self.generated_on)
+        if self.auto_refresh:
+            self._schedule_refresh(
+                (self.expires_on - datetime.now()).total_seconds() - self.refresh_margin
+            )
+
+    def _schedule_refresh(self, delay: float) -> None:
+        if self._refresh_timer is not None:
+            self._refresh_timer.cancel()
+        self._refresh_timer = Timer(
+            max(delay, 0), _background_refresh, args=(ref(self),)
+        )
+        self._refresh_timer.daemon = True
+        self._refresh_timer.start()
+
+    def token_expiring(self) -> bool:
+        """
+        Return True if the token expires within refresh_margin seconds.
+        """
+        return datetime.now() >= self.expires_on - timedelta(
+            seconds=self.refresh_margin
+        )
+
+    def refresh_if_needed(self) -> bool:
+        """
+        Refresh the token if it expires within refresh_margin seconds.
+
+        Only one thread refreshes at a time. Threads that were waiting on it
+        use the new token instead of requesting another.
+
+        Returns True if this call refreshed the token.
+        """
+        if not self.token_expiring():
+            return False
+
+        with self._token_lock:
+            # Another thread may have refreshed it while we waited on the lock:
+            if not self.token_expiring():
+                return False
+            print("Token is about to expire. Refreshing token...")
+            self._set_token(self.get_token())
+            return True
+
+    def close(self) -> None:
+        """
+        Stop the background token refresh.
+        """
+        if self._refresh_timer is not None:
+            self._refresh_timer.cancel()
+            self._refresh_timer = None
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        super().__exit__(exc_type, exc_value, traceback)
+
+    def __getstate__(self) -> dict:
+        # Locks and timers cannot be pickled/copied. Copies refresh on demand only:
+        state = self.__dict__.copy()
+        del state["_token_lock"]
+        state["_refresh_timer"] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._token_lock = Lock()
+
     def as_header(self) -> dict:
         """
         returns the headers for the API request
@@ -4,7 +4,7 @@ Basic functionality / helpers for qualysdk.
 
 from .call_api import call_api
 from .call_schema import CALL_SCHEMA
-from .xml_parser import xml_parser
+from .xml_parser import xml_parser, XMLSpec
 from .base_list import BaseList
 from .csv_export import write_csv, write_excel
 from .json_export import write_json
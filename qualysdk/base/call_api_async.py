@@ -0,0 +1,256 @@
+"""
+call_api_async.py - contains the asyncio counterpart of call_api for the qualysdk package.
+
+call_api_async validates and builds requests exactly like call_api, but sends them
+over the auth object's pooled httpx.AsyncClient so that many requests can be in
+flight on one event loop. It also contains iter_workers_async, which the async
+paginators use to fan work out over a bounded number of tasks.
+
+Requires httpx: pip install qualysdk[async]
+"""
+
+from asyncio import Queue, create_task, sleep, to_thread
+from datetime import datetime, timedelta
+from time import perf_counter
+from typing import AsyncIterator, Callable, Iterable, Literal, Union
+
+from requests import Response
+
+from ..auth.token import TokenAuth
+from ..auth.basic import BasicAuth
+from .call_api import _prepare_request, _refresh_token_if_needed, _check_response
+from .ratelimit import is_rate_limited, served_without_request
+from .retry import RetryStats
+from .hooks import RequestEvent, reset_current_event, track_response
+from .deadline import Deadline
+from .ledger import SLOT_POLL
+from ..exceptions.Exceptions import DeadlineExceeded
+
+# Marks a finished worker on the output queue of iter_workers_async:
+_WORKER_DONE = object()
+
+
+async def _send_async(
+    auth: Union[BasicAuth, TokenAuth], request: dict, deadline: Deadline = None
+) -> Response:
+    """
+    Send a prepared request through the auth object's transport.
+
+    If a deadline is given, the request's timeouts are capped by the time remaining.
+    """
+    if deadline is not None:
+        deadline.check()
+    return await auth.transport.arequest(
+        request["url_type"],
+        method=request["method"],
+        url=request["url"],
+        headers=request["headers"],
+        params=request["params"],
+        data=request["data"],
+        json=request["json"],
+        auth=request["auth"],
+        timeout=(
+            deadline.cap(auth.transport.timeout)
+            if deadline is not None
+            else auth.transport.timeout
+        ),
+    )
+
+
+async def call_api_async(
+    auth: Union[BasicAuth, TokenAuth],
+    module: str,
+    endpoint: str,
+    headers: dict = None,
+    params: dict = None,
+    payload: dict = None,
+    jsonbody: dict = None,
+    override_method: Literal["GET", "POST", "PUT", "PATCH", "DELETE"] = None,
+    deadline: Deadline = None,
+) -> Response:
+    """
+    Async base call function for the Qualys API.
+
+    Takes the same arguments as call_api and returns a requests.Response,
+    so responses can be parsed the same way as synchronous ones.
+
+    Params:
+    ```
+    auth (Union[BasicAuth, TokenAuth]) The authentication object.
+    module (str) The module to call using the CALL_SCHEMA.
+    endpoint (str) The endpoint to call using the CALL_SCHEMA.
+    headers (dict) The headers to send.
+    payload (dict) The payload to send.
+    params (dict) The parameters to send.
+    jsonbody (dict) The JSON body to send.
+    override_method (Literal["GET", "POST", "PUT", "PATCH", "DELETE"]) The method to override the schema with.
+    deadline (Deadline) Optional deadline for the call. Raises DeadlineExceeded instead of sending, waiting or retrying past it.
+    ```
+    """
+    # Token refreshes are blocking HTTP calls, so keep them off the event loop:
+    await to_thread(_refresh_token_if_needed, auth)
+
+    request = _prepare_request(
+        auth, module, endpoint, headers, params, payload, jsonbody, override_method
+    )
+
+    bucket = auth.rate_limiter.bucket(module, endpoint)
+    policy = auth.retry_policy
+    stats = RetryStats()
+
+    # Parsing is counted towards this call once it returns a response:
+    reset_current_event()
+    # Emitted to auth.hooks once the call returns or raises:
+    event = RequestEvent(
+        module, endpoint, request["method"], request["url"], _hooks=auth.hooks
+    )
+
+    try:
+        while True:  # loop to handle hitting the rate limit and transient failures
+            waited = 0
+            while (wait := bucket.reserve()) > 0:
+                if deadline is not None:
+                    deadline.check(wait)
+                await sleep(wait)
+                waited += wait
+            if waited:
+                event.rate_limit_wait += waited
+                await to_thread(_refresh_token_if_needed, auth, request)
+
+            stats.attempts += 1
+            # Other processes sharing a ledger may hold the API's concurrency slots:
+            while (
+                slot := auth.rate_limiter.try_acquire_slot(module, endpoint)
+            ) is None:
+                if deadline is not None:
+                    deadline.check(SLOT_POLL)
+                await sleep(SLOT_POLL)
+
+            try:
+                start = perf_counter()
+                response = await _send_async(auth, request, deadline)
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                if deadline is not None and deadline.expired():
+                    # The timeout was cut short by the deadline:
+                    policy.record(module, endpoint, stats, failed=True)
+                    deadline.check()
+                delay = policy.next_delay(request, module, endpoint, stats, error=e)
+                if delay is None:
+                    policy.record(module, endpoint, stats, failed=True)
+                    raise
+                if deadline is not None:
+                    deadline.check(delay)
+                await sleep(delay)
+                continue
+            finally:
+                auth.rate_limiter.release_slot(slot)
+
+            event.record_response(response, perf_counter() - start)
+
+            if served_without_request(response):
+                # No request reached Qualys, so the call is not counted against
+                # the API's budget or in the retry stats:
+                bucket.refund()
+                response.retry_stats = stats
+                track_response(event, response)
+                return response
+
+            rate_limited = is_rate_limited(response)
+            to_wait = bucket.update(response.headers, rate_limited)
+
+            if rate_limited:
+                event.rate_limited += 1
+                print(
+                    f"WARNING: You have reached the rate limit for this endpoint. qualysdk will automatically sleep for {to_wait:.0f} seconds and try again at approximately {datetime.now() + timedelta(seconds=to_wait)}."
+                )
+                continue
+
+            delay = policy.next_delay(
+                request, module, endpoint, stats, response=response
+            )
+            if delay is not None:
+                if deadline is not None:
+                    deadline.check(delay)
+                await sleep(delay)
+                continue
+
+            policy.record(module, endpoint, stats, failed=response.status_code >= 500)
+            response.retry_stats = stats
+            track_response(event, response)
+
+            # check for errors not related to rate limiting:
+            _check_response(module, endpoint, response)
+
+            return response
+    except Exception as e:
+        event.error = repr(e)
+        raise
+    finally:
+        event.attempts = stats.attempts
+        event.retries = stats.retries
+        event.backoff = stats.backoff
+        if auth.hooks:
+            auth.hooks.emit("request", event)
+
+
+async def iter_workers_async(
+    worker: Callable[..., AsyncIterator],
+    jobs: Iterable,
+    concurrency: int,
+    jobs_per_worker: Union[int, "all"] = "all",
+) -> AsyncIterator:
+    """
+    Run worker(job) for every job with at most concurrency tasks at once,
+    yielding each item the workers produce as soon as it is ready.
+
+    Params:
+    ```
+    worker (Callable[..., AsyncIterator]) An async generator function taking one job.
+    jobs (Iterable) The jobs to hand out.
+    concurrency (int) The number of worker tasks to run.
+    jobs_per_worker (Union[int, "all"]) How many jobs a task takes before it exits. Defaults to "all".
+    ```
+
+    If a worker raises, the remaining tasks are cancelled and the exception is re-raised.
+    """
+    if not isinstance(concurrency, int) or concurrency < 1:
+        raise ValueError("concurrency must be an integer >= 1.")
+
+    job_queue = Queue()
+    for job in jobs:
+        job_queue.put_nowait(job)
+
+    # Bounded, so fast producers wait for the consumer instead of piling up records:
+    out = Queue(maxsize=concurrency * 1000)
+
+    async def run():
+        taken = 0
+        try:
+            while not job_queue.empty():
+                if jobs_per_worker != "all" and taken >= jobs_per_worker:
+                    break
+                job = job_queue.get_nowait()
+                taken += 1
+                async for item in worker(job):
+                    await out.put(item)
+        except Exception as e:
+            await out.put(e)
+        await out.put(_WORKER_DONE)
+
+    tasks = [create_task(run()) for _ in range(concurrency)]
+    running = len(tasks)
+
+    try:
+        while running:
+            item = await out.get()
+            if item is _WORKER_DONE:
+                running -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,130 @@
+"""
+call_plan.py - contains the compiled CALL_SCHEMA plans used by call_api.
+
+Interpreting an endpoint's CALL_SCHEMA entry (validating the module and endpoint,
+resolving the URL for the platform, finding the placeholders in its path) gives
+the same result every time. get_plan does it once per (module, endpoint, platform)
+and caches the result, so that each page of a paginated pull only has to check
+its kwargs against frozensets and fill in the URL.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from string import Formatter
+
+from .call_schema import CALL_SCHEMA
+
+# Every placeholder an endpoint path can contain. They are sent as part of the
+# URL, never as params/POST data:
+PLACEHOLDERS = (
+    "placeholder",
+    "cloudprovider",
+    "connectorid",
+    "controlid",
+    "resourceid",
+    "webappId",
+    "webappAuthRecordId",
+    "findingId",
+)
+
+
+@dataclass(frozen=True, slots=True)
+class CallPlan:
+    """
+    CallPlan - one endpoint's CALL_SCHEMA entry, compiled for a platform.
+
+    Attributes:
+    ```
+    module: str - the module.
+    endpoint: str - the endpoint.
+    url_type: str - the module's URL type (api, gateway or base).
+    url: str - the full URL. Contains {placeholder}-style slots if slots is not empty.
+    slots: tuple - the placeholders in the URL, in order.
+    methods: tuple - the HTTP methods the endpoint accepts. The first is the default.
+    valid_params: frozenset - the accepted URL params.
+    valid_post_data: frozenset - the accepted POST data keys.
+    use_json: bool - whether data is sent with requests' json=.
+    xml_data: bool - whether the endpoint accepts a raw _xml_data body.
+    auth_type: str - the auth type the endpoint expects.
+    ```
+    """
+
+    module: str
+    endpoint: str
+    url_type: str
+    url: str
+    slots: tuple
+    methods: tuple
+    valid_params: frozenset
+    valid_post_data: frozenset
+    use_json: bool
+    xml_data: bool
+    auth_type: str
+
+    def format_url(self, values: dict) -> str:
+        """
+        Pop the placeholders out of values (params or POST data) and fill in the URL.
+        Placeholders with no value are filled with "None".
+        """
+        filled = {name: str(values.pop(name, None)) for name in PLACEHOLDERS}
+        return self.url.format_map(filled)
+
+
+def _base_url(url_type: str, platform: str) -> str:
+    match url_type:
+        case "gateway":
+            return f"https://gateway.{platform}.apps.qualys.com"
+        case "api":
+            # Special case for qg1 platform: no qg or apps in the URL
+            if platform == "qg1":
+                return "https://qualysapi.qualys.com"
+            return f"https://qualysapi.{platform}.apps.qualys.com"
+        case "base":
+            if platform == "qg1":
+                return "https://qualysguard.qualys.com"
+            return f"https://qualysguard.{platform}.apps.qualys.com"
+        case _:
+            raise ValueError(f"Invalid url_type {url_type}.")
+
+
+@lru_cache(maxsize=None)
+def get_plan(module: str, endpoint: str, platform: str) -> CallPlan:
+    """
+    Return the compiled plan for an endpoint on a platform.
+
+    Params:
+    ```
+    module (str) The module in the CALL_SCHEMA.
+    endpoint (str) The endpoint in the CALL_SCHEMA.
+    platform (str) The Qualys platform, i.e. "qg1".
+    ```
+    """
+    # check module and endpoint:
+    if module.lower() not in CALL_SCHEMA.keys():
+        raise ValueError(
+            f"Invalid module {module}. Valid modules are: {CALL_SCHEMA.keys()}."
+        )
+    if endpoint.lower() not in CALL_SCHEMA[module].keys():
+        raise ValueError(
+            f"Invalid endpoint {endpoint} for module {module}. Valid endpoints are: {[i for i in CALL_SCHEMA[module].keys() if i != 'url_type']}."
+        )
+
+    SCHEMA = CALL_SCHEMA[module][endpoint]
+    url_type = CALL_SCHEMA[module]["url_type"]
+    url = _base_url(url_type, platform) + SCHEMA["endpoint"]
+
+    return CallPlan(
+        module=module,
+        endpoint=endpoint,
+        url_type=url_type,
+        url=url,
+        slots=tuple(
+            name for _, name, _, _ in Formatter().parse(url) if name is not None
+        ),
+        methods=tuple(SCHEMA["method"]),
+        valid_params=frozenset(SCHEMA["valid_params"]),
+        valid_post_data=frozenset(SCHEMA["valid_POST_data"]),
+        use_json=bool(SCHEMA["use_requests_json_data"]),
+        xml_data=bool(SCHEMA.get("_xml_data")),
+        auth_type=SCHEMA["auth_type"],
+    )
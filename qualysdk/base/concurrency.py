@@ -0,0 +1,251 @@
+"""
+concurrency.py - contains the ConcurrencyController class for the qualysdk package.
+
+The threaded pulls (i.e. get_hld, get_inventory) start as many threads as they
+are asked for and keep them all busy, whether or not Qualys answers any faster
+for it. Past some number of requests in flight, each one just takes longer, and
+past the subscription's concurrency limit they are turned away.
+
+A ConcurrencyController lets only limit of a pull's threads make a request at a
+time, and tunes limit as the pull goes, from the RequestEvents of its calls
+(see hooks.py), the way TCP tunes its window (AIMD):
+
+- Each round of requests, limit grows by 1 while the bytes received per second
+  keep rising and the requests' median network time stays within tolerance of
+  the quickest round's.
+- A request that was rate limited (409/429) halves limit, once per limit
+  requests. A round that got slower without being rate limited takes 1 off
+  instead, and one where the X-Concurrency-Limit-Running header shows the
+  subscription at its limit does not grow.
+- Once growing stops paying off, limit stays put, trying 1 more again every
+  few rounds.
+"""
+
+from contextlib import contextmanager, nullcontext
+from statistics import median
+from threading import Condition
+from time import perf_counter
+from typing import ContextManager, Iterable
+
+from .deadline import Deadline
+from .hooks import HookRegistry, RequestEvent
+
+# Rounds to hold limit for, after growing stopped paying off, before trying 1 more:
+_HOLD_ROUNDS = 5
+
+
+class ConcurrencyController:
+    """
+    ConcurrencyController - let a tuned number of threads make requests at a time.
+
+    Each request of the pull is made inside slot(), which waits while limit
+    requests are in flight. While watching() an auth object's hooks, the
+    controller learns from the RequestEvents of the endpoints it was given.
+
+    Params:
+    ```
+    maximum (int) The most requests to allow at once, i.e. the number of threads started.
+    endpoints (Iterable[tuple[str, str]]) The (module, endpoint) pairs the pull calls, i.e. [("vmdr", "get_hld")].
+    start (int) Optional. The limit to start at. Defaults to half of maximum, rounded up.
+    minimum (int) The lowest limit to back off to. Defaults to 1.
+    tolerance (float) How much slower than the quickest round a round may be, as a fraction, and still count as flat. Defaults to 0.5.
+    gain (float) How much more throughput a round must have than the last, as a fraction, to count as better. Defaults to 0.05.
+    ```
+
+    Attributes:
+    ```
+    limit: int - the number of requests allowed at once.
+    history: list[tuple[float, int]] - (seconds since the first request, limit) for each change of limit.
+    ```
+    """
+
+    def __init__(
+        self,
+        maximum: int,
+        endpoints: Iterable[tuple[str, str]],
+        start: int = None,
+        minimum: int = 1,
+        tolerance: float = 0.5,
+        gain: float = 0.05,
+    ):
+        if not isinstance(maximum, int) or maximum < 1:
+            raise ValueError("maximum must be an integer of 1 or more.")
+        if not isinstance(minimum, int) or not 1 <= minimum <= maximum:
+            raise ValueError("minimum must be an integer from 1 to maximum.")
+
+        self.maximum = maximum
+        self.minimum = minimum
+        self.endpoints = frozenset(endpoints)
+        self.tolerance = tolerance
+        self.gain = gain
+        self.limit = max(
+            minimum, min(maximum, start if start is not None else -(-maximum // 2))
+        )
+        self.history = [(0.0, self.limit)]
+        self.requests = 0
+        self.rate_limited = 0
+
+        self._active = 0
+        self._cond = Condition()
+        self._started = None
+        # The current round's network times and bytes, and when it started:
+        self._times = []
+        self._bytes = 0
+        self._round_start = None
+        self._last_throughput = None
+        self._baseline = None
+        self._grew = False
+        self._held = 0
+        self._full = False
+        self._decreased_at = -maximum
+
+    @contextmanager
+    def slot(self, deadline: Deadline = None):
+        """
+        Hold one of the limit slots for the duration of the block, waiting for one
+        to free up first. Raises DeadlineExceeded if the deadline expires first.
+        """
+        with self._cond:
+            while self._active >= self.limit:
+                if deadline is not None:
+                    deadline.check()
+                # Time out now and then to check the deadline:
+                self._cond.wait(0.5)
+            self._active += 1
+            if self._started is None:
+                self._started = self._round_start = perf_counter()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify()
+
+    @contextmanager
+    def watching(self, hooks: HookRegistry):
+        """
+        Learn from the RequestEvents emitted to hooks for the duration of the block.
+        """
+        hooks.register(self.observe, "request")
+        try:
+            yield self
+        finally:
+            hooks.unregister(self.observe)
+
+    def _set_limit(self, limit: int) -> None:
+        # Caller holds the lock.
+        limit = max(self.minimum, min(self.maximum, limit))
+        if limit != self.limit:
+            grew = limit > self.limit
+            self.limit = limit
+            self.history.append((perf_counter() - self._started, limit))
+            if grew:
+                self._cond.notify_all()
+
+    def _end_round(self, now: float) -> None:
+        # Caller holds the lock.
+        elapsed = now - self._round_start
+        latency = median(self._times)
+        throughput = (self._bytes or len(self._times)) / elapsed if elapsed else None
+        full = self._full
+        self._times = []
+        self._bytes = 0
+        self._round_start = now
+        self._full = False
+
+        if self._baseline is None or latency < self._baseline:
+            self._baseline = latency
+
+        if latency > self._baseline * (1 + self.tolerance):
+            # Requests are queueing up on Qualys' side:
+            self._set_limit(self.limit - 1)
+            self._grew = False
+        elif (
+            throughput is not None
+            and self._last_throughput is not None
+            and throughput <= self._last_throughput * (1 + self.gain)
+            and self._grew
+        ):
+            # The last step up did not pay off. Step back and hold:
+            self._set_limit(self.limit - 1)
+            self._grew = False
+            self._held = 0
+        elif not full and (
+            self._last_throughput is None or self._grew or self._held >= _HOLD_ROUNDS
+        ):
+            grew = self.limit < self.maximum
+            self._set_limit(self.limit + 1)
+            self._grew = grew
+            self._held = 0
+        else:
+            self._held += 1
+        self._last_throughput = throughput
+
+    def observe(self, event: RequestEvent) -> None:
+        """
+        Learn from the RequestEvent of one call. Registered on auth.hooks by watching().
+        """
+        # Calls made outside slot(), before the pull started, are not counted:
+        if (
+            self._started is None
+            or (event.module, event.endpoint) not in self.endpoints
+        ):
+            return
+
+        headers = event.rate_limit
+        limit = headers.get("X-Concurrency-Limit-Limit")
+        running = headers.get("X-Concurrency-Limit-Running")
+        with self._cond:
+            self.requests += 1
+            if limit and int(limit) > 0 and int(limit) < self.maximum:
+                self.maximum = max(self.minimum, int(limit))
+                self._set_limit(self.limit)
+
+            if event.rate_limited or event.status in (409, 429):
+                self.rate_limited += 1
+                # Requests sent before the last decrease may still be turned away.
+                # Only one decrease is made per limit requests:
+                if self.requests - self._decreased_at > self.limit:
+                    self._decreased_at = self.requests
+                    self._set_limit(self.limit // 2)
+                    self._grew = False
+                    self._held = 0
+                    # Start a new round at the new limit:
+                    self._times = []
+                    self._bytes = 0
+                    self._round_start = perf_counter()
+                return
+
+            if limit and running and int(running) >= int(limit):
+                # The subscription is at its limit (counting other clients), so
+                # growing would only get requests turned away:
+                self._full = True
+
+            if event.error is not None:
+                return
+            self._times.append(event.network_time)
+            self._bytes += event.bytes
+            # A round is long enough for each slot to have made about 2 requests:
+            if len(self._times) >= max(2 * self.limit, 4):
+                self._end_round(perf_counter())
+
+    def summary(self) -> str:
+        """
+        A line on the limit the controller settled on.
+        """
+        return (
+            f"settled on {self.limit} of {self.maximum} threads after {self.requests} requests "
+            f"({len(self.history) - 1} changes, {self.rate_limited} rate limited)"
+        )
+
+    def __repr__(self) -> str:
+        return f"ConcurrencyController(limit={self.limit}, maximum={self.maximum}, active={self._active})"
+
+
+def concurrency_slot(
+    controller: ConcurrencyController, deadline: Deadline = None
+) -> ContextManager:
+    """
+    controller.slot(deadline), or a block that does nothing if controller is None.
+    """
+    return nullcontext() if controller is None else controller.slot(deadline)
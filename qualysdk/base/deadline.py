@@ -0,0 +1,74 @@
+"""
+deadline.py - contains the Deadline class for the qualysdk package.
+
+A Deadline bounds the total runtime of a pull. call_api checks it before every
+attempt and caps each request's timeouts (and any rate limit/retry waits) by the
+time remaining, so a pull's worker threads all stop shortly after it expires.
+"""
+
+from time import monotonic
+from typing import Union
+
+from ..exceptions.Exceptions import DeadlineExceeded
+
+
+class Deadline:
+    """
+    Deadline - a point in time after which a pull stops.
+
+    Params:
+    ```
+    seconds (float) How many seconds from now the deadline expires.
+    ```
+    """
+
+    def __init__(self, seconds: float):
+        if not isinstance(seconds, (int, float)) or seconds <= 0:
+            raise ValueError("deadline must be a number of seconds above 0.")
+        self.seconds = seconds
+        self.expires_at = monotonic() + seconds
+        # Set once anything has been cut short by this deadline:
+        self.exceeded = False
+
+    @classmethod
+    def from_seconds(cls, seconds: Union[float, None]) -> Union["Deadline", None]:
+        """
+        Return a Deadline, or None if seconds is None.
+        """
+        return None if seconds is None else cls(seconds)
+
+    def remaining(self) -> float:
+        """
+        Return the number of seconds left, or 0 if expired.
+        """
+        return max(self.expires_at - monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def check(self, wait: float = 0) -> None:
+        """
+        Raise DeadlineExceeded if the deadline has expired, or will have expired after waiting wait seconds.
+        """
+        remaining = self.remaining()
+        if remaining <= 0 or wait >= remaining:
+            self.exceeded = True
+            raise DeadlineExceeded(
+                f"Deadline of {self.seconds} seconds exceeded."
+                if remaining <= 0
+                else f"Waiting {wait:.1f} seconds would exceed the deadline of {self.seconds} seconds."
+            )
+
+    def cap(self, timeout: Union[float, tuple, None]) -> tuple:
+        """
+        Cap a requests-style timeout (a number or a (connect, read) tuple) by the time remaining.
+        """
+        remaining = self.remaining()
+        if timeout is None:
+            return (remaining, remaining)
+        if not isinstance(timeout, tuple):
+            timeout = (timeout, timeout)
+        return tuple(remaining if t is None else min(t, remaining) for t in timeout)
+
+    def __repr__(self) -> str:
+        return f"Deadline(seconds={self.seconds}, remaining={self.remaining():.1f})"
@@ -0,0 +1,285 @@
+"""
+hooks.py - contains the request event hooks for the qualysdk package.
+
+call_api and call_api_async emit a RequestEvent for every call to the callbacks
+registered on auth.hooks. The event carries where the time went (waiting on the
+rate limiter, waiting for the first byte, downloading the body) along with the
+bytes received, retries and rate limit headers.
+
+Parsing a response with xml_parser or response.json() emits a ParseEvent for the
+most recent call in the same thread (or asyncio task). Responses are parsed after
+their RequestEvent is emitted, so parse time is only reported by ParseEvents.
+Comparing these against a function's total run time shows whether a pull is
+bound by the network, by parsing or by building data classes.
+"""
+
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from threading import Lock
+from time import perf_counter
+from typing import Callable, Literal, Union
+
+from requests import Response
+
+EVENTS = ("request", "parse")
+
+# The event of the most recent call_api call in the current thread/task:
+_current_event = ContextVar("qualysdk_current_event", default=None)
+
+
+@dataclass
+class RequestEvent:
+    """
+    RequestEvent - emitted once per call_api/call_api_async call. Times are in seconds.
+
+    Attributes:
+    ```
+    module: str - the module called.
+    endpoint: str - the endpoint called.
+    method: str - the HTTP method.
+    url: str - the URL called.
+    status: int - the HTTP status of the final response. None if no response was received.
+    ttfb: float - time to first byte of the final attempt: from sending the request to receiving the headers.
+    download: float - time spent reading the body of the final attempt.
+    bytes: int - the size of the response body, after decompression.
+    wire_bytes: int - the size of the response body as received, before decompression.
+    attempts: int - the number of attempts made, including retries.
+    retries: int - the number of retries.
+    backoff: float - total time slept between retries.
+    rate_limit_wait: float - total time spent waiting on the client-side rate limiter.
+    rate_limited: int - the number of responses rejected for exceeding the rate limit (429, or 409 from the API server) before the final one.
+    rate_limit: dict - the X-RateLimit-* and X-Concurrency-Limit-* headers of the final response.
+    error: str - the exception raised by the call, if any.
+    started: float - the perf_counter() value when the call started.
+    ```
+    """
+
+    module: str
+    endpoint: str
+    method: str = None
+    url: str = None
+    status: int = None
+    ttfb: float = 0.0
+    download: float = 0.0
+    bytes: int = 0
+    wire_bytes: int = 0
+    attempts: int = 0
+    retries: int = 0
+    backoff: float = 0.0
+    rate_limit_wait: float = 0.0
+    rate_limited: int = 0
+    rate_limit: dict = field(default_factory=dict)
+    error: str = None
+    started: float = field(default_factory=perf_counter)
+    _hooks: "HookRegistry" = field(default=None, repr=False, compare=False)
+
+    @property
+    def network_time(self) -> float:
+        """
+        Time to first byte plus download time of the final attempt.
+        """
+        return self.ttfb + self.download
+
+    def record_response(self, response: Response, total: float) -> None:
+        """
+        Fill in the response fields. total is the time the transport took to return the response.
+        """
+        self.status = response.status_code
+        self.ttfb = min(response.elapsed.total_seconds(), total)
+        self.download = total - self.ttfb
+        self.bytes = len(response.content)
+        self.wire_bytes = getattr(response, "wire_bytes", self.bytes)
+        self.rate_limit = {
+            k: v
+            for k, v in response.headers.items()
+            if k.startswith(("X-RateLimit-", "X-Concurrency-Limit-"))
+        }
+
+    def add_parse(self, parser: Literal["xml", "json"], seconds: float, nbytes: int):
+        """
+        Emit a ParseEvent for time spent parsing the response.
+        """
+        if self._hooks:
+            self._hooks.emit(
+                "parse",
+                ParseEvent(self.module, self.endpoint, parser, seconds, nbytes, self),
+            )
+
+
+@dataclass
+class ParseEvent:
+    """
+    ParseEvent - emitted each time a response is parsed with xml_parser or response.json().
+
+    Attributes:
+    ```
+    module: str - the module of the call whose response was parsed.
+    endpoint: str - the endpoint of the call whose response was parsed.
+    parser: str - "xml" or "json".
+    seconds: float - time spent parsing.
+    bytes: int - the size of the parsed document.
+    request: RequestEvent - the event of the call whose response was parsed.
+    ```
+    """
+
+    module: str
+    endpoint: str
+    parser: Literal["xml", "json"]
+    seconds: float
+    bytes: int
+    request: RequestEvent = field(repr=False)
+
+
+class HookRegistry:
+    """
+    HookRegistry - the callbacks an auth object emits events to.
+
+    Callbacks are called from whichever thread (or event loop) made the call, so
+    they should be quick and thread-safe. Exceptions raised by a callback are
+    printed and otherwise ignored.
+    """
+
+    def __init__(self):
+        self._callbacks = {event: [] for event in EVENTS}
+        self._lock = Lock()
+
+    def register(
+        self,
+        callback: Callable[[Union[RequestEvent, ParseEvent]], None],
+        event: Literal["request", "parse"] = None,
+    ) -> Callable:
+        """
+        Register a callback for an event, or for every event if event is None.
+
+        Returns the callback, so this can be used as a decorator.
+        """
+        if event is not None and event not in EVENTS:
+            raise ValueError(f"Invalid event {event}. Valid events are: {EVENTS}.")
+
+        with self._lock:
+            for name in (event,) if event else EVENTS:
+                self._callbacks[name] = self._callbacks[name] + [callback]
+        return callback
+
+    def unregister(self, callback: Callable) -> None:
+        """
+        Remove a callback from every event.
+        """
+        with self._lock:
+            for name in EVENTS:
+                # ==, not is, so that a bound method (a new object each time
+                # it is looked up) matches the one registered:
+                self._callbacks[name] = [
+                    cb for cb in self._callbacks[name] if cb != callback
+                ]
+
+    def emit(
+        self, event: Literal["request", "parse"], data: Union[RequestEvent, ParseEvent]
+    ) -> None:
+        # Lists are replaced, never mutated, so no lock is needed to iterate:
+        for callback in self._callbacks[event]:
+            try:
+                callback(data)
+            except Exception as e:
+                print(f"Warning: {event} hook {callback} raised {e!r}.")
+
+    def __bool__(self) -> bool:
+        return any(self._callbacks.values())
+
+    def __getstate__(self) -> dict:
+        # Callbacks and locks are not carried over to copies/other processes:
+        return {}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__()
+
+    def __repr__(self) -> str:
+        return f"HookRegistry({', '.join(f'{k}={len(v)}' for k, v in self._callbacks.items())})"
+
+
+def track_response(event: RequestEvent, response: Response) -> None:
+    """
+    Attach an event to a response, make it the current event for parsing, and
+    time calls to response.json().
+    """
+    response.event = event
+    _current_event.set(event)
+
+    original = response.json
+
+    def json(**kwargs):
+        start = perf_counter()
+        data = original(**kwargs)
+        event.add_parse("json", perf_counter() - start, len(response.content))
+        return data
+
+    response.json = json
+
+
+def reset_current_event() -> None:
+    """
+    Forget the current thread/task's most recent call, so that parsing done while
+    the next call is in flight, or after it raises, is not counted towards it.
+    """
+    _current_event.set(None)
+
+
+def record_parse(parser: Literal["xml", "json"], seconds: float, nbytes: int) -> None:
+    """
+    Add parse time to the current thread/task's most recent call, if there is one.
+    """
+    event = _current_event.get()
+    if event is not None:
+        event.add_parse(parser, seconds, nbytes)
+
+
+class StatsCollector:
+    """
+    StatsCollector - a ready-made hook that totals events per module and endpoint.
+
+    Register it with auth.hooks.register(collector) and read collector.summary()
+    once the pull finishes.
+    """
+
+    def __init__(self):
+        self.totals = {}
+        self._lock = Lock()
+
+    def __call__(self, event: Union[RequestEvent, ParseEvent]) -> None:
+        with self._lock:
+            totals = self.totals.setdefault(
+                f"{event.module}.{event.endpoint}",
+                {
+                    "calls": 0,
+                    "errors": 0,
+                    "retries": 0,
+                    "bytes": 0,
+                    "wire_bytes": 0,
+                    "rate_limit_wait": 0.0,
+                    "ttfb": 0.0,
+                    "download": 0.0,
+                    "parse": 0.0,
+                },
+            )
+            if isinstance(event, ParseEvent):
+                totals["parse"] += event.seconds
+                return
+            totals["calls"] += 1
+            totals["errors"] += int(event.error is not None)
+            totals["retries"] += event.retries
+            totals["bytes"] += event.bytes
+            totals["wire_bytes"] += event.wire_bytes
+            totals["rate_limit_wait"] += event.rate_limit_wait
+            totals["ttfb"] += event.ttfb
+            totals["download"] += event.download
+
+    def summary(self) -> dict:
+        """
+        Return a copy of the totals, keyed by "module.endpoint". Times are in seconds.
+        """
+        with self._lock:
+            return {key: dict(totals) for key, totals in self.totals.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self.totals = {}
@@ -0,0 +1,224 @@
+"""
+json_stream.py - contains the JSONRecordStream class for the qualysdk package.
+
+response.json() decodes a whole page into one tree of dicts and lists before the
+first record is built, so a page of GAV assets with their software lists is held
+in memory twice over (the raw bytes and the tree), and then a third time as
+data classes.
+
+JSONRecordStream decodes the document a chunk at a time instead. Each element of
+the records array (i.e. assetListData.asset) is decoded on its own with the json
+module's C scanner and yielded, so only one record's dicts exist at a time, and
+building a record's data class overlaps with decoding the next one. The keys
+outside the array (i.e. hasMore, lastSeenAssetId) may come before or after it,
+so they are available once iteration finishes.
+"""
+
+from codecs import getincrementaldecoder
+from io import BytesIO
+from json import JSONDecodeError, JSONDecoder
+from re import compile
+from time import perf_counter
+from typing import IO, Any, Iterator, Union
+
+from .hooks import record_parse
+
+_DECODER = JSONDecoder()
+_WHITESPACE = compile(r"[ \t\n\r]*")
+# Characters that may continue a number:
+_NUMBER_CHARS = frozenset("0123456789.eE+-")
+
+
+class JSONRecordStream:
+    """
+    JSONRecordStream - iterate over the records of a JSON document one at a time.
+
+    Iterating yields each element of the array at path. If the value at path is
+    an object rather than an array, it is yielded as the only record. If it is
+    null or empty, or path is not in the document, nothing is yielded. Once iteration
+    finishes, document holds the rest of the document. A stream can only be
+    iterated once.
+
+    Params:
+    ```
+    source (Union[bytes, str, IO]) The JSON, or a binary file-like object to read it from (i.e. a streamed response.raw).
+    path (tuple[str, ...]) The keys of the records array, i.e. ("assetListData", "asset"). Defaults to (), for a document that is the array itself.
+    chunk_size (int) The number of bytes to read at a time. Defaults to 65536.
+    ```
+
+    Attributes:
+    ```
+    document: Any - the document without the records, i.e. {"hasMore": 1, "assetListData": {}}. Set once iteration finishes.
+    found: bool - whether path was in the document.
+    records: int - the number of records yielded so far.
+    ```
+    """
+
+    def __init__(
+        self,
+        source: Union[bytes, str, IO],
+        path: tuple[str, ...] = (),
+        chunk_size: int = 65536,
+    ):
+        if isinstance(source, str):
+            source = source.encode("utf-8")
+        if isinstance(source, bytes):
+            self.bytes = len(source)
+            source = BytesIO(source)
+        else:
+            self.bytes = None
+
+        self.source = source
+        self.path = tuple(path)
+        self.chunk_size = chunk_size
+        self.document = None
+        self.found = False
+        self.records = 0
+        self._started = False
+        self._text = getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, size: int = None) -> bool:
+        """
+        Read the next chunk onto the buffer, dropping what has been decoded.
+        Returns False at the end of the document.
+        """
+        if self._eof:
+            return False
+        chunk = self.source.read(size or self.chunk_size)
+        if not chunk:
+            self._eof = True
+        self._buffer = self._buffer[self._pos :] + self._text.decode(
+            chunk, final=self._eof
+        )
+        self._pos = 0
+        return True
+
+    def _peek(self) -> str:
+        """
+        Skip whitespace and return the next character, or "" at the end.
+        """
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, chars: str) -> str:
+        char = self._peek()
+        if not char or char not in chars:
+            raise JSONDecodeError(
+                f"Expecting one of {chars!r}", self._buffer, self._pos
+            )
+        self._pos += 1
+        return char
+
+    def _value(self) -> Any:
+        """
+        Decode the next whole value.
+        """
+        self._peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._buffer, self._pos)
+            except JSONDecodeError:
+                # The value goes on past the buffer:
+                if not self._fill(size):
+                    raise
+            else:
+                # A number that ends the buffer, or a chunk boundary (i.e. "1." or
+                # "1e"), may go on in the next chunk:
+                if (
+                    end < len(self._buffer) and self._buffer[end] not in _NUMBER_CHARS
+                ) or not self._fill(size):
+                    self._pos = end
+                    return value
+            # Read bigger chunks for big values, so they are not decoded too many times:
+            size *= 2
+
+    def _walk(self, depth: int) -> Iterator[Any]:
+        """
+        Yield the records below the next value, which is at self.path[:depth], and
+        return the value without them.
+        """
+        if depth == len(self.path):
+            self.found = True
+            if self._peek() != "[":
+                value = self._value()
+                if value:
+                    yield value
+                return None
+            self._pos += 1
+            if self._peek() == "]":
+                self._pos += 1
+                return None
+            while True:
+                yield self._value()
+                if self._expect(",]") == "]":
+                    return None
+
+        if self._peek() != "{":
+            return self._value()
+        self._pos += 1
+        rest = {}
+        if self._peek() == "}":
+            self._pos += 1
+            return rest
+        while True:
+            if self._peek() != '"':
+                raise JSONDecodeError(
+                    "Expecting property name", self._buffer, self._pos
+                )
+            key = self._value()
+            self._expect(":")
+            if key == self.path[depth]:
+                value = yield from self._walk(depth + 1)
+                if value is not None:
+                    rest[key] = value
+            else:
+                rest[key] = self._value()
+            if self._expect(",}") == "}":
+                return rest
+
+    def __iter__(self) -> Iterator[Any]:
+        if self._started:
+            raise RuntimeError("A JSONRecordStream can only be iterated once.")
+        self._started = True
+
+        # Time spent decoding, not counting the time the caller spends on each record:
+        seconds = 0.0
+        start = perf_counter()
+        walk = self._walk(0)
+        while True:
+            try:
+                record = next(walk)
+            except StopIteration as done:
+                self.document = done.value
+                break
+            self.records += 1
+            seconds += perf_counter() - start
+            yield record
+            start = perf_counter()
+
+        if self._peek():
+            raise JSONDecodeError("Extra data", self._buffer, self._pos)
+        seconds += perf_counter() - start
+        # Count the time towards the call that returned this document (see hooks.py):
+        record_parse("json", seconds, self.bytes or 0)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        document.get(key, default), for documents that are objects.
+        """
+        return (
+            self.document.get(key, default)
+            if isinstance(self.document, dict)
+            else default
+        )
+
+    def __repr__(self) -> str:
+        return f"JSONRecordStream(path={self.path!r}, records={self.records})"
@@ -0,0 +1,132 @@
+"""
+lazy.py - contains the LazyRecord class for the qualysdk package.
+
+Building a data class runs its whole __post_init__: every date, int and IP is
+converted, nested lists become BaseLists of more data classes, and HTML fields
+are run through BeautifulSoup. A pull that only reads a few fields of each record
+pays for all of it.
+
+A LazyRecord holds the record's parsed dict instead. Each attribute is converted
+the first time it is read, by the data class's own __post_init__ run on just
+that key, so values are the same as the data class's. materialize() builds the
+full data class when it is needed.
+"""
+
+from copy import deepcopy
+from dataclasses import MISSING, fields
+from typing import Any
+
+# data class -> the names of its fields, and of its required fields:
+_FIELDS = {}
+
+
+class LazyRecord:
+    """
+    LazyRecord - a read-only view of one record that converts its fields on first access.
+
+    Subclasses set _model to the data class the record materializes to.
+
+    Params:
+    ```
+    data (dict) The record, as parsed from the response. Owned by the view from then on.
+    ```
+    """
+
+    __slots__ = ("_data", "_values", "_record")
+
+    # The data class the record materializes to:
+    _model = None
+    # The field shown by repr():
+    _key = None
+    # Attributes that _model.__post_init__ derives from other keys of the record,
+    # mapped to those keys:
+    _sources = {}
+
+    def __init__(self, data: dict):
+        self._data = data
+        self._values = {}
+        self._record = None
+
+    @classmethod
+    def _fields(cls) -> tuple[frozenset, tuple]:
+        """
+        The names of model's fields, and of the fields it cannot be built without.
+        """
+        try:
+            return _FIELDS[cls._model]
+        except KeyError:
+            model_fields = fields(cls._model)
+            _FIELDS[cls._model] = (
+                frozenset(f.name for f in model_fields),
+                tuple(
+                    f.name
+                    for f in model_fields
+                    if f.default is MISSING and f.default_factory is MISSING
+                ),
+            )
+            return _FIELDS[cls._model]
+
+    def _decode(self, name: str) -> Any:
+        """
+        Convert one attribute by building the model from only the keys it comes from.
+        """
+        subset = {}
+        for key in (name, *self._sources.get(name, ()), *self._fields()[1]):
+            if key in self._data:
+                value = self._data[key]
+                # __post_init__ may rework nested values in place. Keep the
+                # record intact for materialize():
+                subset[key] = (
+                    deepcopy(value) if isinstance(value, (dict, list)) else value
+                )
+        return getattr(self._model.from_dict(subset), name)
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for names that are not slots or methods of the view:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if self._record is not None:
+            return getattr(self._record, name)
+        try:
+            return self._values[name]
+        except KeyError:
+            pass
+
+        if name in self._fields()[0] or name in self._sources:
+            value = self._values[name] = self._decode(name)
+            return value
+
+        # Methods, properties and attributes set in __post_init__ need the whole record:
+        return getattr(self.materialize(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name in LazyRecord.__slots__:
+            object.__setattr__(self, name, value)
+        else:
+            raise AttributeError(
+                f"{type(self).__name__} is read-only. Call materialize() to get a {self._model.__name__} to modify."
+            )
+
+    def materialize(self):
+        """
+        Build and return the full data class. It is built once, and the view
+        reads from it from then on.
+        """
+        if self._record is None:
+            self._record = self._model.from_dict(self._data)
+            self._data = None
+            self._values = None
+        return self._record
+
+    def to_dict(self) -> dict:
+        return self.materialize().to_dict()
+
+    def __str__(self) -> str:
+        return (
+            str(self.materialize())
+            if self._key is None
+            else str(getattr(self, self._key))
+        )
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._key}={getattr(self, self._key)!r})"
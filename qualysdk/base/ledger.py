@@ -0,0 +1,329 @@
+"""
+ledger.py - contains the SharedLedger class for the qualysdk package.
+
+RateLimiter only paces the calls made by one process. When several processes
+(i.e. a VMDR pull, a GAV pull and a PM job) run against the same subscription,
+each one learns the limits on its own and together they overrun them.
+
+A SharedLedger is a small SQLite database that every process on a machine can
+point at. It holds a token bucket per API, shared through SharedBucket, and a
+semaphore per API that caps the number of calls in flight at the subscription's
+X-Concurrency-Limit-Limit. SQLite's file locking keeps the processes in step.
+"""
+
+import os
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock, local
+from time import sleep, time
+from typing import Union
+
+from .ratelimit import TokenBucket
+
+# The ledger used when auth objects are created with ledger=True. It is per-user,
+# so that other users on the machine cannot read or take the subscription's slots:
+DEFAULT_LEDGER_PATH = (
+    Path(os.environ.get("XDG_STATE_HOME") or Path.home() / ".local" / "state")
+    / "qualysdk"
+    / "ledger.sqlite3"
+)
+# Seconds between checks for a free concurrency slot:
+SLOT_POLL = 0.1
+# Seconds after which a slot is considered abandoned, i.e. by a killed process:
+SLOT_TIMEOUT = 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    key TEXT PRIMARY KEY,
+    max_calls INTEGER,
+    window_sec REAL,
+    tokens REAL,
+    updated REAL,
+    blocked_until REAL
+);
+CREATE TABLE IF NOT EXISTS concurrency (
+    key TEXT PRIMARY KEY,
+    max_running INTEGER
+);
+CREATE TABLE IF NOT EXISTS slots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT,
+    pid INTEGER,
+    acquired REAL
+);
+CREATE INDEX IF NOT EXISTS slots_key ON slots (key);
+"""
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # os.kill would terminate the process on Windows. Rely on SLOT_TIMEOUT instead:
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SharedLedger:
+    """
+    SharedLedger - rate limit buckets and concurrency slots shared by every process using the same file.
+
+    Params:
+    ```
+    path (Union[str, Path]) The SQLite file. Created if it does not exist, along with its directory, readable only by the current user. Defaults to DEFAULT_LEDGER_PATH (~/.local/state/qualysdk/ledger.sqlite3).
+    slot_timeout (float) Seconds after which a concurrency slot that was never released is reclaimed. Defaults to 3600.
+    ```
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path] = DEFAULT_LEDGER_PATH,
+        slot_timeout: float = SLOT_TIMEOUT,
+    ):
+        self.path = Path(path)
+        self.slot_timeout = slot_timeout
+        self.path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        # sqlite3 connections cannot be shared between threads:
+        self._local = local()
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+            self._local.depth = 0
+        return db
+
+    @contextmanager
+    def transaction(self):
+        """
+        Hold the ledger's write lock, across every process, for the duration of the block.
+        Nested blocks in the same thread share the outer transaction.
+        """
+        db = self._connection()
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                yield db
+            finally:
+                self._local.depth -= 1
+            return
+
+        db.execute("BEGIN IMMEDIATE")
+        self._local.depth = 1
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        else:
+            db.execute("COMMIT")
+        finally:
+            self._local.depth = 0
+
+    def bucket(self, key: str, limit: int = None, window: int = None) -> "SharedBucket":
+        """
+        Return a token bucket kept in this ledger. See SharedBucket.
+        """
+        return SharedBucket(self, key, limit, window)
+
+    def set_concurrency_limit(self, key: str, limit: int) -> None:
+        """
+        Set the number of calls to an API that may be in flight at once.
+        """
+        with self.transaction() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO concurrency (key, max_running) VALUES (?, ?)",
+                (key, limit),
+            )
+
+    def _purge_slots(self, db: sqlite3.Connection, key: str) -> None:
+        # Free slots held by processes that exited without releasing them:
+        db.execute(
+            "DELETE FROM slots WHERE key = ? AND acquired < ?",
+            (key, time() - self.slot_timeout),
+        )
+        for (pid,) in db.execute(
+            "SELECT DISTINCT pid FROM slots WHERE key = ?", (key,)
+        ).fetchall():
+            if pid != os.getpid() and not _pid_alive(pid):
+                db.execute("DELETE FROM slots WHERE pid = ?", (pid,))
+
+    def try_acquire_slot(self, key: str) -> Union[int, None]:
+        """
+        Take a concurrency slot for an API if one is free.
+
+        Returns the slot's ID, 0 if the API's concurrency limit is not known yet
+        (no slot is needed), or None if every slot is taken.
+        """
+        with self.transaction() as db:
+            row = db.execute(
+                "SELECT max_running FROM concurrency WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return 0
+
+            self._purge_slots(db, key)
+            (running,) = db.execute(
+                "SELECT COUNT(*) FROM slots WHERE key = ?", (key,)
+            ).fetchone()
+            if running >= row[0]:
+                return None
+
+            return db.execute(
+                "INSERT INTO slots (key, pid, acquired) VALUES (?, ?, ?)",
+                (key, os.getpid(), time()),
+            ).lastrowid
+
+    def acquire_slot(self, key: str, deadline=None) -> int:
+        """
+        Block until a concurrency slot for an API is free and take it.
+
+        If a Deadline is given, raises DeadlineExceeded instead of waiting past it.
+
+        Returns the slot's ID (0 if no slot was needed), to pass to release_slot.
+        """
+        while (slot := self.try_acquire_slot(key)) is None:
+            if deadline is not None:
+                deadline.check(SLOT_POLL)
+            sleep(SLOT_POLL)
+        return slot
+
+    def release_slot(self, slot: int) -> None:
+        """
+        Give back a slot taken with acquire_slot or try_acquire_slot.
+        """
+        if slot:
+            with self.transaction() as db:
+                db.execute("DELETE FROM slots WHERE id = ?", (slot,))
+
+    def __getstate__(self) -> dict:
+        # Connections cannot be pickled/copied. Only the configuration is kept:
+        return {"path": self.path, "slot_timeout": self.slot_timeout}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["path"], state["slot_timeout"])
+
+    def __repr__(self) -> str:
+        return f"SharedLedger(path='{self.path}')"
+
+
+class SharedBucket(TokenBucket):
+    """
+    SharedBucket - a TokenBucket whose state lives in a SharedLedger, so that
+    every process using the ledger draws from the same budget.
+
+    Params:
+    ```
+    ledger (SharedLedger) The ledger to keep the bucket in.
+    key (str) The bucket's key in the ledger, i.e. "user@qg1/vmdr.get_hld".
+    limit (int) The number of calls allowed per window. Optional.
+    window (int) The window length in seconds. Optional.
+    ```
+    """
+
+    # Processes cannot compare monotonic clocks, so the shared state uses wall time:
+    clock = staticmethod(time)
+
+    def __init__(
+        self, ledger: SharedLedger, key: str, limit: int = None, window: int = None
+    ):
+        self.ledger = ledger
+        self.key = key
+        super().__init__(limit, window)
+
+    def _sync(self, method, *args):
+        """
+        Load the bucket from the ledger, run a TokenBucket method on it and save it,
+        all in one ledger transaction.
+        """
+        with self.ledger.transaction() as db:
+            row = db.execute(
+                "SELECT max_calls, window_sec, tokens, updated, blocked_until FROM buckets WHERE key = ?",
+                (self.key,),
+            ).fetchone()
+            if row is not None:
+                (
+                    self.limit,
+                    self.window,
+                    self.tokens,
+                    self._updated,
+                    self.blocked_until,
+                ) = row
+
+            result = method(*args)
+
+            db.execute(
+                "INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    self.key,
+                    self.limit,
+                    self.window,
+                    self.tokens,
+                    self._updated,
+                    self.blocked_until,
+                ),
+            )
+        return result
+
+    def set_limit(self, limit: int, window: int) -> None:
+        return self._sync(super().set_limit, limit, window)
+
+    def reserve(self) -> float:
+        return self._sync(super().reserve)
+
+    def refund(self) -> None:
+        return self._sync(super().refund)
+
+    def update(self, headers: dict, rate_limited: bool = False) -> Union[float, None]:
+        """
+        Learn the limits from a response's headers, including the concurrency limit.
+        """
+        with self.ledger.transaction():
+            concurrency = headers.get("X-Concurrency-Limit-Limit")
+            if concurrency and int(concurrency) > 0:
+                self.ledger.set_concurrency_limit(self.key, int(concurrency))
+            return self._sync(super().update, headers, rate_limited)
+
+    def __repr__(self) -> str:
+        return f"SharedBucket(key='{self.key}', limit={self.limit}, window={self.window}, tokens={self.tokens})"
+
+
+# One SharedLedger per file, so that auth objects in a process share its connections:
+_LEDGERS = {}
+_LEDGERS_LOCK = Lock()
+
+
+def get_ledger(
+    ledger: Union[bool, str, Path, SharedLedger],
+) -> Union[SharedLedger, None]:
+    """
+    Turn the ledger argument of an auth object into a SharedLedger.
+
+    Params:
+    ```
+    ledger (Union[bool, str, Path, SharedLedger]) True for DEFAULT_LEDGER_PATH, a path, a SharedLedger, or None/False for no ledger.
+    ```
+    """
+    if not ledger:
+        return None
+    if isinstance(ledger, SharedLedger):
+        return ledger
+    if ledger is True:
+        ledger = DEFAULT_LEDGER_PATH
+    if not isinstance(ledger, (str, Path)):
+        raise ValueError("ledger must be True, a file path or a SharedLedger.")
+
+    path = Path(ledger).resolve()
+    with _LEDGERS_LOCK:
+        if path not in _LEDGERS:
+            _LEDGERS[path] = SharedLedger(path)
+        return _LEDGERS[path]
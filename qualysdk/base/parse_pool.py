@@ -0,0 +1,96 @@
+"""
+parse_pool.py - contains the ParsePool class for the qualysdk package.
+
+Turning a page of XML into data classes is pure Python, so the threads of a
+multithreaded pull (i.e. get_hld) take turns holding the GIL while they parse,
+and adding threads stops helping after a few.
+
+A ParsePool hands each page's raw bytes to a pool of worker processes instead.
+A worker parses the page and builds the data classes, and sends them back
+pickled, which is several times cheaper for the calling process than parsing.
+The pull's threads are left to wait on the network, and parsing scales with the
+number of cores.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from os import cpu_count
+from time import perf_counter
+from typing import Any, Callable
+
+from .hooks import record_parse
+
+
+def _parse_in_worker(func: Callable, content: bytes, args: tuple) -> tuple:
+    # Runs in a worker process. The time is reported back to the calling thread:
+    start = perf_counter()
+    result = func(content, *args)
+    return result, perf_counter() - start
+
+
+class ParsePool:
+    """
+    ParsePool - parse downloaded pages in worker processes.
+
+    With processes=0, pages are parsed in the calling thread, as if there were no pool.
+
+    Use it as a context manager, or call close() when done, to stop the workers.
+
+    As with any use of multiprocessing, scripts that use a ParsePool should
+    start their work under an `if __name__ == "__main__":` block, because
+    worker processes may import the script's main module.
+
+    Params:
+    ```
+    processes (int) The number of worker processes. 0 to parse in the calling thread. Defaults to 0.
+    ```
+    """
+
+    def __init__(self, processes: int = 0):
+        if not isinstance(processes, int) or processes < 0:
+            raise ValueError("parse_processes must be an integer of 0 or more.")
+        if processes > cpu_count():
+            print(
+                f"Warning: The number of parse processes ({processes}) is greater than the number of CPUs ({cpu_count()}). This may cause performance issues."
+            )
+
+        self.processes = processes
+        self._executor = None
+        if processes:
+            self._executor = ProcessPoolExecutor(processes)
+            # Start the workers now, from the calling thread, rather than from
+            # whichever pull thread parses the first page:
+            self._executor.submit(int).result()
+
+    def parse(self, func: Callable, content: bytes, *args) -> Any:
+        """
+        Return func(content, *args), run in a worker process.
+
+        func must be a module-level function, and its arguments and result must
+        be picklable. Exceptions raised by func are re-raised here.
+        """
+        if self._executor is None:
+            return func(content, *args)
+
+        result, seconds = self._executor.submit(
+            _parse_in_worker, func, content, args
+        ).result()
+        # Count the worker's time towards the call that returned the page (see hooks.py):
+        record_parse("xml", seconds, len(content))
+        return result
+
+    def close(self) -> None:
+        """
+        Stop the worker processes.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> "ParsePool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"ParsePool(processes={self.processes})"
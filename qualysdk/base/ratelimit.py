@@ -0,0 +1,352 @@
+"""
+ratelimit.py - contains the client-side rate limiter for the qualysdk package.
+
+Qualys limits how many calls a subscription may make to each API within a
+window, and reports the limit through X-RateLimit-* response headers. The
+RateLimiter keeps one token bucket per (module, endpoint) that learns the
+window and remaining budget from those headers and paces calls from every
+thread so that the hard limit is not hit in the first place.
+
+Patch Management does not send X-RateLimit headers, so its buckets can be
+given a fixed budget instead (see RateLimiter.configure).
+
+To share the budget with other processes, the RateLimiter can keep its buckets
+in a SharedLedger (see ledger.py). It then also caps the calls in flight to each
+API at the subscription's concurrency limit.
+"""
+
+from contextlib import contextmanager
+from threading import Lock
+from time import monotonic, sleep
+from typing import Union
+
+# Seconds to back off when rate limited without an X-RateLimit-ToWait-Sec header
+# and before the bucket has learned its window:
+DEFAULT_BACKOFF = 60
+
+
+class TokenBucket:
+    """
+    TokenBucket - a thread-safe token bucket for one Qualys API.
+
+    Until a limit is known (learned from headers or configured), the bucket does not pace calls.
+    See ledger.SharedBucket for a bucket shared between processes.
+
+    Params:
+    ```
+    limit (int) The number of calls allowed per window. Optional.
+    window (int) The window length in seconds. Optional.
+    ```
+    """
+
+    # The clock the bucket runs on. Only needs to be comparable within one process:
+    clock = staticmethod(monotonic)
+
+    def __init__(self, limit: int = None, window: int = None):
+        self._lock = Lock()
+        self.limit = None
+        self.window = None
+        self.tokens = None
+        self.blocked_until = 0.0
+        self._updated = self.clock()
+        if limit and window:
+            self.set_limit(limit, window)
+
+    def set_limit(self, limit: int, window: int) -> None:
+        """
+        Set the number of calls allowed per window.
+        """
+        if not isinstance(limit, int) or limit < 1:
+            raise ValueError("limit must be an integer above 0.")
+        if not isinstance(window, (int, float)) or window <= 0:
+            raise ValueError("window must be a number of seconds above 0.")
+
+        with self._lock:
+            if self.tokens is None:
+                self.tokens = float(limit)
+            self.limit = limit
+            self.window = window
+            self.tokens = min(self.tokens, float(limit))
+
+    def _refill(self, now: float) -> None:
+        # Caller holds the lock.
+        if self.limit is not None:
+            rate = self.limit / self.window
+            self.tokens = min(
+                float(self.limit), self.tokens + (now - self._updated) * rate
+            )
+        self._updated = now
+
+    def reserve(self) -> float:
+        """
+        Take a token if one is available.
+
+        Returns 0 if a token was taken, otherwise the number of seconds
+        to wait before asking again.
+        """
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+
+            if now < self.blocked_until:
+                return self.blocked_until - now
+
+            if self.limit is None:
+                return 0
+
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+
+            return (1 - self.tokens) * self.window / self.limit
+
+    def acquire(self, deadline=None) -> float:
+        """
+        Block until a token is available and take it.
+
+        If a Deadline is given, raises DeadlineExceeded instead of waiting past it.
+
+        Returns the total number of seconds spent waiting.
+        """
+        waited = 0.0
+        while (wait := self.reserve()) > 0:
+            if deadline is not None:
+                deadline.check(wait)
+            sleep(wait)
+            waited += wait
+        return waited
+
+    def refund(self) -> None:
+        """
+        Give back the token taken for a call that sent no request, i.e. one
+        answered from a cache.
+        """
+        with self._lock:
+            if self.tokens is not None and self.limit is not None:
+                self.tokens = min(float(self.limit), self.tokens + 1)
+
+    def update(self, headers: dict, rate_limited: bool = False) -> Union[float, None]:
+        """
+        Learn the limit and remaining budget from a response's headers.
+
+        Params:
+        ```
+        headers (dict) The response headers.
+        rate_limited (bool) Whether the response was rejected for exceeding the rate limit.
+        ```
+
+        Returns the number of seconds the bucket is now blocked for, if rate_limited.
+        """
+        limit = headers.get("X-RateLimit-Limit")
+        window = headers.get("X-RateLimit-Window-Sec")
+        if limit and window and int(limit) > 0 and int(window) > 0:
+            self.set_limit(int(limit), int(window))
+
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+
+            remaining = headers.get("X-RateLimit-Remaining")
+            if remaining is not None and self.limit is not None:
+                # The server's count is authoritative. It includes calls made by other clients:
+                self.tokens = min(float(int(remaining)), float(self.limit))
+
+            to_wait = headers.get("X-RateLimit-ToWait-Sec")
+            if to_wait is not None and int(to_wait) > 0:
+                self.blocked_until = max(self.blocked_until, now + int(to_wait))
+            elif rate_limited:
+                if self.limit is not None:
+                    # Wait for one token's worth of the window:
+                    backoff = self.window / self.limit
+                else:
+                    backoff = DEFAULT_BACKOFF
+                self.blocked_until = max(self.blocked_until, now + backoff)
+
+            if rate_limited:
+                if self.tokens is not None:
+                    self.tokens = 0.0
+                return max(self.blocked_until - now, 0)
+        return None
+
+    def __repr__(self) -> str:
+        return f"TokenBucket(limit={self.limit}, window={self.window}, tokens={self.tokens})"
+
+
+class RateLimiter:
+    """
+    RateLimiter - holds a TokenBucket for each (module, endpoint) of a subscription.
+
+    Auth objects for the same username and platform share one RateLimiter,
+    so every thread and auth object calling an API draws from the same budget.
+
+    Params:
+    ```
+    budgets (dict) Fixed budgets for APIs that do not send X-RateLimit headers.
+        Keys are a module ("pm") or "module.endpoint" ("pm.list_jobs"). Values are
+        (calls, window_seconds) tuples, i.e. {"pm": (300, 60)}.
+    ledger (SharedLedger) Optional ledger to keep the buckets and concurrency slots in, shared with other processes.
+    name (str) The subscription's name in the ledger, i.e. "user@qg1".
+    ```
+    """
+
+    def __init__(self, budgets: dict = None, ledger=None, name: str = None):
+        self.budgets = {}
+        self.ledger = ledger
+        self.name = name
+        self._buckets = {}
+        self._lock = Lock()
+        if budgets:
+            self.configure(budgets)
+
+    def configure(self, budgets: dict) -> None:
+        """
+        Set fixed budgets. See the class docstring for the format.
+        """
+        if not isinstance(budgets, dict):
+            raise ValueError(
+                "rate_limits must be a dict of module/module.endpoint: (calls, window_seconds)."
+            )
+
+        for key, budget in budgets.items():
+            if (
+                not isinstance(key, str)
+                or not isinstance(budget, (tuple, list))
+                or len(budget) != 2
+            ):
+                raise ValueError(
+                    f"Invalid rate limit budget {key}: {budget}. Budgets must be (calls, window_seconds)."
+                )
+
+        with self._lock:
+            self.budgets.update(
+                {key: (int(budget[0]), budget[1]) for key, budget in budgets.items()}
+            )
+            for (module, endpoint), bucket in self._buckets.items():
+                budget = self._budget_for(module, endpoint)
+                if budget:
+                    bucket.set_limit(*budget)
+
+    def _budget_for(self, module: str, endpoint: str) -> Union[tuple, None]:
+        return self.budgets.get(f"{module}.{endpoint}", self.budgets.get(module))
+
+    def bucket(self, module: str, endpoint: str) -> TokenBucket:
+        """
+        Return the bucket for a module and endpoint, creating it if needed.
+        """
+        key = (module, endpoint)
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            return bucket
+
+        with self._lock:
+            if key not in self._buckets:
+                budget = self._budget_for(module, endpoint) or ()
+                if self.ledger is not None:
+                    self._buckets[key] = self.ledger.bucket(
+                        self._ledger_key(module, endpoint), *budget
+                    )
+                else:
+                    self._buckets[key] = TokenBucket(*budget)
+            return self._buckets[key]
+
+    def _ledger_key(self, module: str, endpoint: str) -> str:
+        return f"{self.name}/{module}.{endpoint}"
+
+    def try_acquire_slot(self, module: str, endpoint: str) -> Union[int, None]:
+        """
+        Take a concurrency slot for an API if one is free. See SharedLedger.try_acquire_slot.
+
+        Without a ledger, calls are not capped and 0 is always returned.
+        """
+        if self.ledger is None:
+            return 0
+        return self.ledger.try_acquire_slot(self._ledger_key(module, endpoint))
+
+    def release_slot(self, slot: int) -> None:
+        if self.ledger is not None:
+            self.ledger.release_slot(slot)
+
+    @contextmanager
+    def slot(self, module: str, endpoint: str, deadline=None):
+        """
+        Hold a concurrency slot for an API for the duration of the block.
+
+        Without a ledger, this does nothing.
+        """
+        if self.ledger is None:
+            yield
+            return
+
+        slot = self.ledger.acquire_slot(self._ledger_key(module, endpoint), deadline)
+        try:
+            yield
+        finally:
+            self.ledger.release_slot(slot)
+
+    def __getstate__(self) -> dict:
+        # Locks cannot be pickled/copied. Only the configuration is kept:
+        return {"budgets": self.budgets, "ledger": self.ledger, "name": self.name}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["budgets"], state.get("ledger"), state.get("name"))
+
+    def __repr__(self) -> str:
+        return f"RateLimiter(budgets={self.budgets}, ledger={self.ledger}, buckets={len(self._buckets)})"
+
+
+# One RateLimiter per subscription, shared by every auth object for it:
+_LIMITERS = {}
+_LIMITERS_LOCK = Lock()
+
+
+def get_rate_limiter(
+    username: str, platform: str, budgets: dict = None, ledger=None
+) -> RateLimiter:
+    """
+    Return the shared RateLimiter for a username and platform.
+
+    Params:
+    ```
+    username (str) The Qualys username.
+    platform (str) The Qualys platform, i.e. "qg1".
+    budgets (dict) Fixed budgets to add. See RateLimiter.
+    ledger (SharedLedger) Optional ledger to share the limits with other processes.
+    ```
+    """
+    key = (username, platform, ledger.path if ledger is not None else None)
+    with _LIMITERS_LOCK:
+        if key not in _LIMITERS:
+            _LIMITERS[key] = RateLimiter(ledger=ledger, name=f"{username}@{platform}")
+        limiter = _LIMITERS[key]
+    if budgets:
+        limiter.configure(budgets)
+    return limiter
+
+
+def is_rate_limited(response) -> bool:
+    """
+    Return True if Qualys rejected the response for exceeding the rate limit.
+
+    The Gateway returns 429. The API server returns 409 with
+    "This API cannot be run again for another..." in the body.
+    """
+    if response.status_code == 429:
+        return True
+    return (
+        response.status_code == 409
+        and b"This API cannot be run again for another" in response.content
+    )
+
+
+def served_without_request(response) -> bool:
+    """
+    Return True if the transport answered a call from its cache without sending a
+    request (see transport.CachingTransport). Such a response used none of the
+    API's budget, and has no rate limit headers to learn from.
+
+    A cached response revalidated with a 304 did send a request, and carries the
+    304's headers.
+    """
+    return getattr(response, "from_cache", False) and not getattr(
+        response, "revalidated", False
+    )
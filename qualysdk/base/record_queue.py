@@ -0,0 +1,142 @@
+"""
+record_queue.py - contains the RecordQueue class for the qualysdk package.
+
+The multithreaded pulls (i.e. get_hld) have their threads extend one shared
+BaseList, and return it once every thread has joined, so a whole subscription's
+records are held in memory at once.
+
+A RecordQueue is passed to the threads in place of that BaseList. Each page of
+records a thread adds is put on a bounded queue, and iterating over the
+RecordQueue yields the records as the pages arrive. A thread whose page does not
+fit waits for the consumer to catch up, so at most maxsize pages (plus the page
+each thread is holding) are in memory at a time, however big the pull is.
+"""
+
+from queue import Empty, Full, Queue
+from threading import Thread
+from typing import Any, Callable, Iterable, Iterator
+
+# Put on the queue by each thread when it finishes:
+_DONE = object()
+
+
+class _Closed(Exception):
+    """
+    Raised in a thread that adds records after the consumer stopped iterating,
+    to end the thread.
+    """
+
+
+class _Failed:
+    """
+    Put on the queue by a thread that raised, for the consumer to re-raise.
+    """
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class RecordQueue:
+    """
+    RecordQueue - hand pages of records from worker threads to one consumer.
+
+    Threads are started with start(), and add each page with extend(), as they
+    would to a BaseList. Iterating yields the records until every thread has
+    finished. An exception raised in a thread is re-raised by the iteration.
+
+    If the consumer stops iterating early (break, or an exception), the threads
+    end at their next extend() call, and are joined.
+
+    Params:
+    ```
+    maxsize (int) The number of pages that may wait to be yielded. Threads block while it is reached. Defaults to 10.
+    ```
+    """
+
+    def __init__(self, maxsize: int = 10):
+        if not isinstance(maxsize, int) or maxsize < 1:
+            raise ValueError("queue_size must be an integer of 1 or more.")
+
+        self.maxsize = maxsize
+        self.yielded = 0
+        self._queue = Queue(maxsize)
+        self._threads = []
+        self._closed = False
+
+    def _put(self, item: Any) -> None:
+        # Wake up now and then, so that a thread is not stuck on a full queue once
+        # the consumer has stopped:
+        while not self._closed:
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except Full:
+                pass
+        raise _Closed()
+
+    def extend(self, records: Iterable) -> None:
+        """
+        Add a page of records. Blocks while maxsize pages are waiting.
+        """
+        if not isinstance(records, list):
+            records = list(records)
+        if records:
+            self._put(records)
+
+    def _run(self, target: Callable, args: tuple) -> None:
+        try:
+            target(*args)
+        except _Closed:
+            return
+        except BaseException as e:
+            try:
+                self._put(_Failed(e))
+            except _Closed:
+                pass
+            return
+        try:
+            self._put(_DONE)
+        except _Closed:
+            pass
+
+    def start(self, target: Callable, args: tuple = (), name: str = None) -> Thread:
+        """
+        Start a thread that runs target(*args).
+        """
+        thread = Thread(target=self._run, args=(target, args), name=name)
+        self._threads.append(thread)
+        thread.start()
+        return thread
+
+    def close(self) -> None:
+        """
+        Stop the threads at their next extend() call, and wait for them to finish.
+        """
+        self._closed = True
+        for thread in self._threads:
+            while thread.is_alive():
+                # Make room for a thread blocked on a full queue:
+                try:
+                    self._queue.get_nowait()
+                except Empty:
+                    pass
+                thread.join(0.1)
+
+    def __iter__(self) -> Iterator:
+        running = len(self._threads)
+        try:
+            while running:
+                item = self._queue.get()
+                if item is _DONE:
+                    running -= 1
+                elif isinstance(item, _Failed):
+                    raise item.error
+                else:
+                    for record in item:
+                        self.yielded += 1
+                        yield record
+        finally:
+            self.close()
+
+    def __repr__(self) -> str:
+        return f"RecordQueue(maxsize={self.maxsize}, yielded={self.yielded})"
@@ -0,0 +1,242 @@
+"""
+retry.py - contains the RetryPolicy class for the qualysdk package.
+
+call_api and call_api_async use the auth object's RetryPolicy to retry calls that
+fail for transient reasons: dropped/reset connections, timeouts, truncated bodies
+and 502/503/504 responses. Only calls that are safe to repeat are retried.
+"""
+
+import sys
+from dataclasses import dataclass, field
+from random import uniform
+from threading import Lock
+from typing import Union
+from urllib.parse import urlparse
+
+from requests.exceptions import (
+    ConnectionError,
+    ConnectTimeout,
+    Timeout,
+    ChunkedEncodingError,
+    ContentDecodingError,
+)
+
+RETRYABLE_STATUSES = frozenset({502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+# POST endpoints that only read data, and so are safe to repeat:
+READ_ONLY_ENDPOINTS = frozenset(
+    {
+        ("cloud_agent", "list_agents"),
+        ("gav", "count_assets"),
+        ("gav", "get_all_assets"),
+        ("gav", "get_asset"),
+        ("gav", "query_assets"),
+        ("pm", "vulnerabilities"),
+        ("pm", "get_patches"),
+        ("pm", "get_assets"),
+        ("pm", "lookup_host_uuids"),
+        ("pm", "get_patch_catalog"),
+        ("vmdr", "query_kb"),
+        ("vmdr", "get_host_list"),
+        ("vmdr", "get_hld"),
+        ("vmdr", "get_cve_hld"),
+        ("vmdr", "get_ip_list"),
+        ("vmdr", "get_ag_list"),
+        ("vmdr", "list_scans"),
+        ("vmdr", "fetch_scan"),
+        ("vmdr", "get_scanner_list"),
+        ("vmdr", "get_report_list"),
+        ("vmdr", "get_template_list"),
+        ("vmdr", "fetch_report"),
+        ("vmdr", "get_scheduled_report_list"),
+        ("vmdr", "get_user_list"),
+        ("vmdr", "get_kb_qvs"),
+        ("vmdr", "get_activity_log"),
+        ("cert", "list_certs"),
+    }
+)
+
+# GET endpoints that change data, and so are never repeated:
+NON_IDEMPOTENT_ENDPOINTS = frozenset({("vmdr", "add_user")})
+
+# WAS multiplexes reads and writes over one endpoint. The operation is the URL segment after /qps/rest/3.0/:
+WAS_READ_ONLY_OPERATIONS = frozenset({"search", "count", "get", "download"})
+
+
+@dataclass
+class RetryStats:
+    """
+    RetryStats - the retry history of a single call. Attached to responses as response.retry_stats.
+    """
+
+    attempts: int = 0
+    retries: int = 0
+    backoff: float = 0.0
+    errors: list = field(default_factory=list)
+
+    def record_retry(self, reason: str, delay: float) -> None:
+        self.retries += 1
+        self.backoff += delay
+        self.errors.append(reason)
+
+
+class RetryPolicy:
+    """
+    RetryPolicy - decides whether and when a failed call is retried.
+
+    Params:
+    ```
+    max_attempts (int) The maximum number of attempts per call, including the first. Defaults to 5. 1 disables retries.
+    backoff_factor (float) The base delay in seconds. Attempt n waits up to backoff_factor * 2 ** (n - 1) seconds. Defaults to 1.
+    max_backoff (float) The maximum delay between attempts in seconds. Defaults to 60.
+    jitter (bool) Whether to pick a random delay between 0 and the backoff ("full jitter") so that threads do not retry in lockstep. Defaults to True.
+    retry_statuses (Iterable[int]) HTTP statuses to retry. Defaults to 502, 503 and 504.
+    ```
+
+    Totals per (module, endpoint) are kept in the stats attribute.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 5,
+        backoff_factor: float = 1.0,
+        max_backoff: float = 60.0,
+        jitter: bool = True,
+        retry_statuses=RETRYABLE_STATUSES,
+    ):
+        if not isinstance(max_attempts, int) or max_attempts < 1:
+            raise ValueError("max_attempts must be an integer above 0.")
+        if backoff_factor < 0 or max_backoff < 0:
+            raise ValueError("backoff_factor and max_backoff must not be negative.")
+
+        self.max_attempts = max_attempts
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.retry_statuses = frozenset(retry_statuses)
+        self.stats = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def is_idempotent(method: str, module: str, endpoint: str, url: str) -> bool:
+        """
+        Return True if repeating the call cannot change data.
+        """
+        if (module, endpoint) in NON_IDEMPOTENT_ENDPOINTS:
+            return False
+        if module == "was":
+            path = urlparse(url).path.split("/qps/rest/3.0/")[-1]
+            return path.split("/")[0] in WAS_READ_ONLY_OPERATIONS
+        return method.upper() in IDEMPOTENT_METHODS or (
+            (module, endpoint) in READ_ONLY_ENDPOINTS
+        )
+
+    @staticmethod
+    def is_retryable_error(error: Exception) -> bool:
+        """
+        Return True if the exception is a transient network error.
+        """
+        if isinstance(
+            error,
+            (ConnectionError, Timeout, ChunkedEncodingError, ContentDecodingError),
+        ):
+            return True
+        # The async API raises httpx errors. Only check for them if httpx is in use:
+        httpx = sys.modules.get("httpx")
+        return httpx is not None and isinstance(error, httpx.TransportError)
+
+    @staticmethod
+    def _never_sent(error: Exception) -> bool:
+        # A connection that was never opened is safe to retry for any method.
+        if isinstance(error, ConnectTimeout):
+            return True
+        httpx = sys.modules.get("httpx")
+        return httpx is not None and isinstance(
+            error, (httpx.ConnectError, httpx.ConnectTimeout)
+        )
+
+    def backoff(self, attempt: int, retry_after: str = None) -> float:
+        """
+        Return the delay before the next attempt, after attempt number attempt failed.
+        """
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.max_backoff)
+
+        delay = min(self.max_backoff, self.backoff_factor * 2 ** (attempt - 1))
+        return uniform(0, delay) if self.jitter else delay
+
+    def next_delay(
+        self,
+        request: dict,
+        module: str,
+        endpoint: str,
+        stats: RetryStats,
+        response=None,
+        error: Exception = None,
+    ) -> Union[float, None]:
+        """
+        Decide whether a failed attempt is retried.
+
+        Params:
+        ```
+        request (dict) The prepared request (from call_api._prepare_request).
+        module (str) The module called.
+        endpoint (str) The endpoint called.
+        stats (RetryStats) The call's retry history. Updated if the call is retried.
+        response (requests.Response) The response, if one was received.
+        error (Exception) The exception raised, if no response was received.
+        ```
+
+        Returns the number of seconds to wait before retrying, or None to give up.
+        """
+        if error is not None:
+            if not self.is_retryable_error(error):
+                return None
+            reason = type(error).__name__
+            retry_after = None
+        elif response is not None and response.status_code in self.retry_statuses:
+            reason = str(response.status_code)
+            retry_after = response.headers.get("Retry-After")
+        else:
+            return None
+
+        if stats.attempts >= self.max_attempts:
+            return None
+
+        if not (
+            (error is not None and self._never_sent(error))
+            or self.is_idempotent(request["method"], module, endpoint, request["url"])
+        ):
+            return None
+
+        delay = self.backoff(stats.attempts, retry_after)
+        stats.record_retry(reason, delay)
+        print(
+            f"Warning: {module}-{endpoint} failed with {reason} on attempt {stats.attempts}/{self.max_attempts}. Retrying in {delay:.1f} seconds."
+        )
+        return delay
+
+    def record(self, module: str, endpoint: str, stats: RetryStats, failed: bool):
+        """
+        Add a finished call to the per-endpoint totals.
+        """
+        with self._lock:
+            totals = self.stats.setdefault(
+                f"{module}.{endpoint}", {"calls": 0, "retries": 0, "failures": 0}
+            )
+            totals["calls"] += 1
+            totals["retries"] += stats.retries
+            totals["failures"] += int(failed)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = Lock()
+
+    def __repr__(self) -> str:
+        return f"RetryPolicy(max_attempts={self.max_attempts}, backoff_factor={self.backoff_factor}, max_backoff={self.max_backoff}, jitter={self.jitter}, retry_statuses={sorted(self.retry_statuses)})"
@@ -0,0 +1,529 @@
+"""
+session.py - contains the SessionManager class for the qualysdk package.
+
+The SessionManager keeps one pooled, keep-alive requests.Session per Qualys
+URL type (api, gateway, base) so that paginated and multithreaded pulls reuse
+TCP/TLS connections instead of opening a new one for every request.
+
+For the asyncio API (call_api_async), it also keeps one httpx.AsyncClient per
+URL type and event loop. httpx is only imported when the async API is used.
+
+SessionManager is the default Transport. Every HTTP request the package makes goes
+through auth.transport, so it can be swapped for another Transport, such as
+HTTP2Transport below or the recording and replay transports in transport.py.
+"""
+
+from asyncio import (
+    AbstractEventLoop,
+    get_running_loop,
+    new_event_loop,
+    run_coroutine_threadsafe,
+)
+from datetime import timedelta
+from threading import Lock, Thread
+from time import perf_counter
+from typing import Literal, Union
+from weakref import WeakKeyDictionary
+
+from requests import Session, Response
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+URL_TYPES = ("api", "gateway", "base")
+DEFAULT_POOL_SIZE = 10
+# (connect, read) timeouts in seconds. The read timeout is the longest Qualys may go
+# without sending a byte, so it has to allow for slow-to-generate pages like get_hld:
+DEFAULT_TIMEOUT = (10, 300)
+# Compression asked for on every request. XML and JSON pages shrink several times over
+# with gzip, and these are the two encodings both requests and httpx always decode:
+ACCEPT_ENCODING = "gzip, deflate"
+
+
+class Transport:
+    """
+    Transport - the interface every HTTP request made by qualysdk goes through.
+
+    Subclasses implement request() and, for the async API, arequest(). Both take
+    a Qualys URL type (api, gateway, base), the method and URL, plus requests-style
+    kwargs (headers, params, data, json, auth, timeout), and return a requests.Response.
+
+    Responses may carry a wire_bytes attribute: the size of the body as received,
+    before decompression. Without it, the body is assumed to have been uncompressed.
+    """
+
+    # The (connect, read) timeout call_api sends with each request:
+    timeout = DEFAULT_TIMEOUT
+
+    def request(
+        self,
+        url_type: Literal["api", "gateway", "base"],
+        method: str,
+        url: str,
+        **kwargs,
+    ) -> Response:
+        raise NotImplementedError
+
+    async def arequest(
+        self,
+        url_type: Literal["api", "gateway", "base"],
+        method: str,
+        url: str,
+        **kwargs,
+    ) -> Response:
+        raise NotImplementedError
+
+    def bind(self, session_manager: "SessionManager") -> None:
+        """
+        Called by the auth object with its SessionManager. Transports that wrap
+        another transport use it as the default one to wrap.
+        """
+
+    def close(self) -> None:
+        """
+        Release any open connections or files.
+        """
+
+    async def aclose(self) -> None:
+        """
+        Release any connections bound to the running event loop.
+        """
+
+
+class SessionManager(Transport):
+    """
+    SessionManager - holds a pooled requests.Session for each Qualys URL type.
+
+    Sessions are created lazily the first time a URL type is used and are safe
+    to share between the worker threads of a single auth object.
+
+    Params:
+    ```
+    pool_size (Union[int, dict]) The maximum number of keep-alive connections per host.
+        Either a single int applied to every URL type, or a dict such as
+        {"api": 10, "gateway": 20, "base": 5}. URL types missing from the dict use DEFAULT_POOL_SIZE.
+    timeout (Union[float, tuple]) The default timeout for every request, in seconds. Either one
+        number for both, or a (connect, read) tuple. Defaults to DEFAULT_TIMEOUT.
+    ```
+    """
+
+    def __init__(
+        self,
+        pool_size: Union[int, dict] = DEFAULT_POOL_SIZE,
+        timeout: Union[float, tuple] = DEFAULT_TIMEOUT,
+    ):
+        self.pool_sizes = self._normalize_pool_size(pool_size)
+        self.timeout = self._normalize_timeout(timeout)
+        self._sessions = {}
+        self._async_clients = WeakKeyDictionary()
+        self._lock = Lock()
+
+    @staticmethod
+    def _normalize_pool_size(pool_size: Union[int, dict]) -> dict:
+        """
+        Turn the user-supplied pool_size into a {url_type: int} dict.
+        """
+        if isinstance(pool_size, int):
+            sizes = {url_type: pool_size for url_type in URL_TYPES}
+        elif isinstance(pool_size, dict):
+            for url_type in pool_size.keys():
+                if url_type not in URL_TYPES:
+                    raise ValueError(
+                        f"Invalid url_type {url_type} in pool_size. Valid url_types are: {URL_TYPES}."
+                    )
+            sizes = {
+                url_type: pool_size.get(url_type, DEFAULT_POOL_SIZE)
+                for url_type in URL_TYPES
+            }
+        else:
+            raise ValueError("pool_size must be an int or a dict of url_type: int.")
+
+        if any(not isinstance(size, int) or size < 1 for size in sizes.values()):
+            raise ValueError("pool_size values must be integers above 0.")
+
+        return sizes
+
+    @staticmethod
+    def _normalize_timeout(timeout: Union[float, tuple]) -> tuple:
+        """
+        Turn the user-supplied timeout into a (connect, read) tuple.
+        """
+        if isinstance(timeout, (int, float)):
+            timeout = (timeout, timeout)
+        if (
+            not isinstance(timeout, tuple)
+            or len(timeout) != 2
+            or any(not isinstance(t, (int, float)) or t <= 0 for t in timeout)
+        ):
+            raise ValueError(
+                "timeout must be a number of seconds above 0, or a (connect, read) tuple of them."
+            )
+        return timeout
+
+    def get_session(self, url_type: Literal["api", "gateway", "base"]) -> Session:
+        """
+        Return the pooled session for a URL type, creating it if needed.
+        """
+        session = self._sessions.get(url_type)
+        if session is not None:
+            return session
+
+        with self._lock:
+            # Another thread may have created it while we waited on the lock:
+            if url_type not in self._sessions:
+                if url_type not in URL_TYPES:
+                    raise ValueError(
+                        f"Invalid url_type {url_type}. Valid url_types are: {URL_TYPES}."
+                    )
+                session = Session()
+                session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+                adapter = HTTPAdapter(
+                    pool_connections=len(URL_TYPES),
+                    pool_maxsize=self.pool_sizes[url_type],
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._sessions[url_type] = session
+            return self._sessions[url_type]
+
+    def request(
+        self,
+        url_type: Literal["api", "gateway", "base"],
+        method: str,
+        url: str,
+        **kwargs,
+    ) -> Response:
+        """
+        Send a request over the pooled session for url_type.
+
+        kwargs are passed straight through to requests.Session.request.
+        If no timeout is given, the manager's default timeout is used.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        response = self.get_session(url_type).request(method=method, url=url, **kwargs)
+        # urllib3 counts the bytes read off the connection, before decompression:
+        response.wire_bytes = response.raw.tell()
+        return response
+
+    def get_async_client(self, url_type: Literal["api", "gateway", "base"]):
+        """
+        Return the pooled httpx.AsyncClient for a URL type on the running event loop.
+
+        httpx clients are bound to the loop they are first used on, so one
+        client is kept per loop.
+        """
+        if url_type not in URL_TYPES:
+            raise ValueError(
+                f"Invalid url_type {url_type}. Valid url_types are: {URL_TYPES}."
+            )
+
+        loop = get_running_loop()
+        clients = self._async_clients.setdefault(loop, {})
+        if url_type not in clients:
+            httpx = _import_httpx()
+            size = self.pool_sizes[url_type]
+            clients[url_type] = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=size, max_keepalive_connections=size
+                ),
+                timeout=None,
+                headers={"Accept-Encoding": ACCEPT_ENCODING},
+            )
+        return clients[url_type]
+
+    async def arequest(
+        self,
+        url_type: Literal["api", "gateway", "base"],
+        method: str,
+        url: str,
+        **kwargs,
+    ) -> Response:
+        """
+        Async counterpart of request(). Sends over the pooled httpx.AsyncClient
+        for url_type and returns a requests.Response so that callers can parse
+        it exactly like a synchronous response.
+
+        kwargs use the requests names (headers, params, data, json, auth, timeout).
+        """
+        client = self.get_async_client(url_type)
+        request = _build_httpx_request(client, method, url, kwargs, self.timeout)
+        # Stream so that the time to first byte can be told apart from the download:
+        start = perf_counter()
+        r = await client.send(request, auth=kwargs.get("auth"), stream=True)
+        ttfb = perf_counter() - start
+        try:
+            await r.aread()
+        finally:
+            await r.aclose()
+
+        return _to_requests_response(r, ttfb)
+
+    async def aclose(self) -> None:
+        """
+        Close the httpx.AsyncClients bound to the running event loop.
+        """
+        clients = self._async_clients.pop(get_running_loop(), {})
+        for client in clients.values():
+            await client.aclose()
+
+    def close(self) -> None:
+        """
+        Close all pooled connections. Sessions are recreated on next use.
+        """
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions = {}
+
+    def __getstate__(self) -> dict:
+        # Sessions and locks cannot be pickled/copied. Only the configuration is kept:
+        return {"pool_sizes": self.pool_sizes, "timeout": self.timeout}
+
+    def __setstate__(self, state: dict) -> None:
+        self.pool_sizes = state["pool_sizes"]
+        self.timeout = state.get("timeout", DEFAULT_TIMEOUT)
+        self._sessions = {}
+        self._async_clients = WeakKeyDictionary()
+        self._lock = Lock()
+
+    def __repr__(self) -> str:
+        return f"SessionManager(pool_sizes={self.pool_sizes}, timeout={self.timeout}, open={list(self._sessions.keys())})"
+
+
+class HTTP2Transport(Transport):
+    """
+    HTTP2Transport - sends requests for some URL types over multiplexed HTTP/2 connections.
+
+    Modules on the gateway (GAV, PM, CS, Cert) are called with many small concurrent
+    requests. Over HTTP/1.1, each request in flight needs a connection of its own.
+    Over HTTP/2, they share a few connections as separate streams.
+
+    httpx's synchronous HTTP/2 client cannot be shared between threads, so requests
+    made from worker threads are all sent from one background event loop, which
+    owns the connections. Requests for other URL types go through the auth object's
+    SessionManager.
+
+    Requires httpx and h2: pip install qualysdk[http2]
+
+    Params:
+    ```
+    url_types (tuple) The URL types to send over HTTP/2. Defaults to ("gateway",).
+    max_connections (int) The maximum number of HTTP/2 connections per URL type. Defaults to 2.
+    transport (Transport) The transport for every other URL type. Defaults to the auth object's SessionManager.
+    ```
+    """
+
+    def __init__(
+        self,
+        url_types: tuple = ("gateway",),
+        max_connections: int = 2,
+        transport: Transport = None,
+    ):
+        for url_type in url_types:
+            if url_type not in URL_TYPES:
+                raise ValueError(
+                    f"Invalid url_type {url_type} in url_types. Valid url_types are: {URL_TYPES}."
+                )
+        if not isinstance(max_connections, int) or max_connections < 1:
+            raise ValueError("max_connections must be an integer above 0.")
+        # Fail on creation rather than on the first request:
+        _import_httpx(http2=True)
+
+        self.url_types = tuple(url_types)
+        self.max_connections = max_connections
+        self.transport = transport
+        self._async_clients = WeakKeyDictionary()
+        self._loop = None
+        self._lock = Lock()
+
+    @property
+    def timeout(self) -> tuple:
+        return self.transport.timeout if self.transport else DEFAULT_TIMEOUT
+
+    def bind(self, session_manager: SessionManager) -> None:
+        if self.transport is None:
+            self.transport = session_manager
+
+    def get_async_client(self, url_type: Literal["api", "gateway", "base"]):
+        """
+        Return the HTTP/2 httpx.AsyncClient for a URL type on the running event loop.
+        """
+        clients = self._async_clients.setdefault(get_running_loop(), {})
+        if url_type not in clients:
+            httpx = _import_httpx(http2=True)
+            clients[url_type] = httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                timeout=None,
+                headers={"Accept-Encoding": ACCEPT_ENCODING},
+            )
+        return clients[url_type]
+
+    def _get_loop(self) -> AbstractEventLoop:
+        """
+        Return the background event loop synchronous requests are sent from, starting it if needed.
+        """
+        with self._lock:
+            if self._loop is None:
+                self._loop = new_event_loop()
+                Thread(
+                    target=_run_loop,
+                    args=(self._loop,),
+                    name="qualysdk-http2",
+                    daemon=True,
+                ).start()
+            return self._loop
+
+    async def _send(
+        self, url_type: str, method: str, url: str, kwargs: dict
+    ) -> Response:
+        client = self.get_async_client(url_type)
+        request = _build_httpx_request(client, method, url, kwargs, self.timeout)
+        # Stream so that the time to first byte can be told apart from the download:
+        start = perf_counter()
+        r = await client.send(request, auth=kwargs.get("auth"), stream=True)
+        ttfb = perf_counter() - start
+        try:
+            await r.aread()
+        finally:
+            await r.aclose()
+
+        return _to_requests_response(r, ttfb)
+
+    def request(
+        self,
+        url_type: Literal["api", "gateway", "base"],
+        method: str,
+        url: str,
+        **kwargs,
+    ) -> Response:
+        if url_type not in self.url_types:
+            return self.transport.request(url_type, method, url, **kwargs)
+        return run_coroutine_threadsafe(
+            self._send(url_type, method, url, kwargs), self._get_loop()
+        ).result()
+
+    async def arequest(
+        self,
+        url_type: Literal["api", "gateway", "base"],
+        method: str,
+        url: str,
+        **kwargs,
+    ) -> Response:
+        if url_type not in self.url_types:
+            return await self.transport.arequest(url_type, method, url, **kwargs)
+        return await self._send(url_type, method, url, kwargs)
+
+    async def _close_clients(self) -> None:
+        clients = self._async_clients.pop(get_running_loop(), {})
+        for client in clients.values():
+            await client.aclose()
+
+    def close(self) -> None:
+        """
+        Close the HTTP/2 connections used by synchronous requests and stop the background loop.
+        """
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is not None:
+            run_coroutine_threadsafe(self._close_clients(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+        if self.transport is not None:
+            self.transport.close()
+
+    async def aclose(self) -> None:
+        await self._close_clients()
+        if self.transport is not None:
+            await self.transport.aclose()
+
+    def __getstate__(self) -> dict:
+        # Clients, loops and locks cannot be pickled/copied. Only the configuration is kept:
+        return {
+            "url_types": self.url_types,
+            "max_connections": self.max_connections,
+            "transport": self.transport,
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["url_types"], state["max_connections"], state["transport"])
+
+    def __repr__(self) -> str:
+        return f"HTTP2Transport(url_types={self.url_types}, max_connections={self.max_connections})"
+
+
+def _run_loop(loop: AbstractEventLoop) -> None:
+    loop.run_forever()
+    loop.close()
+
+
+def _import_httpx(http2: bool = False):
+    """
+    Import httpx on demand. It is only needed for the async API and HTTP2Transport.
+    """
+    try:
+        import httpx
+    except ImportError as e:
+        raise ImportError(
+            "HTTP2Transport requires httpx and h2. Install them with: pip install qualysdk[http2]"
+            if http2
+            else "The qualysdk async API requires httpx. Install it with: pip install qualysdk[async]"
+        ) from e
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError as e:
+            raise ImportError(
+                "HTTP2Transport requires h2. Install it with: pip install qualysdk[http2]"
+            ) from e
+    return httpx
+
+
+def _build_httpx_request(client, method: str, url: str, kwargs: dict, timeout: tuple):
+    """
+    Build an httpx.Request from requests-style kwargs (headers, params, data, json, timeout).
+    """
+    httpx = _import_httpx()
+    connect, read = kwargs.get("timeout") or timeout
+
+    headers = kwargs.get("headers")
+    if headers:
+        # requests silently drops None-valued headers. httpx does not:
+        headers = {k: v for k, v in headers.items() if v is not None}
+
+    data = kwargs.get("data")
+    content = None
+    if isinstance(data, (str, bytes)):
+        # Raw bodies (i.e. _xml_data) are sent as content in httpx:
+        content, data = data, None
+
+    return client.build_request(
+        method,
+        url,
+        headers=headers,
+        params=kwargs.get("params"),
+        data=data,
+        content=content,
+        json=kwargs.get("json"),
+        timeout=httpx.Timeout(connect=connect, read=read, write=read, pool=None),
+    )
+
+
+def _to_requests_response(r, ttfb: float) -> Response:
+    """
+    Convert an httpx.Response into a requests.Response. ttfb is the time the
+    headers took to arrive.
+    """
+    response = Response()
+    response.status_code = r.status_code
+    response.headers = CaseInsensitiveDict(r.headers)
+    response._content = r.content
+    response.url = str(r.url)
+    response.reason = r.reason_phrase
+    # Mirror requests: only trust an explicit charset, otherwise let .text guess.
+    response.encoding = r.charset_encoding
+    # Match requests, where elapsed stops once the headers are parsed:
+    response.elapsed = timedelta(seconds=ttfb)
+    response.wire_bytes = r.num_bytes_downloaded
+    return response
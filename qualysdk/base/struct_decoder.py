@@ -0,0 +1,234 @@
+"""
+struct_decoder.py - contains the StructDecoder class for the qualysdk package.
+
+The JSON APIs (GAV, PM, TotalCloud) decode each page into dicts, then build a data
+class from each record with model(**record). The data class's __init__ takes every
+key, and its __post_init__ checks every field it knows of, whether or not the
+record has it, before converting the few that need it.
+
+A StructDecoder decodes the page with msgspec instead, straight into slotted
+structs generated from the data class's fields, so unknown keys are rejected while
+decoding rather than by __init__. Each record is then built in one step: fields
+__post_init__ does not touch are set as decoded, fields with a converter (i.e.
+datetime.fromisoformat) are converted by it, and __post_init__ runs with only the
+fields it reworks (nested dicts and lists). The values are the same as the data
+class's own. A page the structs do not cover, and any error while building its
+records, sends the page through JSONRecordStream and model(**record) instead.
+
+Which fields __post_init__ needs is declared by each decoder (post_init). A
+decoder that does not declare them passes every field but those in convert to
+__post_init__, so only the decoding and the converted fields are saved.
+
+msgspec is optional. It is only imported the first time a decoder is used.
+"""
+
+from dataclasses import MISSING, fields
+from time import perf_counter
+from typing import Any, Callable, Iterable, Optional
+
+from .base_list import BaseList
+from .hooks import record_parse
+from .json_stream import JSONRecordStream
+
+
+def _msgspec():
+    try:
+        import msgspec
+    except ImportError as e:
+        raise ImportError(
+            "Typed decoding requires msgspec. Install it with: pip install qualysdk[typed]"
+        ) from e
+    return msgspec
+
+
+class StructDecoder:
+    """
+    StructDecoder - decode a page of JSON records straight into data classes.
+
+    Calling the decoder with a page's bytes returns the page's records as a
+    BaseList of model, and {key: value} for the keys of the page outside the
+    records (only those in keys, and only those the page has).
+
+    Params:
+    ```
+    model (type) The data class to build.
+    path (tuple[str, ...]) The keys of the records array, i.e. ("assetListData", "asset"). Defaults to (), for a page that is the array itself.
+    keys (Iterable[str]) Optional. Top-level keys of the page to return, i.e. ("hasMore", "lastSeenAssetId").
+    convert (dict[str, Callable]) Optional. Fields mapped to a function of their value, i.e. datetime.fromisoformat. Only called for truthy values, and must give what model.__post_init__ would.
+    rename (dict[str, str]) Optional. Keys mapped to the field they are stored in, i.e. {"type": "_type"}.
+    post_init (Iterable[str]) Optional. The fields model.__post_init__ converts, or derives other fields from. Defaults to every field not in convert, i.e. __post_init__ runs as it does for model(**record).
+    ```
+    """
+
+    def __init__(
+        self,
+        model: type,
+        path: tuple[str, ...] = (),
+        keys: Iterable[str] = (),
+        convert: dict[str, Callable] = None,
+        rename: dict[str, str] = None,
+        post_init: Iterable[str] = None,
+    ):
+        self.model = model
+        self.path = tuple(path)
+        self.keys = tuple(keys)
+        self.convert = convert or {}
+        self.rename = rename or {}
+        if post_init is None:
+            post_init = {f.name for f in fields(model) if f.init} - set(self.convert)
+        self.post_init = frozenset(post_init)
+        # Built on first use, so that msgspec is only needed then:
+        self._page_type = None
+
+    def _compile(self) -> None:
+        msgspec = _msgspec()
+        model_fields = fields(self.model)
+        # Fields __init__ does not take are left out, so that records with them
+        # fall back, and raise as model(**record) does:
+        names = [f.name for f in model_fields if f.init]
+
+        self.required = tuple(
+            f.name
+            for f in model_fields
+            if f.default is MISSING and f.default_factory is MISSING
+        )
+        # The fields of a record with no keys, after __post_init__:
+        try:
+            self.defaults = vars(self.model(**dict.fromkeys(self.required)))
+        except Exception:
+            self.defaults = {
+                f.name: None if f.default is MISSING else f.default
+                for f in model_fields
+            }
+        # (field, converter or None, whether __post_init__ converts it), in the
+        # order of the struct's fields:
+        self.fields = tuple(
+            (name, self.convert.get(name), name in self.post_init) for name in names
+        )
+
+        record = msgspec.defstruct(
+            f"{self.model.__name__}Struct",
+            [(name, Any, msgspec.UNSET) for name in names],
+            rename={name: key for key, name in self.rename.items()},
+            forbid_unknown_fields=True,
+            gc=False,
+        )
+        # The page, from the records array up:
+        page_type = Optional[list[record]]
+        for depth in reversed(range(len(self.path))):
+            level = [(self.path[depth], page_type, msgspec.UNSET)]
+            if depth == 0:
+                level += [
+                    (key, Any, msgspec.UNSET)
+                    for key in self.keys
+                    if key != self.path[0]
+                ]
+            page_type = msgspec.defstruct(
+                f"{self.model.__name__}Page{depth}", level, gc=False
+            )
+        self._unset = msgspec.UNSET
+        self._astuple = msgspec.structs.astuple
+        self._page_type = page_type
+
+    def build(self, struct: Any, values: dict = None) -> Any:
+        """
+        Build a record from its struct. values are set on the record as if they
+        were keys of it.
+        """
+        unset = self._unset
+        direct = {}
+        # The fields __post_init__ converts, plus the required ones it is built with:
+        deferred = None
+        for (name, func, post_init), value in zip(self.fields, self._astuple(struct)):
+            if value is unset:
+                continue
+            if post_init:
+                if deferred is None:
+                    deferred = dict.fromkeys(self.required)
+                deferred[name] = value
+            elif func is not None and value:
+                direct[name] = func(value)
+            else:
+                direct[name] = value
+        if values:
+            for name, value in values.items():
+                if name in self.post_init:
+                    if deferred is None:
+                        deferred = dict.fromkeys(self.required)
+                    deferred[name] = value
+                    direct.pop(name, None)
+                else:
+                    direct[name] = value
+
+        for name in self.required:
+            if name not in direct and (deferred is None or name not in deferred):
+                # model(**record) raises for it:
+                raise TypeError(f"missing required field {name}")
+
+        if deferred is not None:
+            record = self.model(**deferred)
+        else:
+            record = self.model.__new__(self.model)
+            record.__dict__.update(self.defaults)
+        record.__dict__.update(direct)
+        return record
+
+    def decode(self, content: bytes, values: dict = None) -> tuple[BaseList, dict]:
+        """
+        Decode a page with the structs. Raises if they do not cover it.
+        """
+        if self._page_type is None:
+            self._compile()
+        msgspec = _msgspec()
+
+        start = perf_counter()
+        page = msgspec.json.decode(content, type=self._page_type)
+        seconds = perf_counter() - start
+
+        document = {}
+        for key in self.keys:
+            value = getattr(page, key, self._unset) if self.path else self._unset
+            if value is not self._unset:
+                document[key] = value
+        for key in self.path:
+            page = getattr(page, key)
+            if page is self._unset:
+                page = None
+                break
+
+        result = BaseList()
+        for struct in page or ():
+            result.append(self.build(struct, values))
+        # Count the time towards the call that returned this page (see hooks.py).
+        # A page that falls back is counted by JSONRecordStream instead:
+        record_parse("json", seconds, len(content))
+        return result, document
+
+    def fallback(self, content: bytes, values: dict = None) -> tuple[BaseList, dict]:
+        """
+        Decode a page the usual way, through JSONRecordStream and model(**record).
+        """
+        stream = JSONRecordStream(content, self.path)
+        result = BaseList()
+        for record in stream:
+            for key, name in self.rename.items():
+                if key in record:
+                    record[name] = record.pop(key)
+            if values:
+                record.update(values)
+            result.append(self.model(**record))
+        document = stream.document if isinstance(stream.document, dict) else {}
+        return result, document
+
+    def __call__(self, content: bytes, **values) -> tuple[BaseList, dict]:
+        try:
+            return self.decode(content, values)
+        except ImportError:
+            raise
+        except Exception:
+            # Including errors from the converters and __post_init__, so that a
+            # malformed page raises what it did before, if anything:
+            return self.fallback(content, values)
+
+    def __repr__(self) -> str:
+        return f"StructDecoder(model={self.model.__name__}, path={self.path!r})"
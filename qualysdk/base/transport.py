@@ -0,0 +1,592 @@
+"""
+transport.py - contains the recording, replay and caching transports for the qualysdk package.
+
+RecordingTransport wraps another transport (by default the auth object's
+SessionManager) and saves every response it returns to a cassette directory.
+ReplayTransport serves a cassette back without touching the network, so that
+parsing, data class and SQL throughput can be measured offline against real
+payloads, and without using any of the subscription's rate limit.
+
+A cassette is a directory containing interactions.jsonl, with one line per
+response, and a bodies/ directory holding each raw response body.
+
+CachingTransport keeps the responses of slow-changing reference endpoints (report
+templates, scanners, users, search lists, control metadata, connectors) on disk
+and revalidates them with If-None-Match/If-Modified-Since, or reuses them for a
+TTL when Qualys sends no validators, so repeated pulls skip the download.
+"""
+
+import os
+import re
+from asyncio import sleep as async_sleep
+from datetime import timedelta
+from hashlib import sha256
+from json import dumps, loads
+from pathlib import Path
+from threading import Lock, get_ident
+from time import sleep, time
+from typing import Literal, Union
+from urllib.parse import urlsplit
+
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+from .call_schema import CALL_SCHEMA
+from .session import Transport, SessionManager, DEFAULT_TIMEOUT
+from ..exceptions.Exceptions import CassetteMissError
+
+INDEX_FILE = "interactions.jsonl"
+BODY_DIR = "bodies"
+# Login credentials are left out of request keys, and token responses are not saved:
+CREDENTIAL_FIELDS = frozenset({"username", "password"})
+REDACTED = b"<redacted>"
+# Response headers that are not saved:
+DROPPED_HEADERS = frozenset({"set-cookie"})
+# Response headers CachingTransport does not keep. They describe the subscription's
+# budget when the response was sent, and would be stale when it is served again:
+RATE_LIMIT_HEADERS = ("x-ratelimit-", "x-concurrency-limit-")
+# Headers of a 304 that describe its own (empty) body, not the cached one:
+BODY_HEADERS = frozenset({"content-length", "content-encoding", "transfer-encoding"})
+
+# The directory CachingTransport uses when no path is given. It is per-user, since
+# cached responses hold subscription data:
+DEFAULT_CACHE_PATH = (
+    Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "qualysdk"
+)
+# The (module, endpoint) pairs CachingTransport caches by default. These return
+# reference data that rarely changes between pulls:
+CACHED_ENDPOINTS = frozenset(
+    {
+        ("vmdr", "get_template_list"),
+        ("vmdr", "get_scanner_list"),
+        ("vmdr", "get_user_list"),
+        ("vmdr", "get_static_searchlists"),
+        ("cloudview", "get_control_metadata"),
+        ("cloudview", "get_connectors"),
+    }
+)
+
+
+def _request_key(method: str, url: str, kwargs: dict) -> str:
+    """
+    Return the key a request is recorded and replayed under.
+
+    The key covers the method, URL, params and body. Headers and credentials are
+    left out, so a cassette can be replayed with a different auth object.
+    """
+    data = kwargs.get("data")
+    if isinstance(data, dict):
+        data = {k: v for k, v in data.items() if k not in CREDENTIAL_FIELDS}
+    elif isinstance(data, bytes):
+        data = data.decode("utf-8", errors="replace")
+
+    key = dumps(
+        [method.upper(), url, kwargs.get("params"), data, kwargs.get("json")],
+        sort_keys=True,
+        default=str,
+    )
+    return sha256(key.encode()).hexdigest()
+
+
+def _has_credentials(kwargs: dict) -> bool:
+    data = kwargs.get("data")
+    return isinstance(data, dict) and not CREDENTIAL_FIELDS.isdisjoint(data)
+
+
+def _response_fields(response: Response) -> dict:
+    """
+    Return what is saved of a response, apart from its body.
+    """
+    return {
+        "status": response.status_code,
+        "reason": response.reason,
+        "headers": {
+            k: v
+            for k, v in response.headers.items()
+            if k.lower() not in DROPPED_HEADERS
+        },
+        "encoding": response.encoding,
+        "elapsed": response.elapsed.total_seconds(),
+        "wire_bytes": getattr(response, "wire_bytes", len(response.content)),
+    }
+
+
+def _build_response(fields: dict, url: str, body: bytes) -> Response:
+    """
+    Rebuild a requests.Response from saved fields and body.
+    """
+    response = Response()
+    response.status_code = fields["status"]
+    response.reason = fields["reason"]
+    response.headers = CaseInsensitiveDict(fields["headers"])
+    response._content = body
+    response.encoding = fields["encoding"]
+    response.url = url
+    response.elapsed = timedelta(seconds=fields["elapsed"])
+    response.wire_bytes = fields.get("wire_bytes", len(body))
+    return response
+
+
+class RecordingTransport(Transport):
+    """
+    RecordingTransport - sends requests over another transport and saves every response to a cassette.
+
+    Recording into an existing cassette appends to it.
+
+    Params:
+    ```
+    path (Union[str, Path]) The cassette directory. Created if it does not exist.
+    transport (Transport) The transport to record. Defaults to the auth object's SessionManager.
+    ```
+    """
+
+    def __init__(self, path: Union[str, Path], transport: Transport = None):
+        self.path = Path(path)
+        self.transport = transport
+        self._lock = Lock()
+        (self.path / BODY_DIR).mkdir(parents=True, exist_ok=True)
+        index = self.path / INDEX_FILE
+        self.recorded = (
+            sum(1 for _ in index.open(encoding="utf-8")) if index.exists() else 0
+        )
+
+    @property
+    def timeout(self) -> tuple:
+        return self.transport.timeout if self.transport else DEFAULT_TIMEOUT
+
+    def bind(self, session_manager: SessionManager) -> None:
+        if self.transport is None:
+            self.transport = session_manager
+
+    def _record(self, method: str, url: str, kwargs: dict, response: Response):
+        body = response.content if not _has_credentials(kwargs) else REDACTED
+        params = kwargs.get("params")
+
+        with self._lock:
+            self.recorded += 1
+            body_file = f"{BODY_DIR}/{self.recorded:06d}.bin"
+            (self.path / body_file).write_bytes(body)
+
+            interaction = {
+                "key": _request_key(method, url, kwargs),
+                "method": method.upper(),
+                "url": url,
+                "params": params if isinstance(params, dict) else None,
+                **_response_fields(response),
+                "body": body_file,
+            }
+            with (self.path / INDEX_FILE).open("a", encoding="utf-8") as f:
+                f.write(dumps(interaction, default=str) + "\n")
+
+    def request(
+        self,
+        url_type: Literal["api", "gateway", "base"],
+        method: str,
+        url: str,
+        **kwargs,
+    ) -> Response:
+        response = self.transport.request(url_type, method, url, **kwargs)
+        self._record(method, url, kwargs, response)
+        return response
+
+    async def arequest(
+        self,
+        url_type: Literal["api", "gateway", "base"],
+        method: str,
+        url: str,
+        **kwargs,
+    ) -> Response:
+        response = await self.transport.arequest(url_type, method, url, **kwargs)
+        self._record(method, url, kwargs, response)
+        return response
+
+    def close(self) -> None:
+        if self.transport is not None:
+            self.transport.close()
+
+    async def aclose(self) -> None:
+        if self.transport is not None:
+            await self.transport.aclose()
+
+    def __getstate__(self) -> dict:
+        return {"path": self.path, "transport": self.transport}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["path"], state["transport"])
+
+    def __repr__(self) -> str:
+        return f"RecordingTransport(path='{self.path}', recorded={self.recorded})"
+
+
+class ReplayTransport(Transport):
+    """
+    ReplayTransport - serves the responses saved in a cassette instead of calling Qualys.
+
+    Responses recorded more than once for the same request (i.e. a retried call)
+    are served in the order they were recorded. After the last one, it is repeated.
+
+    Params:
+    ```
+    path (Union[str, Path]) The cassette directory.
+    latency (Union[float, "recorded"]) Seconds to wait before returning each response,
+        or "recorded" to wait as long as the recorded response took. Defaults to 0.
+    ```
+    """
+
+    def __init__(
+        self, path: Union[str, Path], latency: Union[float, Literal["recorded"]] = 0
+    ):
+        if latency != "recorded" and (
+            not isinstance(latency, (int, float)) or latency < 0
+        ):
+            raise ValueError(
+                "latency must be a number of seconds of at least 0, or 'recorded'."
+            )
+
+        self.path = Path(path)
+        self.latency = latency
+        self._lock = Lock()
+        self._bodies = {}
+        self.served = 0
+
+        index = self.path / INDEX_FILE
+        if not index.exists():
+            raise FileNotFoundError(f"No cassette found at {self.path}.")
+
+        self._interactions = {}
+        with index.open(encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    interaction = loads(line)
+                    self._interactions.setdefault(interaction["key"], []).append(
+                        interaction
+                    )
+        self._cursors = {key: 0 for key in self._interactions}
+
+    def _next(self, method: str, url: str, kwargs: dict) -> dict:
+        key = _request_key(method, url, kwargs)
+        with self._lock:
+            interactions = self._interactions.get(key)
+            if not interactions:
+                raise CassetteMissError(
+                    f"No recorded response for {method.upper()} {url} with params {kwargs.get('params')} in {self.path}."
+                )
+            i = self._cursors[key]
+            self._cursors[key] = min(i + 1, len(interactions) - 1)
+            self.served += 1
+            return interactions[i]
+
+    def _delay(self, interaction: dict) -> float:
+        return interaction["elapsed"] if self.latency == "recorded" else self.latency
+
+    def _to_response(self, interaction: dict) -> Response:
+        body = self._bodies.get(interaction["body"])
+        if body is None:
+            # Bodies are kept in memory so that repeated replays measure parsing, not disk reads:
+            body = (self.path / interaction["body"]).read_bytes()
+            self._bodies[interaction["body"]] = body
+
+        return _build_response(interaction, interaction["url"], body)
+
+    def request(
+        self,
+        url_type: Literal["api", "gateway", "base"],
+        method: str,
+        url: str,
+        **kwargs,
+    ) -> Response:
+        interaction = self._next(method, url, kwargs)
+        if delay := self._delay(interaction):
+            sleep(delay)
+        return self._to_response(interaction)
+
+    async def arequest(
+        self,
+        url_type: Literal["api", "gateway", "base"],
+        method: str,
+        url: str,
+        **kwargs,
+    ) -> Response:
+        interaction = self._next(method, url, kwargs)
+        if delay := self._delay(interaction):
+            await async_sleep(delay)
+        return self._to_response(interaction)
+
+    def rewind(self) -> None:
+        """
+        Serve every request from its first recorded response again.
+        """
+        with self._lock:
+            self._cursors = {key: 0 for key in self._interactions}
+
+    def __getstate__(self) -> dict:
+        return {"path": self.path, "latency": self.latency}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["path"], state["latency"])
+
+    def __repr__(self) -> str:
+        return f"ReplayTransport(path='{self.path}', latency={self.latency}, interactions={sum(len(i) for i in self._interactions.values())})"
+
+
+def _path_pattern(path: str) -> re.Pattern:
+    """
+    Turn a CALL_SCHEMA endpoint path into a regex. Placeholders match one path segment.
+    """
+    parts = re.split(r"\{[^}]+\}", path)
+    return re.compile("[^/]+".join(re.escape(part) for part in parts))
+
+
+class CachingTransport(Transport):
+    """
+    CachingTransport - sends requests over another transport and caches the GET
+    responses of reference endpoints on disk.
+
+    A cached response with an ETag or Last-Modified header is revalidated with
+    If-None-Match/If-Modified-Since, and served from the cache on a 304 Not Modified.
+    A cached response with neither is served without a request while it is
+    younger than ttl, and fetched again once it is older.
+
+    Entries are keyed on the request (see _request_key) and the user sending it,
+    so auth objects for different users can share a cache directory.
+
+    Params:
+    ```
+    path (Union[str, Path]) The cache directory. Created, readable only by the current user, if it does not exist. Defaults to DEFAULT_CACHE_PATH (~/.cache/qualysdk).
+    ttl (float) Seconds a response without validators is reused for. Defaults to 3600.
+    endpoints (set) The (module, endpoint) pairs to cache. Defaults to CACHED_ENDPOINTS.
+    transport (Transport) The transport to send requests over. Defaults to the auth object's SessionManager.
+    ```
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path] = DEFAULT_CACHE_PATH,
+        ttl: float = 3600,
+        endpoints: set = CACHED_ENDPOINTS,
+        transport: Transport = None,
+    ):
+        if not isinstance(ttl, (int, float)) or ttl < 0:
+            raise ValueError("ttl must be a number of seconds of at least 0.")
+        for module, endpoint in endpoints:
+            if endpoint not in CALL_SCHEMA.get(module, {}):
+                raise ValueError(
+                    f"Invalid endpoint {endpoint} for module {module} in endpoints."
+                )
+
+        self.path = Path(path)
+        self.ttl = ttl
+        self.endpoints = frozenset(endpoints)
+        self.transport = transport
+        self._lock = Lock()
+        self.stats = {"hits": 0, "misses": 0, "revalidated": 0, "bytes_saved": 0}
+        self.path.mkdir(mode=0o700, parents=True, exist_ok=True)
+
+        self._patterns = tuple(
+            (
+                CALL_SCHEMA[module]["url_type"],
+                _path_pattern(CALL_SCHEMA[module][endpoint]["endpoint"]),
+            )
+            for module, endpoint in self.endpoints
+        )
+
+    @property
+    def timeout(self) -> tuple:
+        return self.transport.timeout if self.transport else DEFAULT_TIMEOUT
+
+    def bind(self, session_manager: SessionManager) -> None:
+        if self.transport is None:
+            self.transport = session_manager
+
+    def _cache_key(self, url_type: str, method: str, url: str, kwargs: dict):
+        """
+        Return the key a request is cached under, or None if it is not cached.
+        """
+        if method.upper() != "GET":
+            return None
+        path = urlsplit(url).path
+        if not any(
+            url_type == cached_type and pattern.fullmatch(path)
+            for cached_type, pattern in self._patterns
+        ):
+            return None
+
+        # Responses are only shared between requests made as the same user:
+        auth = kwargs.get("auth")
+        if isinstance(auth, tuple):
+            identity = auth[0]
+        else:
+            identity = (kwargs.get("headers") or {}).get("Authorization", "")
+        identity = sha256(str(identity).encode()).hexdigest()
+        return sha256(
+            (identity + _request_key(method, url, kwargs)).encode()
+        ).hexdigest()
+
+    def _load(self, key: str) -> Union[dict, None]:
+        try:
+            entry = loads((self.path / f"{key}.json").read_text(encoding="utf-8"))
+            entry["content"] = (self.path / f"{key}.bin").read_bytes()
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def _write(self, file: Path, data: bytes) -> None:
+        # Written to a temporary file and renamed, so readers never see half an entry.
+        # The name is unique per thread, so two threads storing one key don't collide:
+        tmp = file.with_name(f"{file.name}.{os.getpid()}.{get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, file)
+
+    def _store(self, key: str, entry: dict, body: bytes = None) -> None:
+        if body is not None:
+            self._write(self.path / f"{key}.bin", body)
+        meta = {k: v for k, v in entry.items() if k != "content"}
+        self._write(self.path / f"{key}.json", dumps(meta, default=str).encode())
+
+    def _conditional_kwargs(self, entry: dict, kwargs: dict) -> dict:
+        headers = dict(kwargs.get("headers") or {})
+        cached = CaseInsensitiveDict(entry["headers"])
+        if etag := cached.get("ETag"):
+            headers["If-None-Match"] = etag
+        if last_modified := cached.get("Last-Modified"):
+            headers["If-Modified-Since"] = last_modified
+        return {**kwargs, "headers": headers}
+
+    def _count(self, stat: str, nbytes: int = 0) -> None:
+        with self._lock:
+            self.stats[stat] += 1
+            self.stats["bytes_saved"] += nbytes
+
+    @staticmethod
+    def _cached_headers(headers) -> dict:
+        return {
+            k: v
+            for k, v in headers.items()
+            if not k.lower().startswith(RATE_LIMIT_HEADERS)
+        }
+
+    def _hit(self, url: str, entry: dict, not_modified: Response = None) -> Response:
+        """
+        Build the response for a cached entry. not_modified is the 304 it was
+        revalidated with, if any, whose headers (rate limits included) are
+        merged in.
+        """
+        headers = self._cached_headers(entry["headers"])
+        if not_modified is not None:
+            headers.update(
+                (k, v)
+                for k, v in not_modified.headers.items()
+                if k.lower() not in DROPPED_HEADERS | BODY_HEADERS
+            )
+        response = _build_response(
+            {**entry, "headers": headers, "elapsed": 0, "wire_bytes": 0},
+            url,
+            entry["content"],
+        )
+        response.from_cache = True
+        response.revalidated = not_modified is not None
+        return response
+
+    def _before(self, key: str, kwargs: dict):
+        """
+        Look a request up in the cache. Returns the cached entry to revalidate (or None),
+        the cached response if it can be served without a request (or None), and the
+        kwargs to send the request with.
+        """
+        entry = self._load(key)
+        if entry is None:
+            return None, None, kwargs
+
+        headers = CaseInsensitiveDict(entry["headers"])
+        if "ETag" in headers or "Last-Modified" in headers:
+            return entry, None, self._conditional_kwargs(entry, kwargs)
+        if time() - entry["stored_at"] < self.ttl:
+            self._count("hits", len(entry["content"]))
+            return entry, self._hit(entry["url"], entry), kwargs
+        return None, None, kwargs
+
+    def _after(self, key: str, url: str, entry: dict, response: Response) -> Response:
+        if entry is not None and response.status_code == 304:
+            entry["stored_at"] = time()
+            self._store(key, entry)
+            self._count("revalidated", len(entry["content"]))
+            return self._hit(url, entry, response)
+
+        self._count("misses")
+        if response.status_code == 200:
+            fields = _response_fields(response)
+            fields["headers"] = self._cached_headers(fields["headers"])
+            self._store(
+                key, {**fields, "url": url, "stored_at": time()}, response.content
+            )
+        return response
+
+    def request(
+        self,
+        url_type: Literal["api", "gateway", "base"],
+        method: str,
+        url: str,
+        **kwargs,
+    ) -> Response:
+        key = self._cache_key(url_type, method, url, kwargs)
+        if key is None:
+            return self.transport.request(url_type, method, url, **kwargs)
+
+        entry, cached, send_kwargs = self._before(key, kwargs)
+        if cached is not None:
+            return cached
+        response = self.transport.request(url_type, method, url, **send_kwargs)
+        return self._after(key, url, entry, response)
+
+    async def arequest(
+        self,
+        url_type: Literal["api", "gateway", "base"],
+        method: str,
+        url: str,
+        **kwargs,
+    ) -> Response:
+        key = self._cache_key(url_type, method, url, kwargs)
+        if key is None:
+            return await self.transport.arequest(url_type, method, url, **kwargs)
+
+        entry, cached, send_kwargs = self._before(key, kwargs)
+        if cached is not None:
+            return cached
+        response = await self.transport.arequest(url_type, method, url, **send_kwargs)
+        return self._after(key, url, entry, response)
+
+    def clear(self) -> None:
+        """
+        Delete every cached response and reset the stats.
+        """
+        for file in self.path.iterdir():
+            if file.suffix in (".json", ".bin"):
+                file.unlink(missing_ok=True)
+        with self._lock:
+            self.stats = dict.fromkeys(self.stats, 0)
+
+    def close(self) -> None:
+        if self.transport is not None:
+            self.transport.close()
+
+    async def aclose(self) -> None:
+        if self.transport is not None:
+            await self.transport.aclose()
+
+    def __getstate__(self) -> dict:
+        return {
+            "path": self.path,
+            "ttl": self.ttl,
+            "endpoints": self.endpoints,
+            "transport": self.transport,
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(
+            state["path"], state["ttl"], state["endpoints"], state["transport"]
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"CachingTransport(path='{self.path}', ttl={self.ttl}, stats={self.stats})"
+        )
@@ -0,0 +1,272 @@
+"""
+xml_decoder.py - contains the XMLDecoder class for the qualysdk package.
+
+xml_parser converts each record element (i.e. a HOST) to nested dicts, and the
+data class's __post_init__ then walks those dicts again to convert each field and
+build the nested data classes (Tag, Detection, QDS...).
+
+An XMLDecoder builds the data class straight from the element instead, using a
+field map compiled once per record type: each child tag maps to a field and to a
+function that turns the element into the field's final value. The values are the
+same as the data class's own. A record the field map does not cover (an unknown
+tag, an empty element where a value was expected...) is converted the usual way,
+through element_to_dict and the data class.
+"""
+
+from dataclasses import MISSING, fields
+from typing import Any, Callable, Iterable
+from warnings import catch_warnings, simplefilter
+
+from bs4 import BeautifulSoup
+
+from .base_list import BaseList
+from .xml_parser import XMLSpec, element_to_dict
+
+
+class DecodeError(Exception):
+    """
+    Raised when an element is not shaped the way the field map expects. The
+    record is then converted through element_to_dict instead.
+    """
+
+
+def text(element) -> str:
+    """
+    The text of a leaf element, as xml_parser converts it.
+
+    Raises DecodeError for elements with attributes or children, and for empty
+    elements (which xml_parser converts to {}).
+    """
+    if len(element) or element.attrib:
+        raise DecodeError(element.tag)
+    value = element.text
+    if value is not None:
+        value = value.strip()
+        if value:
+            return value
+    raise DecodeError(element.tag)
+
+
+def text_or_empty(element) -> Any:
+    """
+    The text of a leaf element, or {} for an empty one, as xml_parser converts
+    both. The default for fields with no converter.
+    """
+    if len(element) or element.attrib:
+        raise DecodeError(element.tag)
+    value = element.text
+    if value is not None:
+        value = value.strip()
+        if value:
+            return value
+    return {}
+
+
+def html_text(value: str) -> str:
+    """
+    The text of an HTML field, as BeautifulSoup(value, "html.parser").get_text()
+    returns it. Text with no markup or entities is returned as is, as
+    BeautifulSoup would, without parsing it.
+    """
+    if "<" not in value and "&" not in value:
+        return value
+    with catch_warnings():
+        simplefilter("ignore")  # ignore the warning about the html.parser
+        return BeautifulSoup(value, "html.parser").get_text()
+
+
+def leaf_fields(element, rename: dict = None) -> dict:
+    """
+    The children of a record of leaf elements (i.e. a TAG) as {tag: text}.
+    """
+    if element.attrib:
+        raise DecodeError(element.tag)
+    values = {}
+    for child in element:
+        tag = child.tag
+        if not isinstance(tag, str):
+            # Comments and processing instructions:
+            continue
+        if rename:
+            tag = rename.get(tag, tag)
+        if tag in values:
+            raise DecodeError(tag)
+        values[tag] = text(child)
+    if not values:
+        raise DecodeError(element.tag)
+    return values
+
+
+def leaf_record(model: type, rename: dict = None) -> Callable:
+    """
+    A function that builds model from a record of leaf elements, i.e.
+    leaf_record(Tag) for a TAG. model's own __post_init__ converts the text.
+    """
+    return lambda element: model(**leaf_fields(element, rename))
+
+
+def records(tag: str, build: Callable) -> Callable:
+    """
+    A converter for a list element (i.e. TAGS), which holds one or more tag
+    elements. It returns a BaseList of build(element) for each of them.
+    """
+
+    def convert(element) -> BaseList:
+        if element.attrib:
+            raise DecodeError(element.tag)
+        result = BaseList()
+        for child in element:
+            if child.tag == tag:
+                result.append(build(child))
+            elif isinstance(child.tag, str):
+                raise DecodeError(child.tag)
+        if not result:
+            raise DecodeError(element.tag)
+        return result
+
+    return convert
+
+
+def _text_as(func: Callable) -> Callable:
+    return lambda element: func(text(element))
+
+
+class XMLDecoder:
+    """
+    XMLDecoder - build a data class straight from each record element.
+
+    Each child of a record is the field of the same name, unless renamed. A
+    field's value is the child's text ({} if empty, as xml_parser gives), or:
+
+    - convert: a function of the text, i.e. int or datetime.fromisoformat.
+    - nested: a function of the element, i.e. records("TAG", leaf_record(Tag)).
+    - post_init: the element as element_to_dict converts it, which model's own
+      __post_init__ then converts. __post_init__ is run with only these fields.
+      Use it for fields that other fields are derived from (i.e. a VMDRHost's
+      METADATA), and for conversions not worth repeating here.
+
+    Converters must give the values model.__post_init__ would, and raise
+    DecodeError for elements they do not handle. Anything the field map does not
+    cover (unknown or repeated tags, attributes on the record), and any error
+    while decoding, sends the record through element_to_dict and fallback instead.
+
+    Calling the decoder with a record element returns the built record.
+
+    Params:
+    ```
+    model (type) The data class to build.
+    convert (dict[str, Callable]) Optional. Fields mapped to a function of their text.
+    nested (dict[str, Callable]) Optional. Fields mapped to a function of their element.
+    post_init (Iterable[str]) Optional. Fields that model.__post_init__ converts.
+    rename (dict[str, str]) Optional. Tags mapped to the field they are stored in, i.e. {"CVSS3.1": "CVSS_31"}. The field's own name is then not accepted as a tag.
+    finish (Callable) Optional. Called with each built record, for the steps of __post_init__ that span fields. May raise DecodeError.
+    spec (XMLSpec) Optional. The spec records are converted with by element_to_dict. Paths start below the record.
+    fallback (Callable) Optional. Builds a record from its element_to_dict dict. Defaults to model.from_dict.
+    ```
+    """
+
+    def __init__(
+        self,
+        model: type,
+        convert: dict[str, Callable] = None,
+        nested: dict[str, Callable] = None,
+        post_init: Iterable[str] = (),
+        rename: dict[str, str] = None,
+        finish: Callable = None,
+        spec: XMLSpec = None,
+        fallback: Callable = None,
+    ):
+        convert = convert or {}
+        nested = nested or {}
+        post_init = set(post_init)
+
+        self.model = model
+        self.finish = finish
+        self.spec = spec
+        self.fallback = fallback or model.from_dict
+
+        model_fields = fields(model)
+        self.required = tuple(
+            f.name
+            for f in model_fields
+            if f.default is MISSING and f.default_factory is MISSING
+        )
+        # The fields of a record with no elements, after __post_init__. Required
+        # fields are always decoded:
+        try:
+            self.defaults = vars(model(**dict.fromkeys(self.required)))
+        except Exception:
+            self.defaults = {
+                f.name: None if f.default is MISSING else f.default
+                for f in model_fields
+            }
+
+        # tag -> (field, converter, whether __post_init__ converts the field):
+        self.fields = {}
+        for f in model_fields:
+            if f.name in nested:
+                func = nested[f.name]
+            elif f.name in convert:
+                func = _text_as(convert[f.name])
+            else:
+                func = text_or_empty
+            self.fields[f.name] = (f.name, func, f.name in post_init)
+        for tag, name in (rename or {}).items():
+            self.fields[tag] = self.fields.pop(name)
+
+    def decode(self, element) -> Any:
+        """
+        Build a record from its element. Raises DecodeError if the field map does
+        not cover it.
+        """
+        if element.attrib:
+            raise DecodeError(element.tag)
+
+        values = {}
+        # Elements of the fields __post_init__ converts:
+        deferred = {}
+        for child in element:
+            tag = child.tag
+            try:
+                name, func, post_init = self.fields[tag]
+            except KeyError:
+                if isinstance(tag, str):
+                    raise DecodeError(tag)
+                # Comments and processing instructions:
+                continue
+            if name in values or name in deferred:
+                raise DecodeError(tag)
+            if post_init:
+                deferred[name] = child
+            else:
+                values[name] = func(child)
+
+        for name in self.required:
+            if name not in values:
+                raise DecodeError(name)
+
+        if deferred:
+            children = self.spec.children if self.spec is not None else {}
+            kwargs = dict.fromkeys(self.required)
+            for name, child in deferred.items():
+                kwargs[name] = element_to_dict(child, spec=children.get(child.tag))
+            record = self.model(**kwargs)
+        else:
+            record = self.model.__new__(self.model)
+            record.__dict__.update(self.defaults)
+        record.__dict__.update(values)
+
+        if self.finish is not None:
+            self.finish(record)
+        return record
+
+    def __call__(self, element) -> Any:
+        try:
+            return self.decode(element)
+        except Exception:
+            # Including errors from the converters (i.e. int() of a bad value), so
+            # that a malformed record raises what it did before, if anything:
+            return self.fallback(element_to_dict(element, spec=self.spec))
+
+    def __repr__(self) -> str:
+        return f"XMLDecoder(model={self.model.__name__}, fields={len(self.fields)})"
@@ -1,51 +1,204 @@
 """
 xml_parser.py - contains the xml_parser function that parses an XML string into a dictionary.
+
+To convert a large document one record at a time instead, see xml_stream.py.
+
+XML does not say which elements can repeat, so an element that appears once is
+converted to a dict and one that appears several times to a list of dicts. An
+XMLSpec declares the elements that should always be lists, and converters for
+element text, so that callers get consistently shaped data in one pass. It can
+also hand record elements to an XMLDecoder (see xml_decoder.py), which builds
+data classes from them without converting them to dicts first.
 """
 
-from lxml.etree import _Comment
+from sys import intern
+from time import perf_counter
+from typing import Callable, Iterable
+
+from lxml.etree import iterwalk
 from defusedxml.lxml import fromstring
 
+from .hooks import record_parse
+
+
+class XMLSpec:
+    """
+    XMLSpec - how to shape the output of xml_parser for one kind of document.
+
+    Paths are tags joined with "/", relative to the element being converted. For
+    xml_parser, that is the document, so paths start with the root tag. For
+    XMLRecordStream, paths start below each record.
+
+    Params:
+    ```
+    lists (Iterable[str]) Paths of elements that are always put in a list, even when there is only one.
+    coerce (dict[str, Callable]) Paths of text-only elements mapped to a function applied to their text, i.e. {"RESPONSE/COUNT": int}.
+    nested (dict[str, XMLSpec]) Paths of elements mapped to another XMLSpec to apply below them.
+    decode (dict[str, Callable]) Paths of elements mapped to a function that builds their value from the lxml element itself, i.e. an XMLDecoder. Their children are not converted.
+    ```
+    """
+
+    __slots__ = ("children", "lists", "coerce", "decode")
+
+    def __init__(
+        self,
+        lists: Iterable[str] = (),
+        coerce: dict[str, Callable] = None,
+        nested: dict[str, "XMLSpec"] = None,
+        decode: dict[str, Callable] = None,
+    ):
+        self.children = {}
+        self.lists = set()
+        self.coerce = {}
+        self.decode = {}
+
+        for path, spec in (nested or {}).items():
+            self._node(path.split("/"))._merge(spec)
+        for path in lists:
+            *parents, tag = path.split("/")
+            self._node(parents).lists.add(tag)
+        for path, func in (coerce or {}).items():
+            *parents, tag = path.split("/")
+            self._node(parents).coerce[tag] = func
+        for path, func in (decode or {}).items():
+            *parents, tag = path.split("/")
+            self._node(parents).decode[tag] = func
+
+    def _node(self, parts: list) -> "XMLSpec":
+        node = self
+        for tag in parts:
+            node = node.children.setdefault(tag, XMLSpec())
+        return node
+
+    def _merge(self, other: "XMLSpec") -> None:
+        # Copy rather than share, so that specs used in several places stay independent:
+        self.lists |= other.lists
+        self.coerce.update(other.coerce)
+        self.decode.update(other.decode)
+        for tag, child in other.children.items():
+            self.children.setdefault(tag, XMLSpec())._merge(child)
+
+    def __repr__(self) -> str:
+        return f"XMLSpec(lists={sorted(self.lists)}, coerce={sorted(self.coerce)}, decode={sorted(self.decode)}, children={sorted(self.children)})"
+
+
+def element_to_dict(element, attr_prefix="@", cdata_key="#text", spec=None):
+    """
+    Turn an lxml element into a dictionary (or a string, for text-only elements).
+    This is how xml_parser converts each element of a document.
+
+    The tree is walked with lxml's iterwalk rather than recursively, so there is
+    no Python call per element and comments are skipped in C. Tag and attribute
+    keys are interned, so the many dicts of a document share their key strings.
+
+     Params:
+         element (lxml.etree._Element): The element to convert.
+         attr_prefix (str): The prefix to add to attributes.
+         cdata_key (str): The key to use for cdata.
+         spec (XMLSpec): Optional. Which child elements are always lists, and how to convert their text.
+
+     Returns:
+         Union[dict, str]: The converted element.
+    """
+    # tag -> interned tag, attribute name -> interned attr_prefix + name:
+    tags = {}
+    attr_keys = {}
+    # The dicts (and specs) of the ancestors of the current element:
+    stack = []
+    push = stack.append
+    pop = stack.pop
+    parsed_dict = None
+
+    walker = iterwalk(element, events=("start", "end"))
+    for event, el in walker:
+        if event == "start":
+            push((parsed_dict, spec))
+            if spec is not None and parsed_dict is not None:
+                if spec.decode and el.tag in spec.decode:
+                    # Built from the element when it ends:
+                    walker.skip_subtree()
+                # spec applies to the children of element, so only descend below it:
+                spec = spec.children.get(el.tag)
+            parsed_dict = {}
+            # Parse attributes
+            attributes = el.items()
+            if attributes:
+                for key, value in attributes:
+                    try:
+                        parsed_dict[attr_keys[key]] = value
+                    except KeyError:
+                        attr_keys[key] = intern(attr_prefix + key)
+                        parsed_dict[attr_keys[key]] = value
+            continue
 
-def xml_parser(xml_string, attr_prefix="@", cdata_key="#text"):
+        # Parse text content. Child elements were added as they ended:
+        text = el.text
+        if text is not None:
+            text = text.strip()
+            if text:
+                if parsed_dict:
+                    parsed_dict[cdata_key] = text
+                else:
+                    parsed_dict = text
+
+        child_dict = parsed_dict
+        parsed_dict, spec = pop()
+        if parsed_dict is None:
+            # This was the element being converted:
+            return child_dict
+
+        tag = el.tag
+        try:
+            tag = tags[tag]
+        except KeyError:
+            tags[tag] = tag = intern(tag)
+
+        if spec is not None:
+            if spec.decode and tag in spec.decode:
+                child_dict = spec.decode[tag](el)
+            elif tag in spec.coerce and isinstance(child_dict, str):
+                child_dict = spec.coerce[tag](child_dict)
+            if tag in spec.lists:
+                parsed_dict.setdefault(tag, []).append(child_dict)
+                continue
+
+        existing = parsed_dict.get(tag, parsed_dict)
+        if existing is parsed_dict:
+            parsed_dict[tag] = child_dict
+        elif isinstance(existing, list):
+            existing.append(child_dict)
+        else:
+            parsed_dict[tag] = [existing, child_dict]
+
+
+def xml_parser(
+    xml_string, attr_prefix="@", cdata_key="#text", spec: XMLSpec = None
+) -> dict:
     """
     Turn an xml string into a dictionary.
 
      Params:
-         xml_string (str): The xml string to parse.
+         xml_string (Union[bytes, str]): The xml to parse. Prefer the raw bytes
+             (i.e. response.content): a str is encoded back to bytes before parsing.
          attr_prefix (str): The prefix to add to attributes.
          cdata_key (str): The key to use for cdata.
+         spec (XMLSpec): Optional. Which elements are always lists, and how to convert their text.
 
      Returns:
          dict: The parsed xml as a dictionary.
     """
+    start = perf_counter()
+
     # check if the user passed in a string or bytes. if string, encode it to utf-8
     if isinstance(xml_string, str):
         xml_string = xml_string.encode("utf-8")
 
-    def parse_element(element):
-        parsed_dict = {}
-        # Parse attributes
-        for key, value in element.attrib.items():
-            parsed_dict[attr_prefix + key] = value
-        # Parse child elements
-        for child in element:
-            if isinstance(child, _Comment):
-                continue  # Skip comments
-            child_dict = parse_element(child)
-            if child.tag in parsed_dict:
-                if not isinstance(parsed_dict[child.tag], list):
-                    parsed_dict[child.tag] = [parsed_dict[child.tag]]
-                parsed_dict[child.tag].append(child_dict)
-            else:
-                parsed_dict[child.tag] = child_dict
-        # Parse text content
-        text = (element.text or "").strip()
-        if text:
-            if parsed_dict:
-                parsed_dict[cdata_key] = text
-            else:
-                parsed_dict = text
-        return parsed_dict
-
     root = fromstring(xml_string)
-    return {root.tag: parse_element(root)}
+    if spec is not None:
+        # The root element is the first step of every path:
+        spec = spec.children.get(root.tag)
+    parsed = {root.tag: element_to_dict(root, attr_prefix, cdata_key, spec)}
+
+    # Count the time towards the call that returned this document (see hooks.py):
+    record_parse("xml", perf_counter() - start, len(xml_string))
+    return parsed
@@ -0,0 +1,157 @@
+"""
+xml_stream.py - contains the XMLRecordStream class for the qualysdk package.
+
+xml_parser builds an lxml tree of the whole document and then converts all of it
+to nested dicts, so a page of host list detection output is held in memory three
+times over (the raw bytes, the tree and the dicts) before the first VMDRHost is
+built.
+
+XMLRecordStream walks the document with lxml's iterparse instead. Each record
+element (i.e. a HOST) is converted to the same dict xml_parser would produce for
+it, yielded, and then cleared from the tree, so only one record's tree and dict
+exist at a time. The RESPONSE's WARNING (which carries the next page's URL) comes
+after the records, so it is available once iteration finishes.
+
+Only the tree and dicts are bounded this way. A stream over bytes (i.e.
+response.content, as the VMDR pulls use) still needs the whole document in
+memory first. Pass a file-like object, such as the raw body of a request made
+with stream=True, to bound the download too.
+"""
+
+from io import BytesIO
+from time import perf_counter
+from typing import IO, Any, Callable, Iterator, Union
+
+from lxml.etree import iterparse
+from defusedxml.lxml import check_docinfo
+
+from .hooks import record_parse
+from .xml_parser import XMLSpec, element_to_dict
+
+
+class XMLRecordStream:
+    """
+    XMLRecordStream - iterate over the records of an XML document one at a time.
+
+    Iterating yields each record_tag element whose parent is parent_tag, converted
+    with the same rules as xml_parser. Once iteration finishes, root_tag and warning
+    are set. A stream can only be iterated once.
+
+    DTDs and external entities are never loaded or resolved, and a document that
+    declares entities raises EntitiesForbidden, as it does with xml_parser.
+
+    Params:
+    ```
+    source (Union[bytes, str, IO]) The XML, or a binary file-like object to read it from (i.e. a streamed response.raw).
+    record_tag (str) The tag of the elements to yield, i.e. "HOST".
+    parent_tag (str) The tag of the records' parent element, i.e. "HOST_LIST".
+    spec (XMLSpec) Optional. Which elements of each record are always lists, and how to convert their text. Paths start below the record.
+    decoder (Callable) Optional. Builds each record from its lxml element instead of converting it to a dict, i.e. an XMLDecoder (see xml_decoder.py).
+    attr_prefix (str) The prefix to add to attributes. Defaults to "@".
+    cdata_key (str) The key to use for cdata. Defaults to "#text".
+    ```
+
+    Attributes:
+    ```
+    root_tag: str - the tag of the document's root element.
+    warning: dict - the RESPONSE's WARNING element (CODE, TEXT, URL), or None if there was none.
+    records: int - the number of records yielded so far.
+    ```
+    """
+
+    def __init__(
+        self,
+        source: Union[bytes, str, IO],
+        record_tag: str,
+        parent_tag: str,
+        spec: XMLSpec = None,
+        decoder: Callable = None,
+        attr_prefix: str = "@",
+        cdata_key: str = "#text",
+    ):
+        if isinstance(source, str):
+            source = source.encode("utf-8")
+        if isinstance(source, bytes):
+            self.bytes = len(source)
+            source = BytesIO(source)
+        else:
+            self.bytes = None
+
+        self.source = source
+        self.record_tag = record_tag
+        self.parent_tag = parent_tag
+        self.spec = spec
+        self.decoder = decoder
+        self.attr_prefix = attr_prefix
+        self.cdata_key = cdata_key
+        self.root_tag = None
+        self.warning = None
+        self.records = 0
+        self._started = False
+
+    @property
+    def url(self) -> Union[str, None]:
+        """
+        The WARNING/URL of the document: where the next page starts. None if it
+        was the last page, or if iteration has not finished.
+        """
+        return self.warning.get("URL") if isinstance(self.warning, dict) else None
+
+    def __iter__(self) -> Iterator[Union[dict, str, Any]]:
+        if self._started:
+            raise RuntimeError("An XMLRecordStream can only be iterated once.")
+        self._started = True
+
+        events = iterparse(
+            self.source,
+            events=("end",),
+            # Only records and WARNINGs are reported. lxml skips the rest in C:
+            tag=(self.record_tag, "WARNING"),
+            resolve_entities=False,
+            load_dtd=False,
+            no_network=True,
+        )
+        # Time spent parsing, not counting the time the caller spends on each record:
+        seconds = 0.0
+        start = perf_counter()
+        checked = False
+        for _, element in events:
+            if not checked:
+                # The DOCTYPE has been read by the time of the first event. Reject
+                # entity declarations the way defusedxml does for xml_parser:
+                check_docinfo(element.getroottree())
+                checked = True
+
+            parent = element.getparent()
+            if parent is None:
+                continue
+
+            if element.tag == self.record_tag and parent.tag == self.parent_tag:
+                if self.decoder is not None:
+                    record = self.decoder(element)
+                else:
+                    record = element_to_dict(
+                        element, self.attr_prefix, self.cdata_key, self.spec
+                    )
+                # Free the record, and the already-converted records before it:
+                element.clear()
+                while element.getprevious() is not None:
+                    del parent[0]
+                self.records += 1
+                seconds += perf_counter() - start
+                yield record
+                start = perf_counter()
+            elif element.tag == "WARNING" and parent.tag == "RESPONSE":
+                self.warning = element_to_dict(
+                    element, self.attr_prefix, self.cdata_key
+                )
+
+        if not checked:
+            check_docinfo(events.root.getroottree())
+        self.root_tag = events.root.tag
+        seconds += perf_counter() - start
+        # Count the time towards the call that returned this document (see hooks.py):
+        record_parse("xml", seconds, self.bytes or 0)
+
+    def __repr__(self) -> str:
+        return f"XMLRecordStream(record_tag='{self.record_tag}', parent_tag='{self.parent_tag}', records={self.records}, url={self.url!r})"
@@ -2,4 +2,4 @@
 Certificate View module
 """
 
-from .list_certs import list_certs
+from .list_certs import list_certs, list_certs_async
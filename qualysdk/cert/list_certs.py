@@ -3,11 +3,13 @@ Contains the list_certs function
 """
 
 from json import JSONDecodeError
-from typing import Union
+from typing import Union, AsyncIterator
 
 from .data_classes.Certificate import Certificate
 from ..base.base_list import BaseList
 from ..base.call_api import call_api
+from ..base.json_stream import JSONRecordStream
+from ..base.call_api_async import call_api_async
 from ..auth.token import TokenAuth
 from ..exceptions.Exceptions import QualysAPIError
 
@@ -47,6 +49,39 @@ def list_certs(
     pages_pulled = 0
     responses = BaseList()
 
+    payload = _build_payload(**kwargs)
+
+    while True:
+        response = call_api(
+            auth=auth, module="cert", endpoint="list_certs", jsonbody=payload
+        )
+
+        if response.status_code != 200:
+            raise QualysAPIError(response.text)
+
+        # Decode one certificate at a time:
+        stream = JSONRecordStream(response.content)
+        for cert in stream:
+            responses.append(Certificate(**cert))
+        pages_pulled += 1
+
+        if page_count != "all" and pages_pulled >= page_count:
+            print(f"Hit user-defined limit of {page_count} pages.")
+            break
+
+        if not stream.records:
+            break
+
+        payload["pageNumber"] += 1
+
+    return responses
+
+
+def _build_payload(**kwargs) -> dict:
+    """
+    Build the list_certs JSON body from the list_certs kwargs.
+    """
+
     payload = {
         "filter": {
             "filters": [],
@@ -105,26 +140,48 @@ def list_certs(
                 {"field": key, "value": value, "operator": operator}
             )
 
+    return payload
+
+
+async def list_certs_async(
+    auth: TokenAuth, page_count: Union[int, "all"] = "all", **kwargs
+) -> AsyncIterator[Certificate]:
+    """
+    asyncio version of list_certs. Yields each Certificate as soon as its page is parsed. Requires httpx.
+
+    Args:
+        auth (TokenAuth): The authentication object.
+        page_count (Union[int, "all"]): The number of pages to return. Default is "all".
+        **kwargs: Accepts the same kwargs as list_certs.
+
+    Yields:
+        Certificate: Certificate objects.
+    """
+
+    # Check that page_count is either > 0 or 'all':
+    if page_count != "all" and (not isinstance(page_count, int) or page_count <= 0):
+        raise ValueError("page_count must be 'all' or > 0")
+
+    pages_pulled = 0
+    payload = _build_payload(**kwargs)
+
     while True:
-        response = call_api(
+        response = await call_api_async(
             auth=auth, module="cert", endpoint="list_certs", jsonbody=payload
         )
 
-        response_json = response.json()
         if response.status_code != 200:
             raise QualysAPIError(response.text)
+        response_json = response.json()
 
         for cert in response_json:
-            responses.append(Certificate(**cert))
+            yield Certificate(**cert)
         pages_pulled += 1
 
         if page_count != "all" and pages_pulled >= page_count:
-            print(f"Hit user-defined limit of {page_count} pages.")
             break
 
         if not response_json:
             break
 
         payload["pageNumber"] += 1
-
-    return responses
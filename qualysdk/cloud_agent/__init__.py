@@ -5,4 +5,4 @@ https://cdn2.qualys.com/docs/qualys-ca-api-user-guide.pdf
 """
 
 from .purge import purge_agent, bulk_purge_agent
-from .calls import list_agents, launch_ods, bulk_launch_ods
+from .calls import list_agents, list_agents_async, launch_ods, bulk_launch_ods
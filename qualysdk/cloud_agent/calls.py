@@ -2,12 +2,17 @@
 calls.py - contains the user-facing functions for most cloud agent API calls.
 """
 
-from typing import Union, Literal
+from typing import Union, Literal, AsyncIterator, Callable
+from datetime import datetime
 
-from .data_classes.Agent import CloudAgent
+from .data_classes.Agent import CloudAgent, LazyCloudAgent
+from .data_classes.CloudAgentTag import CloudAgentTag
 from .prepare_criteria import prepare_criteria
 from ..base.call_api import call_api
-from ..base.xml_parser import xml_parser
+from ..base.call_api_async import call_api_async
+from ..base.xml_parser import xml_parser, XMLSpec, element_to_dict
+from ..base.xml_decoder import XMLDecoder, DecodeError, leaf_fields, records
+from ..base.parse_pool import ParsePool
 from ..auth.basic import BasicAuth
 from ..base.base_list import BaseList
 
@@ -20,9 +25,176 @@ TRANSLATION = {
     "swca": "SWCA_Scan",
 }
 
+# The repeated elements of a HostAsset, which CloudAgent turns into lists:
+AGENT_SPEC = XMLSpec(
+    lists=(
+        "tags/list/TagSimple",
+        "openPort/list/HostAssetOpenPort",
+        "software/list/HostAssetSoftware",
+        "vuln/list/HostAssetVuln",
+        "processor/list/HostAssetProcessor",
+        "volume/list/HostAssetVolume",
+        "account/list/HostAssetAccount",
+        "networkInterface/list/HostAssetInterface",
+    )
+)
+
+
+def _asset_list(item_tag: str, summarize: Callable) -> Callable:
+    """
+    A converter for the <list> of a HostAsset's repeated elements (i.e.
+    openPort/list/HostAssetOpenPort), as CloudAgent.__post_init__ summarizes
+    each item from its fields.
+    """
+    items = records(item_tag, lambda element: summarize(leaf_fields(element)))
+
+    def convert(element) -> BaseList:
+        children = [child for child in element if isinstance(child.tag, str)]
+        if element.attrib or len(children) != 1 or children[0].tag != "list":
+            raise DecodeError(element.tag)
+        return items(children[0])
+
+    return convert
+
+
+def _volume(volume: dict) -> str:
+    # Calculate the % free space on the volume. Account for 0 division!
+    try:
+        percent_free = (int(volume.get("free")) / int(volume.get("size"))) * 100
+    except ZeroDivisionError:
+        percent_free = 0
+    return f"{volume.get('name')} ({percent_free:.2f}% free)"
+
+
+def _empty_to_none(element) -> Union[dict, None]:
+    value = element_to_dict(element)
+    return None if value == {} else value
+
+
+_processors = _asset_list("HostAssetProcessor", lambda item: f"{item.get('name')}")
+
+# Builds CloudAgents straight from HostAsset elements (see base/xml_decoder.py):
+AGENT_DECODER = XMLDecoder(
+    CloudAgent,
+    convert={
+        **dict.fromkeys(
+            (
+                "created",
+                "modified",
+                "lastComplianceScan",
+                "lastSystemBoot",
+                "agentInfo_lastCheckedIn",
+                "lastVulnScan",
+                "vulnsUpdated",
+                "informationGatheredUpdated",
+            ),
+            datetime.fromisoformat,
+        ),
+        **dict.fromkeys(
+            (
+                "id",
+                "qwebHostId",
+                "agentInfo_agentConfiguration_id",
+                "criticalityScore",
+                "totalMemory",
+            ),
+            int,
+        ),
+        "agentInfo_locationGeoLatitude": float,
+        "agentInfo_locationGeoLongitude": float,
+        "isDockerHost": lambda value: value == "true",
+    },
+    nested={
+        "tags": _asset_list("TagSimple", lambda tag: CloudAgentTag(**tag)),
+        "sourceInfo": element_to_dict,
+        "agentInfo": _empty_to_none,
+        "agentInfo_agentConfiguration": _empty_to_none,
+        "agentInfo_activationKey": _empty_to_none,
+        "openPort": _asset_list(
+            "HostAssetOpenPort",
+            lambda port: f"{port.get('port')}-{port.get('protocol')} ({port.get('serviceName')})",
+        ),
+        "software": _asset_list(
+            "HostAssetSoftware", lambda item: f"{item.get('name')}"
+        ),
+        "vuln": _asset_list(
+            "HostAssetVuln",
+            lambda vuln: f"{vuln.get('qid')} ({vuln.get('hostInstanveVulnId')}) First found: {vuln.get('firstFound')} Last found: {vuln.get('lastFound')}",
+        ),
+        "processor": lambda element: _processors(element)[0],
+        "volume": _asset_list("HostAssetVolume", _volume),
+        "account": _asset_list("HostAssetAccount", lambda item: item.get("username")),
+        "networkInterface": _asset_list(
+            "HostAssetInterface",
+            lambda interface: f"{interface.get('interfaceName')} ({interface.get('macAddress')})",
+        ),
+    },
+    post_init=("agentInfo_connectedFrom", "dockerInfo"),
+    spec=AGENT_SPEC,
+    fallback=lambda agent: CloudAgent(**agent),
+)
+
+# LIST_AGENTS_SPEC converts HostAssets to dicts (for LazyCloudAgent), and
+# DECODE_LIST_AGENTS_SPEC builds them with AGENT_DECODER:
+_LIST_AGENTS_COERCE = {
+    "ServiceResponse/count": int,
+    "ServiceResponse/hasMoreRecords": lambda value: value == "true",
+    "ServiceResponse/lastId": int,
+}
+LIST_AGENTS_SPEC = XMLSpec(
+    lists=("ServiceResponse/data/HostAsset",),
+    coerce=_LIST_AGENTS_COERCE,
+    nested={"ServiceResponse/data/HostAsset": AGENT_SPEC},
+)
+DECODE_LIST_AGENTS_SPEC = XMLSpec(
+    lists=("ServiceResponse/data/HostAsset",),
+    coerce=_LIST_AGENTS_COERCE,
+    decode={"ServiceResponse/data/HostAsset": AGENT_DECODER},
+)
+
+
+def _parse_agents_page(
+    content: bytes, lazy: bool = False
+) -> tuple[BaseList[CloudAgent], bool, Union[int, None]]:
+    """
+    Parse one page of list_agents XML.
+
+    Args:
+        content (bytes): The raw XML of the page.
+        lazy (bool): Whether to return LazyCloudAgent views instead of CloudAgent objects.
+
+    Returns:
+        tuple: The agents on the page, whether there are more pages, and the last asset ID on the page.
+    """
+    parsed = xml_parser(
+        content, spec=LIST_AGENTS_SPEC if lazy else DECODE_LIST_AGENTS_SPEC
+    )
+
+    if parsed.get("ServiceResponse")["responseCode"] != "SUCCESS":
+        combined_error = f"{parsed.get('ServiceResponse')['responseErrorDetails']['errorMessage']}: {parsed.get('ServiceResponse')['responseErrorDetails']['errorResolution']}"
+        raise ValueError(combined_error)
+
+    agents = BaseList()
+    if parsed.get("ServiceResponse").get("count") == 0:
+        return agents, False, None
+
+    for agent in parsed.get("ServiceResponse").get("data").get("HostAsset"):
+        # Already built by AGENT_DECODER unless lazy:
+        agents.append(LazyCloudAgent(agent) if lazy else agent)
+
+    return (
+        agents,
+        bool(parsed.get("ServiceResponse").get("hasMoreRecords")),
+        parsed["ServiceResponse"].get("lastId"),
+    )
+
 
 def list_agents(
-    auth: BasicAuth, page_count: Union[int, "all"] = "all", **kwargs
+    auth: BasicAuth,
+    page_count: Union[int, "all"] = "all",
+    parse_processes: int = 0,
+    lazy: bool = False,
+    **kwargs,
 ) -> BaseList[CloudAgent]:
     """
     Get a list of Cloud Agents in your subscription, according to the filters provided.
@@ -30,6 +202,8 @@ def list_agents(
     Args:
         auth (BasicAuth): The authentication object containing the user's credentials.
         page_count (Union[int, 'all']): The number of pages to retrieve. Defaults to 'all'.
+        parse_processes (int): Optional number of worker processes to parse pages in. See ParsePool. Defaults to 0 (parse in this thread).
+        lazy (bool): Whether to return LazyCloudAgent views, which convert each field when it is first read, instead of CloudAgent objects. Call materialize() on a view to get its CloudAgent. Defaults to False.
         **kwargs: The filters to apply to the list.
 
     ## Kwargs:
@@ -83,49 +257,91 @@ def list_agents(
     results = BaseList()
     pulled = 0
 
+    with ParsePool(parse_processes) as parse_pool:
+        while True:
+            response = call_api(
+                auth=auth,
+                module="cloud_agent",
+                endpoint="list_agents",
+                payload=payload,
+            )
+
+            agents, has_more, last_id = parse_pool.parse(
+                _parse_agents_page, response.content, lazy
+            )
+
+            if not agents:
+                break
+
+            results.extend(agents)
+
+            pulled += 1
+            print(f"Pulled page {pulled}...")
+
+            if page_count != "all" and pulled >= page_count:
+                print("Page count reached. Returning...")
+                break
+
+            if not has_more:
+                break
+
+            else:
+                # Grab the last asset ID to use as the pagination ID
+                payload["_xml_data"] = prepare_criteria(
+                    pagination_id=last_id - 1, **kwargs
+                )
+
+    return results
+
+
+async def list_agents_async(
+    auth: BasicAuth, page_count: Union[int, "all"] = "all", **kwargs
+) -> AsyncIterator[CloudAgent]:
+    """
+    asyncio version of list_agents. Yields each CloudAgent as soon as its page is parsed. Requires httpx.
+
+    Args:
+        auth (BasicAuth): The authentication object containing the user's credentials.
+        page_count (Union[int, 'all']): The number of pages to retrieve. Defaults to 'all'.
+        **kwargs: The filters to apply to the list. Accepts the same kwargs as list_agents.
+
+    Yields:
+        CloudAgent: CloudAgent objects.
+    """
+
+    # Ensure positive page_count:
+    if page_count != "all" and page_count < 1:
+        raise ValueError("page_count must be 'all' or a positive integer.")
+
+    payload = {"_xml_data": prepare_criteria(**kwargs)}
+    pulled = 0
+
     while True:
-        response = call_api(
+        response = await call_api_async(
             auth=auth,
             module="cloud_agent",
             endpoint="list_agents",
             payload=payload,
         )
 
-        parsed = xml_parser(response.text)
-
-        if parsed.get("ServiceResponse")["responseCode"] != "SUCCESS":
-            combined_error = f"{parsed.get('ServiceResponse')['responseErrorDetails']['errorMessage']}: {parsed.get('ServiceResponse')['responseErrorDetails']['errorResolution']}"
-            raise ValueError(combined_error)
+        agents, has_more, last_id = _parse_agents_page(response.content)
 
-        if parsed.get("ServiceResponse").get("count") == "0":
+        if not agents:
             break
 
-        data = parsed.get("ServiceResponse").get("data").get("HostAsset")
-
-        if not isinstance(data, list):
-            data = [data]
-
-        for agent in data:
-            results.append(CloudAgent(**agent))
+        for agent in agents:
+            yield agent
 
         pulled += 1
-        print(f"Pulled page {pulled}...")
 
         if page_count != "all" and pulled >= page_count:
-            print("Page count reached. Returning...")
             break
 
-        if parsed.get("ServiceResponse").get("hasMoreRecords") != "true":
+        if not has_more:
             break
 
-        else:
-            # Grab the last asset ID to use as the pagination ID
-            last_id = parsed["ServiceResponse"]["lastId"]
-            payload["_xml_data"] = prepare_criteria(
-                pagination_id=int(last_id) - 1, **kwargs
-            )
-
-    return results
+        # Grab the last asset ID to use as the pagination ID
+        payload["_xml_data"] = prepare_criteria(pagination_id=last_id - 1, **kwargs)
 
 
 def launch_ods(
@@ -175,7 +391,7 @@ def launch_ods(
         params=params,
     )
 
-    parsed = xml_parser(response.text)
+    parsed = xml_parser(response.content)
 
     return (
         parsed.get("ServiceResponse").get("responseCode")
@@ -225,13 +441,13 @@ def bulk_launch_ods(
         params=params,
     )
 
-    parsed = xml_parser(response.text)
+    parsed = xml_parser(response.content)
 
     return (
         parsed.get("ServiceResponse").get("responseCode")
         if response.status_code == 200
         else "ERROR: "
-        + xml_parser(response.text)
+        + xml_parser(response.content)
         .get("ServiceResponse")
         .get("responseErrorDetails")
         .get("errorMessage")
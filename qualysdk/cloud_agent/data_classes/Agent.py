@@ -9,6 +9,7 @@ from ipaddress import ip_address
 
 from ...base.base_class import BaseClass
 from ...base.base_list import BaseList
+from ...base.lazy import LazyRecord
 from ..data_classes.CloudAgentTag import CloudAgentTag
 
 
@@ -133,15 +134,17 @@ class CloudAgent(BaseClass):
             if getattr(self, ip_field):
                 setattr(self, field, ip_address(getattr(self, ip_field)))
 
-        # Before setting none fields, let's build the BaseList objects
+        # Before setting none fields, let's build the BaseList objects.
+        # Each list's items are already a list when parsed with AGENT_SPEC (see
+        # calls.py), but may be a single dict in data from elsewhere:
         if self.tags:
             tags = BaseList()
             data = self.tags.get("list")
             if data:
-                data = data.get("TagSimple")
-                if data and not isinstance(data, list):
-                    data = [data]
-                for tag in data:
+                items = data.get("TagSimple", [])
+                if isinstance(items, dict):
+                    items = [items]
+                for tag in items:
                     tags.append(CloudAgentTag(**tag))
 
             if len(tags) > 0:
@@ -153,10 +156,10 @@ class CloudAgent(BaseClass):
             open_ports = BaseList()
             data = self.openPort.get("list")
             if data:
-                data = data.get("HostAssetOpenPort")
-                if data and not isinstance(data, list):
-                    data = [data]
-                for port in data:
+                items = data.get("HostAssetOpenPort", [])
+                if isinstance(items, dict):
+                    items = [items]
+                for port in items:
                     open_ports.append(
                         f"{port.get('port')}-{port.get('protocol')} ({port.get('serviceName')})"
                     )
@@ -170,10 +173,10 @@ class CloudAgent(BaseClass):
             software = BaseList()
             data = self.software.get("list")
             if data:
-                data = data.get("HostAssetSoftware")
-                if data and not isinstance(data, list):
-                    data = [data]
-                for software_item in data:
+                items = data.get("HostAssetSoftware", [])
+                if isinstance(items, dict):
+                    items = [items]
+                for software_item in items:
                     software.append(f"{software_item.get('name')}")
 
             if len(software) > 0:
@@ -185,10 +188,10 @@ class CloudAgent(BaseClass):
             vulns = BaseList()
             data = self.vuln.get("list")
             if data:
-                data = data.get("HostAssetVuln")
-                if data and not isinstance(data, list):
-                    data = [data]
-                for vuln in data:
+                items = data.get("HostAssetVuln", [])
+                if isinstance(items, dict):
+                    items = [items]
+                for vuln in items:
                     vulns.append(
                         f"{vuln.get('qid')} ({vuln.get('hostInstanveVulnId')}) First found: {vuln.get('firstFound')} Last found: {vuln.get('lastFound')}"
                     )
@@ -202,10 +205,10 @@ class CloudAgent(BaseClass):
             temp = []
             data = self.processor.get("list")
             if data:
-                data = data.get("HostAssetProcessor")
-                if data and not isinstance(data, list):
-                    data = [data]
-                for processor_item in data:
+                items = data.get("HostAssetProcessor", [])
+                if isinstance(items, dict):
+                    items = [items]
+                for processor_item in items:
                     temp.append(f"{processor_item.get('name')}")
 
             if len(temp) > 0:
@@ -217,10 +220,10 @@ class CloudAgent(BaseClass):
             volumes = BaseList()
             data = self.volume.get("list")
             if data:
-                data = data.get("HostAssetVolume")
-                if data and not isinstance(data, list):
-                    data = [data]
-                for volume in data:
+                items = data.get("HostAssetVolume", [])
+                if isinstance(items, dict):
+                    items = [items]
+                for volume in items:
                     # Calculate the % free space on the volume. Account for 0 division!
                     try:
                         percent_free = (
@@ -239,10 +242,10 @@ class CloudAgent(BaseClass):
             accounts = BaseList()
             data = self.account.get("list")
             if data:
-                data = data.get("HostAssetAccount")
-                if data and not isinstance(data, list):
-                    data = [data]
-                for account in data:
+                items = data.get("HostAssetAccount", [])
+                if isinstance(items, dict):
+                    items = [items]
+                for account in items:
                     accounts.append(account.get("username"))
 
             if len(accounts) > 0:
@@ -254,10 +257,10 @@ class CloudAgent(BaseClass):
             interfaces = BaseList()
             data = self.networkInterface.get("list")
             if data:
-                data = data.get("HostAssetInterface")
-                if data and not isinstance(data, list):
-                    data = [data]
-                for interface in data:
+                items = data.get("HostAssetInterface", [])
+                if isinstance(items, dict):
+                    items = [items]
+                for interface in items:
                     interfaces.append(
                         f"{interface.get('interfaceName')} ({interface.get('macAddress')})"
                     )
@@ -340,3 +343,15 @@ class CloudAgent(BaseClass):
             bool: True if the agent was modified before the date, False otherwise.
         """
         return self.modified < date
+
+
+class LazyCloudAgent(LazyRecord):
+    """
+    LazyCloudAgent - a CloudAgent whose fields are converted when first read (see base/lazy.py).
+
+    Call materialize() to get the CloudAgent.
+    """
+
+    __slots__ = ()
+    _model = CloudAgent
+    _key = "name"
@@ -36,7 +36,7 @@ def purge_agent(auth: BasicAuth, asset_id: str) -> str:
         payload=payload,
     )
 
-    data = xml_parser(response.text)
+    data = xml_parser(response.content)
 
     return data.get("ServiceResponse").get("responseCode")
 
@@ -76,13 +76,13 @@ def bulk_purge_agent(auth: BasicAuth, **kwargs) -> str:
         payload=payload,
     )
 
-    data = xml_parser(response.text)
+    data = xml_parser(response.content)
 
     return (
         data.get("ServiceResponse").get("responseCode")
         if response.status_code == 200
         else "ERROR: "
-        + xml_parser(response.text)
+        + xml_parser(response.content)
         .get("ServiceResponse")
         .get("responseErrorDetails")
         .get("errorMessage")
@@ -4,4 +4,8 @@ Container Security API module
 This module contains ways to interact with the Qualys Container Security APIs. 
 """
 
-from .container.container_calls import list_containers, get_container_details
+from .container.container_calls import (
+    list_containers,
+    list_containers_async,
+    get_container_details,
+)
@@ -2,12 +2,14 @@
 Contains the code to interact with Docker hosts.
 """
 
-from typing import Union
+from typing import Union, AsyncIterator
 from urllib.parse import parse_qs
 
 from ..data_classes.container import Container
 from ...auth.token import TokenAuth
 from ...base.call_api import call_api
+from ...base.json_stream import JSONRecordStream
+from ...base.call_api_async import call_api_async
 from ...base.base_list import BaseList
 from ...exceptions.Exceptions import *
 
@@ -51,20 +53,18 @@ def list_containers(
                 f"An error occurred with status code {response.status_code}. Qualys did not return any additional information."
             )
 
-        data = response.json()
-
-        # Check if the data is empty:
-        if not data.get("data"):
-            break
-
-        if isinstance(data.get("data"), dict):
-            # If the data is a dict, convert it to a list of dicts:
-            data["data"] = [data["data"]]
+        # Decode one container at a time. A single container comes as a dict
+        # rather than a list, which the stream yields the same way:
+        stream = JSONRecordStream(response.content, ("data",))
 
         # Add the data to the results:
-        for container in data["data"]:
+        for container in stream:
             results.append(Container(**container))
 
+        # Check if the data is empty:
+        if not stream.records:
+            break
+
         pages_pulled += 1
 
         # Check if we need to pull more pages:
@@ -86,6 +86,66 @@ def list_containers(
     return results
 
 
+async def list_containers_async(
+    auth: TokenAuth, page_count: Union[int, "all"] = "all", **kwargs
+) -> AsyncIterator[Container]:
+    """
+    asyncio version of list_containers. Yields each Container as soon as its page is parsed. Requires httpx.
+
+    Args:
+        auth (TokenAuth): The authentication token.
+        page_count (Union[int, 'all'] = 'all'): How many pages of results to retrieve.
+        **kwargs: Accepts the same kwargs as list_containers.
+
+    Yields:
+        Container: Container objects.
+    """
+
+    # Check if page_count is valid:
+    if page_count != "all" and not isinstance(page_count, int):
+        raise ValueError("page_count must be an integer or 'all'.")
+
+    pages_pulled = 0
+
+    while True:
+        response = await call_api_async(
+            auth, "containersecurity", "list_containers", params=kwargs
+        )
+
+        if response.status_code != 200 and response.content:
+            raise QualysAPIError(response.json())
+        elif response.status_code != 200 and not response.content:
+            raise QualysAPIError(
+                f"An error occurred with status code {response.status_code}. Qualys did not return any additional information."
+            )
+
+        data = response.json()
+
+        # Check if the data is empty:
+        if not data.get("data"):
+            break
+
+        if isinstance(data.get("data"), dict):
+            # If the data is a dict, convert it to a list of dicts:
+            data["data"] = [data["data"]]
+
+        for container in data["data"]:
+            yield Container(**container)
+
+        pages_pulled += 1
+
+        if page_count != "all" and pages_pulled >= page_count:
+            break
+
+        # Check the response headers for the next page:
+        link = response.headers.get("Link")
+        if not link:
+            break
+        kwargs["paginationQuery"] = parse_qs(link.split(";")[0].strip("<>"))[
+            "paginationQuery"
+        ][0]
+
+
 def get_container_details(auth: TokenAuth, containerSha: str) -> Container:
     """
     Get details of a single container instance.
@@ -71,3 +71,26 @@ class QualysAPIError(Exception):
     def __init__(self, message: str):
         self.message = message
         super().__init__(message)
+
+
+class DeadlineExceeded(Exception):
+    """
+    Exception for when a pull runs past its deadline.
+
+    Whatever was pulled before the deadline is available in the partial_results attribute.
+    """
+
+    def __init__(self, message: str, partial_results: list = None):
+        self.message = message
+        self.partial_results = partial_results if partial_results is not None else []
+        super().__init__(message)
+
+
+class CassetteMissError(Exception):
+    """
+    Exception for when a ReplayTransport has no recorded response for a request.
+    """
+
+    def __init__(self, message: str):
+        self.message = message
+        super().__init__(message)
@@ -9,5 +9,5 @@ GAV QQL Syntax help: https://docs.qualys.com/en/gav/2.18.0.0/search/how_to_searc
 from .count_assets import count_assets
 from .get_all_assets import get_all_assets
 from .get_asset import get_asset
-from .query_assets import query_assets
+from .query_assets import query_assets, query_assets_async
 from .uber import GAVUber
@@ -6,13 +6,17 @@ from typing import Union
 
 from ..base.base_list import BaseList
 from ..base.call_api import call_api
+from ..base.json_stream import JSONRecordStream
 from ..auth.token import TokenAuth
 from ..exceptions.Exceptions import *
-from .hosts import Host
+from .hosts import HOST_DECODER, Host
 
 
 def get_all_assets(
-    auth: TokenAuth, page_count: Union[int, "all"] = "all", **kwargs
+    auth: TokenAuth,
+    page_count: Union[int, "all"] = "all",
+    typed: bool = False,
+    **kwargs,
 ) -> BaseList[Host]:
     """
     Get all assets in the Global AssetView API.
@@ -20,6 +24,7 @@ def get_all_assets(
     Params:
         auth (TokenAuth): The authentication object.
         page_count (Union[int, "all"]): The number of pages to get. If "all", get all pages. Defaults to "all".
+        typed (bool): Decode pages straight into Hosts with msgspec, which must be installed. See StructDecoder. Defaults to False.
 
     :Kwargs:
         excludeFields (str): The fields to exclude.
@@ -40,13 +45,19 @@ def get_all_assets(
         response = call_api(
             auth=auth, module="gav", endpoint="get_all_assets", params=kwargs
         )
-        j = response.json()
+        if typed:
+            page, j = HOST_DECODER(response.content)
+        else:
+            # Decode one asset at a time. The rest of the page (responseCode,
+            # hasMore...) can come after the assets, so it is checked once they are read:
+            stream = JSONRecordStream(response.content, ("assetListData", "asset"))
+            page = BaseList(Host(**record) for record in stream)
+            j = stream.document
 
         if "responseCode" not in j.keys() or j["responseCode"] == "FAILED":
             raise QualysAPIError(j["responseMessage"])
 
-        for record in j["assetListData"]["asset"]:
-            responses.append(Host(**record))
+        responses.extend(page)
         (
             print(f"Page {pulled+1} of {page_count} complete.")
             if page_count != "all"
@@ -2,7 +2,7 @@
 hosts.py - contains the dataclass for a Qualys GAV host record.
 """
 
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 from datetime import datetime
 from typing import List, Optional, Union
 
@@ -10,6 +10,7 @@ from frozendict import frozendict
 
 from ..base.base_class import BaseClass
 from ..base.base_list import BaseList
+from ..base.struct_decoder import StructDecoder
 
 SOFTWARE_SCHEMA = frozendict(
     {
@@ -775,3 +776,60 @@ class Host(BaseClass):
         that can create the object for terminal space's sake.
         """
         return f"AssetID({self.assetId})"
+
+
+# Decodes get_all_assets and query_assets pages straight into Hosts, for typed=True
+# (see StructDecoder):
+HOST_DECODER = StructDecoder(
+    Host,
+    ("assetListData", "asset"),
+    keys=("responseCode", "responseMessage", "hasMore", "lastSeenAssetId"),
+    convert=dict.fromkeys(
+        ["lastModifiedDate", "createdDate", "sensorLastUpdatedDate", "lastBoot"],
+        datetime.fromisoformat,
+    ),
+    # The fields Host.__post_init__ reads, and the fields it flattens their dicts
+    # into. Keep in step with it:
+    post_init=[
+        f.name
+        for f in fields(Host)
+        if f.name.startswith(
+            (
+                "activity_",
+                "agent_",
+                "cloudProvider_",
+                "container_",
+                "hardware_",
+                "inventory_",
+                "operatingSystem_",
+                "sensor_",
+            )
+        )
+    ]
+    + [
+        "activity",
+        "agent",
+        "businessAppListData",
+        "cloudProvider",
+        "container",
+        "criticality",
+        "customAttributes",
+        "easmTags",
+        "hardware",
+        "inventory",
+        "lastLocation",
+        "missingSoftware",
+        "networkInterfaceListData",
+        "openPortListData",
+        "operatingSystem",
+        "operatingSystem_lifecycle",
+        "processor",
+        "sensor",
+        "serviceList",
+        "softwareComponent",
+        "softwareListData",
+        "tagList",
+        "userAccountListData",
+        "volumeListData",
+    ],
+)
@@ -4,17 +4,22 @@ query_assets.py - contains the query_assets function for the Global AssetView AP
 Gets all assets that satisfy a Qualys Query Language (QQL) filter.
 """
 
-from typing import Union
+from typing import Union, AsyncIterator
 
 from ..base.base_list import BaseList
 from ..base.call_api import call_api
+from ..base.json_stream import JSONRecordStream
+from ..base.call_api_async import call_api_async
 from ..auth.token import TokenAuth
 from ..exceptions.Exceptions import *
-from .hosts import Host
+from .hosts import HOST_DECODER, Host
 
 
 def query_assets(
-    auth: TokenAuth, page_count: Union["all", int] = "all", **kwargs
+    auth: TokenAuth,
+    page_count: Union["all", int] = "all",
+    typed: bool = False,
+    **kwargs,
 ) -> BaseList[Host]:
     """
     Queries GAV inventory for assets that satisfy a Qualys Query Language (QQL) filter.
@@ -22,6 +27,7 @@ def query_assets(
     Params:
         auth (TokenAuth): The authentication object.
         page_count (int): The number of pages to get. Defaults to 'all'.
+        typed (bool): Decode pages straight into Hosts with msgspec, which must be installed. See StructDecoder. Defaults to False.
 
     ## Kwargs:
 
@@ -45,17 +51,23 @@ def query_assets(
             auth=auth, module="gav", endpoint="query_assets", params=kwargs
         )
         # if there is no response, break the loop
-        if not response.text:
+        if not response.content:
             print("No Results returned.")
             break
 
-        j = response.json()
+        if typed:
+            page, j = HOST_DECODER(response.content)
+        else:
+            # Decode one asset at a time. The rest of the page (responseCode,
+            # hasMore...) can come after the assets, so it is checked once they are read:
+            stream = JSONRecordStream(response.content, ("assetListData", "asset"))
+            page = BaseList(Host(**record) for record in stream)
+            j = stream.document
 
         if "responseCode" not in j.keys() or j["responseCode"] == "FAILED":
             raise QualysAPIError(j["responseMessage"])
 
-        for record in j["assetListData"]["asset"]:
-            responses.append(Host(**record))
+        responses.extend(page)
         (
             print(f"Page {pulled+1} of {page_count} complete.")
             if page_count != "all"
@@ -76,3 +88,48 @@ def query_assets(
 
     print("All pages complete.")
     return responses
+
+
+async def query_assets_async(
+    auth: TokenAuth, page_count: Union["all", int] = "all", **kwargs
+) -> AsyncIterator[Host]:
+    """
+    asyncio version of query_assets. Yields each Host as soon as its page is parsed. Requires httpx.
+
+    Params:
+        auth (TokenAuth): The authentication object.
+        page_count (Union["all", int]): The number of pages to return. Defaults to "all".
+        **kwargs: Accepts the same kwargs as query_assets.
+
+    Yields:
+        Host: Host objects.
+    """
+
+    pulled = 0
+
+    while True:
+        # make the request:
+        response = await call_api_async(
+            auth=auth, module="gav", endpoint="query_assets", params=kwargs
+        )
+        # if there is no response, stop
+        if not response.content:
+            print("No Results returned.")
+            break
+
+        j = response.json()
+
+        if "responseCode" not in j.keys() or j["responseCode"] == "FAILED":
+            raise QualysAPIError(j["responseMessage"])
+
+        for record in j["assetListData"]["asset"]:
+            yield Host(**record)
+        pulled += 1
+
+        if not j["hasMore"]:
+            break
+
+        if page_count != "all" and pulled >= page_count:
+            break
+
+        kwargs["lastSeenAssetId"] = j["lastSeenAssetId"]
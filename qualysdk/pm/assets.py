@@ -38,6 +38,7 @@ def get_assets(
         - query (str): A PM asset QQL query.
         - havingQuery (str): A patch QQL query.
         - attributes (list[str]): A list of attributes to return.
+        - typed (bool): Decode pages straight into Assets with msgspec, which must be installed. See StructDecoder. Default is False.
 
     Returns:
         BaseList[Asset]: A BaseList of Asset objects.
@@ -10,9 +10,42 @@ from ..data_classes.PMAsset import Asset
 from .page_limit import check_page_size_limit
 from ...auth.token import TokenAuth
 from ...base.call_api import call_api
+from ...base.json_stream import JSONRecordStream
 from ...base.base_list import BaseList
+from ...base.struct_decoder import StructDecoder
 from ...exceptions.Exceptions import QualysAPIError
 
+# Decode pages straight into Patches/Assets, for typed=True (see StructDecoder).
+# post_init is the fields each __post_init__ reads or sets. Keep in step with them:
+PATCH_DECODER = StructDecoder(
+    Patch,
+    post_init=[
+        "modifiedDate",
+        "publishedDate",
+        "architecture",
+        "product",
+        "cve",
+        "supersedes",
+        "supersededBy",
+        "qid",
+        "packageDetails",
+    ],
+)
+ASSET_DECODER = StructDecoder(
+    Asset,
+    post_init=[
+        "activatedModules",
+        "osNotSupportedForModules",
+        "scanDateTime",
+        "statusDateTime",
+        "interfaces",
+        "tags",
+        "hardware",
+        "hardware_model",
+        "hardware_manufacturer",
+    ],
+)
+
 
 def _threading_backend(
     auth: TokenAuth,
@@ -41,6 +74,7 @@ def _threading_backend(
         - attributes (list[str]): A list of attributes to return.
         - searchAfter (str): The searchAfter value. Do not use this parameter directly.
         - page_count (Union[int, 'all']): The number of pages to retrieve. Default is 'all'.
+        - typed (bool): Decode pages straight into Patches/Assets with msgspec, which must be installed. See StructDecoder. Default is False.
 
     Returns:
         None
@@ -119,13 +153,21 @@ def _threading_backend(
 
         if response.status_code not in range(200, 299):
             raise QualysAPIError(response.text)
-        j = response.json()
-        for resource in j:
-            resource["platform"] = platform
-            if data_type == "PATCH":
-                _ResponsesList.append(Patch(**resource))
-            else:
-                _ResponsesList.append(Asset(**resource))
+        if kwargs.get("typed"):
+            decoder = PATCH_DECODER if data_type == "PATCH" else ASSET_DECODER
+            page, _ = decoder(response.content, platform=platform)
+            _ResponsesList.extend(page)
+            records = len(page)
+        else:
+            # Decode one resource at a time:
+            stream = JSONRecordStream(response.content)
+            for resource in stream:
+                resource["platform"] = platform
+                if data_type == "PATCH":
+                    _ResponsesList.append(Patch(**resource))
+                else:
+                    _ResponsesList.append(Asset(**resource))
+            records = stream.records
 
         if response.headers.get("searchAfter"):
             headers["searchAfter"] = response.headers["searchAfter"]
@@ -143,7 +185,7 @@ def _threading_backend(
                 )
             break
 
-        if len(j) < params["pageSize"]:
+        if records < params["pageSize"]:
             with LOCK:
                 print(f"{platform} Thread has reached the end of the list.")
             break
@@ -175,6 +217,7 @@ def _get_patches_or_assets(
         - query (str): A patch QQL query.
         - havingQuery (str): A PM asset QQL query.
         - attributes (list[str]): A list of attributes to return.
+        - typed (bool): Decode pages straight into Patches/Assets with msgspec, which must be installed. See StructDecoder. Default is False.
     """
 
     responses = BaseList()
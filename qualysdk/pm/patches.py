@@ -38,6 +38,7 @@ def get_patches(
         - query (str): A patch QQL query. Default is patchStatus:[Missing,Installed] and isSuperseded:false when platform == 'windows'.
         - havingQuery (str): A PM asset QQL query.
         - attributes (list[str]): A list of attributes to return.
+        - typed (bool): Decode pages straight into Patches with msgspec, which must be installed. See StructDecoder. Default is False.
 
     Returns:
         BaseList[Patch]: A BaseList of Patch objects.
@@ -16,6 +16,6 @@ from .evaluations import (
     get_account_evaluation,
     get_resources_evaluated_by_control,
 )
-from .get_inventory import get_inventory
+from .get_inventory import get_inventory, get_inventory_async
 from .get_resource_details import get_resource_details
 from .remediation_log import get_remediation_activities
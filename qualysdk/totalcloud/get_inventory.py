@@ -2,12 +2,19 @@
 Pull resources from a cloud provider account.
 """
 
+from contextlib import nullcontext
+from datetime import datetime
 from threading import Lock, Thread, current_thread
 from queue import Queue
-from typing import Literal, Union
+from typing import Literal, Union, AsyncIterator, Iterable
 
 from ..base.call_api import call_api
+from ..base.json_stream import JSONRecordStream
+from ..base.call_api_async import call_api_async, iter_workers_async
 from ..base.base_list import BaseList
+from ..base.concurrency import ConcurrencyController, concurrency_slot
+from ..base.deadline import Deadline
+from ..base.struct_decoder import StructDecoder
 from ..auth.token import BasicAuth
 from ..exceptions.Exceptions import *
 from .data_classes.AWSResources import *
@@ -17,6 +24,28 @@ from .data_classes.resource_mappings import *
 
 termination_flag = False
 
+# resource class -> its StructDecoder, for typed=True:
+_DECODERS = {}
+
+
+def resource_decoder(resource_class: type) -> StructDecoder:
+    """
+    The StructDecoder that decodes inventory pages straight into resource_class.
+    """
+    decoder = _DECODERS.get(resource_class)
+    if decoder is None:
+        decoder = _DECODERS[resource_class] = StructDecoder(
+            resource_class,
+            ("content",),
+            keys=("empty",),
+            # BaseResource.__post_init__'s dates:
+            convert=dict.fromkeys(
+                ["created", "createdOn", "lastUpdated"], datetime.fromisoformat
+            ),
+            rename={"type": "_type"},
+        )
+    return decoder
+
 
 def fetch_page(
     auth: BasicAuth,
@@ -26,6 +55,9 @@ def fetch_page(
     results: BaseList,
     lock: Lock,
     page_count: Union[int, "all"],
+    deadline: Deadline = None,
+    typed: bool = False,
+    concurrency: ConcurrencyController = None,
     **kwargs,
 ):
     """
@@ -46,15 +78,17 @@ def fetch_page(
 
     kwargs["pageNo"] = pageNo
 
-    response = call_api(
-        auth=auth,
-        module="cloudview",
-        endpoint="get_inventory",
-        params=kwargs,
-    )
+    with concurrency_slot(concurrency, deadline):
+        response = call_api(
+            auth=auth,
+            module="cloudview",
+            endpoint="get_inventory",
+            params=kwargs,
+            deadline=deadline,
+        )
 
     if response.status_code not in [200, 400, 404]:
-        if not response.text:
+        if not response.content:
             raise QualysAPIError(
                 "An error occurred while retrieving the inventory. Most likely, a parameter you set is incorrect."
             )
@@ -63,7 +97,7 @@ def fetch_page(
 
     # Check for empty response or invalid page count
     if (
-        not response.text
+        not response.content
         or response.status_code in [400, 404]
         or (page_count != "all" and pageNo >= 199)
     ):
@@ -71,7 +105,16 @@ def fetch_page(
             termination_flag = True
         return
 
-    j = response.json()
+    if typed:
+        resources, j = resource_decoder(get_resource_class(provider, resourceType))(
+            response.content
+        )
+    else:
+        # Decode one resource at a time. "empty" comes after the content, so it
+        # is checked once the content is read (an empty page has no resources):
+        stream = JSONRecordStream(response.content, ("content",))
+        resources = parse_resources(provider, resourceType, stream)
+        j = stream
 
     if j.get("empty", True):
         with lock:
@@ -79,29 +122,45 @@ def fetch_page(
         return
 
     with lock:
-        for i in j["content"]:
-            resource_class = resource_map.get(resourceType, None)
-            if resource_class:
-                if "type" in i.keys():
-                    i["_type"] = i.pop("type")
-                i = resource_class(**i)
-            else:
-                raise ValueError(
-                    f"Invalid resource type {resourceType} for provider {provider}. Valid resource types are:\n{VALID_RESOURCETYPES[provider]}"
-                )
-            results.append(i)
+        results.extend(resources)
 
         if (pageNo + 1) % 20 == 0:
             print(
                 f"({current_thread().name}) Page {pageNo+1} of {provider}-{resourceType} retrieved successfully."
             )
 
-        if "INTERNAL_SERVER_ERROR" in response.text and response.status_code == 502:
+        if b"INTERNAL_SERVER_ERROR" in response.content and response.status_code == 502:
             # We have reached the end of the pages
             with lock:
                 termination_flag = True
 
 
+def get_resource_class(provider: str, resourceType: str) -> type:
+    """
+    The data class for resources of resourceType.
+    """
+    resource_class = resource_map.get(resourceType, None)
+    if not resource_class:
+        raise ValueError(
+            f"Invalid resource type {resourceType} for provider {provider}. Valid resource types are:\n{VALID_RESOURCETYPES[provider]}"
+        )
+    return resource_class
+
+
+def parse_resources(provider: str, resourceType: str, content: Iterable) -> list:
+    """
+    Turn the content of one inventory page into resource objects.
+    """
+    resource_class = get_resource_class(provider, resourceType)
+
+    resources = []
+    for i in content:
+        if "type" in i.keys():
+            i["_type"] = i.pop("type")
+        resources.append(resource_class(**i))
+    return resources
+
+
 def worker(
     auth,
     provider,
@@ -110,6 +169,9 @@ def worker(
     queue,
     lock,
     page_count,
+    deadline=None,
+    typed=False,
+    concurrency=None,
     **kwargs,
 ):
     global termination_flag
@@ -122,16 +184,27 @@ def worker(
         if pageNo is None:
             break
 
-        fetch_page(
-            auth,
-            provider,
-            resourceType,
-            pageNo,
-            results,
-            lock,
-            page_count,
-            **kwargs,
-        )
+        try:
+            fetch_page(
+                auth,
+                provider,
+                resourceType,
+                pageNo,
+                results,
+                lock,
+                page_count,
+                deadline,
+                typed,
+                concurrency,
+                **kwargs,
+            )
+        except DeadlineExceeded:
+            with lock:
+                print(
+                    f"({current_thread().name}) Deadline exceeded. Terminating thread."
+                )
+                termination_flag = True
+            break
         queue.task_done()
 
 
@@ -139,12 +212,52 @@ def check_termination_or_empty(queue):
     return queue.empty() or termination_flag
 
 
+def validate_inventory_args(
+    provider: str, resourceType: str, page_count: Union[int, "all"]
+) -> tuple[str, str, Union[int, "all"]]:
+    """
+    Validate and normalize the provider, resourceType and page_count for get_inventory.
+    """
+    # Validate provider
+    provider = provider.lower()
+    resourceType = resourceType.upper()
+
+    if provider not in ["aws", "azure"]:
+        raise ValueError("Invalid provider. Must be 'aws' or 'azure'.")
+
+    # Handle common names
+    resourceType = resourceType.replace(" ", "_")
+    for key, value in COMMON_NAMES[provider].items():
+        if resourceType in value:
+            resourceType = key
+            break
+
+    if resourceType not in VALID_RESOURCETYPES[provider]:
+        raise ValueError(
+            f"Invalid resource type for provider {provider}. Valid resource types are: {VALID_RESOURCETYPES[provider]}"
+        )
+
+    if page_count != "all" and (not isinstance(page_count, int)):
+        raise ValueError("page_count must be an integer <= 200 or 'all'.")
+
+    # If user has set page_count to a number >= 200, set it to 199
+    if page_count != "all" and page_count >= 200:
+        page_count = 199
+    elif page_count != "all" and page_count < 1:
+        raise ValueError("page_count must be an integer >= 1.")
+
+    return provider, resourceType, page_count
+
+
 def get_inventory(
     auth: BasicAuth,
     provider: Literal["aws", "azure"],
     resourceType: str,
     page_count: Union[int, "all"] = "all",
     thread_count: int = 5,
+    deadline: float = None,
+    typed: bool = False,
+    autotune: bool = False,
     **kwargs,
 ) -> BaseList:
     """
@@ -156,6 +269,9 @@ def get_inventory(
         resourceType (str): The type of resource to get.
         page_count (Union[int, "all"]): The number of pages to return. MAX VALUE IS 200. If 'all', return all pages. Default is 'all'.
         thread_count (int): The number of threads to use for fetching data.
+        deadline (float): Optional number of seconds the whole pull may take. Once it passes, outstanding pages are cancelled and DeadlineExceeded is raised with the resources pulled so far in its partial_results attribute.
+        typed (bool): Decode pages straight into resource objects with msgspec, which must be installed. See StructDecoder. Defaults to False.
+        autotune (bool): Whether to tune how many of the threads make requests at once as the pull goes, from the requests' throughput and latency, backing off on 409/429 responses and the concurrency limit headers. thread_count is then the most that may. See ConcurrencyController. Defaults to False.
 
      ## Kwargs:
 
@@ -171,35 +287,13 @@ def get_inventory(
     global termination_flag
     termination_flag = False
 
-    # Validate provider
-    provider = provider.lower()
-    resourceType = resourceType.upper()
-
-    kwargs["pageSize"] = 50
-
-    if provider not in ["aws", "azure"]:
-        raise ValueError("Invalid provider. Must be 'aws' or 'azure'.")
-
-    # Handle common names
-    resourceType = resourceType.replace(" ", "_")
-    for key, value in COMMON_NAMES[provider].items():
-        if resourceType in value:
-            resourceType = key
-            break
-
-    if resourceType not in VALID_RESOURCETYPES[provider]:
-        raise ValueError(
-            f"Invalid resource type for provider {provider}. Valid resource types are: {VALID_RESOURCETYPES[provider]}"
-        )
+    deadline = Deadline.from_seconds(deadline)
 
-    if page_count != "all" and (not isinstance(page_count, int)):
-        raise ValueError("page_count must be an integer <= 200 or 'all'.")
+    provider, resourceType, page_count = validate_inventory_args(
+        provider, resourceType, page_count
+    )
 
-    # If user has set page_count to a number >= 200, set it to 199
-    if page_count != "all" and page_count >= 200:
-        page_count = 199
-    elif page_count != "all" and page_count < 1:
-        raise ValueError("page_count must be an integer >= 1.")
+    kwargs["pageSize"] = 50
 
     if not isinstance(thread_count, int) or thread_count < 1:
         raise ValueError("thread_count must be an integer >= 1.")
@@ -212,28 +306,135 @@ def get_inventory(
     for i in range(200) if page_count == "all" else range(page_count):
         page_queue.put(i)
 
+    concurrency = (
+        ConcurrencyController(thread_count, [("cloudview", "get_inventory")])
+        if autotune
+        else None
+    )
+
     # Start worker threads
     threads = []
     for _ in range(thread_count):
         t = Thread(
             target=worker,
-            args=(auth, provider, resourceType, results, page_queue, lock, page_count),
+            args=(
+                auth,
+                provider,
+                resourceType,
+                results,
+                page_queue,
+                lock,
+                page_count,
+                deadline,
+                typed,
+                concurrency,
+            ),
             kwargs=kwargs,
         )
         threads.append(t)
 
-    for t in threads:
-        t.start()
-
-    # Wait for the queue to be empty, or the termination flag to be set
-    while not check_termination_or_empty(page_queue):
-        pass
-
-    # Stop the worker threads
-    for _ in range(thread_count):
-        page_queue.put(None)
-    for t in threads:
-        t.join()
+    with concurrency.watching(auth.hooks) if concurrency else nullcontext():
+        for t in threads:
+            t.start()
+
+        # Wait for the queue to be empty, or the termination flag to be set
+        while not check_termination_or_empty(page_queue):
+            if deadline is not None and deadline.expired():
+                deadline.exceeded = True
+                break
+
+        # Stop the worker threads
+        for _ in range(thread_count):
+            page_queue.put(None)
+        for t in threads:
+            t.join()
+
+    if deadline is not None and deadline.exceeded:
+        raise DeadlineExceeded(
+            f"get_inventory did not finish within {deadline.seconds} seconds. {len(results)} resources were pulled before the deadline.",
+            partial_results=results,
+        )
 
+    if concurrency:
+        print(f"Concurrency: {concurrency.summary()}")
     # print(f"{str(len(results))} {provider} {resourceType} records retrieved.")
     return results
+
+
+async def get_inventory_async(
+    auth: BasicAuth,
+    provider: Literal["aws", "azure"],
+    resourceType: str,
+    page_count: Union[int, "all"] = "all",
+    concurrency: int = 5,
+    **kwargs,
+) -> AsyncIterator:
+    """
+    asyncio version of get_inventory. Pulls pages concurrently on one event loop
+    and yields each resource as soon as its page is parsed. Requires httpx.
+
+    Args:
+        auth (BasicAuth): The authentication object.
+        provider (Literal['aws', 'azure']): The cloud provider to get resources from.
+        resourceType (str): The type of resource to get.
+        page_count (Union[int, 'all']): The number of pages to get. Defaults to 'all'.
+        concurrency (int): The number of pages to pull at once. Defaults to 5.
+        **kwargs: Accepts the same kwargs as get_inventory.
+
+    Yields:
+        Resource objects for the given provider and resourceType.
+    """
+
+    provider, resourceType, page_count = validate_inventory_args(
+        provider, resourceType, page_count
+    )
+
+    if not isinstance(concurrency, int) or concurrency < 1:
+        raise ValueError("concurrency must be an integer >= 1.")
+
+    kwargs["pageSize"] = 50
+    kwargs["placeholder"] = resourceType
+    kwargs["cloudprovider"] = "AWS" if provider == "aws" else "Azure"
+
+    # Set by the first task that runs past the last page:
+    done = False
+
+    async def fetch(pageNo: int) -> AsyncIterator:
+        nonlocal done
+        if done:
+            return
+
+        response = await call_api_async(
+            auth=auth,
+            module="cloudview",
+            endpoint="get_inventory",
+            params={**kwargs, "pageNo": pageNo},
+        )
+
+        if response.status_code not in [200, 400, 404]:
+            if not response.content:
+                raise QualysAPIError(
+                    "An error occurred while retrieving the inventory. Most likely, a parameter you set is incorrect."
+                )
+            else:
+                raise QualysAPIError(response.json())
+
+        if not response.content or response.status_code in [400, 404]:
+            done = True
+            return
+
+        j = response.json()
+
+        if j.get("empty", True):
+            done = True
+            return
+
+        for resource in parse_resources(provider, resourceType, j["content"]):
+            yield resource
+
+        if page_count != "all" and pageNo >= 199:
+            done = True
+
+    pages = range(200) if page_count == "all" else range(page_count)
+    async for resource in iter_workers_async(fetch, pages, concurrency):
+        yield resource
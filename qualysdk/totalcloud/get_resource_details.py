@@ -82,7 +82,7 @@ def get_resource_details(
     )
 
     if response.status_code not in [200, 400, 404]:
-        if not response.text:
+        if not response.content:
             raise QualysAPIError(
                 "An error occurred while retrieving the resource details. Most likely, a parameter you set is incorrect."
             )
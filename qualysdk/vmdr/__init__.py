@@ -7,8 +7,15 @@ VMDR QQL Syntax help: https://qualysguard.qg2.apps.qualys.com/portal-help/en/vm/
 """
 
 from .query_kb import query_kb, get_kb_qvs
-from .get_host_list import get_host_list
-from .get_host_list_detections import get_hld, get_cve_hld
+from .get_host_list import get_host_list, iter_host_list, get_host_list_async
+from .get_host_list_detections import (
+    get_hld,
+    get_cve_hld,
+    iter_hld,
+    iter_cve_hld,
+    get_hld_async,
+    get_cve_hld_async,
+)
 from .ips import get_ip_list, add_ips, update_ips
 from .assetgroups import get_ag_list, add_ag, edit_ag, delete_ag
 from .vmscans import (
@@ -64,7 +64,7 @@ def get_ag_list(
         )
 
         if response.status_code == 200:
-            data = xml_parser(response.text)["ASSET_GROUP_LIST_OUTPUT"]
+            data = xml_parser(response.content)["ASSET_GROUP_LIST_OUTPUT"]
 
             if "ASSET_GROUP" not in data["RESPONSE"]["ASSET_GROUP_LIST"]:
                 print("No asset groups found. Returning empty BaseList.")
@@ -240,7 +240,7 @@ def manage_ag(
         headers={"X-Requested-With": "qualysdk SDK"},
     )
 
-    result = xml_parser(response.text)["SIMPLE_RETURN"]["RESPONSE"]["TEXT"]
+    result = xml_parser(response.content)["SIMPLE_RETURN"]["RESPONSE"]["TEXT"]
 
     return result
 
@@ -0,0 +1,183 @@
+"""
+Helper functions for the asyncio versions of get_hld, get_cve_hld and get_host_list.
+
+These mirror the threaded helpers in helpers.py, but pull chunks of host IDs
+concurrently on one event loop and yield hosts as each page is parsed.
+"""
+
+from asyncio import to_thread
+from typing import AsyncIterator, Literal, Union
+
+from .helpers import (
+    LOCK,
+    prepare_args,
+    _parse_detection_page,
+    _parse_host_list_page,
+)
+from ..data_classes.hosts import VMDRID, VMDRHost
+from ...exceptions import QualysAPIError
+from ...base.call_api_async import call_api_async, iter_workers_async
+from ...auth.basic import BasicAuth
+
+
+async def backend_async(
+    auth: BasicAuth,
+    endpoint: Literal["get_hld", "get_cve_hld", "get_host_list"],
+    page_count: Union[int, "all"] = "all",
+    **kwargs,
+) -> AsyncIterator[Union[VMDRHost, VMDRID]]:
+    """
+    Async counterpart of hld_backend, get_cve_hld_backend and get_host_list_backend.
+    Pages through one set of IDs, yielding hosts as each page is parsed.
+
+    Params:
+        auth (BasicAuth): The BasicAuth object containing the username and password.
+        endpoint (Literal["get_hld", "get_cve_hld", "get_host_list"]): The endpoint to page through.
+        page_count (Union[int, "all"]): The number of pages to retrieve. Defaults to "all".
+        **kwargs: Additional keyword arguments to pass to the API.
+
+    Yields:
+        Union[VMDRHost, VMDRID]: The hosts (or IDs, for get_host_list with details=None) on each page.
+    """
+    # Set the kwargs
+    kwargs["action"] = "list"
+    if endpoint == "get_hld":
+        kwargs["echo_request"] = 0
+        kwargs["show_results"] = 1
+        kwargs["output_format"] = "XML"
+
+    pulled = 0
+
+    while True:
+        response = await call_api_async(
+            auth=auth,
+            module="vmdr",
+            endpoint=endpoint,
+            params=kwargs,
+            headers={"X-Requested-With": "qualysdk SDK"},
+        )
+
+        if response.status_code != 200:
+            with LOCK:
+                print(f"({endpoint}) - No data returned on page {pulled + 1}.")
+            break
+
+        if endpoint == "get_host_list":
+            hosts, next_id_min, has_list = _parse_host_list_page(
+                response.content, kwargs.get("show_asset_id")
+            )
+            if not has_list:
+                with LOCK:
+                    print("No host list returned.")
+                break
+        else:
+            hosts, next_id_min = _parse_detection_page(response.content, endpoint)
+
+        for host in hosts:
+            yield host
+
+        pulled += 1
+        if page_count != "all" and pulled >= page_count:
+            break
+
+        if next_id_min is None:
+            break
+
+        with LOCK:
+            print(
+                f"({endpoint}) - Pagination detected. Pulling next page with id_min: {next_id_min}"
+            )
+        kwargs["id_min"] = next_id_min
+
+
+async def create_id_chunks_async(
+    auth: BasicAuth, chunk_size: int = 100, ids: str = None
+) -> list[list[str]]:
+    """
+    Async counterpart of create_id_queue. Pulls the ID set and splits it into
+    chunks of chunk_size IDs.
+
+    Params:
+        auth (BasicAuth): The BasicAuth object containing the username and password.
+        chunk_size (int): The size of each chunk. Defaults to 100.
+        ids (str): A comma-separated string of host IDs to use. If specified, this will be used instead of pulling the full set.
+
+    Returns:
+        list[list[str]]: The chunks of host IDs to pull.
+    """
+    params = {"details": None, "truncation_limit": 0}
+    if ids:
+        params["ids"] = ids
+
+    id_list = [str(i) async for i in backend_async(auth, "get_host_list", **params)]
+
+    if not id_list:
+        raise QualysAPIError("No IDs returned from API.")
+    with LOCK:
+        print(f"ID set pulled. Total IDs: {len(id_list)}")
+
+    chunks = [id_list[i : i + chunk_size] for i in range(0, len(id_list), chunk_size)]
+
+    # If there is only 1 chunk, split it up so that every task has something to pull:
+    if len(chunks) == 1:
+        chunks = [[i] for i in id_list]
+
+    with LOCK:
+        print(f"Created {len(chunks)} chunks")
+
+    return chunks
+
+
+async def pull_chunks_async(
+    auth: BasicAuth,
+    endpoint: Literal["get_hld", "get_cve_hld", "get_host_list"],
+    chunk_size: int,
+    concurrency: int,
+    page_count: Union[int, "all"],
+    chunk_count: Union[int, "all"],
+    **kwargs,
+) -> AsyncIterator[Union[VMDRHost, VMDRID]]:
+    """
+    Async counterpart of the threaded get_hld/get_cve_hld/get_host_list drivers.
+    Pulls chunks of host IDs with up to concurrency requests in flight.
+
+    Params:
+        auth (BasicAuth): The BasicAuth object containing the username and password.
+        endpoint (Literal["get_hld", "get_cve_hld", "get_host_list"]): The endpoint to pull.
+        chunk_size (int): The size of each chunk.
+        concurrency (int): The number of chunks to pull at once.
+        page_count (Union[int, "all"]): The number of pages to retrieve per chunk.
+        chunk_count (Union[int, "all"]): The number of chunks each task pulls before it stops.
+        **kwargs: Additional keyword arguments to pass to the API.
+
+    Yields:
+        Union[VMDRHost, VMDRID]: Hosts as soon as their page is parsed.
+    """
+    # prepare_args may fetch the concurrency limit with a blocking call:
+    concurrency = await to_thread(
+        prepare_args,
+        auth=auth,
+        chunk_size=chunk_size,
+        threads=concurrency,
+        page_count=page_count,
+        chunk_count=chunk_count,
+        ids=kwargs.get("ids"),
+    )
+
+    chunks = await create_id_chunks_async(
+        auth, chunk_size=chunk_size, ids=kwargs.get("ids")
+    )
+    print(f"Starting {endpoint} with {concurrency} concurrent requests.")
+
+    async def worker(ids: list[str]) -> AsyncIterator[Union[VMDRHost, VMDRID]]:
+        params = dict(kwargs)
+        params["ids"] = f"{ids[0]}-{ids[-1]}" if len(ids) > 1 else ids[0]
+        async for host in backend_async(auth, endpoint, page_count, **params):
+            yield host
+
+    async for host in iter_workers_async(
+        worker, chunks, concurrency, jobs_per_worker=chunk_count
+    ):
+        yield host
+
+    print(f"All {endpoint} chunks have completed.")
@@ -0,0 +1,260 @@
+"""
+chunk_scheduler.py - contains the ChunkScheduler class for get_hld and get_cve_hld.
+
+create_id_queue cuts the host IDs into fixed chunks of chunk_size IDs, each sent
+as one ids=first-last range. How long a chunk takes depends on how far apart its
+IDs are and how many detections its hosts have, so a few chunks can run on for
+many pages after the rest are done, while the other threads sit idle.
+
+A ChunkScheduler hands out the chunks instead, and rebalances them as they are
+pulled:
+
+- Chunks shrink as the IDs run out (guided self-scheduling). Each chunk holds a
+  share of the IDs left per thread, up to chunk_size, so the last chunks are small
+  and the threads finish close together. A chunk also ends before a gap in the
+  IDs wider than chunk_size IDs at their usual spacing.
+- A thread with no chunk left to take waits for the threads still pulling. After
+  each page, a chunk with IDs left gives part of them back for the waiting threads
+  to take. Pages are never cut short, so no host is pulled twice.
+- Unless truncation_limit is passed, it is set for each page from the time a host
+  of that chunk has been taking (which grows with its detections), so that pages
+  take about page_seconds each. A page's time is split into the time of the
+  request itself, taken to be the quickest page's, and a time per host.
+"""
+
+from bisect import bisect_left
+from collections import deque
+from math import ceil
+from statistics import median
+from threading import Condition
+from typing import Iterable, Union
+
+from ...base.deadline import Deadline
+
+# Weight of the newest page in the running seconds per host:
+_SMOOTHING = 0.2
+
+
+class Chunk:
+    """
+    Chunk - a range of host IDs, pulled by one thread a page at a time.
+
+    Attributes:
+    ```
+    ids: list[int] - the IDs of the range not pulled yet, ascending.
+    low: int - the first ID of the range.
+    high: int - the last ID of the range. Lowered when IDs are given back.
+    pages: int - the number of pages pulled.
+    seconds_per_host: float - the time the last page took per host, or None.
+    ```
+    """
+
+    def __init__(self, scheduler: "ChunkScheduler", ids: list[int]):
+        self.scheduler = scheduler
+        self.ids = ids
+        self.low = ids[0]
+        self.high = ids[-1]
+        self.pages = 0
+        self.seconds_per_host = None
+
+    def params(self) -> dict:
+        """
+        The API params for the next page: ids, and truncation_limit if tuned.
+        """
+        params = {
+            "ids": (
+                f"{self.low}-{self.high}" if self.low != self.high else str(self.low)
+            )
+        }
+        limit = self.scheduler.truncation_limit(self)
+        if limit is not None:
+            params["truncation_limit"] = limit
+        return params
+
+    def page_done(
+        self, hosts: int, seconds: float, next_id_min: Union[str, None]
+    ) -> None:
+        """
+        Record a page of hosts that took seconds, and give back part of the IDs left
+        (from next_id_min on) if threads are waiting.
+        """
+        self.scheduler._page_done(self, hosts, seconds, next_id_min)
+
+    def __repr__(self) -> str:
+        return f"Chunk(ids={self.low}-{self.high}, left={len(self.ids)}, pages={self.pages})"
+
+
+class ChunkScheduler:
+    """
+    ChunkScheduler - hand out chunks of host IDs to the threads of a pull, and
+    rebalance them between the threads as they are pulled.
+
+    Threads call take() for a chunk, pull it a page at a time with chunk.params(),
+    call chunk.page_done() after each page, and done() once the chunk is finished.
+    take() returns None once every ID has been pulled.
+
+    Params:
+    ```
+    ids (Iterable) The host IDs to pull.
+    chunk_size (int) The most IDs a chunk may hold.
+    threads (int) The number of threads pulling.
+    truncation_limit (int) Optional. A fixed truncation_limit. Defaults to None, which tunes it per page.
+    page_seconds (float) The time a page should take, when tuning truncation_limit. Defaults to 30.
+    limits (tuple[int, int]) The lowest and highest truncation_limit to tune to. Defaults to (100, 5000).
+    ```
+    """
+
+    def __init__(
+        self,
+        ids: Iterable,
+        chunk_size: int,
+        threads: int,
+        truncation_limit: int = None,
+        page_seconds: float = 30.0,
+        limits: tuple[int, int] = (100, 5000),
+    ):
+        if page_seconds <= 0:
+            raise ValueError("page_seconds must be a number above 0.")
+
+        ids = sorted(int(i) for i in ids)
+        self.chunk_size = chunk_size
+        self.threads = threads
+        self.fixed_limit = truncation_limit
+        self.page_seconds = page_seconds
+        self.limits = limits
+
+        # A gap wider than chunk_size IDs at the usual spacing ends a chunk:
+        gaps = [b - a for a, b in zip(ids, ids[1:])]
+        self.max_gap = chunk_size * median(gaps) if gaps else None
+
+        self.seconds_per_host = None
+        self.request_seconds = None
+        self.chunks = 0
+        self.splits = 0
+        self.pages = 0
+        self.hosts = 0
+
+        self._pending = deque([ids] if ids else [])
+        self._left = len(ids)
+        self._active = set()
+        self._waiting = 0
+        self._cond = Condition()
+
+    def _cut(self, ids: list[int]) -> int:
+        """
+        The number of IDs from the front of ids to make the next chunk of.
+        """
+        size = min(len(ids), self.chunk_size, ceil(self._left / self.threads))
+        if self.max_gap is not None:
+            for i in range(1, size):
+                if ids[i] - ids[i - 1] > self.max_gap:
+                    return i
+        return size
+
+    def take(self, deadline: Deadline = None) -> Union[Chunk, None]:
+        """
+        Return the next chunk to pull, waiting while other threads may still give
+        IDs back. Returns None once there are none left, or the deadline expires.
+        """
+        with self._cond:
+            while not self._pending:
+                if not self._active or (deadline is not None and deadline.expired()):
+                    return None
+                self._waiting += 1
+                # Time out now and then to check the deadline:
+                self._cond.wait(0.5)
+                self._waiting -= 1
+
+            ids = self._pending.popleft()
+            size = self._cut(ids)
+            if size < len(ids):
+                self._pending.appendleft(ids[size:])
+            self._left -= size
+
+            chunk = Chunk(self, ids[:size])
+            self._active.add(chunk)
+            self.chunks += 1
+            return chunk
+
+    def done(self, chunk: Chunk) -> None:
+        """
+        Mark a chunk as finished, or abandoned.
+        """
+        with self._cond:
+            self._active.discard(chunk)
+            self._cond.notify_all()
+
+    def truncation_limit(self, chunk: Chunk = None) -> Union[int, None]:
+        """
+        The truncation_limit for chunk's next page (or for a new chunk's first), or
+        None to leave it as is.
+        """
+        if self.fixed_limit is not None:
+            return None
+        seconds_per_host = (chunk and chunk.seconds_per_host) or self.seconds_per_host
+        if not seconds_per_host:
+            return None
+        # The time left for hosts, once the request itself is paid for:
+        host_seconds = self.page_seconds - min(
+            self.request_seconds, self.page_seconds / 2
+        )
+        low, high = self.limits
+        return max(low, min(high, int(host_seconds / seconds_per_host)))
+
+    def _page_done(
+        self, chunk: Chunk, hosts: int, seconds: float, next_id_min: Union[str, None]
+    ) -> None:
+        with self._cond:
+            self.pages += 1
+            self.hosts += hosts
+            chunk.pages += 1
+            # A page takes a fixed time per request, taken to be the quickest page's
+            # time, plus a time per host:
+            if self.request_seconds is None:
+                self.request_seconds = seconds
+                host_seconds = seconds
+            else:
+                self.request_seconds = min(self.request_seconds, seconds)
+                host_seconds = seconds - self.request_seconds
+            if hosts and host_seconds > 0:
+                chunk.seconds_per_host = host_seconds / hosts
+                self.seconds_per_host = (
+                    chunk.seconds_per_host
+                    if self.seconds_per_host is None
+                    else (1 - _SMOOTHING) * self.seconds_per_host
+                    + _SMOOTHING * chunk.seconds_per_host
+                )
+
+            if next_id_min is None:
+                chunk.ids = []
+                return
+            chunk.ids = chunk.ids[bisect_left(chunk.ids, int(next_id_min)) :]
+
+            # Give the waiting threads an equal share of the IDs left:
+            if self._waiting and not self._pending and len(chunk.ids) > 1:
+                parts = min(self._waiting + 1, len(chunk.ids))
+                share = ceil(len(chunk.ids) / parts)
+                for i in range(share, len(chunk.ids), share):
+                    self._pending.append(chunk.ids[i : i + share])
+                    self.splits += 1
+                self._left += len(chunk.ids) - share
+                chunk.ids = chunk.ids[:share]
+                chunk.high = chunk.ids[-1]
+                self._cond.notify_all()
+
+    def summary(self) -> str:
+        """
+        A line on how the pull was scheduled.
+        """
+        limit = (
+            self.fixed_limit
+            if self.fixed_limit is not None
+            else self.truncation_limit()
+        )
+        return (
+            f"{self.chunks} chunks ({self.splits} given back), {self.pages} pages, "
+            f"{self.hosts} hosts, truncation_limit {limit if limit is not None else 'not tuned'}"
+        )
+
+    def __repr__(self) -> str:
+        return f"ChunkScheduler(left={self._left}, active={len(self._active)}, chunks={self.chunks})"
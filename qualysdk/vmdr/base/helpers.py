@@ -2,21 +2,233 @@
 Helper functions for multithreading get_hld and get_host_list functions.
 """
 
+from contextlib import nullcontext
 from queue import Queue, Empty
-from typing import Union, List, Literal
+from typing import Iterator, Union, List, Literal
 from threading import current_thread, Lock
 from urllib.parse import urlparse, parse_qs
 from os import cpu_count
-
-from ..data_classes.hosts import VMDRID, VMDRHost
-from ...exceptions import QualysAPIError
+from datetime import datetime
+from ipaddress import IPv4Address, IPv6Address
+
+from ..data_classes.hosts import VMDRID, VMDRHost, LazyVMDRHost
+from ..data_classes.detection import Detection, CVEDetection
+from ..data_classes.qds import QDS
+from ..data_classes.qds_factor import QDSFactor
+from ..data_classes.tag import Tag, CloudTag
+from ...exceptions import QualysAPIError, DeadlineExceeded
 from ...base.call_api import call_api
-from ...base.xml_parser import xml_parser
+from ...base.xml_parser import xml_parser, XMLSpec
+from ...base.xml_stream import XMLRecordStream
+from ...base.xml_decoder import (
+    XMLDecoder,
+    DecodeError,
+    html_text,
+    leaf_record,
+    records,
+)
 from ...auth.basic import BasicAuth
 from ...base.base_list import BaseList
+from ...base.deadline import Deadline
+from ...base.parse_pool import ParsePool
+from ...base.record_queue import RecordQueue
+from .chunk_scheduler import Chunk, ChunkScheduler
+from ...base.concurrency import ConcurrencyController, concurrency_slot
 
 LOCK = Lock()
 
+# Elements of a HOST that are always lists, whether there is one or many. VMDRHost,
+# Detection and CVEDetection expect these shapes:
+HOST_SPEC = XMLSpec(
+    lists=(
+        "TAGS/TAG",
+        "CLOUD_PROVIDER_TAGS/CLOUD_TAG",
+        "METADATA/EC2/ATTRIBUTE",
+        "METADATA/AZURE/ATTRIBUTE",
+        "METADATA/GCP/ATTRIBUTE",
+        "TRURISK_SCORE_FACTORS/VULN_COUNT",
+        "DETECTION_LIST/DETECTION",
+        "DETECTION_LIST/DETECTION/QDS_FACTORS/QDS_FACTOR",
+        "CVE_DETECTION_LIST/CVE_DETECTION",
+    )
+)
+
+
+def _qds(element) -> QDS:
+    # <QDS severity="HIGH">80</QDS>, which Detection reads from {"@severity": ..., "#text": ...}:
+    severity = element.get("severity")
+    score = (element.text or "").strip()
+    if severity is None or not score or len(element):
+        raise DecodeError(element.tag)
+    return QDS(SEVERITY=severity, SCORE=int(score))
+
+
+def _qds_factor(element) -> QDSFactor:
+    # <QDS_FACTOR name="CVSS">v3.1</QDS_FACTOR>
+    name = element.get("name")
+    value = (element.text or "").strip()
+    if name is None or not value or len(element):
+        raise DecodeError(element.tag)
+    return QDSFactor(NAME=name, VALUE=value)
+
+
+def _require_cvss_31(detection: CVEDetection) -> None:
+    # VMDRHost renames CVSS3.1 with pop(), so CVE detections without one fail the
+    # same way through the fallback:
+    if detection.CVSS_31 is None:
+        raise DecodeError("CVSS3.1")
+
+
+def _set_detection_ids(host: VMDRHost) -> None:
+    # As VMDRHost.__post_init__ does, relate each detection to its host:
+    if host.DETECTION_LIST:
+        for detection in host.DETECTION_LIST:
+            detection.ID = host.ID
+
+
+def _require_cve_detections(host: VMDRHost) -> None:
+    # _cve_host_from_dict pops CVE_DETECTION_LIST, so hosts without one fail the
+    # same way through the fallback:
+    if host.DETECTION_LIST is None:
+        raise DecodeError("CVE_DETECTION_LIST")
+    _set_detection_ids(host)
+
+
+def _cve_host_from_dict(host: dict) -> VMDRHost:
+    # Ensure compatability:
+    host["DETECTION_LIST"] = host.pop("CVE_DETECTION_LIST")
+    return VMDRHost.from_dict(host)
+
+
+# Field maps that build VMDRHosts and their detections straight from HOST
+# elements, with the conversions of their __post_init__ (see base/xml_decoder.py).
+# tests/test_xml_decoder.py checks they build the same records as from_dict:
+_BASE_DETECTION_CONVERT = {
+    "UNIQUE_VULN_ID": int,
+    "TIMES_FOUND": int,
+    "PORT": int,
+    "SSL": bool,
+    "IS_IGNORED": bool,
+    "IS_DISABLED": bool,
+    "FIRST_FOUND_DATETIME": datetime.fromisoformat,
+    "LAST_FOUND_DATETIME": datetime.fromisoformat,
+    "LAST_TEST_DATETIME": datetime.fromisoformat,
+    "LAST_UPDATE_DATETIME": datetime.fromisoformat,
+    "LAST_PROCESSED_DATETIME": datetime.fromisoformat,
+    "LAST_FIXED_DATETIME": datetime.fromisoformat,
+    "RESULTS": html_text,
+}
+DETECTION_DECODER = XMLDecoder(
+    Detection,
+    convert={**_BASE_DETECTION_CONVERT, "QID": int},
+    nested={"QDS": _qds, "QDS_FACTORS": records("QDS_FACTOR", _qds_factor)},
+)
+CVE_DETECTION_DECODER = XMLDecoder(
+    CVEDetection,
+    convert={
+        **_BASE_DETECTION_CONVERT,
+        "ASSOCIATED_QID": int,
+        "QVS": int,
+        "CVSS": float,
+        "CVSS_31": float,
+    },
+    rename={
+        "CVSS3.1": "CVSS_31",
+        "CVSS3.1_BASE": "CVSS_31_BASE",
+        "CVSS3.1_TEMPORAL": "CVSS_31_TEMPORAL",
+    },
+    finish=_require_cvss_31,
+)
+_HOST_CONVERT = {
+    "ID": int,
+    "ASSET_ID": int,
+    "LAST_VM_SCANNED_DURATION": int,
+    "ASSET_RISK_SCORE": int,
+    "TRURISK_SCORE": int,
+    "ASSET_CRITICALITY_SCORE": int,
+    "IP": IPv4Address,
+    "IPV6": IPv6Address,
+    "LAST_BOOT": datetime.fromisoformat,
+    "FIRST_FOUND_DATE": datetime.fromisoformat,
+    "LAST_ACTIVITY_DATE": datetime.fromisoformat,
+    "LAST_SCAN_DATETIME": datetime.fromisoformat,
+    "LAST_VULN_SCAN_DATETIME": datetime.fromisoformat,
+    "LAST_VM_SCANNED_DATE": datetime.fromisoformat,
+    "LAST_VM_AUTH_SCANNED_DATE": datetime.fromisoformat,
+    "LAST_COMPLIANCE_SCAN_DATETIME": datetime.fromisoformat,
+    "LAST_VULN_SCAN_DATE": datetime.fromisoformat,
+    "LAST_ACTIVITY": datetime.fromisoformat,
+    "LAST_PC_SCANNED_DATE": datetime.fromisoformat,
+}
+_HOST_NESTED = {
+    "TAGS": records("TAG", leaf_record(Tag)),
+    "CLOUD_PROVIDER_TAGS": records("CLOUD_TAG", leaf_record(CloudTag)),
+}
+# Left to VMDRHost.__post_init__: DNS_DATA and METADATA, which other fields are
+# pulled up from, and TRURISK_SCORE_FACTORS:
+_HOST_POST_INIT = (
+    "DNS_DATA",
+    "TRURISK_SCORE_FACTORS",
+    "CLOUD_PROVIDER",
+    "METADATA",
+    *(
+        f"CLOUD_{name}"
+        for name in (
+            "GROUP_NAME",
+            "INSTANCE_STATE",
+            "INSTANCE_TYPE",
+            "IS_SPOT_INSTANCE",
+            "ARCHITECTURE",
+            "IMAGE_ID",
+            "REGION",
+            "AMI_ID",
+            "PUBLIC_HOSTNAME",
+            "PUBLIC_IPV4",
+            "ACCOUNT_ID",
+        )
+    ),
+)
+HOST_DECODER = XMLDecoder(
+    VMDRHost,
+    convert=_HOST_CONVERT,
+    nested={
+        **_HOST_NESTED,
+        "DETECTION_LIST": records("DETECTION", DETECTION_DECODER.decode),
+    },
+    post_init=_HOST_POST_INIT,
+    finish=_set_detection_ids,
+    spec=HOST_SPEC,
+)
+CVE_HOST_DECODER = XMLDecoder(
+    VMDRHost,
+    convert=_HOST_CONVERT,
+    nested={
+        **_HOST_NESTED,
+        "DETECTION_LIST": records("CVE_DETECTION", CVE_DETECTION_DECODER.decode),
+    },
+    post_init=_HOST_POST_INIT,
+    rename={"CVE_DETECTION_LIST": "DETECTION_LIST"},
+    finish=_require_cve_detections,
+    spec=HOST_SPEC,
+    fallback=_cve_host_from_dict,
+)
+
+# get_host_list pages. HOST_LIST_OUTPUT holds either a HOST_LIST or an ID_SET.
+# HOST_LIST_SPEC converts HOSTs to dicts (for LazyVMDRHost), and
+# DECODE_HOST_LIST_SPEC builds them with HOST_DECODER:
+_HOST_LIST_LISTS = (
+    "HOST_LIST_OUTPUT/RESPONSE/HOST_LIST/HOST",
+    "HOST_LIST_OUTPUT/RESPONSE/ID_SET/ID",
+)
+HOST_LIST_SPEC = XMLSpec(
+    lists=_HOST_LIST_LISTS,
+    nested={"HOST_LIST_OUTPUT/RESPONSE/HOST_LIST/HOST": HOST_SPEC},
+)
+DECODE_HOST_LIST_SPEC = XMLSpec(
+    lists=_HOST_LIST_LISTS,
+    decode={"HOST_LIST_OUTPUT/RESPONSE/HOST_LIST/HOST": HOST_DECODER},
+)
+
 
 def prepare_args(
     auth: BasicAuth,
@@ -25,7 +237,7 @@ def prepare_args(
     page_count: Union[int, "all"],
     chunk_count: Union[int, "all"],
     ids: str = None,
-) -> dict:
+) -> int:
     """
     Performs necessary checks for thread count, CPU count, rate
     limits.
@@ -39,7 +251,7 @@ def prepare_args(
         ids (str): A comma-separated string of host IDs to use. If specified, this will be used instead of pulling the full set.
 
     Returns:
-        None
+        int: The number of threads to use, clamped to the subscription's concurrency limit.
 
     Raises:
         ValueError: If threads, chunk_size, page_count, or chunk_count are less than 1.
@@ -64,7 +276,7 @@ def prepare_args(
                 f"Warning: The number of threads ({threads}) is greater than the number of CPUs ({cpu_count()}). This may cause performance issues."
             )
 
-    # Second, get concurrency rate limit from auth object. NOTE: eventually, auth class should have an attribute for this.
+    # Second, get concurrency rate limit from auth object. It is cached for auth.ratelimit_ttl seconds:
     rl = auth.get_ratelimit()
     if threads > rl["X-Concurrency-Limit-Limit"]:
         with LOCK:
@@ -79,6 +291,8 @@ def prepare_args(
         else print(f"Pulling/creating queue for user-specified IDs: {ids}...")
     )
 
+    return threads
+
 
 def normalize_id_list(id_list):
     """
@@ -101,24 +315,36 @@ def normalize_id_list(id_list):
     return new_list
 
 
-def pull_id_set(auth: BasicAuth, ids: str = None) -> BaseList[VMDRID]:
+def pull_id_set(
+    auth: BasicAuth, ids: str = None, deadline: Deadline = None
+) -> BaseList[VMDRID]:
     """
     pull_id_set - pull a set of host IDs from the VMDR API.
 
     Params:
         auth (BasicAuth): The BasicAuth object containing the username and password.
         ids (str): A comma-separated string of host IDs to use. If specified, this will be used instead of pulling the full set.
+        deadline (Deadline): Optional deadline for pulling the ID set.
 
     Returns:
         List[int]: A BaseList of host IDs as VMDRIDs.
     """
 
-    if ids:
-        # User has specified specific IDs to pull:
-        res = get_host_list_backend(auth, details=None, truncation_limit=0, ids=ids)
-    else:
-        # User has not specified specific IDs to pull, so pull all:
-        res = get_host_list_backend(auth, details=None, truncation_limit=0)
+    try:
+        if ids:
+            # User has specified specific IDs to pull:
+            res = get_host_list_backend(
+                auth, details=None, truncation_limit=0, ids=ids, deadline=deadline
+            )
+        else:
+            # User has not specified specific IDs to pull, so pull all:
+            res = get_host_list_backend(
+                auth, details=None, truncation_limit=0, deadline=deadline
+            )
+    except DeadlineExceeded as e:
+        # No hosts have been pulled yet, only IDs:
+        e.partial_results = BaseList()
+        raise
 
     if not res:
         raise QualysAPIError("No IDs returned from API!")
@@ -127,7 +353,7 @@ def pull_id_set(auth: BasicAuth, ids: str = None) -> BaseList[VMDRID]:
 
 
 def create_id_queue(
-    auth: BasicAuth, chunk_size: int = 100, ids: str = None
+    auth: BasicAuth, chunk_size: int = 100, ids: str = None, deadline: Deadline = None
 ) -> BaseList:
     """
     create_id_queue - create a queue of host IDs to pull. the queue contains chunks (lists) of chunk_size
@@ -137,15 +363,16 @@ def create_id_queue(
         auth (BasicAuth): The BasicAuth object containing the username and password.
         chunk_size (int): The size of each chunk. Defaults to 100.
         ids (str): A comma-separated string of host IDs to use. If specified, this will be used instead of pulling the full set.
+        deadline (Deadline): Optional deadline for pulling the ID set.
 
     Returns:
         Queue: A queue of host IDs to pull.
     """
 
     if ids:
-        id_list = pull_id_set(auth, ids=ids)
+        id_list = pull_id_set(auth, ids=ids, deadline=deadline)
     else:
-        id_list = pull_id_set(auth)
+        id_list = pull_id_set(auth, deadline=deadline)
 
     if not id_list:
         raise QualysAPIError("No IDs returned from API.")
@@ -174,9 +401,159 @@ def create_id_queue(
     return id_queue
 
 
+def create_chunk_scheduler(
+    auth: BasicAuth,
+    chunk_size: int,
+    threads: int,
+    ids: str = None,
+    deadline: Deadline = None,
+    truncation_limit: int = None,
+) -> ChunkScheduler:
+    """
+    create_chunk_scheduler - pull the host IDs and return a ChunkScheduler to hand
+    them out with. The adaptive counterpart of create_id_queue.
+
+    Params:
+        auth (BasicAuth): The BasicAuth object containing the username and password.
+        chunk_size (int): The most IDs a chunk may hold.
+        threads (int): The number of threads pulling.
+        ids (str): A comma-separated string of host IDs to use. If specified, this will be used instead of pulling the full set.
+        deadline (Deadline): Optional deadline for pulling the ID set.
+        truncation_limit (int): Optional. The truncation_limit the user passed, which is then not tuned.
+
+    Returns:
+        ChunkScheduler: The scheduler for the pull's threads.
+    """
+
+    id_list = pull_id_set(auth, ids=ids, deadline=deadline)
+    with LOCK:
+        print(f"ID set pulled. Total IDs: {len(id_list)}")
+
+    return ChunkScheduler(
+        id_list,
+        chunk_size=chunk_size,
+        threads=threads,
+        truncation_limit=truncation_limit,
+    )
+
+
+def _next_id_min(url: Union[str, None]) -> Union[str, None]:
+    """
+    Return the id_min of the next page from a RESPONSE node's WARNING/URL,
+    or None if there are no more pages.
+    """
+    if url:
+        # get the id_min parameter from the URL to pass into kwargs:
+        params = parse_qs(urlparse(url).query)
+        return params["id_min"][0]
+    return None
+
+
+def _parse_detection_page(
+    content: bytes, endpoint: Literal["get_hld", "get_cve_hld"], lazy: bool = False
+) -> tuple[BaseList[VMDRHost], Union[str, None]]:
+    """
+    Parse one page of host list detection XML.
+
+    The page is parsed with XMLRecordStream, so only one HOST is held as an
+    lxml tree and a dict at a time, however large the page is. This bounds the
+    memory used by parsing only: content is the whole page, downloaded before
+    parsing starts, so the raw bytes of a page are still held in full.
+
+    Params:
+        content (bytes): The raw XML of the page.
+        endpoint (Literal['get_hld', 'get_cve_hld']): Which detection endpoint the page came from.
+        lazy (bool): Whether to return LazyVMDRHost views instead of VMDRHost objects.
+
+    Returns:
+        tuple[BaseList[VMDRHost], Union[str, None]]: The hosts on the page and the id_min of the next page, if any.
+    """
+    output_tag = (
+        "HOST_LIST_VM_DETECTION_OUTPUT"
+        if endpoint == "get_hld"
+        else "HOST_LIST_CVE_VM_DETECTION_OUTPUT"
+    )
+    hosts = BaseList()
+
+    if lazy:
+        stream = XMLRecordStream(content, "HOST", "HOST_LIST", HOST_SPEC)
+    else:
+        stream = XMLRecordStream(
+            content,
+            "HOST",
+            "HOST_LIST",
+            decoder=HOST_DECODER if endpoint == "get_hld" else CVE_HOST_DECODER,
+        )
+    for host in stream:
+        if lazy:
+            if endpoint == "get_cve_hld":
+                # Ensure compatability:
+                host["DETECTION_LIST"] = host.pop("CVE_DETECTION_LIST")
+            host = LazyVMDRHost(host)
+        hosts.append(host)
+
+    if stream.root_tag != output_tag:
+        raise QualysAPIError(
+            f"Expected a {output_tag} document from {endpoint}, got {stream.root_tag}."
+        )
+
+    # check if there is no host list
+    if not stream.records:
+        with LOCK:
+            print(f"{current_thread().name} - No host list returned.")
+
+    return hosts, _next_id_min(stream.url)
+
+
+def _parse_host_list_page(
+    content: bytes, show_asset_id: bool = False, lazy: bool = False
+) -> tuple[BaseList[Union[VMDRHost, VMDRID]], Union[str, None], bool]:
+    """
+    Parse one page of host list XML.
+
+    Params:
+        content (bytes): The raw XML of the page.
+        show_asset_id (bool): Whether IDs in an ID_SET are asset IDs instead of host IDs.
+        lazy (bool): Whether to return LazyVMDRHost views instead of VMDRHost objects.
+
+    Returns:
+        tuple: The hosts/IDs on the page, the id_min of the next page (if any), and
+        whether the page contained a HOST_LIST or ID_SET at all.
+    """
+    hosts = BaseList()
+    xml = xml_parser(content, spec=HOST_LIST_SPEC if lazy else DECODE_HOST_LIST_SPEC)
+    response_node = xml["HOST_LIST_OUTPUT"]["RESPONSE"]
+
+    if "HOST_LIST" not in response_node and "ID_SET" not in response_node:
+        return hosts, None, False
+
+    # If details is none, ID_SET will be returned instead of HOST_LIST
+    if "ID_SET" in response_node:
+        for ID in response_node["ID_SET"].get("ID", []):
+            # create a VMDRID object and append to responses
+            # This code will only run if details=None, so now we just need to check if show_asset_id is set to 1:
+            if show_asset_id:
+                hosts.append(VMDRID(ID=ID, TYPE="asset"))
+            else:
+                hosts.append(VMDRID(ID=ID, TYPE="host"))
+    else:
+        # HOST_LIST will be returned
+        for host in response_node["HOST_LIST"]["HOST"]:
+            # return a list of VMDRHost objects (already built by HOST_DECODER unless lazy)
+            hosts.append(LazyVMDRHost(host) if lazy else host)
+
+    return hosts, _next_id_min(response_node.get("WARNING", {}).get("URL")), True
+
+
 def hld_backend(
     auth: BasicAuth,
     page_count: Union[int, "all"] = "all",
+    deadline: Deadline = None,
+    parse_pool: ParsePool = None,
+    lazy: bool = False,
+    responses: BaseList = None,
+    chunk: Chunk = None,
+    concurrency: ConcurrencyController = None,
     **kwargs,
 ) -> List:
     """
@@ -185,6 +562,12 @@ def hld_backend(
     Params:
         auth (BasicAuth): The BasicAuth object containing the username and password.
         page_count (Union[int, "all"]): The number of pages to retrieve. Defaults to "all".
+        deadline (Deadline): Optional deadline. If it expires, DeadlineExceeded is raised with the pages pulled so far.
+        parse_pool (ParsePool): Optional. The ParsePool to parse pages in. Defaults to parsing in this thread.
+        lazy (bool): Whether to return LazyVMDRHost views instead of VMDRHost objects. Defaults to False.
+        responses (BaseList): Optional. The list each page's hosts are added to as soon as it is parsed, i.e. get_hld's shared list or a RecordQueue. Defaults to a new BaseList.
+        chunk (Chunk): Optional. The ChunkScheduler chunk being pulled. Its ids (and truncation_limit, if tuned) are used for each page, and it is told how long each page took.
+        concurrency (ConcurrencyController): Optional. The controller each request waits for a slot from. See get_hld's autotune.
         **kwargs: Additional keyword arguments to pass to the API. See below.
 
     Kwargs:
@@ -278,23 +661,36 @@ def hld_backend(
     kwargs["show_results"] = 1
     kwargs["output_format"] = "XML"
 
-    responses = BaseList()
+    if parse_pool is None:
+        parse_pool = ParsePool()
+
+    if responses is None:
+        responses = BaseList()
     pulled = 0
 
     while True:
+        if chunk is not None:
+            kwargs.update(chunk.params())
+
         with LOCK:
             print(
                 f"{current_thread().name} - Pulling page {pulled+1} for ids {kwargs.get('ids')}. KWARGS: {kwargs}"
             )
 
         # make the request:
-        response = call_api(
-            auth=auth,
-            module="vmdr",
-            endpoint="get_hld",
-            params=kwargs,
-            headers={"X-Requested-With": "qualysdk SDK"},
-        )
+        try:
+            with concurrency_slot(concurrency, deadline):
+                response = call_api(
+                    auth=auth,
+                    module="vmdr",
+                    endpoint="get_hld",
+                    params=kwargs,
+                    headers={"X-Requested-With": "qualysdk SDK"},
+                    deadline=deadline,
+                )
+        except DeadlineExceeded as e:
+            e.partial_results = responses
+            raise
 
         if response.status_code != 200:
             with LOCK:
@@ -308,66 +704,41 @@ def hld_backend(
                 else:
                     continue
 
-        # cleaned = remove_problem_characters(response.text)
-        xml = xml_parser(response.content)
-
-        # check if there is no host list
-        if "HOST_LIST" not in xml["HOST_LIST_VM_DETECTION_OUTPUT"]["RESPONSE"]:
-            with LOCK:
-                print(f"{current_thread().name} - No host list returned.")
-        else:
-            # check if ["HOST_LIST_VM_DETECTION_OUTPUT"]["RESPONSE"]["HOST_LIST"]["HOST"] is a list of dictionaries
-            # or just a dictionary. if it is just one, put it inside a list
-            if not isinstance(
-                xml["HOST_LIST_VM_DETECTION_OUTPUT"]["RESPONSE"]["HOST_LIST"]["HOST"],
-                list,
-            ):
-                xml["HOST_LIST_VM_DETECTION_OUTPUT"]["RESPONSE"]["HOST_LIST"][
-                    "HOST"
-                ] = [
-                    xml["HOST_LIST_VM_DETECTION_OUTPUT"]["RESPONSE"]["HOST_LIST"][
-                        "HOST"
-                    ]
-                ]
-
-            for host in xml["HOST_LIST_VM_DETECTION_OUTPUT"]["RESPONSE"]["HOST_LIST"][
-                "HOST"
-            ]:
-                host_obj = VMDRHost.from_dict(host)
-                responses.append(host_obj)
+        hosts, next_id_min = parse_pool.parse(
+            _parse_detection_page, response.content, "get_hld", lazy
+        )
+        if chunk is not None:
+            # Timed by the request alone, leaving out rate limit waits, retries
+            # and parsing, so that page sizes follow how fast Qualys serves hosts:
+            chunk.page_done(len(hosts), response.event.network_time, next_id_min)
+        responses.extend(hosts)
 
         pulled += 1
         if page_count != "all":
             if pulled == page_count:
                 break
 
-        if "WARNING" in xml["HOST_LIST_VM_DETECTION_OUTPUT"]["RESPONSE"]:
-            if "URL" in xml["HOST_LIST_VM_DETECTION_OUTPUT"]["RESPONSE"]["WARNING"]:
-                # get the id_min parameter from the URL to pass into kwargs:
-                params = parse_qs(
-                    urlparse(
-                        xml["HOST_LIST_VM_DETECTION_OUTPUT"]["RESPONSE"]["WARNING"][
-                            "URL"
-                        ]
-                    ).query
-                )
-                with LOCK:
-                    print(
-                        f"{current_thread().name} (get_hld) - Pagination detected. Pulling next page with id_min: {params['id_min'][0]}"
-                    )
-                kwargs["id_min"] = params["id_min"][0]
-
-            else:
-                break
-        else:
+        if next_id_min is None:
             break
 
+        with LOCK:
+            print(
+                f"{current_thread().name} (get_hld) - Pagination detected. Pulling next page with id_min: {next_id_min}"
+            )
+        kwargs["id_min"] = next_id_min
+
     return responses
 
 
 def get_cve_hld_backend(
     auth: BasicAuth,
     page_count: Union[int, "all"] = "all",
+    deadline: Deadline = None,
+    parse_pool: ParsePool = None,
+    lazy: bool = False,
+    responses: BaseList = None,
+    chunk: Chunk = None,
+    concurrency: ConcurrencyController = None,
     **kwargs,
 ) -> List:
     """
@@ -377,23 +748,36 @@ def get_cve_hld_backend(
     # Set the kwargs
     kwargs["action"] = "list"
 
-    responses = BaseList()
+    if parse_pool is None:
+        parse_pool = ParsePool()
+
+    if responses is None:
+        responses = BaseList()
     pulled = 0
 
     while True:
+        if chunk is not None:
+            kwargs.update(chunk.params())
+
         with LOCK:
             print(
                 f"{current_thread().name} - Pulling page {pulled+1} for ids {kwargs.get('ids')}. KWARGS: {kwargs}"
             )
 
         # make the request:
-        response = call_api(
-            auth=auth,
-            module="vmdr",
-            endpoint="get_cve_hld",
-            params=kwargs,
-            headers={"X-Requested-With": "qualysdk SDK"},
-        )
+        try:
+            with concurrency_slot(concurrency, deadline):
+                response = call_api(
+                    auth=auth,
+                    module="vmdr",
+                    endpoint="get_cve_hld",
+                    params=kwargs,
+                    headers={"X-Requested-With": "qualysdk SDK"},
+                    deadline=deadline,
+                )
+        except DeadlineExceeded as e:
+            e.partial_results = responses
+            raise
 
         if response.status_code != 200:
             with LOCK:
@@ -407,64 +791,29 @@ def get_cve_hld_backend(
                 else:
                     continue
 
-        # cleaned = remove_problem_characters(response.text)
-        xml = xml_parser(response.content)
-
-        # check if there is no host list
-        if "HOST_LIST" not in xml["HOST_LIST_CVE_VM_DETECTION_OUTPUT"]["RESPONSE"]:
-            with LOCK:
-                print(f"{current_thread().name} - No host list returned.")
-        else:
-            # check if ["HOST_LIST_CVE_VM_DETECTION_OUTPUT"]["RESPONSE"]["HOST_LIST"]["HOST"] is a list of dictionaries
-            # or just a dictionary. if it is just one, put it inside a list
-            if not isinstance(
-                xml["HOST_LIST_CVE_VM_DETECTION_OUTPUT"]["RESPONSE"]["HOST_LIST"][
-                    "HOST"
-                ],
-                list,
-            ):
-                xml["HOST_LIST_CVE_VM_DETECTION_OUTPUT"]["RESPONSE"]["HOST_LIST"][
-                    "HOST"
-                ] = [
-                    xml["HOST_LIST_CVE_VM_DETECTION_OUTPUT"]["RESPONSE"]["HOST_LIST"][
-                        "HOST"
-                    ]
-                ]
-
-            for host in xml["HOST_LIST_CVE_VM_DETECTION_OUTPUT"]["RESPONSE"][
-                "HOST_LIST"
-            ]["HOST"]:
-                # Ensure compatability:
-                host["DETECTION_LIST"] = host.pop("CVE_DETECTION_LIST")
-                host_obj = VMDRHost.from_dict(host)
-                responses.append(host_obj)
+        hosts, next_id_min = parse_pool.parse(
+            _parse_detection_page, response.content, "get_cve_hld", lazy
+        )
+        if chunk is not None:
+            # Timed by the request alone, leaving out rate limit waits, retries
+            # and parsing, so that page sizes follow how fast Qualys serves hosts:
+            chunk.page_done(len(hosts), response.event.network_time, next_id_min)
+        responses.extend(hosts)
 
         pulled += 1
         if page_count != "all":
             if pulled == page_count:
                 break
 
-        if "WARNING" in xml["HOST_LIST_CVE_VM_DETECTION_OUTPUT"]["RESPONSE"]:
-            if "URL" in xml["HOST_LIST_CVE_VM_DETECTION_OUTPUT"]["RESPONSE"]["WARNING"]:
-                # get the id_min parameter from the URL to pass into kwargs:
-                params = parse_qs(
-                    urlparse(
-                        xml["HOST_LIST_CVE_VM_DETECTION_OUTPUT"]["RESPONSE"]["WARNING"][
-                            "URL"
-                        ]
-                    ).query
-                )
-                with LOCK:
-                    print(
-                        f"{current_thread().name} (get_hld) - Pagination detected. Pulling next page with id_min: {params['id_min'][0]}"
-                    )
-                kwargs["id_min"] = params["id_min"][0]
-
-            else:
-                break
-        else:
+        if next_id_min is None:
             break
 
+        with LOCK:
+            print(
+                f"{current_thread().name} (get_hld) - Pagination detected. Pulling next page with id_min: {next_id_min}"
+            )
+        kwargs["id_min"] = next_id_min
+
     return responses
 
 
@@ -476,6 +825,10 @@ def thread_worker(
     chunk_count: Union[int, "all"],
     endpoint_called: Literal["get_hld", "get_host_list", "get_cve_hld"],
     kwargs,
+    deadline: Deadline = None,
+    parse_pool: ParsePool = None,
+    lazy: bool = False,
+    concurrency: ConcurrencyController = None,
 ):
     """
     thread_worker - the worker function for get_hld/hld_backend functions.
@@ -483,16 +836,27 @@ def thread_worker(
     Params:
         auth (BasicAuth): The BasicAuth object containing the username and password.
         id_queue (Queue): The queue of host IDs to pull.
-        responses (BaseList): The list of responses to append to.
+        responses (BaseList): The list of responses to append to, or a RecordQueue.
         page_count (Union[int, "all"]): The number of pages to retrieve. Defaults to "all".
         chunk_count (Union[int, "all"]): The number of chunks to retrieve. Defaults to "all".
         endpoint_called (Union['get_hld', 'get_host_list', 'get_cve_hld']): The function that was called.
         **kwargs: Additional keyword arguments to pass to the API. See get_hld() for details.
+        deadline (Deadline): Optional deadline. The thread stops once it expires, keeping what it pulled.
+        parse_pool (ParsePool): Optional. The ParsePool that get_hld/get_cve_hld pages are parsed in.
+        lazy (bool): Whether to return LazyVMDRHost views instead of VMDRHost objects.
+        concurrency (ConcurrencyController): Optional. The controller each request waits for a slot from.
     """
 
     while True:
         pages_pulled = 0
         chunks_pulled = 0
+        if deadline is not None and deadline.expired():
+            deadline.exceeded = True
+            with LOCK:
+                print(
+                    f"{current_thread().name} ({endpoint_called}) - Deadline exceeded. Terminating thread."
+                )
+            break
         try:
             ids = (
                 id_queue.get_nowait()
@@ -512,18 +876,51 @@ def thread_worker(
         else:
             kwargs["ids"] = ids[0]
 
-        if endpoint_called == "get_hld":
-            responses.extend(hld_backend(auth, page_count=page_count, **kwargs))
-        elif endpoint_called == "get_host_list":
-            responses.extend(
-                get_host_list_backend(auth, page_count=page_count, **kwargs)
-            )
-        elif endpoint_called == "get_cve_hld":
-            responses.extend(get_cve_hld_backend(auth, page_count=page_count, **kwargs))
-        else:
-            raise ValueError(
-                "endpoint_called must be either 'get_hld' or 'get_host_list'."
-            )
+        # The backends add each page to responses as soon as it is parsed:
+        try:
+            if endpoint_called == "get_hld":
+                hld_backend(
+                    auth,
+                    page_count=page_count,
+                    deadline=deadline,
+                    parse_pool=parse_pool,
+                    lazy=lazy,
+                    responses=responses,
+                    concurrency=concurrency,
+                    **kwargs,
+                )
+            elif endpoint_called == "get_host_list":
+                get_host_list_backend(
+                    auth,
+                    page_count=page_count,
+                    deadline=deadline,
+                    lazy=lazy,
+                    responses=responses,
+                    concurrency=concurrency,
+                    **kwargs,
+                )
+            elif endpoint_called == "get_cve_hld":
+                get_cve_hld_backend(
+                    auth,
+                    page_count=page_count,
+                    deadline=deadline,
+                    parse_pool=parse_pool,
+                    lazy=lazy,
+                    responses=responses,
+                    concurrency=concurrency,
+                    **kwargs,
+                )
+            else:
+                raise ValueError(
+                    "endpoint_called must be either 'get_hld' or 'get_host_list'."
+                )
+        except DeadlineExceeded:
+            # The pages of this chunk that were pulled in time are already in responses:
+            with LOCK:
+                print(
+                    f"{current_thread().name} ({endpoint_called}) - Deadline exceeded. Terminating thread."
+                )
+            break
         id_queue.task_done()
         with LOCK:
             print(f"{current_thread().name} ({endpoint_called}) - Chunk complete.")
@@ -550,8 +947,211 @@ def thread_worker(
             break
 
 
+def scheduled_worker(
+    auth: BasicAuth,
+    scheduler: ChunkScheduler,
+    responses: BaseList,
+    page_count: Union[int, "all"],
+    chunk_count: Union[int, "all"],
+    endpoint_called: Literal["get_hld", "get_cve_hld"],
+    kwargs,
+    deadline: Deadline = None,
+    parse_pool: ParsePool = None,
+    lazy: bool = False,
+    concurrency: ConcurrencyController = None,
+):
+    """
+    scheduled_worker - the worker function for get_hld/get_cve_hld with adaptive=True.
+    Takes chunks from a ChunkScheduler instead of a queue of fixed chunks.
+
+    Params:
+        auth (BasicAuth): The BasicAuth object containing the username and password.
+        scheduler (ChunkScheduler): The scheduler to take chunks from.
+        responses (BaseList): The list of responses to append to, or a RecordQueue.
+        page_count (Union[int, "all"]): The number of pages to retrieve per chunk.
+        chunk_count (Union[int, "all"]): The number of chunks this thread pulls before it stops.
+        endpoint_called (Union['get_hld', 'get_cve_hld']): The function that was called.
+        **kwargs: Additional keyword arguments to pass to the API. See get_hld() for details.
+        deadline (Deadline): Optional deadline. The thread stops once it expires, keeping what it pulled.
+        parse_pool (ParsePool): Optional. The ParsePool that pages are parsed in.
+        lazy (bool): Whether to return LazyVMDRHost views instead of VMDRHost objects.
+        concurrency (ConcurrencyController): Optional. The controller each request waits for a slot from.
+    """
+
+    if endpoint_called == "get_hld":
+        backend = hld_backend
+    elif endpoint_called == "get_cve_hld":
+        backend = get_cve_hld_backend
+    else:
+        raise ValueError("endpoint_called must be either 'get_hld' or 'get_cve_hld'.")
+
+    chunks_pulled = 0
+    while chunk_count == "all" or chunks_pulled < chunk_count:
+        chunk = scheduler.take(deadline)
+        if chunk is None:
+            if deadline is not None and deadline.expired():
+                deadline.exceeded = True
+                with LOCK:
+                    print(
+                        f"{current_thread().name} ({endpoint_called}) - Deadline exceeded. Terminating thread."
+                    )
+            else:
+                with LOCK:
+                    print(
+                        f"{current_thread().name} ({endpoint_called}) - No chunks left. Terminating thread."
+                    )
+            return
+
+        # Each chunk gets its own copy of kwargs, as the backend sets ids and id_min on it:
+        try:
+            backend(
+                auth,
+                page_count=page_count,
+                deadline=deadline,
+                parse_pool=parse_pool,
+                lazy=lazy,
+                responses=responses,
+                chunk=chunk,
+                concurrency=concurrency,
+                **kwargs,
+            )
+        except DeadlineExceeded:
+            # The pages of this chunk that were pulled in time are already in responses:
+            with LOCK:
+                print(
+                    f"{current_thread().name} ({endpoint_called}) - Deadline exceeded. Terminating thread."
+                )
+            return
+        finally:
+            scheduler.done(chunk)
+
+        chunks_pulled += 1
+        with LOCK:
+            print(
+                f"{current_thread().name} ({endpoint_called}) - Chunk {chunk.low}-{chunk.high} complete in {chunk.pages} pages."
+            )
+
+    with LOCK:
+        print(
+            f"{current_thread().name} - Thread has pulled all chunks. Terminating thread."
+        )
+
+
+def iter_pull(
+    auth: BasicAuth,
+    endpoint_called: Literal["get_hld", "get_host_list", "get_cve_hld"],
+    chunk_size: int,
+    threads: int,
+    page_count: Union[int, "all"],
+    chunk_count: Union[int, "all"],
+    deadline: float,
+    parse_processes: int,
+    lazy: bool,
+    queue_size: int,
+    kwargs: dict,
+    adaptive: bool = False,
+    autotune: bool = False,
+) -> Iterator:
+    """
+    iter_pull - the generator behind iter_hld, iter_cve_hld and iter_host_list.
+
+    Pulls the same way as get_hld/get_cve_hld/get_host_list, but the threads hand
+    each page to a RecordQueue of queue_size pages, and its hosts are yielded as
+    they arrive. Nothing is pulled until the first host is asked for.
+
+    Params:
+        auth (BasicAuth): The BasicAuth object containing the username and password.
+        endpoint_called (Union['get_hld', 'get_host_list', 'get_cve_hld']): The function to pull as.
+        queue_size (int): The number of parsed pages that may wait to be yielded.
+        adaptive (bool): Whether to hand out the IDs with a ChunkScheduler (get_hld and get_cve_hld only). Defaults to False.
+        autotune (bool): Whether to let a ConcurrencyController tune how many of the threads make requests at once. Defaults to False.
+        The rest are as for get_hld. kwargs is the dict of API keyword arguments.
+
+    Yields:
+        The hosts of each page, as it is parsed.
+    """
+
+    deadline = Deadline.from_seconds(deadline)
+    records = RecordQueue(queue_size)
+
+    threads = prepare_args(
+        auth=auth,
+        chunk_size=chunk_size,
+        threads=threads,
+        page_count=page_count,
+        chunk_count=chunk_count,
+        ids=kwargs.get("ids"),
+    )
+
+    if adaptive:
+        id_queue = create_chunk_scheduler(
+            auth,
+            chunk_size=chunk_size,
+            threads=threads,
+            ids=kwargs.get("ids"),
+            deadline=deadline,
+            truncation_limit=kwargs.get("truncation_limit"),
+        )
+        worker = scheduled_worker
+    else:
+        id_queue = create_id_queue(
+            auth, chunk_size=chunk_size, ids=kwargs.get("ids", None), deadline=deadline
+        )
+        worker = thread_worker
+    concurrency = (
+        ConcurrencyController(threads, [("vmdr", endpoint_called)])
+        if autotune
+        else None
+    )
+    print(
+        f"Starting {endpoint_called} with {threads} {'threads.' if threads > 1 else 'thread.'}"
+    )
+
+    # The workers are started here, before any pull thread exists (see ParsePool).
+    # Leaving the block, including when the consumer stops early, ends the
+    # threads before the workers:
+    with ParsePool(parse_processes) as parse_pool, (
+        concurrency.watching(auth.hooks) if concurrency else nullcontext()
+    ):
+        for i in range(threads):
+            records.start(
+                worker,
+                (
+                    auth,
+                    id_queue,
+                    records,
+                    page_count,
+                    chunk_count,
+                    endpoint_called,
+                    kwargs,
+                    deadline,
+                    parse_pool,
+                    lazy,
+                    concurrency,
+                ),
+            )
+        yield from records
+
+    if deadline is not None and deadline.exceeded:
+        raise DeadlineExceeded(
+            f"{endpoint_called} did not finish within {deadline.seconds} seconds. {records.yielded} hosts were yielded before the deadline."
+        )
+
+    if adaptive:
+        print(f"Scheduler: {id_queue.summary()}")
+    if concurrency:
+        print(f"Concurrency: {concurrency.summary()}")
+    print("All threads have completed.")
+
+
 def get_host_list_backend(
-    auth: BasicAuth, page_count: Union[int, "all"] = "all", **kwargs
+    auth: BasicAuth,
+    page_count: Union[int, "all"] = "all",
+    deadline: Deadline = None,
+    lazy: bool = False,
+    responses: BaseList = None,
+    concurrency: ConcurrencyController = None,
+    **kwargs,
 ) -> list:
     """
     Get the host list from the VMDR API.
@@ -560,6 +1160,10 @@ def get_host_list_backend(
     Parameters:
         auth (BasicAuth): The authentication object.
         page_count (Union[int, "all"]): The number of pages to get. If "all", get all pages. Defaults to "all".
+        deadline (Deadline): Optional deadline. If it expires, DeadlineExceeded is raised with the pages pulled so far.
+        lazy (bool): Whether to return LazyVMDRHost views instead of VMDRHost objects. Defaults to False.
+        responses (BaseList): Optional. The list each page's hosts are added to as soon as it is parsed, i.e. get_host_list's shared list or a RecordQueue. Defaults to a new BaseList.
+        concurrency (ConcurrencyController): Optional. The controller each request waits for a slot from. See get_host_list's autotune.
 
     :Kwargs:
 
@@ -630,7 +1234,8 @@ def get_host_list_backend(
         list[Union[VMDRHost, VMDRID]]: A list of VMDRHost or VMDRID objects.
     """
 
-    responses = BaseList()
+    if responses is None:
+        responses = BaseList()
     pulled = 0
 
     # add the action to the kwargs:
@@ -647,62 +1252,34 @@ def get_host_list_backend(
 
     while True:
         # make the request:
-        response = call_api(
-            auth=auth,
-            module="vmdr",
-            endpoint="get_host_list",
-            params=kwargs,
-            headers={"X-Requested-With": "qualysdk SDK"},
-        )
+        try:
+            with concurrency_slot(concurrency, deadline):
+                response = call_api(
+                    auth=auth,
+                    module="vmdr",
+                    endpoint="get_host_list",
+                    params=kwargs,
+                    headers={"X-Requested-With": "qualysdk SDK"},
+                    deadline=deadline,
+                )
+        except DeadlineExceeded as e:
+            e.partial_results = responses
+            raise
         if response.status_code != 200:
             with LOCK:
                 print("No data returned.")
             return responses
 
-        xml = xml_parser(response.content)
+        hosts, next_id_min, has_list = _parse_host_list_page(
+            response.content, kwargs.get("show_asset_id"), lazy
+        )
 
-        if (
-            "HOST_LIST" not in xml["HOST_LIST_OUTPUT"]["RESPONSE"]
-            and "ID_SET" not in xml["HOST_LIST_OUTPUT"]["RESPONSE"]
-        ):
+        if not has_list:
             with LOCK:
                 print("No host list returned.")
             return
 
-        # If details is none, ID_SET will be returned instead of HOST_LIST
-        if "ID_SET" in xml["HOST_LIST_OUTPUT"]["RESPONSE"]:
-            # check if ID_SET is a list of dicts/str or a single dict/str:
-            if isinstance(
-                xml["HOST_LIST_OUTPUT"]["RESPONSE"]["ID_SET"]["ID"], (dict, str)
-            ):
-                # if it's a single dict, convert it to a list of dicts:
-                xml["HOST_LIST_OUTPUT"]["RESPONSE"]["ID_SET"]["ID"] = [
-                    xml["HOST_LIST_OUTPUT"]["RESPONSE"]["ID_SET"]["ID"]
-                ]
-
-            for ID in xml["HOST_LIST_OUTPUT"]["RESPONSE"]["ID_SET"]["ID"]:
-                # create a VMDRID object and append to responses
-                # This code will only run if details=None, so now we just need to check if show_asset_id is set to 1:
-                if kwargs.get("show_asset_id"):
-                    responses.append(VMDRID(ID=ID, TYPE="asset"))
-                else:  # elif not kwargs.get("show_asset_id"):
-                    responses.append(VMDRID(ID=ID, TYPE="host"))
-        else:
-            # HOST_LIST will be returned
-            # first, check if xml["HOST_LIST_OUTPUT"]["RESPONSE"]["HOST_LIST"]["HOST"]
-            # is a list of dicts or a single dict:
-            if isinstance(
-                xml["HOST_LIST_OUTPUT"]["RESPONSE"]["HOST_LIST"]["HOST"], dict
-            ):
-                # if it's a single dict, convert it to a list of dicts:
-                xml["HOST_LIST_OUTPUT"]["RESPONSE"]["HOST_LIST"]["HOST"] = [
-                    xml["HOST_LIST_OUTPUT"]["RESPONSE"]["HOST_LIST"]["HOST"]
-                ]
-
-            for host in xml["HOST_LIST_OUTPUT"]["RESPONSE"]["HOST_LIST"]["HOST"]:
-                # return a list of VMDRHost objects
-                responses.append(VMDRHost.from_dict(host))
-
+        responses.extend(hosts)
         pulled += 1
 
         if page_count != "all" and pulled >= page_count:
@@ -710,23 +1287,13 @@ def get_host_list_backend(
                 print(f"{current_thread().name} Page count reached.")
             break
 
-        if "WARNING" in xml["HOST_LIST_OUTPUT"]["RESPONSE"]:
-            if "URL" in xml["HOST_LIST_OUTPUT"]["RESPONSE"]["WARNING"]:
-                with LOCK:
-                    print(
-                        f"{current_thread().name} (get_host_list) Pagination detected. Pulling next page from url: {xml['HOST_LIST_OUTPUT']['RESPONSE']['WARNING']['URL']}"
-                    )
-                # get the id_min parameter from the URL to pass into kwargs:
-                params = parse_qs(
-                    urlparse(
-                        xml["HOST_LIST_OUTPUT"]["RESPONSE"]["WARNING"]["URL"]
-                    ).query
-                )
-                kwargs["id_min"] = params["id_min"][0]
-
-            else:
-                break
-        else:
+        if next_id_min is None:
             break
 
+        with LOCK:
+            print(
+                f"{current_thread().name} (get_host_list) Pagination detected. Pulling next page with id_min: {next_id_min}"
+            )
+        kwargs["id_min"] = next_id_min
+
     return responses
@@ -13,6 +13,7 @@ from .qds_factor import QDSFactor
 from .qds import QDS as qds
 from ...base.base_list import BaseList
 from ...base.base_class import BaseClass
+from ...base.lazy import LazyRecord
 
 
 def parse_datetime_fields(obj, DATETIME_FIELDS: list[str]) -> None:
@@ -204,9 +205,8 @@ class Detection(BaseDetection):
         # convert the QDS factors to QDSFactor objects
         if self.QDS_FACTORS:
             factors_bl = BaseList()
+            # QDS_FACTOR is already a list when parsed with HOST_SPEC:
             data = self.QDS_FACTORS["QDS_FACTOR"]
-
-            # Normalize QDS factors to a list for easier processing
             if isinstance(data, dict):
                 data = [data]
 
@@ -331,3 +331,27 @@ class CVEDetection(BaseDetection):
 
     def __str__(self):
         return self.VULN_CVE
+
+
+class LazyDetection(LazyRecord):
+    """
+    LazyDetection - a Detection whose fields are converted when first read (see base/lazy.py).
+
+    Call materialize() to get the Detection.
+    """
+
+    __slots__ = ()
+    _model = Detection
+    _key = "QID"
+
+
+class LazyCVEDetection(LazyRecord):
+    """
+    LazyCVEDetection - a CVEDetection whose fields are converted when first read (see base/lazy.py).
+
+    Call materialize() to get the CVEDetection.
+    """
+
+    __slots__ = ()
+    _model = CVEDetection
+    _key = "VULN_CVE"
@@ -9,9 +9,10 @@ from datetime import datetime
 from ipaddress import IPv4Address, IPv6Address
 
 from .tag import Tag, CloudTag
-from .detection import Detection, CVEDetection
+from .detection import Detection, CVEDetection, LazyDetection, LazyCVEDetection
 from ...base.base_list import BaseList
 from ...base.base_class import BaseClass
+from ...base.lazy import LazyRecord
 
 
 @dataclass(order=True)
@@ -351,32 +352,31 @@ class VMDRHost(BaseClass):
 
         if self.TRURISK_SCORE_FACTORS:
             s = ""
-            for sev_level in self.TRURISK_SCORE_FACTORS.get("VULN_COUNT"):
+            data = self.TRURISK_SCORE_FACTORS.get("VULN_COUNT")
+            if isinstance(data, dict):
+                data = [data]
+            for sev_level in data:
                 s += f"sev_{sev_level.get('@qds_severity')}: {sev_level.get('#text')}, "
             # Pinch off the trailing comma and space:
             s = s[:-2]
             self.TRURISK_SCORE_FACTORS = s
 
+        # List elements (TAG, CLOUD_TAG, ATTRIBUTE, DETECTION...) are already lists
+        # when parsed with HOST_SPEC (see vmdr/base/helpers.py), but may be a
+        # single dict in data from elsewhere:
         if self.TAGS:
-            # if 'TAG' key's value is a list, it is a list of tag dicts. if it is a single tag dict, it is just a single tag.
-            if isinstance(self.TAGS["TAG"], list):
-                self.TAGS = BaseList([Tag.from_dict(tag) for tag in self.TAGS["TAG"]])
-            else:  # if it is a single tag dict:
-                self.TAGS = BaseList([Tag.from_dict(self.TAGS["TAG"])])
+            data = self.TAGS["TAG"]
+            if isinstance(data, dict):
+                data = [data]
+            self.TAGS = BaseList([Tag.from_dict(tag) for tag in data])
 
         if self.CLOUD_PROVIDER_TAGS:
-            # if 'CLOUD_TAG' key's value is a list, it is a list of tag dicts. if it is a single tag dict, it is just a single tag.
-            if isinstance(self.CLOUD_PROVIDER_TAGS["CLOUD_TAG"], list):
-                self.CLOUD_PROVIDER_TAGS = BaseList(
-                    [
-                        CloudTag.from_dict(tag)
-                        for tag in self.CLOUD_PROVIDER_TAGS["CLOUD_TAG"]
-                    ]
-                )
-            else:  # if it is a single tag dict:
-                self.CLOUD_PROVIDER_TAGS = BaseList(
-                    [CloudTag.from_dict(self.CLOUD_PROVIDER_TAGS["CLOUD_TAG"])]
-                )
+            data = self.CLOUD_PROVIDER_TAGS["CLOUD_TAG"]
+            if isinstance(data, dict):
+                data = [data]
+            self.CLOUD_PROVIDER_TAGS = BaseList(
+                [CloudTag.from_dict(tag) for tag in data]
+            )
 
         # CLOUD SPECIFIC FIELDS:
         if self.METADATA:
@@ -441,31 +441,23 @@ class VMDRHost(BaseClass):
                 # "GCP": VALID_GCP_KEYS #not implemented as i have no access to a GCP environment.
             }
 
+            attributes = self.METADATA[key_selector]["ATTRIBUTE"]
+            if isinstance(attributes, dict):
+                attributes = [attributes]
+
             for key in VALID_KEYS[key_selector]:
-                # check for if self.METADATA[key_selector]['ATTRIBUTE'] is a list of dicts. if not, it is just a single dict.
-                if isinstance(self.METADATA[key_selector]["ATTRIBUTE"], list):
-                    for item in self.METADATA[key_selector]["ATTRIBUTE"]:
-                        if item["NAME"] == key[1]:
-                            setattr(
-                                self,
-                                f"CLOUD_{key[0]}",
-                                (
-                                    item["VALUE"]
-                                    if item["VALUE"] not in ["", {}, []]
-                                    else None
-                                ),
-                            )  # if item['VALUE'] seems to leave behind empties, hence the list
-                            break
-                else:
-                    if (
-                        self.METADATA[key_selector]["ATTRIBUTE"]["NAME"]
-                        and self.METADATA[key_selector]["ATTRIBUTE"]["NAME"] == key
-                    ):
+                for item in attributes:
+                    if item["NAME"] == key[1]:
                         setattr(
                             self,
                             f"CLOUD_{key[0]}",
-                            self.METADATA[key_selector]["ATTRIBUTE"]["VALUE"],
-                        )
+                            (
+                                item["VALUE"]
+                                if item["VALUE"] not in ["", {}, []]
+                                else None
+                            ),
+                        )  # if item['VALUE'] seems to leave behind empties, hence the list
+                        break
 
         for INT_FIELD in INT_FIELDS:
             if getattr(self, INT_FIELD) and not isinstance(
@@ -491,7 +483,6 @@ class VMDRHost(BaseClass):
                 data = self.DETECTION_LIST["CVE_DETECTION"]
             else:
                 data = self.DETECTION_LIST["DETECTION"]
-
             if isinstance(data, dict):
                 data = [data]
 
@@ -622,3 +613,63 @@ class VMDRID(BaseClass):
         """
         for key, value in self.to_dict().items():
             yield key, value
+
+
+class LazyVMDRHost(LazyRecord):
+    """
+    LazyVMDRHost - a VMDRHost whose fields are converted when first read (see base/lazy.py).
+
+    DETECTION_LIST is a BaseList of LazyDetections (or LazyCVEDetections for CVE-based
+    output), so detections are converted field by field too.
+
+    Call materialize() to get the VMDRHost.
+    """
+
+    __slots__ = ()
+    _model = VMDRHost
+    _key = "ID"
+    _sources = {
+        "HOSTNAME": ("DNS_DATA",),
+        "DOMAIN": ("DNS_DATA",),
+        "FQDN": ("DNS_DATA",),
+        "METADATA": ("CLOUD_PROVIDER",),
+        # Pulled out of METADATA by the cloud provider's key:
+        **{
+            f"CLOUD_{name}": ("CLOUD_PROVIDER", "METADATA")
+            for name in (
+                "GROUP_NAME",
+                "INSTANCE_STATE",
+                "INSTANCE_TYPE",
+                "IS_SPOT_INSTANCE",
+                "ARCHITECTURE",
+                "IMAGE_ID",
+                "REGION",
+                "AMI_ID",
+                "PUBLIC_HOSTNAME",
+                "PUBLIC_IPV4",
+                "ACCOUNT_ID",
+            )
+        },
+    }
+
+    def _decode(self, name: str) -> Any:
+        if name != "DETECTION_LIST" or not self._data.get("DETECTION_LIST"):
+            return super()._decode(name)
+
+        # Same as VMDRHost.__post_init__:
+        detection_list = self._data["DETECTION_LIST"]
+        host_id = self.ID
+        detections = BaseList()
+        if "CVE_DETECTION" in detection_list.keys():
+            for detection in detection_list["CVE_DETECTION"]:
+                # Renamed on a copy, as materialize() renames them in the record:
+                detection = dict(detection, ID=host_id)
+                detection["CVSS_31"] = detection.pop("CVSS3.1")
+                detection["CVSS_31_BASE"] = detection.pop("CVSS3.1_BASE", None)
+                detection["CVSS_31_TEMPORAL"] = detection.pop("CVSS3.1_TEMPORAL", None)
+                detections.append(LazyCVEDetection(detection))
+        else:
+            for detection in detection_list["DETECTION"]:
+                detection["ID"] = host_id
+                detections.append(LazyDetection(detection))
+        return detections
@@ -20,6 +20,7 @@ from .threat_intel import ThreatIntel
 from .compliance import Compliance
 from ...base.base_list import BaseList
 from ...base.base_class import BaseClass
+from ...base.lazy import LazyRecord
 
 
 @dataclass(order=True)
@@ -227,7 +228,9 @@ class KBEntry(BaseClass):
                     #    ).get_text(),
                     # )
 
-        # convert the lists to BaseList objects:
+        # convert the lists to BaseList objects. Their elements are already lists
+        # when parsed with KB_SPEC (see vmdr/query_kb.py), but may be a single
+        # dict in data from elsewhere:
         if self.BUGTRAQ_LIST:
             final_bugtraq_list = BaseList()
             data = self.BUGTRAQ_LIST["BUGTRAQ"]
@@ -329,3 +332,15 @@ class KBEntry(BaseClass):
 
     def is_qid(self, qid: int):
         return self.QID == qid
+
+
+class LazyKBEntry(LazyRecord):
+    """
+    LazyKBEntry - a KBEntry whose fields are converted when first read (see base/lazy.py).
+
+    Call materialize() to get the KBEntry.
+    """
+
+    __slots__ = ()
+    _model = KBEntry
+    _key = "QID"
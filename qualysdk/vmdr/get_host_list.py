@@ -2,11 +2,16 @@
 get_host_list.py - call the VMDR host list API.
 """
 
-from typing import Union
+from contextlib import nullcontext
+from typing import Union, AsyncIterator, Iterator
 from threading import Thread
 
 from ..auth.token import BasicAuth
-from .base.helpers import create_id_queue, thread_worker, prepare_args
+from .base.helpers import create_id_queue, thread_worker, prepare_args, iter_pull
+from .base.async_helpers import pull_chunks_async
+from ..base.concurrency import ConcurrencyController
+from ..base.deadline import Deadline
+from .data_classes.hosts import VMDRHost, VMDRID
 from ..exceptions.Exceptions import *
 from ..base.base_list import BaseList
 
@@ -17,6 +22,9 @@ def get_host_list(
     threads: int = 5,
     page_count: Union[int, "all"] = "all",
     chunk_count: Union[int, "all"] = "all",
+    deadline: float = None,
+    lazy: bool = False,
+    autotune: bool = False,
     **kwargs,
 ) -> BaseList:
     """
@@ -29,6 +37,9 @@ def get_host_list(
         threads (int): The number of threads to use. Defaults to 5.
         page_count (Union[int, "all"]): The number of pages to get. If "all", get all pages. Defaults to "all".
         chunk_count (Union[int, "all"]): The number of chunks to get. If "all", get all chunks. Defaults to "all".
+        deadline (float): Optional number of seconds the whole pull may take. Once it passes, outstanding work is cancelled and DeadlineExceeded is raised with the hosts pulled so far in its partial_results attribute.
+        lazy (bool): Whether to return LazyVMDRHost views, which convert each field when it is first read, instead of VMDRHost objects. Call materialize() on a view to get its VMDRHost. Defaults to False.
+        autotune (bool): Whether to tune how many of the threads make requests at once as the pull goes, from the requests' throughput and latency, backing off on 409/429 responses and the concurrency limit headers. threads is then the most that may. See ConcurrencyController. Defaults to False.
 
     :Kwargs:
 
@@ -99,7 +110,9 @@ def get_host_list(
         BaseList[Union[VMDRHost, VMDRID]]: A list of VMDRHost or VMDRID objects.
     """
 
-    prepare_args(
+    deadline = Deadline.from_seconds(deadline)
+
+    threads = prepare_args(
         auth=auth,
         chunk_size=chunk_size,
         threads=threads,
@@ -108,33 +121,139 @@ def get_host_list(
         ids=kwargs.get("ids", None),
     )
 
-    id_queue = create_id_queue(auth, chunk_size=chunk_size, ids=kwargs.get("ids", None))
+    id_queue = create_id_queue(
+        auth, chunk_size=chunk_size, ids=kwargs.get("ids", None), deadline=deadline
+    )
     print(
         f"Starting get_host_list with {threads} {'threads.' if threads > 1 else 'thread.'}"
     )
 
+    concurrency = (
+        ConcurrencyController(threads, [("vmdr", "get_host_list")])
+        if autotune
+        else None
+    )
+
     threads_list = []
 
     responses = BaseList()
 
-    for i in range(threads):
-        thread = Thread(
-            target=thread_worker,
-            args=(
-                auth,
-                id_queue,
-                responses,
-                page_count,
-                chunk_count,
-                "get_host_list",
-                kwargs,
-            ),
-        )
-        threads_list.append(thread)
-        thread.start()
+    with concurrency.watching(auth.hooks) if concurrency else nullcontext():
+        for i in range(threads):
+            thread = Thread(
+                target=thread_worker,
+                args=(
+                    auth,
+                    id_queue,
+                    responses,
+                    page_count,
+                    chunk_count,
+                    "get_host_list",
+                    kwargs,
+                    deadline,
+                    None,
+                    lazy,
+                    concurrency,
+                ),
+            )
+            threads_list.append(thread)
+            thread.start()
 
-    for thread in threads_list:
-        thread.join()
+        for thread in threads_list:
+            thread.join()
 
+    if deadline is not None and deadline.exceeded:
+        raise DeadlineExceeded(
+            f"get_host_list did not finish within {deadline.seconds} seconds. {len(responses)} hosts were pulled before the deadline.",
+            partial_results=responses,
+        )
+
+    if concurrency:
+        print(f"Concurrency: {concurrency.summary()}")
     print("All threads have completed. Returning responses.")
     return responses
+
+
+def iter_host_list(
+    auth: BasicAuth,
+    chunk_size: int = 3000,
+    threads: int = 5,
+    page_count: Union[int, "all"] = "all",
+    chunk_count: Union[int, "all"] = "all",
+    deadline: float = None,
+    lazy: bool = False,
+    queue_size: int = 10,
+    autotune: bool = False,
+    **kwargs,
+) -> Iterator[Union[VMDRHost, VMDRID]]:
+    """
+    Generator version of get_host_list. Pulls with the same threads, but yields
+    each host as soon as its page is parsed instead of returning them all at the
+    end. At most queue_size parsed pages wait to be yielded (the threads pause
+    until the loop catches up), so subscriptions of any size can be processed in
+    constant memory.
+
+    Params:
+        auth (BasicAuth): The authentication object.
+        chunk_size (int): The number of hosts to get per thread. Defaults to 3000.
+        threads (int): The number of threads to use. Defaults to 5.
+        page_count (Union[int, "all"]): The number of pages to get. If "all", get all pages. Defaults to "all".
+        chunk_count (Union[int, "all"]): The number of chunks to get. If "all", get all chunks. Defaults to "all".
+        deadline (float): Optional number of seconds the whole pull may take. Once it passes, outstanding work is cancelled and DeadlineExceeded is raised after the hosts pulled so far are yielded.
+        lazy (bool): Whether to yield LazyVMDRHost views instead of VMDRHost objects. Defaults to False.
+        queue_size (int): The number of parsed pages that may wait to be yielded. Defaults to 10.
+        autotune (bool): Whether to tune how many of the threads make requests at once as the pull goes, from the requests' throughput and latency, backing off on 409/429 responses and the concurrency limit headers. threads is then the most that may. See ConcurrencyController. Defaults to False.
+        **kwargs: Additional keyword arguments to pass to the API. Accepts the same kwargs as get_host_list.
+
+    Yields:
+        Union[VMDRHost, VMDRID]: VMDRHost or VMDRID objects.
+    """
+    yield from iter_pull(
+        auth,
+        "get_host_list",
+        chunk_size,
+        threads,
+        page_count,
+        chunk_count,
+        deadline,
+        0,
+        lazy,
+        queue_size,
+        kwargs,
+        autotune=autotune,
+    )
+
+
+async def get_host_list_async(
+    auth: BasicAuth,
+    chunk_size: int = 3000,
+    concurrency: int = 5,
+    page_count: Union[int, "all"] = "all",
+    chunk_count: Union[int, "all"] = "all",
+    **kwargs,
+) -> AsyncIterator[Union[VMDRHost, VMDRID]]:
+    """
+    asyncio version of get_host_list. Pulls chunks of hosts concurrently on one event loop
+    and yields each host as soon as its page is parsed. Requires httpx.
+
+    Params:
+        auth (BasicAuth): The authentication object.
+        chunk_size (int): The size of each chunk. Defaults to 3000.
+        concurrency (int): The number of chunks to pull at once. Defaults to 5.
+        page_count (Union[int, "all"]): The number of pages to retrieve per chunk. Defaults to "all".
+        chunk_count (Union[int, "all"]): The number of chunks each concurrent task pulls. Defaults to "all".
+        **kwargs: Additional keyword arguments to pass to the API. Accepts the same kwargs as get_host_list.
+
+    Yields:
+        Union[VMDRHost, VMDRID]: VMDRHost or VMDRID objects.
+    """
+    async for host in pull_chunks_async(
+        auth,
+        "get_host_list",
+        chunk_size=chunk_size,
+        concurrency=concurrency,
+        page_count=page_count,
+        chunk_count=chunk_count,
+        **kwargs,
+    ):
+        yield host
@@ -4,10 +4,23 @@ get_host_list_detections.py - contains the get_host_list_detections function for
 This endpoint is used to get a list of hosts and their QID detections. The function is multithreaded and uses the hld_backend function to pull the data.
 """
 
-from typing import Union
+from contextlib import nullcontext
+from typing import Union, AsyncIterator, Iterator
 from threading import Thread
 
-from .base.helpers import create_id_queue, thread_worker, prepare_args
+from .base.helpers import (
+    create_id_queue,
+    create_chunk_scheduler,
+    thread_worker,
+    scheduled_worker,
+    prepare_args,
+    iter_pull,
+)
+from .base.async_helpers import pull_chunks_async
+from ..base.concurrency import ConcurrencyController
+from ..base.deadline import Deadline
+from ..base.parse_pool import ParsePool
+from .data_classes.hosts import VMDRHost
 from ..base.base_list import BaseList
 from ..auth.token import BasicAuth
 from ..exceptions.Exceptions import *
@@ -19,6 +32,11 @@ def get_hld(
     threads: int = 5,
     page_count: Union[int, "all"] = "all",
     chunk_count: Union[int, "all"] = "all",
+    deadline: float = None,
+    parse_processes: int = 0,
+    lazy: bool = False,
+    adaptive: bool = False,
+    autotune: bool = False,
     **kwargs,
 ) -> BaseList:
     """
@@ -30,6 +48,11 @@ def get_hld(
         threads (int): The number of threads to use. Defaults to 5.
         page_count (Union[int, "all"]): The number of pages to retrieve. Defaults to "all".
         chunk_count (Union[int, "all"]): The number of chunks to retrieve. Defaults to "all".
+        deadline (float): Optional number of seconds the whole pull may take. Once it passes, outstanding work is cancelled and DeadlineExceeded is raised with the hosts pulled so far in its partial_results attribute.
+        parse_processes (int): Optional number of worker processes to parse pages in, leaving the threads to download. See ParsePool. Defaults to 0 (parse in the threads).
+        lazy (bool): Whether to return LazyVMDRHost views, which convert each field (and each detection's fields) when it is first read, instead of VMDRHost objects. Call materialize() on a view to get its VMDRHost. Defaults to False.
+        adaptive (bool): Whether to size chunks as the pull goes instead of cutting fixed chunks of chunk_size IDs: chunks shrink as the IDs run out, threads with nothing left take part of the IDs of chunks still being pulled, and truncation_limit (unless passed) is tuned so pages take about the same time. See ChunkScheduler. Defaults to False.
+        autotune (bool): Whether to tune how many of the threads make requests at once as the pull goes, from the requests' throughput and latency, backing off on 409/429 responses and the concurrency limit headers. threads is then the most that may. See ConcurrencyController. Defaults to False.
         **kwargs: Additional keyword arguments to pass to the API.
 
     Kwargs:
@@ -117,7 +140,9 @@ def get_hld(
         BaseList: A list of VMDRHost objects, with their DETECTIONS attribute populated.
     """
 
-    prepare_args(
+    deadline = Deadline.from_seconds(deadline)
+
+    threads = prepare_args(
         auth=auth,
         chunk_size=chunk_size,
         threads=threads,
@@ -126,32 +151,68 @@ def get_hld(
         ids=kwargs.get("ids"),
     )
 
-    id_queue = create_id_queue(auth, chunk_size=chunk_size, ids=kwargs.get("ids", None))
+    if adaptive:
+        id_queue = create_chunk_scheduler(
+            auth,
+            chunk_size=chunk_size,
+            threads=threads,
+            ids=kwargs.get("ids"),
+            deadline=deadline,
+            truncation_limit=kwargs.get("truncation_limit"),
+        )
+        worker = scheduled_worker
+    else:
+        id_queue = create_id_queue(
+            auth, chunk_size=chunk_size, ids=kwargs.get("ids", None), deadline=deadline
+        )
+        worker = thread_worker
     print(f"Starting get_hld with {threads} {'threads.' if threads > 1 else 'thread.'}")
 
+    concurrency = (
+        ConcurrencyController(threads, [("vmdr", "get_hld")]) if autotune else None
+    )
+
     threads_list = []
 
     responses = BaseList()
 
-    for i in range(threads):
-        thread = Thread(
-            target=thread_worker,
-            args=(
-                auth,
-                id_queue,
-                responses,
-                page_count,
-                chunk_count,
-                "get_hld",
-                kwargs,
-            ),
+    # Leaving the block, including on an exception, shuts the workers down:
+    with ParsePool(parse_processes) as parse_pool, (
+        concurrency.watching(auth.hooks) if concurrency else nullcontext()
+    ):
+        for i in range(threads):
+            thread = Thread(
+                target=worker,
+                args=(
+                    auth,
+                    id_queue,
+                    responses,
+                    page_count,
+                    chunk_count,
+                    "get_hld",
+                    kwargs,
+                    deadline,
+                    parse_pool,
+                    lazy,
+                    concurrency,
+                ),
+            )
+            threads_list.append(thread)
+            thread.start()
+
+        for thread in threads_list:
+            thread.join()
+
+    if deadline is not None and deadline.exceeded:
+        raise DeadlineExceeded(
+            f"get_hld did not finish within {deadline.seconds} seconds. {len(responses)} hosts were pulled before the deadline.",
+            partial_results=responses,
         )
-        threads_list.append(thread)
-        thread.start()
-
-    for thread in threads_list:
-        thread.join()
 
+    if adaptive:
+        print(f"Scheduler: {id_queue.summary()}")
+    if concurrency:
+        print(f"Concurrency: {concurrency.summary()}")
     print("All threads have completed. Returning responses.")
     return responses
 
@@ -162,6 +223,11 @@ def get_cve_hld(
     threads: int = 5,
     page_count: Union[int, "all"] = "all",
     chunk_count: Union[int, "all"] = "all",
+    deadline: float = None,
+    parse_processes: int = 0,
+    lazy: bool = False,
+    adaptive: bool = False,
+    autotune: bool = False,
     **kwargs,
 ) -> BaseList:
     """
@@ -173,6 +239,11 @@ def get_cve_hld(
         threads (int): The number of threads to use. Defaults to 5.
         page_count (Union[int, "all"]): The number of pages to retrieve. Defaults to "all".
         chunk_count (Union[int, "all"]): The number of chunks to retrieve. Defaults to "all".
+        deadline (float): Optional number of seconds the whole pull may take. Once it passes, outstanding work is cancelled and DeadlineExceeded is raised with the hosts pulled so far in its partial_results attribute.
+        parse_processes (int): Optional number of worker processes to parse pages in, leaving the threads to download. See ParsePool. Defaults to 0 (parse in the threads).
+        lazy (bool): Whether to return LazyVMDRHost views, which convert each field (and each detection's fields) when it is first read, instead of VMDRHost objects. Call materialize() on a view to get its VMDRHost. Defaults to False.
+        adaptive (bool): Whether to size chunks as the pull goes instead of cutting fixed chunks of chunk_size IDs: chunks shrink as the IDs run out, threads with nothing left take part of the IDs of chunks still being pulled, and truncation_limit (unless passed) is tuned so pages take about the same time. See ChunkScheduler. Defaults to False.
+        autotune (bool): Whether to tune how many of the threads make requests at once as the pull goes, from the requests' throughput and latency, backing off on 409/429 responses and the concurrency limit headers. threads is then the most that may. See ConcurrencyController. Defaults to False.
         **kwargs: Additional keyword arguments to pass to the API.
 
     Kwargs:
@@ -223,7 +294,9 @@ def get_cve_hld(
         BaseList: A list of VMDRHost objects, with their DETECTIONS attribute populated.
     """
 
-    prepare_args(
+    deadline = Deadline.from_seconds(deadline)
+
+    threads = prepare_args(
         auth=auth,
         chunk_size=chunk_size,
         threads=threads,
@@ -232,33 +305,265 @@ def get_cve_hld(
         ids=kwargs.get("ids"),
     )
 
-    id_queue = create_id_queue(auth, chunk_size=chunk_size, ids=kwargs.get("ids", None))
+    if adaptive:
+        id_queue = create_chunk_scheduler(
+            auth,
+            chunk_size=chunk_size,
+            threads=threads,
+            ids=kwargs.get("ids"),
+            deadline=deadline,
+            truncation_limit=kwargs.get("truncation_limit"),
+        )
+        worker = scheduled_worker
+    else:
+        id_queue = create_id_queue(
+            auth, chunk_size=chunk_size, ids=kwargs.get("ids", None), deadline=deadline
+        )
+        worker = thread_worker
     print(
         f"Starting get_cve_hld with {threads} {'threads.' if threads > 1 else 'thread.'}"
     )
 
+    concurrency = (
+        ConcurrencyController(threads, [("vmdr", "get_cve_hld")]) if autotune else None
+    )
+
     threads_list = []
 
     responses = BaseList()
 
-    for i in range(threads):
-        thread = Thread(
-            target=thread_worker,
-            args=(
-                auth,
-                id_queue,
-                responses,
-                page_count,
-                chunk_count,
-                "get_cve_hld",
-                kwargs,
-            ),
+    # Leaving the block, including on an exception, shuts the workers down:
+    with ParsePool(parse_processes) as parse_pool, (
+        concurrency.watching(auth.hooks) if concurrency else nullcontext()
+    ):
+        for i in range(threads):
+            thread = Thread(
+                target=worker,
+                args=(
+                    auth,
+                    id_queue,
+                    responses,
+                    page_count,
+                    chunk_count,
+                    "get_cve_hld",
+                    kwargs,
+                    deadline,
+                    parse_pool,
+                    lazy,
+                    concurrency,
+                ),
+            )
+            threads_list.append(thread)
+            thread.start()
+
+        for thread in threads_list:
+            thread.join()
+
+    if deadline is not None and deadline.exceeded:
+        raise DeadlineExceeded(
+            f"get_cve_hld did not finish within {deadline.seconds} seconds. {len(responses)} hosts were pulled before the deadline.",
+            partial_results=responses,
         )
-        threads_list.append(thread)
-        thread.start()
-
-    for thread in threads_list:
-        thread.join()
 
+    if adaptive:
+        print(f"Scheduler: {id_queue.summary()}")
+    if concurrency:
+        print(f"Concurrency: {concurrency.summary()}")
     print("All threads have completed. Returning responses.")
     return responses
+
+
+def iter_hld(
+    auth: BasicAuth,
+    chunk_size: int = 3000,
+    threads: int = 5,
+    page_count: Union[int, "all"] = "all",
+    chunk_count: Union[int, "all"] = "all",
+    deadline: float = None,
+    parse_processes: int = 0,
+    lazy: bool = False,
+    queue_size: int = 10,
+    adaptive: bool = False,
+    autotune: bool = False,
+    **kwargs,
+) -> Iterator[VMDRHost]:
+    """
+    Generator version of get_hld. Pulls with the same threads, but yields each host
+    as soon as its page is parsed instead of returning them all at the end. At
+    most queue_size parsed pages wait to be yielded (the threads pause until the
+    loop catches up), so subscriptions of any size can be processed in constant
+    memory.
+
+    Example:
+        for host in iter_hld(auth, chunk_size=1000, threads=5):
+            ...
+
+    Params:
+        auth (BasicAuth): The BasicAuth object containing the username and password.
+        chunk_size (int): The size of each chunk. Defaults to 3000.
+        threads (int): The number of threads to use. Defaults to 5.
+        page_count (Union[int, "all"]): The number of pages to retrieve. Defaults to "all".
+        chunk_count (Union[int, "all"]): The number of chunks to retrieve. Defaults to "all".
+        deadline (float): Optional number of seconds the whole pull may take. Once it passes, outstanding work is cancelled and DeadlineExceeded is raised after the hosts pulled so far are yielded.
+        parse_processes (int): Optional number of worker processes to parse pages in, leaving the threads to download. See ParsePool. Defaults to 0 (parse in the threads).
+        lazy (bool): Whether to yield LazyVMDRHost views instead of VMDRHost objects. Defaults to False.
+        queue_size (int): The number of parsed pages that may wait to be yielded. Defaults to 10.
+        adaptive (bool): Whether to size chunks as the pull goes instead of cutting fixed chunks of chunk_size IDs: chunks shrink as the IDs run out, threads with nothing left take part of the IDs of chunks still being pulled, and truncation_limit (unless passed) is tuned so pages take about the same time. See ChunkScheduler. Defaults to False.
+        autotune (bool): Whether to tune how many of the threads make requests at once as the pull goes, from the requests' throughput and latency, backing off on 409/429 responses and the concurrency limit headers. threads is then the most that may. See ConcurrencyController. Defaults to False.
+        **kwargs: Additional keyword arguments to pass to the API. Accepts the same kwargs as get_hld.
+
+    Yields:
+        VMDRHost: VMDRHost objects, with their DETECTIONS attribute populated.
+    """
+    yield from iter_pull(
+        auth,
+        "get_hld",
+        chunk_size,
+        threads,
+        page_count,
+        chunk_count,
+        deadline,
+        parse_processes,
+        lazy,
+        queue_size,
+        kwargs,
+        adaptive,
+        autotune,
+    )
+
+
+def iter_cve_hld(
+    auth: BasicAuth,
+    chunk_size: int = 3000,
+    threads: int = 5,
+    page_count: Union[int, "all"] = "all",
+    chunk_count: Union[int, "all"] = "all",
+    deadline: float = None,
+    parse_processes: int = 0,
+    lazy: bool = False,
+    queue_size: int = 10,
+    adaptive: bool = False,
+    autotune: bool = False,
+    **kwargs,
+) -> Iterator[VMDRHost]:
+    """
+    Generator version of get_cve_hld. Pulls with the same threads, but yields each host
+    as soon as its page is parsed instead of returning them all at the end. At
+    most queue_size parsed pages wait to be yielded (the threads pause until the
+    loop catches up), so subscriptions of any size can be processed in constant
+    memory.
+
+    Example:
+        for host in iter_cve_hld(auth, chunk_size=1000, threads=5):
+            ...
+
+    Params:
+        auth (BasicAuth): The BasicAuth object containing the username and password.
+        chunk_size (int): The size of each chunk. Defaults to 3000.
+        threads (int): The number of threads to use. Defaults to 5.
+        page_count (Union[int, "all"]): The number of pages to retrieve. Defaults to "all".
+        chunk_count (Union[int, "all"]): The number of chunks to retrieve. Defaults to "all".
+        deadline (float): Optional number of seconds the whole pull may take. Once it passes, outstanding work is cancelled and DeadlineExceeded is raised after the hosts pulled so far are yielded.
+        parse_processes (int): Optional number of worker processes to parse pages in, leaving the threads to download. See ParsePool. Defaults to 0 (parse in the threads).
+        lazy (bool): Whether to yield LazyVMDRHost views instead of VMDRHost objects. Defaults to False.
+        queue_size (int): The number of parsed pages that may wait to be yielded. Defaults to 10.
+        adaptive (bool): Whether to size chunks as the pull goes instead of cutting fixed chunks of chunk_size IDs: chunks shrink as the IDs run out, threads with nothing left take part of the IDs of chunks still being pulled, and truncation_limit (unless passed) is tuned so pages take about the same time. See ChunkScheduler. Defaults to False.
+        autotune (bool): Whether to tune how many of the threads make requests at once as the pull goes, from the requests' throughput and latency, backing off on 409/429 responses and the concurrency limit headers. threads is then the most that may. See ConcurrencyController. Defaults to False.
+        **kwargs: Additional keyword arguments to pass to the API. Accepts the same kwargs as get_cve_hld.
+
+    Yields:
+        VMDRHost: VMDRHost objects, with their DETECTIONS attribute populated.
+    """
+    yield from iter_pull(
+        auth,
+        "get_cve_hld",
+        chunk_size,
+        threads,
+        page_count,
+        chunk_count,
+        deadline,
+        parse_processes,
+        lazy,
+        queue_size,
+        kwargs,
+        adaptive,
+        autotune,
+    )
+
+
+async def get_hld_async(
+    auth: BasicAuth,
+    chunk_size: int = 3000,
+    concurrency: int = 5,
+    page_count: Union[int, "all"] = "all",
+    chunk_count: Union[int, "all"] = "all",
+    **kwargs,
+) -> AsyncIterator[VMDRHost]:
+    """
+    asyncio version of get_hld. Pulls chunks of hosts concurrently on one event loop
+    and yields each host as soon as its page is parsed. Requires httpx.
+
+    Example:
+        async for host in get_hld_async(auth, chunk_size=1000, concurrency=5):
+            ...
+
+    Params:
+        auth (BasicAuth): The BasicAuth object containing the username and password.
+        chunk_size (int): The size of each chunk. Defaults to 3000.
+        concurrency (int): The number of chunks to pull at once. Defaults to 5.
+        page_count (Union[int, "all"]): The number of pages to retrieve per chunk. Defaults to "all".
+        chunk_count (Union[int, "all"]): The number of chunks each concurrent task pulls. Defaults to "all".
+        **kwargs: Additional keyword arguments to pass to the API. Accepts the same kwargs as get_hld.
+
+    Yields:
+        VMDRHost: VMDRHost objects, with their DETECTIONS attribute populated.
+    """
+    async for host in pull_chunks_async(
+        auth,
+        "get_hld",
+        chunk_size=chunk_size,
+        concurrency=concurrency,
+        page_count=page_count,
+        chunk_count=chunk_count,
+        **kwargs,
+    ):
+        yield host
+
+
+async def get_cve_hld_async(
+    auth: BasicAuth,
+    chunk_size: int = 3000,
+    concurrency: int = 5,
+    page_count: Union[int, "all"] = "all",
+    chunk_count: Union[int, "all"] = "all",
+    **kwargs,
+) -> AsyncIterator[VMDRHost]:
+    """
+    asyncio version of get_cve_hld. Pulls chunks of hosts concurrently on one event loop
+    and yields each host as soon as its page is parsed. Requires httpx.
+
+    Example:
+        async for host in get_cve_hld_async(auth, chunk_size=1000, concurrency=5):
+            ...
+
+    Params:
+        auth (BasicAuth): The BasicAuth object containing the username and password.
+        chunk_size (int): The size of each chunk. Defaults to 3000.
+        concurrency (int): The number of chunks to pull at once. Defaults to 5.
+        page_count (Union[int, "all"]): The number of pages to retrieve per chunk. Defaults to "all".
+        chunk_count (Union[int, "all"]): The number of chunks each concurrent task pulls. Defaults to "all".
+        **kwargs: Additional keyword arguments to pass to the API. Accepts the same kwargs as get_cve_hld.
+
+    Yields:
+        VMDRHost: VMDRHost objects, with their DETECTIONS attribute populated.
+    """
+    async for host in pull_chunks_async(
+        auth,
+        "get_cve_hld",
+        chunk_size=chunk_size,
+        concurrency=concurrency,
+        page_count=page_count,
+        chunk_count=chunk_count,
+        **kwargs,
+    ):
+        yield host
@@ -46,7 +46,7 @@ def get_ip_list(auth: BasicAuth, **kwargs) -> BaseList:
     )
 
     if response.status_code == 200:
-        data = xml_parser(response.text)["IP_LIST_OUTPUT"]
+        data = xml_parser(response.content)["IP_LIST_OUTPUT"]
 
         if "IP_SET" not in data["RESPONSE"]:
             print("No IP addresses found. Returning empty BaseList.")
@@ -150,7 +150,7 @@ def add_ips(
         headers={"X-Requested-With": "qualysdk SDK"},
     )
 
-    result = xml_parser(response.text)["SIMPLE_RETURN"]["RESPONSE"]["TEXT"]
+    result = xml_parser(response.content)["SIMPLE_RETURN"]["RESPONSE"]["TEXT"]
 
     print(result)
 
@@ -199,6 +199,6 @@ def update_ips(auth: BasicAuth, ips: Union[str, BaseList], **kwargs) -> None:
         headers={"X-Requested-With": "qualysdk SDK"},
     )
 
-    result = xml_parser(response.text)["SIMPLE_RETURN"]["RESPONSE"]["TEXT"]
+    result = xml_parser(response.content)["SIMPLE_RETURN"]["RESPONSE"]["TEXT"]
 
     print(result)
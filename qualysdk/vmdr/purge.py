@@ -64,7 +64,7 @@ def purge_hosts(
         params=kwargs,
     )
 
-    data = xml_parser(result.text)
+    data = xml_parser(result.content)
 
     if isinstance(data["BATCH_RETURN"]["RESPONSE"]["BATCH_LIST"].get("BATCH"), list):
         return str(data["BATCH_RETURN"]["RESPONSE"]["BATCH_LIST"]["BATCH"])
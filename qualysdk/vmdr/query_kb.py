@@ -6,17 +6,147 @@ This function is used to query the Qualys KnowledgeBase (KB), which is a databas
 
 from typing import overload, Union
 from urllib.parse import parse_qs, urlparse
-
-from .data_classes.kb_entry import KBEntry
+from datetime import datetime
+from warnings import catch_warnings, simplefilter
+
+from bs4 import BeautifulSoup
+
+from .data_classes.kb_entry import KBEntry, LazyKBEntry
+from .data_classes.bugtraq import Bugtraq
+from .data_classes.software import Software
+from .data_classes.vendor_reference import VendorReference
+from .data_classes.cve import CVEID
+from .data_classes.threat_intel import ThreatIntel
+from .data_classes.compliance import Compliance
 from .data_classes.qvs import KBQVS
 from ..base.base_list import BaseList
 from ..base.call_api import call_api
 from ..auth.token import BasicAuth
-from ..base.xml_parser import xml_parser
+from ..base.xml_parser import xml_parser, XMLSpec, element_to_dict
+from ..base.xml_decoder import XMLDecoder, DecodeError, leaf_record, records
+from ..base.parse_pool import ParsePool
 from ..exceptions.Exceptions import QualysAPIError
 
+# VULN is always a list, as are the repeated elements of each VULN that KBEntry
+# turns into BaseLists, even when the page has only one of them:
+VULN_SPEC = XMLSpec(
+    lists=(
+        "BUGTRAQ_LIST/BUGTRAQ",
+        "SOFTWARE_LIST/SOFTWARE",
+        "VENDOR_REFERENCE_LIST/VENDOR_REFERENCE",
+        "CVE_LIST/CVE",
+        "THREAT_INTELLIGENCE/THREAT_INTEL",
+        "COMPLIANCE_LIST/COMPLIANCE",
+    )
+)
+
+
+def _kb_html(value: str) -> str:
+    # As KBEntry.__post_init__ converts DIAGNOSIS, CONSEQUENCE and SOLUTION. Text
+    # with no markup or entities has no links to replace, and is returned as is:
+    if "<" not in value and "&" not in value:
+        return value
+    with catch_warnings():
+        simplefilter("ignore")  # ignore the warning about the html.parser
+        soup = BeautifulSoup(value, "html.parser")
+        for a_tag in soup.find_all("a"):
+            if a_tag.has_attr("href"):
+                a_tag.replace_with(a_tag["href"])
+        return soup.get_text()
+
+
+def _threat_intel(element) -> ThreatIntel:
+    # <THREAT_INTEL id="4"><![CDATA[Easy_Exploit]]></THREAT_INTEL>
+    intel_id = element.get("id")
+    text = (element.text or "").strip()
+    if intel_id is None or not text or len(element) or len(element.attrib) > 1:
+        raise DecodeError(element.tag)
+    return ThreatIntel(ID=int(intel_id), TEXT=text)
+
+
+# Builds KBEntries straight from VULN elements (see base/xml_decoder.py). The
+# dict-shaped fields are kept as xml_parser converts them:
+VULN_DECODER = XMLDecoder(
+    KBEntry,
+    convert={
+        "QID": int,
+        "SEVERITY_LEVEL": int,
+        "LAST_SERVICE_MODIFICATION_DATETIME": datetime.fromisoformat,
+        "PUBLISHED_DATETIME": datetime.fromisoformat,
+        "CODE_MODIFIED_DATETIME": datetime.fromisoformat,
+        "PATCH_PUBLISHED_DATE": datetime.fromisoformat,
+        "PATCHABLE": bool,
+        "PCI_FLAG": bool,
+        "IS_DISABLED": bool,
+        "DIAGNOSIS": _kb_html,
+        "CONSEQUENCE": _kb_html,
+        "SOLUTION": _kb_html,
+    },
+    nested={
+        "BUGTRAQ_LIST": records("BUGTRAQ", leaf_record(Bugtraq)),
+        "SOFTWARE_LIST": records("SOFTWARE", leaf_record(Software)),
+        "VENDOR_REFERENCE_LIST": records(
+            "VENDOR_REFERENCE", leaf_record(VendorReference)
+        ),
+        "CVE_LIST": records("CVE", leaf_record(CVEID)),
+        "THREAT_INTELLIGENCE": records("THREAT_INTEL", _threat_intel),
+        "COMPLIANCE_LIST": records(
+            "COMPLIANCE", leaf_record(Compliance, rename={"TYPE": "_TYPE"})
+        ),
+        "CORRELATION": element_to_dict,
+        "CVSS": element_to_dict,
+        "CVSS_V3": element_to_dict,
+        "PCI_REASONS": element_to_dict,
+        "DISCOVERY": element_to_dict,
+        "CHANGE_LOG": element_to_dict,
+    },
+    post_init=("LAST_CUSTOMIZATION",),
+    spec=VULN_SPEC,
+)
+
+# KB_SPEC converts VULNs to dicts (for LazyKBEntry), and DECODE_KB_SPEC builds
+# them with VULN_DECODER:
+KB_SPEC = XMLSpec(
+    lists=("KNOWLEDGE_BASE_VULN_LIST_OUTPUT/RESPONSE/VULN_LIST/VULN",),
+    nested={"KNOWLEDGE_BASE_VULN_LIST_OUTPUT/RESPONSE/VULN_LIST/VULN": VULN_SPEC},
+)
+DECODE_KB_SPEC = XMLSpec(
+    lists=("KNOWLEDGE_BASE_VULN_LIST_OUTPUT/RESPONSE/VULN_LIST/VULN",),
+    decode={"KNOWLEDGE_BASE_VULN_LIST_OUTPUT/RESPONSE/VULN_LIST/VULN": VULN_DECODER},
+)
+
+
+def _parse_kb_page(
+    content: bytes, lazy: bool = False
+) -> tuple[Union[BaseList[KBEntry], None], Union[str, None]]:
+    """
+    Parse one page of KB XML.
+
+    Params:
+        content (bytes): The raw XML of the page.
+        lazy (bool): Whether to return LazyKBEntry views instead of KBEntry objects.
+
+    Returns:
+        tuple: The entries on the page (None if the page had no VULN_LIST), and the URL of the next page, if any.
+    """
+    response_node = xml_parser(content, spec=KB_SPEC if lazy else DECODE_KB_SPEC)[
+        "KNOWLEDGE_BASE_VULN_LIST_OUTPUT"
+    ]["RESPONSE"]
+
+    if "VULN_LIST" not in response_node:
+        return None, None
+
+    entries = BaseList()
+    for e in response_node["VULN_LIST"]["VULN"]:
+        # Already built by VULN_DECODER unless lazy:
+        entries.append(LazyKBEntry(e) if lazy else e)
+
+    return entries, response_node.get("WARNING", {}).get("URL")
 
-def query_kb(auth: BasicAuth, **kwargs) -> BaseList[KBEntry]:
+
+def query_kb(
+    auth: BasicAuth, parse_processes: int = 0, lazy: bool = False, **kwargs
+) -> BaseList[KBEntry]:
     """
     Query the Qualys KnowledgeBase (KB) for vulnerabilities matching the kiven kwargs.
 
@@ -27,6 +157,8 @@ def query_kb(auth: BasicAuth, **kwargs) -> BaseList[KBEntry]:
 
     Params:
         auth (BasicAuth) The authentication object.
+        parse_processes (int) Optional number of worker processes to parse pages in. See ParsePool. Defaults to 0 (parse in this thread).
+        lazy (bool) Whether to return LazyKBEntry views, which convert each field when it is first read, instead of KBEntry objects. Call materialize() on a view to get its KBEntry. Defaults to False.
 
     ## Kwargs:
 
@@ -69,52 +201,36 @@ def query_kb(auth: BasicAuth, **kwargs) -> BaseList[KBEntry]:
         if isinstance(value, bool):
             kwargs[key] = 1 if value else 0
 
-    while True:
-        # make the request:
-        response = call_api(
-            auth=auth,
-            module="vmdr",
-            endpoint="query_kb",
-            params=kwargs,
-            headers={"X-Requested-With": "qualysdk SDK"},
-        )
-        if response.status_code != 200:
-            raise Exception(f"Error: {response.status_code} - {response.text}")
-
-        xml = xml_parser(response.text)
-
-        # check if there is no vuln list
-        if "VULN_LIST" not in xml["KNOWLEDGE_BASE_VULN_LIST_OUTPUT"]["RESPONSE"]:
-            break
-
-        for e in xml["KNOWLEDGE_BASE_VULN_LIST_OUTPUT"]["RESPONSE"]["VULN_LIST"][
-            "VULN"
-        ]:
-            responses.append(KBEntry.from_dict(e))  # append entry
-
-        pulled += 1
-        print(f"Page {pulled} complete.")
-        # KB API normally does not paginate, but if it does
-        if "WARNING" in xml["KNOWLEDGE_BASE_VULN_LIST_OUTPUT"]["RESPONSE"]:
-            if "URL" in xml["KNOWLEDGE_BASE_VULN_LIST_OUTPUT"]["RESPONSE"]["WARNING"]:
-                print(
-                    f"Pagination detected. Pulling next page from url: {xml['KNOWLEDGE_BASE_VULN_LIST_OUTPUT']['RESPONSE']['WARNING']['URL']}"
-                )
-                # parse the url to get the query params
-                ps = parse_qs(
-                    urlparse(
-                        xml["KNOWLEDGE_BASE_VULN_LIST_OUTPUT"]["RESPONSE"]["WARNING"][
-                            "URL"
-                        ]
-                    ).query
-                )
-                # update the kwargs with the new params
-                kwargs.update(ps)
+    with ParsePool(parse_processes) as parse_pool:
+        while True:
+            # make the request:
+            response = call_api(
+                auth=auth,
+                module="vmdr",
+                endpoint="query_kb",
+                params=kwargs,
+                headers={"X-Requested-With": "qualysdk SDK"},
+            )
+            if response.status_code != 200:
+                raise Exception(f"Error: {response.status_code} - {response.text}")
+
+            entries, next_url = parse_pool.parse(_parse_kb_page, response.content, lazy)
+
+            # check if there is no vuln list
+            if entries is None:
+                break
+
+            responses.extend(entries)
 
+            pulled += 1
+            print(f"Page {pulled} complete.")
+            # KB API normally does not paginate, but if it does
+            if next_url:
+                print(f"Pagination detected. Pulling next page from url: {next_url}")
+                # parse the url to get the query params, and update the kwargs with them
+                kwargs.update(parse_qs(urlparse(next_url).query))
             else:
                 break
-        else:
-            break
 
     return responses
 
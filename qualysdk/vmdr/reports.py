@@ -163,7 +163,7 @@ def get_report_list(auth: BasicAuth, **kwargs) -> BaseList[VMDRReport]:
 
     response = manage_reports(auth, action="list", **kwargs)
 
-    data = xml_parser(response.text)
+    data = xml_parser(response.content)
 
     reports = data["REPORT_LIST_OUTPUT"]["RESPONSE"]["REPORT_LIST"]["REPORT"]
 
@@ -197,7 +197,7 @@ def get_template_list(auth: BasicAuth) -> BaseList[ReportTemplate]:
         headers={"X-Requested-With": "qualysdk SDK"},
     )
 
-    data = xml_parser(response.text)
+    data = xml_parser(response.content)
 
     if "SIMPLE_RETURN" in data:
         raise QualysAPIError(data["SIMPLE_RETURN"]["RESPONSE"]["TEXT"])
@@ -258,7 +258,7 @@ def launch_report(auth: BasicAuth, template_id: str, **kwargs) -> int:
 
     response = manage_reports(auth, action="launch", **kwargs)
 
-    data = xml_parser(response.text)
+    data = xml_parser(response.content)
 
     try:
         return int(data["SIMPLE_RETURN"]["RESPONSE"]["ITEM_LIST"]["ITEM"]["VALUE"])
@@ -280,7 +280,7 @@ def cancel_report(auth: BasicAuth, id: Union[int, str]) -> str:
 
     response = manage_reports(auth, action="cancel", id=id)
 
-    data = xml_parser(response.text)
+    data = xml_parser(response.content)
 
     return data["SIMPLE_RETURN"]["RESPONSE"]["TEXT"]
 
@@ -342,7 +342,7 @@ def fetch_report(
 
         case "xml":
             print("Detected XML format. Returning DataFrame.")
-            data = DataFrame.from_dict(xml_parser(response.text))
+            data = DataFrame.from_dict(xml_parser(response.content))
             return_data = True
 
         case _:
@@ -378,7 +378,7 @@ def delete_report(auth: BasicAuth, id: Union[int, str]) -> str:
 
     response = manage_reports(auth, action="delete", id=id)
 
-    data = xml_parser(response.text)
+    data = xml_parser(response.content)
 
     return data["SIMPLE_RETURN"]["RESPONSE"]["TEXT"]
 
@@ -400,7 +400,7 @@ def get_scheduled_report_list(auth: BasicAuth, **kwargs) -> BaseList[VMDRReport]
 
     response = manage_scheduled_reports(auth, action="list", **kwargs)
 
-    data = xml_parser(response.text)
+    data = xml_parser(response.content)
 
     bl = BaseList()
 
@@ -434,6 +434,6 @@ def launch_scheduled_report(auth: BasicAuth, id: str) -> str:
 
     response = manage_scheduled_reports(auth, action="launch_now", id=id)
 
-    data = xml_parser(response.text)
+    data = xml_parser(response.content)
 
     return data["SIMPLE_RETURN"]["RESPONSE"]["TEXT"]
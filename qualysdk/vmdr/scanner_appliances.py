@@ -52,7 +52,7 @@ def get_scanner_list(auth: BasicAuth, **kwargs) -> BaseList[ScannerAppliance]:
         headers={"X-Requested-With": "qualysdk SDK"},
     )
 
-    data = xml_parser(resp.text)["APPLIANCE_LIST_OUTPUT"]["RESPONSE"]
+    data = xml_parser(resp.content)["APPLIANCE_LIST_OUTPUT"]["RESPONSE"]
 
     if "APPLIANCE_LIST" not in data.keys():
         print("No data in response")
@@ -39,7 +39,7 @@ def get_static_searchlists(
         headers={"X-Requested-With": "qualysdk SDK"},
     )
 
-    searchlists = xml_parser(resp.text)
+    searchlists = xml_parser(resp.content)
 
     if "STATIC_LISTS" not in searchlists["STATIC_SEARCH_LIST_OUTPUT"]["RESPONSE"]:
         print("No Static Searchlists found.")
@@ -106,7 +106,7 @@ def get_dynamic_searchlists(
         headers={"X-Requested-With": "qualysdk SDK"},
     )
 
-    searchlists = xml_parser(resp.text)
+    searchlists = xml_parser(resp.content)
 
     if "DYNAMIC_LISTS" not in searchlists["DYNAMIC_SEARCH_LIST_OUTPUT"]["RESPONSE"]:
         print("No Dynamic Searchlists found.")
@@ -39,7 +39,7 @@ def get_user_list(auth: BasicAuth, **kwargs) -> BaseList[User]:
     if response.status_code != 200:
         raise QualysAPIError(response.text)
 
-    user_list = xml_parser(response.text)
+    user_list = xml_parser(response.content)
 
     if "ERROR" in user_list["USER_LIST_OUTPUT"].keys():
         raise QualysAPIError(user_list["USER_LIST_OUTPUT"]["ERROR"]["#text"])
@@ -135,7 +135,7 @@ def add_user(
     if response.status_code != 200:
         raise QualysAPIError(response.text)
 
-    result = xml_parser(response.text)
+    result = xml_parser(response.content)
 
     if result["USER_OUTPUT"]["RETURN"]["@status"] == "FAILED":
         raise QualysAPIError(result["USER_OUTPUT"]["RETURN"]["MESSAGE"])
@@ -190,7 +190,7 @@ def edit_user(auth: BasicAuth, login: str, **kwargs) -> str:
     if response.status_code != 200:
         raise QualysAPIError(response.text)
 
-    result = xml_parser(response.text)
+    result = xml_parser(response.content)
 
     if result["USER_OUTPUT"]["RETURN"]["@status"] == "FAILED":
         raise QualysAPIError(result["USER_OUTPUT"]["RETURN"]["MESSAGE"])
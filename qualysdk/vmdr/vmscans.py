@@ -72,7 +72,7 @@ def get_scan_list(auth: BasicAuth, **kwargs) -> BaseList[VMScan]:
     )
 
     # Parse the response:
-    result = xml_parser(response.text)
+    result = xml_parser(response.content)
 
     # Check for empty results:
     if not result:
@@ -174,7 +174,7 @@ def launch_scan(auth: BasicAuth, **kwargs) -> VMScan:
     )
 
     # Parse the response:
-    result = xml_parser(response.text)
+    result = xml_parser(response.content)
 
     # Check for empty results:
     if not result:
@@ -269,7 +269,7 @@ def manage_scan(
 
     # Special case for fetch.
     if action != "fetch":
-        result = xml_parser(response.text)
+        result = xml_parser(response.content)
 
         # Check for empty results:
         if not result:
@@ -291,7 +291,7 @@ def manage_scan(
             "text/html; charset=UTF-8",
         ]:
             raise QualysAPIError(
-                xml_parser(response.text)["SIMPLE_RETURN"]["RESPONSE"]["TEXT"]
+                xml_parser(response.content)["SIMPLE_RETURN"]["RESPONSE"]["TEXT"]
             )
 
         # Parse the JSON response:
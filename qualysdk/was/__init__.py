@@ -26,6 +26,7 @@ from .authentication_records import (
 from .findings import (
     count_findings,
     get_findings,
+    get_findings_async,
     get_finding_details,
     get_findings_verbose,
 )
@@ -270,7 +270,7 @@ def get_authentication_record_details(
 
 
 def get_authentication_records_verbose(
-    auth: BasicAuth, thread_count: int = 5, **kwargs
+    auth: BasicAuth, thread_count: int = 5, autotune: bool = False, **kwargs
 ) -> BaseList[WebAppAuthRecord]:
     """
     Uses ```was.get_authentication_records()``` and ```was.get_authentication_record_details()``` to return a ```BaseList``` of ```WebAppAuthRecord```s with
@@ -286,6 +286,7 @@ def get_authentication_records_verbose(
     Args:
         auth (BasicAuth): The authentication object.
         thread_count (int): The number of threads to spawn. Defaults to 5.
+        autotune (bool): Whether to tune how many of the threads pull details at once as the pull goes, from the requests' throughput and latency, backing off on 409/429 responses and the concurrency limit headers. thread_count is then the most that may. See ConcurrencyController. Defaults to False.
 
     ## Kwargs:
 
@@ -323,6 +324,8 @@ def get_authentication_records_verbose(
     # Set up Queue and List, with some cheeky as-needed imports:
     from queue import Queue
     from threading import Thread, Lock, current_thread
+    from contextlib import nullcontext
+    from ..base.concurrency import ConcurrencyController, concurrency_slot
 
     q = Queue()
     authList = BaseList()
@@ -362,7 +365,8 @@ def get_authentication_records_verbose(
                         q.task_done()
                     break
 
-                details = get_authentication_record_details(auth, authrecord.id)
+                with concurrency_slot(concurrency):
+                    details = get_authentication_record_details(auth, authrecord.id)
                 authList.append(details)
                 q.task_done()
                 with LOCK:
@@ -379,16 +383,25 @@ def get_authentication_records_verbose(
                 q.task_done()
                 break
 
-    # Start the threads:
-    for i in range(thread_count):
-        t = Thread(target=worker)
-        threads.append(t)
-        t.start()
+    concurrency = (
+        ConcurrencyController(thread_count, [("was", "call_auth_api")])
+        if autotune
+        else None
+    )
+
+    with concurrency.watching(auth.hooks) if concurrency else nullcontext():
+        # Start the threads:
+        for i in range(thread_count):
+            t = Thread(target=worker)
+            threads.append(t)
+            t.start()
 
-    # Wait for the threads to finish:
-    for t in threads:
-        t.join()
+        # Wait for the threads to finish:
+        for t in threads:
+            t.join()
 
+    if concurrency:
+        print(f"Concurrency: {concurrency.summary()}")
     print(f"Pulled {len(authList)} auth record details.")
     return authList
 
@@ -9,7 +9,7 @@ from re import compile
 import xmltodict
 from requests import Response
 
-from ...base.xml_parser import xml_parser
+from ...base.xml_parser import xml_parser, XMLSpec
 from ...exceptions.Exceptions import QualysAPIError
 
 
@@ -125,18 +125,19 @@ def format_xml_list(items: List[Any], tag: str) -> str:
         return "".join(f"\n<{tag}>{item}</{tag}>" for item in items)
 
 
-def validate_response(response: Response) -> dict:
+def validate_response(response: Response, spec: XMLSpec = None) -> dict:
     """
     Parse the XML response from the Qualys API
     and check for errors.
 
     Args:
         response (Response): The response object from the API call.
+        spec (XMLSpec): Optional. Which elements of the response are always lists. See xml_parser.
 
     Returns:
         dict: The parsed XML response.
     """
-    parsed = xml_parser(response.text)
+    parsed = xml_parser(response.content, spec=spec)
 
     if response.status_code != 200:
         errorMessage = parsed.get("ServiceResponse").get("responseErrorDetails")
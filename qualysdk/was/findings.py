@@ -2,16 +2,62 @@
 Work with Qualys WAS findings
 """
 
-from typing import Union
+from typing import Union, AsyncIterator
 
 from .data_classes.Finding import WASFinding
 from .base.parse_kwargs import validate_kwargs
 from .base.web_app_service_requests import build_service_request
 from ..auth.basic import BasicAuth
 from ..base.call_api import call_api
+from ..base.call_api_async import call_api_async
 from .base.web_app_service_requests import validate_response
 from ..exceptions.Exceptions import QualysAPIError
 from ..base.base_list import BaseList
+from ..base.xml_parser import XMLSpec
+
+# The repeated elements of a Finding, which WASFinding turns into BaseLists.
+# payloads/list/PayloadInstance is left alone: FindingItem tells a single
+# PayloadInstance with a request apart from a list of them.
+FINDING_SPEC = XMLSpec(
+    lists=(
+        "cwe/list/long",
+        "owasp/list/OWASP",
+        "wasc/list/WASC",
+        "resultList/list/Result",
+        "resultList/list/Result/accessPath/list/Url",
+        "history/set/WebAppFindingHistory",
+        "sslData/sslDataInfoList/list/SSLDataInfo",
+        "sslData/sslDataInfoList/list/SSLDataInfo/sslDataCipherList/list/SSLDataCipher",
+        "sslData/sslDataInfoList/list/SSLDataInfo/sslDataKexList/list/SSLDataKex",
+        "sslData/sslDataInfoList/list/SSLDataInfo/sslDataPropList/list/SSLDataProp",
+    )
+)
+SPECS = {
+    # get_findings returns a list of Findings:
+    "get_findings": XMLSpec(
+        lists=("ServiceResponse/data/Finding",),
+        nested={"ServiceResponse/data/Finding": FINDING_SPEC},
+    ),
+    # get_finding_details returns a single one:
+    "get_finding_details": XMLSpec(
+        nested={"ServiceResponse/data/Finding": FINDING_SPEC}
+    ),
+}
+
+
+def _findings_api_params(endpoint: str, payload: dict) -> dict:
+    """
+    Build the URL placeholders for a call to the WAS findings API.
+    """
+    match endpoint:
+        case "count_findings":
+            return {"placeholder": "count", "findingId": ""}
+        case "get_findings":
+            return {"placeholder": "search", "findingId": ""}
+        case "get_finding_details":
+            return {"placeholder": "get", "findingId": payload.pop("findingId")}
+        case _:
+            raise ValueError("Invalid endpoint: {endpoint}")
 
 
 def call_findings_api(
@@ -29,15 +75,7 @@ def call_findings_api(
         Union[int, BaseList[WASFinding], WASFinding]: The response from the API
     """
 
-    match endpoint:
-        case "count_findings":
-            params = {"placeholder": "count", "findingId": ""}
-        case "get_findings":
-            params = {"placeholder": "search", "findingId": ""}
-        case "get_finding_details":
-            params = {"placeholder": "get", "findingId": payload.pop("findingId")}
-        case _:
-            raise ValueError("Invalid endpoint: {endpoint}")
+    params = _findings_api_params(endpoint, payload)
 
     response = call_api(
         auth=auth,
@@ -49,7 +87,37 @@ def call_findings_api(
         headers={"Content-Type": "text/xml"},
     )
 
-    return validate_response(response)
+    return validate_response(response, SPECS.get(endpoint))
+
+
+async def call_findings_api_async(
+    auth: BasicAuth, endpoint: str, payload: dict
+) -> dict:
+    """
+    asyncio version of call_findings_api. Requires httpx.
+
+    Args:
+        auth (BasicAuth): The authentication object
+        endpoint (str): The endpoint to call
+        payload (dict): The payload to send
+
+    Returns:
+        dict: The parsed response from the API
+    """
+
+    params = _findings_api_params(endpoint, payload)
+
+    response = await call_api_async(
+        auth=auth,
+        override_method="GET" if endpoint == "get_finding_details" else "POST",
+        module="was",
+        endpoint="call_findings_api",
+        payload=payload,
+        params=params,
+        headers={"Content-Type": "text/xml"},
+    )
+
+    return validate_response(response, SPECS.get(endpoint))
 
 
 def count_findings(auth: BasicAuth, **kwargs) -> int:
@@ -246,15 +314,7 @@ def get_findings(
             print(f"No findings found on page {pageNo}. Exiting.")
             break
 
-        data = serviceResponse.get("data")
-
-        if data.get("Finding"):
-            data = data.get("Finding")
-
-        if isinstance(data, dict):
-            data = [data]
-
-        for finding in data:
+        for finding in serviceResponse.get("data").get("Finding", []):
             # Create the objects:
             findingList.append(WASFinding.from_dict(finding))
 
@@ -281,6 +341,65 @@ def get_findings(
     return findingList
 
 
+async def get_findings_async(
+    auth: BasicAuth, page_count: Union[int, "all"] = "all", **kwargs
+) -> AsyncIterator[WASFinding]:
+    """
+    asyncio version of get_findings. Yields each WASFinding as soon
+    as its page is parsed. Requires httpx.
+
+    Args:
+        auth (BasicAuth): The authentication object
+        page_count (Union[int, "all"]): The number of pages to retrieve. Defaults to "all"
+        **kwargs: Accepts the same kwargs as get_findings
+
+    Yields:
+        WASFinding: WASFinding objects
+    """
+
+    if page_count != "all" and not (isinstance(page_count, int) or page_count < 0):
+        raise ValueError("page_count must be 'all' or a positive integer")
+
+    pageNo = 0
+    payload = None
+
+    # If kwargs are provided, validate them:
+    if kwargs:
+        kwargs = validate_kwargs(endpoint="get_findings", **kwargs)
+        payload = build_service_request(**kwargs)
+
+    while True:
+        parsed = await call_findings_api_async(auth, "get_findings", payload)
+
+        serviceResponse = parsed.get("ServiceResponse")
+        if not serviceResponse:
+            raise QualysAPIError("No ServiceResponse tag returned in the API response")
+
+        if serviceResponse.get("responseCode") != "SUCCESS":
+            raise QualysAPIError(
+                f"API response returned error: {serviceResponse.get('responseCode')}"
+            )
+
+        if serviceResponse.get("count") == "0":
+            break
+
+        for finding in serviceResponse.get("data").get("Finding", []):
+            yield WASFinding.from_dict(finding)
+
+        pageNo += 1
+
+        if page_count != "all" and pageNo >= page_count:
+            break
+
+        if serviceResponse.get("hasMoreRecords") != "true":
+            break
+
+        # <Criteria field="id" operator="GREATER">XXX</Criteria>
+        kwargs["id.operator"] = "GREATER"
+        kwargs["id"] = serviceResponse.get("lastId")
+        payload = build_service_request(**kwargs)
+
+
 def get_finding_details(auth: BasicAuth, findingId: Union[str, int]) -> WASFinding:
     """
     Pull all details of a single finding from Qualys WAS
@@ -319,7 +438,7 @@ def get_finding_details(auth: BasicAuth, findingId: Union[str, int]) -> WASFindi
 
 
 def get_findings_verbose(
-    auth: BasicAuth, thread_count: int = 5, **kwargs
+    auth: BasicAuth, thread_count: int = 5, autotune: bool = False, **kwargs
 ) -> BaseList[WASFinding]:
     """
     Uses ```was.get_findings()``` and ```was.get_finding_details()``` to return a ```BaseList``` of ```WASFinding```s with
@@ -335,6 +454,7 @@ def get_findings_verbose(
     Args:
         auth (BasicAuth): The authentication object.
         thread_count (int): The number of threads to spawn. Defaults to 5.
+        autotune (bool): Whether to tune how many of the threads pull details at once as the pull goes, from the requests' throughput and latency, backing off on 409/429 responses and the concurrency limit headers. thread_count is then the most that may. See ConcurrencyController. Defaults to False.
 
     ## Kwargs:
 
@@ -403,6 +523,8 @@ def get_findings_verbose(
     # Set up Queue and List, with some cheeky as-needed imports:
     from queue import Queue
     from threading import Thread, Lock, current_thread
+    from contextlib import nullcontext
+    from ..base.concurrency import ConcurrencyController, concurrency_slot
 
     q = Queue()
     findingList = BaseList()
@@ -442,7 +564,8 @@ def get_findings_verbose(
                         q.task_done()
                     break
 
-                details = get_finding_details(auth, finding.id)
+                with concurrency_slot(concurrency):
+                    details = get_finding_details(auth, finding.id)
                 findingList.append(details)
                 q.task_done()
                 with LOCK:
@@ -459,15 +582,24 @@ def get_findings_verbose(
                 q.task_done()
                 break
 
-    # Start the threads:
-    for i in range(thread_count):
-        t = Thread(target=worker)
-        threads.append(t)
-        t.start()
+    concurrency = (
+        ConcurrencyController(thread_count, [("was", "call_findings_api")])
+        if autotune
+        else None
+    )
+
+    with concurrency.watching(auth.hooks) if concurrency else nullcontext():
+        # Start the threads:
+        for i in range(thread_count):
+            t = Thread(target=worker)
+            threads.append(t)
+            t.start()
 
-    # Wait for the threads to finish:
-    for t in threads:
-        t.join()
+        # Wait for the threads to finish:
+        for t in threads:
+            t.join()
 
+    if concurrency:
+        print(f"Concurrency: {concurrency.summary()}")
     print(f"Pulled {len(findingList)} finding details.")
     return findingList
@@ -268,7 +268,7 @@ def get_webapp_details(
 
 
 def get_webapps_verbose(
-    auth: BasicAuth, thread_count: int = 5, **kwargs
+    auth: BasicAuth, thread_count: int = 5, autotune: bool = False, **kwargs
 ) -> BaseList[WebApp]:
     """
     Uses ```was.get_webapps()``` and ```was.get_webapp_details()``` to return a ```BaseList``` of ```WebApp```s with
@@ -284,6 +284,7 @@ def get_webapps_verbose(
     Args:
         auth (BasicAuth): The authentication object.
         thread_count (int): The number of threads to spawn. Defaults to 5.
+        autotune (bool): Whether to tune how many of the threads pull details at once as the pull goes, from the requests' throughput and latency, backing off on 409/429 responses and the concurrency limit headers. thread_count is then the most that may. See ConcurrencyController. Defaults to False.
 
     ## Kwargs:
 
@@ -321,6 +322,8 @@ def get_webapps_verbose(
     # Set up Queue and List, with some cheeky as-needed imports:
     from queue import Queue
     from threading import Thread, Lock, current_thread
+    from contextlib import nullcontext
+    from ..base.concurrency import ConcurrencyController, concurrency_slot
 
     q = Queue()
     appList = BaseList()
@@ -360,7 +363,8 @@ def get_webapps_verbose(
                         q.task_done()
                     break
 
-                details = get_webapp_details(auth, webapp.id)
+                with concurrency_slot(concurrency):
+                    details = get_webapp_details(auth, webapp.id)
                 appList.append(details)
                 q.task_done()
                 with LOCK:
@@ -377,16 +381,25 @@ def get_webapps_verbose(
                 q.task_done()
                 break
 
-    # Start the threads:
-    for i in range(thread_count):
-        t = Thread(target=worker)
-        threads.append(t)
-        t.start()
+    concurrency = (
+        ConcurrencyController(thread_count, [("was", "call_webapp_api")])
+        if autotune
+        else None
+    )
+
+    with concurrency.watching(auth.hooks) if concurrency else nullcontext():
+        # Start the threads:
+        for i in range(thread_count):
+            t = Thread(target=worker)
+            threads.append(t)
+            t.start()
 
-    # Wait for the threads to finish:
-    for t in threads:
-        t.join()
+        # Wait for the threads to finish:
+        for t in threads:
+            t.join()
 
+    if concurrency:
+        print(f"Concurrency: {concurrency.summary()}")
     print(f"Pulled {len(appList)} webapp details.")
     return appList
 
@@ -0,0 +1,234 @@
+from datetime import timedelta
+from json import loads
+from uuid import uuid4
+
+import pytest
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+from qualysdk import BasicAuth
+from qualysdk.base.call_api import call_api
+from qualysdk.base.session import Transport
+from qualysdk.base.transport import CachingTransport
+
+URL = "https://qualysapi.qg1.apps.qualys.com/api/2.0/fo/appliance/"
+BODY = b"<APPLIANCE_LIST_OUTPUT/>"
+RATE_LIMITS = {
+    "X-RateLimit-Limit": "300",
+    "X-RateLimit-Window-Sec": "3600",
+    "X-RateLimit-Remaining": "100",
+    "X-Concurrency-Limit-Limit": "2",
+}
+
+
+def make_response(status: int, body: bytes = b"", headers: dict = None) -> Response:
+    response = Response()
+    response.status_code = status
+    response.reason = "OK" if status == 200 else "Not Modified"
+    response.headers = CaseInsensitiveDict(headers or {})
+    response._content = body
+    response.encoding = "utf-8"
+    response.url = URL
+    response.elapsed = timedelta(seconds=0.01)
+    return response
+
+
+class FakeTransport(Transport):
+    """
+    Answers each request with the next of responses, and keeps the kwargs sent.
+    """
+
+    def __init__(self, *responses: Response):
+        self.responses = list(responses)
+        self.sent = []
+
+    def request(self, url_type, method, url, **kwargs):
+        self.sent.append(kwargs)
+        return self.responses.pop(0)
+
+
+def get(cache: CachingTransport) -> Response:
+    return cache.request("api", "GET", URL, params={"action": "list"})
+
+
+def test_etag_revalidated_with_304(tmp_path):
+    inner = FakeTransport(
+        make_response(200, BODY, {"ETag": '"v1"'}),
+        make_response(304, headers={"ETag": '"v1"'}),
+    )
+    cache = CachingTransport(tmp_path, transport=inner)
+
+    first = get(cache)
+    second = get(cache)
+
+    assert not getattr(first, "from_cache", False)
+    assert inner.sent[1]["headers"]["If-None-Match"] == '"v1"'
+    assert second.from_cache and second.revalidated
+    assert second.status_code == 200 and second.content == BODY
+    assert cache.stats["misses"] == 1 and cache.stats["revalidated"] == 1
+
+
+def test_ttl_hit_sends_no_request(tmp_path):
+    inner = FakeTransport(make_response(200, BODY))
+    cache = CachingTransport(tmp_path, ttl=3600, transport=inner)
+
+    get(cache)
+    second = get(cache)
+
+    assert len(inner.sent) == 1
+    assert second.from_cache and not second.revalidated
+    assert second.content == BODY
+    assert cache.stats == {
+        "hits": 1,
+        "misses": 1,
+        "revalidated": 0,
+        "bytes_saved": len(BODY),
+    }
+
+
+def test_expired_entry_fetched_again(tmp_path):
+    inner = FakeTransport(make_response(200, BODY), make_response(200, b"<NEW/>"))
+    cache = CachingTransport(tmp_path, ttl=0, transport=inner)
+
+    get(cache)
+    second = get(cache)
+
+    assert len(inner.sent) == 2
+    assert second.content == b"<NEW/>"
+
+
+def test_rate_limit_headers_not_cached(tmp_path):
+    inner = FakeTransport(make_response(200, BODY, RATE_LIMITS))
+    cache = CachingTransport(tmp_path, transport=inner)
+
+    get(cache)
+    hit = get(cache)
+
+    (meta,) = tmp_path.glob("*.json")
+    assert not any(
+        k.lower().startswith("x-") for k in loads(meta.read_text())["headers"]
+    )
+    assert "X-RateLimit-Remaining" not in hit.headers
+
+
+def test_304_headers_merged(tmp_path):
+    inner = FakeTransport(
+        make_response(200, BODY, {"ETag": '"v1"', **RATE_LIMITS}),
+        make_response(
+            304,
+            headers={
+                "ETag": '"v1"',
+                "X-RateLimit-Remaining": "42",
+                "Content-Length": "0",
+            },
+        ),
+    )
+    cache = CachingTransport(tmp_path, transport=inner)
+
+    get(cache)
+    revalidated = get(cache)
+
+    assert revalidated.headers["X-RateLimit-Remaining"] == "42"
+    assert "X-RateLimit-Limit" not in revalidated.headers
+    assert "Content-Length" not in revalidated.headers
+
+
+@pytest.mark.parametrize("etag", [False, True], ids=["ttl hit", "304"])
+def test_call_api_cache_hits_and_rate_limiter(tmp_path, etag):
+    headers = {"ETag": '"v1"', **RATE_LIMITS} if etag else RATE_LIMITS
+    inner = FakeTransport(
+        make_response(200, BODY, headers),
+        make_response(304, headers={"X-RateLimit-Remaining": "42"}),
+    )
+    cache = CachingTransport(tmp_path, transport=inner)
+    auth = BasicAuth(f"user-{uuid4()}", "password", platform="qg1", transport=cache)
+    bucket = auth.rate_limiter.bucket("vmdr", "get_scanner_list")
+
+    call_api(auth, "vmdr", "get_scanner_list", params={"action": "list"})
+    assert bucket.tokens == 100
+    assert auth.retry_policy.stats["vmdr.get_scanner_list"]["calls"] == 1
+
+    response = call_api(auth, "vmdr", "get_scanner_list", params={"action": "list"})
+
+    assert response.content == BODY
+    if etag:
+        # The 304 was a request, and its headers are learned:
+        assert bucket.tokens == 42
+        assert auth.retry_policy.stats["vmdr.get_scanner_list"]["calls"] == 2
+    else:
+        # No request was sent, so no token is used and nothing is counted:
+        assert bucket.tokens == pytest.approx(100, abs=0.01)
+        assert auth.retry_policy.stats["vmdr.get_scanner_list"]["calls"] == 1
+
+
+def test_last_modified_revalidated(tmp_path):
+    modified = "Wed, 21 Oct 2026 07:28:00 GMT"
+    inner = FakeTransport(
+        make_response(200, BODY, {"Last-Modified": modified}),
+        make_response(304),
+    )
+    cache = CachingTransport(tmp_path, transport=inner)
+
+    get(cache)
+    second = get(cache)
+
+    assert inner.sent[1]["headers"]["If-Modified-Since"] == modified
+    assert second.revalidated and second.content == BODY
+
+
+def test_changed_entry_replaced(tmp_path):
+    inner = FakeTransport(
+        make_response(200, BODY, {"ETag": '"v1"'}),
+        make_response(200, b"<NEW/>", {"ETag": '"v2"'}),
+        make_response(304),
+    )
+    cache = CachingTransport(tmp_path, transport=inner)
+
+    get(cache)
+    changed = get(cache)
+    third = get(cache)
+
+    assert not getattr(changed, "from_cache", False) and changed.content == b"<NEW/>"
+    assert inner.sent[2]["headers"]["If-None-Match"] == '"v2"'
+    assert third.content == b"<NEW/>"
+
+
+@pytest.mark.parametrize(
+    "method, url",
+    [
+        ("POST", URL),
+        ("GET", "https://qualysapi.qg1.apps.qualys.com/api/2.0/fo/scan/"),
+    ],
+    ids=["not GET", "not cached endpoint"],
+)
+def test_other_requests_pass_through(tmp_path, method, url):
+    inner = FakeTransport(make_response(200, BODY), make_response(200, BODY))
+    cache = CachingTransport(tmp_path, ttl=3600, transport=inner)
+
+    for _ in range(2):
+        cache.request("api", method, url, params={"action": "list"})
+
+    assert len(inner.sent) == 2
+    assert not list(tmp_path.iterdir())
+
+
+def test_entries_are_per_user(tmp_path):
+    inner = FakeTransport(make_response(200, BODY), make_response(200, BODY))
+    cache = CachingTransport(tmp_path, ttl=3600, transport=inner)
+
+    for user in ("alice", "bob"):
+        cache.request("api", "GET", URL, auth=(user, "password"))
+
+    assert len(inner.sent) == 2
+
+
+def test_clear(tmp_path):
+    inner = FakeTransport(make_response(200, BODY), make_response(200, BODY))
+    cache = CachingTransport(tmp_path, ttl=3600, transport=inner)
+
+    get(cache)
+    cache.clear()
+    get(cache)
+
+    assert len(inner.sent) == 2
+    assert cache.stats["misses"] == 1
@@ -0,0 +1,169 @@
+import asyncio
+from datetime import timedelta
+from typing import AsyncIterator
+from uuid import uuid4
+
+import pytest
+from requests import Response
+from requests.exceptions import ConnectionError
+from requests.structures import CaseInsensitiveDict
+
+from qualysdk import BasicAuth
+from qualysdk.base.call_api_async import call_api_async, iter_workers_async
+from qualysdk.base.retry import RetryPolicy
+from qualysdk.base.session import Transport
+
+BODY = b"<APPLIANCE_LIST_OUTPUT/>"
+
+
+def make_response(status: int, headers: dict = None) -> Response:
+    response = Response()
+    response.status_code = status
+    response.headers = CaseInsensitiveDict(headers or {})
+    response._content = BODY if status == 200 else b""
+    response.encoding = "utf-8"
+    response.elapsed = timedelta(seconds=0.01)
+    return response
+
+
+class FakeTransport(Transport):
+    """
+    Answers each request with the next of responses, raising those that are
+    exceptions.
+    """
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.sent = 0
+
+    async def arequest(self, url_type, method, url, **kwargs):
+        self.sent += 1
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def call(*responses) -> tuple:
+    transport = FakeTransport(*responses)
+    auth = BasicAuth(
+        f"user-{uuid4()}",
+        "password",
+        platform="qg1",
+        transport=transport,
+        retry_policy=RetryPolicy(backoff_factor=0),
+    )
+    events = []
+    auth.hooks.register(events.append, "request")
+    response = asyncio.run(
+        call_api_async(auth, "vmdr", "get_scanner_list", params={"action": "list"})
+    )
+    return response, transport, events
+
+
+def test_retries_transient_failures():
+    response, transport, (event,) = call(
+        ConnectionError("reset"), make_response(503), make_response(200)
+    )
+
+    assert response.content == BODY
+    assert transport.sent == 3
+    assert response.retry_stats.retries == 2
+    assert event.attempts == 3 and event.error is None
+
+
+def test_gives_up_after_max_attempts():
+    with pytest.raises(ConnectionError):
+        call(*[ConnectionError("reset")] * 5)
+
+
+def test_waits_out_the_rate_limit():
+    # One token per 10ms, none left:
+    limits = {
+        "X-RateLimit-Limit": "100",
+        "X-RateLimit-Window-Sec": "1",
+        "X-RateLimit-Remaining": "0",
+    }
+    response, transport, (event,) = call(
+        make_response(429, limits), make_response(200, limits)
+    )
+
+    assert response.status_code == 200
+    assert transport.sent == 2
+    assert event.rate_limited == 1
+    assert event.rate_limit_wait > 0
+    # A rate limited attempt is not a retry:
+    assert response.retry_stats.retries == 0
+
+
+async def collect(items: AsyncIterator) -> list:
+    return [item async for item in items]
+
+
+def test_iter_workers_yields_every_item():
+    async def worker(job):
+        for i in range(3):
+            await asyncio.sleep(0)
+            yield (job, i)
+
+    items = asyncio.run(collect(iter_workers_async(worker, range(5), 2)))
+    assert sorted(items) == [(job, i) for job in range(5) for i in range(3)]
+
+    # Each task exits after jobs_per_worker jobs, leaving the rest:
+    items = asyncio.run(collect(iter_workers_async(worker, range(5), 2, 2)))
+    assert sorted(items) == [(job, i) for job in range(4) for i in range(3)]
+
+
+def test_iter_workers_output_is_bounded():
+    produced = 0
+
+    async def worker(job):
+        nonlocal produced
+        for i in range(5000):
+            produced += 1
+            yield i
+
+    async def main():
+        items = iter_workers_async(worker, [1], 1)
+        await items.__anext__()
+        # Give the worker every chance to run ahead of the consumer:
+        for _ in range(100):
+            await asyncio.sleep(0)
+        await items.aclose()
+
+    asyncio.run(main())
+
+    # The output queue holds 1000 items per worker, plus the one in hand:
+    assert produced <= 1002
+
+
+def test_iter_workers_cancels_the_others_on_error():
+    cancelled = asyncio.Event()
+
+    async def worker(job):
+        if job == "fail":
+            yield "first"
+            raise ValueError(job)
+        try:
+            while True:
+                await asyncio.sleep(0.01)
+                yield job
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def main():
+        with pytest.raises(ValueError, match="fail"):
+            async for _ in iter_workers_async(worker, ["fail", "slow"], 2):
+                pass
+        await asyncio.wait_for(cancelled.wait(), 1)
+
+    asyncio.run(main())
+
+
+def test_iter_workers_rejects_bad_concurrency():
+    async def worker(job):
+        yield job
+
+    with pytest.raises(ValueError):
+        asyncio.run(collect(iter_workers_async(worker, [1], 0)))
@@ -0,0 +1,154 @@
+from threading import Thread
+from time import sleep
+
+import pytest
+
+from qualysdk.base.deadline import Deadline
+from qualysdk.vmdr.base.chunk_scheduler import ChunkScheduler
+
+
+def drain(scheduler: ChunkScheduler) -> list:
+    # Pull every chunk in one page, as a single thread:
+    chunks = []
+    while (chunk := scheduler.take()) is not None:
+        chunks.append(chunk.ids)
+        chunk.page_done(len(chunk.ids), 1.0, None)
+        scheduler.done(chunk)
+    return chunks
+
+
+def wait_for_waiting(scheduler: ChunkScheduler, threads: int = 1) -> None:
+    for _ in range(200):
+        if scheduler._waiting >= threads:
+            return
+        sleep(0.005)
+    raise AssertionError("no thread waiting")
+
+
+def test_chunks_shrink_as_ids_run_out():
+    chunks = drain(ChunkScheduler(range(1, 101), chunk_size=50, threads=4))
+
+    assert [len(c) for c in chunks][:4] == [25, 19, 14, 11]
+    assert len(chunks[-1]) == 1
+    assert sum(chunks, []) == list(range(1, 101))
+
+
+def test_chunks_never_exceed_chunk_size():
+    chunks = drain(ChunkScheduler(range(1000), chunk_size=10, threads=2))
+
+    assert max(len(c) for c in chunks) == 10
+
+
+def test_chunk_ends_before_a_gap():
+    ids = list(range(1, 11)) + list(range(1000, 1011))
+
+    chunks = drain(ChunkScheduler(ids, chunk_size=20, threads=1))
+
+    assert chunks == [list(range(1, 11)), list(range(1000, 1011))]
+
+
+def test_no_ids():
+    assert ChunkScheduler([], chunk_size=10, threads=2).take() is None
+
+
+def test_ids_given_back_to_a_waiting_thread():
+    scheduler = ChunkScheduler(range(1, 11), chunk_size=10, threads=1)
+    chunk = scheduler.take()
+    taken = []
+    waiter = Thread(target=lambda: taken.append(scheduler.take()))
+    waiter.start()
+    wait_for_waiting(scheduler)
+
+    # Hosts 1-2 were pulled, 3-10 are left:
+    chunk.page_done(2, 1.0, "3")
+    waiter.join(1)
+
+    (other,) = taken
+    # The range keeps its start, as the next page is asked for from id_min:
+    assert chunk.ids == [3, 4, 5, 6]
+    assert chunk.params()["ids"] == "1-6"
+    assert other.ids == [7, 8, 9, 10]
+    assert other.params()["ids"] == "7-10"
+    assert scheduler.splits == 1
+
+
+def test_nothing_given_back_without_waiting_threads():
+    scheduler = ChunkScheduler(range(1, 11), chunk_size=10, threads=1)
+    chunk = scheduler.take()
+
+    chunk.page_done(2, 1.0, "3")
+
+    assert chunk.ids == list(range(3, 11))
+    assert chunk.params()["ids"] == "1-10"
+    assert scheduler.splits == 0
+
+
+def test_waiting_thread_ends_when_the_last_chunk_is_done():
+    scheduler = ChunkScheduler(range(1, 11), chunk_size=10, threads=1)
+    chunk = scheduler.take()
+    taken = []
+    waiter = Thread(target=lambda: taken.append(scheduler.take()))
+    waiter.start()
+    wait_for_waiting(scheduler)
+
+    chunk.page_done(10, 1.0, None)
+    scheduler.done(chunk)
+    waiter.join(1)
+
+    assert taken == [None]
+
+
+def test_take_stops_at_the_deadline():
+    scheduler = ChunkScheduler(range(1, 11), chunk_size=10, threads=1)
+    scheduler.take()
+    deadline = Deadline(0.01)
+    sleep(0.02)
+
+    assert scheduler.take(deadline) is None
+
+
+def test_truncation_limit_tuned_from_page_times():
+    scheduler = ChunkScheduler(
+        range(1, 10001), chunk_size=1000, threads=2, limits=(10, 5000)
+    )
+    chunk = scheduler.take()
+    # Nothing to tune from yet:
+    assert "truncation_limit" not in chunk.params()
+
+    # The first page is taken as the request time, and as the time for its hosts:
+    chunk.page_done(100, 2.0, "101")
+    assert chunk.seconds_per_host == pytest.approx(0.02)
+    # 28 of the 30 seconds left for hosts, at 0.02 seconds each:
+    assert chunk.params()["truncation_limit"] == 1400
+
+    # 10 seconds over the request time, for 100 hosts:
+    chunk.page_done(100, 12.0, "201")
+    assert chunk.seconds_per_host == pytest.approx(0.1)
+    assert chunk.params()["truncation_limit"] == 280
+    # New chunks start from the running average over every chunk:
+    assert scheduler.seconds_per_host == pytest.approx(0.036)
+    assert scheduler.truncation_limit() == 777
+
+
+def test_truncation_limit_clamped():
+    scheduler = ChunkScheduler(range(1, 101), chunk_size=100, threads=1)
+    chunk = scheduler.take()
+
+    chunk.page_done(10, 1.0, "11")
+    # 29 seconds left for hosts, at 0.1 seconds each:
+    assert chunk.params()["truncation_limit"] == 290
+    chunk.page_done(10, 1000.0, "21")
+    assert chunk.params()["truncation_limit"] == 100
+    chunk.page_done(100000, 1.5, "31")
+    assert chunk.params()["truncation_limit"] == 5000
+
+
+def test_fixed_truncation_limit_is_not_tuned():
+    scheduler = ChunkScheduler(
+        range(1, 101), chunk_size=100, threads=1, truncation_limit=500
+    )
+    chunk = scheduler.take()
+    chunk.page_done(10, 1.0, "11")
+
+    assert "truncation_limit" not in chunk.params()
+    assert scheduler.summary().endswith("truncation_limit 500")
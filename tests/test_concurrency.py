@@ -0,0 +1,23 @@
+from qualysdk.base.concurrency import ConcurrencyController
+from qualysdk.base.hooks import HookRegistry
+
+
+def test_watching_unregisters_controller():
+    hooks = HookRegistry()
+    controller = ConcurrencyController(4, [("vmdr", "get_hld")])
+
+    with controller.watching(hooks):
+        assert len(hooks._callbacks["request"]) == 1
+
+    assert hooks._callbacks["request"] == []
+    assert not hooks
+
+
+def test_unregister_bound_method():
+    hooks = HookRegistry()
+    controller = ConcurrencyController(4, [("vmdr", "get_hld")])
+
+    hooks.register(controller.observe)
+    hooks.unregister(controller.observe)
+
+    assert not hooks
@@ -0,0 +1,66 @@
+import pytest
+
+from qualysdk.base import deadline as deadline_module
+from qualysdk.base.deadline import Deadline
+from qualysdk.exceptions.Exceptions import DeadlineExceeded
+
+
+@pytest.fixture
+def now(monkeypatch):
+    # The deadline's clock reads now[0]:
+    now = [1000.0]
+    monkeypatch.setattr(deadline_module, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.mark.parametrize(
+    "timeout, capped",
+    [
+        (30, (10, 10)),
+        (5, (5, 5)),
+        ((3, 60), (3, 10)),
+        ((None, 5), (10, 5)),
+        (None, (10, 10)),
+    ],
+    ids=["number", "under", "tuple", "no connect timeout", "no timeout"],
+)
+def test_cap(now, timeout, capped):
+    deadline = Deadline(15)
+    now[0] += 5
+
+    assert deadline.cap(timeout) == capped
+
+
+def test_cap_after_expiry_is_zero(now):
+    deadline = Deadline(15)
+    now[0] += 20
+
+    assert deadline.cap((3, 60)) == (0, 0)
+
+
+def test_check(now):
+    deadline = Deadline(15)
+    now[0] += 5
+
+    deadline.check(9.9)
+    assert not deadline.exceeded
+
+    # A wait that would run past the deadline raises before waiting:
+    with pytest.raises(DeadlineExceeded, match="Waiting 10.0 seconds"):
+        deadline.check(10)
+    assert deadline.exceeded
+
+    now[0] += 10
+    with pytest.raises(DeadlineExceeded, match="Deadline of 15 seconds exceeded"):
+        deadline.check()
+
+
+@pytest.mark.parametrize("seconds", [0, -1, "10"])
+def test_rejects_bad_seconds(seconds):
+    with pytest.raises(ValueError):
+        Deadline(seconds)
+
+
+def test_from_seconds():
+    assert Deadline.from_seconds(None) is None
+    assert Deadline.from_seconds(5).seconds == 5
@@ -0,0 +1,58 @@
+from datetime import timedelta
+from uuid import uuid4
+
+import pytest
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+from qualysdk import BasicAuth
+from qualysdk.base.call_api import call_api
+from qualysdk.base.hooks import record_parse
+from qualysdk.base.retry import RetryPolicy
+from qualysdk.base.session import Transport
+
+
+class FakeTransport(Transport):
+    """
+    Answers the first request, and raises for the others.
+    """
+
+    def __init__(self):
+        self.sent = 0
+
+    def request(self, url_type, method, url, **kwargs):
+        self.sent += 1
+        if self.sent > 1:
+            raise ValueError("not sent")
+        response = Response()
+        response.status_code = 200
+        response.headers = CaseInsensitiveDict()
+        response._content = b"<APPLIANCE_LIST_OUTPUT/>"
+        response.elapsed = timedelta(seconds=0.01)
+        return response
+
+
+def test_parse_events_go_to_the_call_that_returned():
+    auth = BasicAuth(
+        f"user-{uuid4()}",
+        "password",
+        platform="qg1",
+        transport=FakeTransport(),
+        retry_policy=RetryPolicy(max_attempts=1),
+    )
+    events = []
+    auth.hooks.register(events.append)
+
+    response = call_api(auth, "vmdr", "get_scanner_list", params={"action": "list"})
+    record_parse("xml", 0.5, 10)
+    request, parse = events
+
+    assert parse.request is request is response.event
+    assert parse.seconds == 0.5
+
+    with pytest.raises(ValueError):
+        call_api(auth, "vmdr", "get_scanner_list", params={"action": "list"})
+    # Parsing after a failed call is not counted towards the call before it:
+    record_parse("xml", 0.5, 10)
+
+    assert len(events) == 3 and events[2].error is not None
@@ -0,0 +1,132 @@
+from io import BytesIO
+from json import JSONDecodeError, dumps, loads
+
+import pytest
+
+from qualysdk.base.json_stream import JSONRecordStream
+
+PATH = ("assetListData", "asset")
+ASSETS = [
+    {
+        "assetId": 1,
+        "riskScore": -12.5e3,
+        "name": "hôst ☃ \U0001f600",
+        "escaped": 'quote " backslash \\ newline \n',
+        "tags": {"tag": [{"tagId": 1}, {"tagId": 2}]},
+        "empty": [],
+        "flags": [True, False, None],
+    },
+    {"assetId": 123456789012345678901234567890, "ratio": 0.000001},
+    [1, [2, [3]]],
+    "text",
+    0,
+]
+
+
+def document(records, before: dict = None, after: dict = None) -> dict:
+    return {**(before or {}), "assetListData": {"asset": records}, **(after or {})}
+
+
+def stream(source, path=PATH, chunk_size: int = 65536) -> tuple:
+    records = JSONRecordStream(source, path, chunk_size)
+    return list(records), records
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 65536])
+def test_matches_json_loads(chunk_size):
+    data = document(
+        ASSETS, {"responseCode": "SUCCESS", "count": 5}, {"hasMore": 1, "last": 5.0}
+    )
+
+    records, s = stream(dumps(data, ensure_ascii=False).encode(), chunk_size=chunk_size)
+
+    assert records == ASSETS
+    assert s.document == {
+        "responseCode": "SUCCESS",
+        "count": 5,
+        "assetListData": {},
+        "hasMore": 1,
+        "last": 5.0,
+    }
+    assert s.found and s.records == len(ASSETS)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5])
+def test_numbers_split_across_chunks(chunk_size):
+    numbers = [1, 12, 123.5, -1e10, 1.25e-7, 10, 100000]
+
+    records, _ = stream(dumps(numbers).replace(" ", "").encode(), (), chunk_size)
+
+    assert records == numbers
+
+
+@pytest.mark.parametrize(
+    "records, expected",
+    [
+        ({"assetId": 1}, [{"assetId": 1}]),
+        (None, []),
+        ([], []),
+        ({}, []),
+    ],
+    ids=["object", "null", "empty array", "empty object"],
+)
+def test_value_at_path(records, expected):
+    result, s = stream(dumps(document(records)).encode())
+
+    assert result == expected
+    assert s.found
+    assert s.document == {"assetListData": {}}
+
+
+def test_path_not_in_document():
+    records, s = stream(b'{"responseCode": "FAILED", "assetListData": null}')
+
+    assert records == []
+    assert not s.found
+    # A null on the way to the records is left out, like the records would be:
+    assert s.document == {"responseCode": "FAILED"}
+    assert s.get("responseCode") == "FAILED"
+
+
+def test_top_level_array():
+    records, s = stream(b' [ {"id": 1} , {"id": 2} ] ', ())
+
+    assert records == [{"id": 1}, {"id": 2}]
+    assert s.document is None
+    assert s.get("hasMore", 0) == 0
+
+
+@pytest.mark.parametrize(
+    "source",
+    [dumps(document(ASSETS)), BytesIO(dumps(document(ASSETS)).encode())],
+    ids=["str", "file"],
+)
+def test_sources(source):
+    records, _ = stream(source, chunk_size=16)
+
+    assert records == loads(dumps(ASSETS))
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        b'{"assetListData": {"asset": [{"assetId": 1}, {"assetId": ',
+        b'{"assetListData": {"asset": [{"assetId": 1} {"assetId": 2}]}}',
+        b'{"assetListData": {"asset": []}} trailing',
+        b'{assetListData: {"asset": []}}',
+        b"",
+    ],
+    ids=["truncated", "missing comma", "extra data", "unquoted key", "empty"],
+)
+@pytest.mark.parametrize("chunk_size", [1, 65536])
+def test_malformed_documents_raise(source, chunk_size):
+    with pytest.raises(JSONDecodeError):
+        stream(source, chunk_size=chunk_size)
+
+
+def test_iterated_once():
+    s = JSONRecordStream(b"[1]")
+    list(s)
+
+    with pytest.raises(RuntimeError):
+        list(s)
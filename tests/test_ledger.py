@@ -0,0 +1,116 @@
+import os
+import stat
+import subprocess
+import sys
+from time import time
+
+import pytest
+
+from qualysdk.base.ledger import SharedLedger
+
+KEY = "user@qg1/vmdr.get_hld"
+
+
+def exited_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", ""])
+    process.wait()
+    return process.pid
+
+
+def add_slot(ledger: SharedLedger, pid: int, acquired: float = None) -> None:
+    # A slot taken by another process:
+    with ledger.transaction() as db:
+        db.execute(
+            "INSERT INTO slots (key, pid, acquired) VALUES (?, ?, ?)",
+            (KEY, pid, time() if acquired is None else acquired),
+        )
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = SharedLedger(tmp_path / "ledger.sqlite3")
+    ledger.set_concurrency_limit(KEY, 2)
+    return ledger
+
+
+def test_no_slot_needed_until_limit_known(tmp_path):
+    ledger = SharedLedger(tmp_path / "ledger.sqlite3")
+
+    assert ledger.try_acquire_slot(KEY) == 0
+
+
+def test_slots_are_capped_and_released(ledger):
+    first = ledger.try_acquire_slot(KEY)
+    second = ledger.try_acquire_slot(KEY)
+
+    assert first and second
+    assert ledger.try_acquire_slot(KEY) is None
+
+    ledger.release_slot(first)
+    assert ledger.try_acquire_slot(KEY)
+
+
+def test_slots_are_shared_between_ledgers_on_one_file(ledger):
+    other = SharedLedger(ledger.path)
+
+    ledger.try_acquire_slot(KEY)
+    other.try_acquire_slot(KEY)
+
+    assert ledger.try_acquire_slot(KEY) is None
+
+
+@pytest.mark.skipif(os.name == "nt", reason="pids are not checked on Windows")
+def test_slots_of_exited_processes_are_purged(ledger):
+    add_slot(ledger, exited_pid())
+    add_slot(ledger, exited_pid())
+
+    assert ledger.try_acquire_slot(KEY)
+    assert ledger.try_acquire_slot(KEY)
+
+
+@pytest.mark.skipif(os.name == "nt", reason="pids are not checked on Windows")
+def test_slots_of_live_processes_are_kept(ledger):
+    add_slot(ledger, os.getppid())
+    add_slot(ledger, os.getppid())
+
+    assert ledger.try_acquire_slot(KEY) is None
+
+
+def test_abandoned_slots_time_out(ledger):
+    # Held by a live process, but for longer than slot_timeout:
+    add_slot(ledger, os.getppid(), acquired=time() - ledger.slot_timeout - 1)
+    add_slot(ledger, os.getppid(), acquired=time() - ledger.slot_timeout - 1)
+
+    assert ledger.try_acquire_slot(KEY)
+
+
+def test_own_slots_are_not_purged(ledger):
+    ledger.try_acquire_slot(KEY)
+    ledger.try_acquire_slot(KEY)
+
+    assert ledger.try_acquire_slot(KEY) is None
+
+
+def test_directory_created_private(tmp_path):
+    path = tmp_path / "state" / "qualysdk" / "ledger.sqlite3"
+
+    SharedLedger(path)
+
+    assert path.exists()
+    assert stat.S_IMODE(path.parent.stat().st_mode) == 0o700
+
+
+def test_buckets_are_shared(ledger):
+    other = SharedLedger(ledger.path)
+
+    ledger.bucket(KEY).update(
+        {
+            "X-RateLimit-Limit": "300",
+            "X-RateLimit-Window-Sec": "3600",
+            "X-RateLimit-Remaining": "1",
+        }
+    )
+    bucket = other.bucket(KEY)
+
+    assert bucket.reserve() == 0
+    assert ledger.bucket(KEY).reserve() > 0
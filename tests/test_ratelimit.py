@@ -0,0 +1,106 @@
+import pytest
+
+from qualysdk.base.ratelimit import DEFAULT_BACKOFF, TokenBucket
+
+
+def bucket_at(now: list, limit: int = None, window: int = None) -> TokenBucket:
+    # A bucket whose clock reads now[0]:
+    bucket = TokenBucket()
+    bucket.clock = lambda: now[0]
+    bucket._updated = now[0]
+    if limit:
+        bucket.set_limit(limit, window)
+    return bucket
+
+
+def test_unknown_limit_does_not_pace():
+    bucket = bucket_at([0.0])
+
+    assert bucket.update({}) is None
+    assert bucket.limit is None
+    assert all(bucket.reserve() == 0 for _ in range(1000))
+
+
+def test_learns_limit_and_remaining_from_headers():
+    bucket = bucket_at([0.0])
+
+    bucket.update(
+        {
+            "X-RateLimit-Limit": "300",
+            "X-RateLimit-Window-Sec": "3600",
+            "X-RateLimit-Remaining": "2",
+        }
+    )
+
+    assert (bucket.limit, bucket.window, bucket.tokens) == (300, 3600, 2.0)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    # Out of tokens, so wait for one to refill at 300 per hour:
+    assert bucket.reserve() == pytest.approx(12)
+
+
+def test_remaining_is_capped_at_the_limit():
+    bucket = bucket_at([0.0], 10, 60)
+
+    bucket.update({"X-RateLimit-Remaining": "50"})
+
+    assert bucket.tokens == 10
+
+
+def test_remaining_is_ignored_until_a_limit_is_known():
+    bucket = bucket_at([0.0])
+
+    bucket.update({"X-RateLimit-Remaining": "5"})
+
+    assert bucket.tokens is None
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [
+        {"X-RateLimit-Limit": "0", "X-RateLimit-Window-Sec": "3600"},
+        {"X-RateLimit-Limit": "300", "X-RateLimit-Window-Sec": "0"},
+        {"X-RateLimit-Limit": "300"},
+    ],
+    ids=["no calls", "no window", "no window header"],
+)
+def test_unusable_limits_are_ignored(headers):
+    bucket = bucket_at([0.0])
+
+    bucket.update(headers)
+
+    assert bucket.limit is None
+
+
+def test_to_wait_header_blocks_the_bucket():
+    now = [100.0]
+    bucket = bucket_at(now, 300, 3600)
+
+    to_wait = bucket.update({"X-RateLimit-ToWait-Sec": "30"}, rate_limited=True)
+
+    assert to_wait == 30
+    assert bucket.tokens == 0
+    assert bucket.reserve() == pytest.approx(30)
+    now[0] = 130.0
+    # Blocked no longer, but the window has only refilled 2.5 tokens:
+    assert bucket.reserve() == 0
+
+
+def test_rate_limited_without_to_wait_waits_for_one_token():
+    bucket = bucket_at([0.0], 60, 60)
+
+    assert bucket.update({}, rate_limited=True) == pytest.approx(1)
+
+
+def test_rate_limited_before_a_limit_is_known():
+    bucket = bucket_at([0.0])
+
+    assert bucket.update({}, rate_limited=True) == DEFAULT_BACKOFF
+    assert bucket.tokens is None
+
+
+def test_to_wait_without_rate_limit_blocks_but_returns_none():
+    bucket = bucket_at([0.0], 300, 3600)
+
+    assert bucket.update({"X-RateLimit-ToWait-Sec": "5"}) is None
+    assert bucket.reserve() == pytest.approx(5)
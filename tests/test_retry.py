@@ -0,0 +1,135 @@
+from datetime import timedelta
+
+import pytest
+from requests import Response
+from requests.exceptions import ConnectionError, ConnectTimeout, ReadTimeout
+from requests.structures import CaseInsensitiveDict
+
+from qualysdk.base.call_schema import CALL_SCHEMA
+from qualysdk.base.retry import (
+    NON_IDEMPOTENT_ENDPOINTS,
+    READ_ONLY_ENDPOINTS,
+    RetryPolicy,
+    RetryStats,
+)
+
+URL = "https://qualysapi.qg1.apps.qualys.com/api/2.0/fo/appliance/"
+WAS_URL = "https://qualysapi.qg1.apps.qualys.com/qps/rest/3.0/{}/was/webapp"
+
+
+def make_response(status: int, headers: dict = None) -> Response:
+    response = Response()
+    response.status_code = status
+    response.headers = CaseInsensitiveDict(headers or {})
+    response.elapsed = timedelta(seconds=0.01)
+    return response
+
+
+def delay(
+    method: str = "GET",
+    module: str = "vmdr",
+    endpoint: str = "get_scanner_list",
+    url: str = URL,
+    attempts: int = 1,
+    policy: RetryPolicy = None,
+    **kwargs,
+):
+    policy = policy or RetryPolicy(jitter=False)
+    stats = RetryStats(attempts=attempts)
+    request = {"method": method, "url": url}
+    return policy.next_delay(request, module, endpoint, stats, **kwargs)
+
+
+@pytest.mark.parametrize(
+    "method, module, endpoint, url, idempotent",
+    [
+        ("GET", "vmdr", "get_scanner_list", URL, True),
+        ("DELETE", "vmdr", "get_scanner_list", URL, True),
+        ("POST", "vmdr", "get_hld", URL, True),
+        ("POST", "vmdr", "launch_scan", URL, False),
+        ("GET", "vmdr", "add_user", URL, False),
+        ("POST", "was", "call_webapp_api", WAS_URL.format("search"), True),
+        ("POST", "was", "call_webapp_api", WAS_URL.format("count"), True),
+        ("POST", "was", "call_webapp_api", WAS_URL.format("create"), False),
+        ("POST", "was", "call_webapp_api", WAS_URL.format("delete"), False),
+    ],
+)
+def test_is_idempotent(method, module, endpoint, url, idempotent):
+    assert RetryPolicy.is_idempotent(method, module, endpoint, url) is idempotent
+
+
+@pytest.mark.parametrize(
+    "module, endpoint", sorted(READ_ONLY_ENDPOINTS | NON_IDEMPOTENT_ENDPOINTS)
+)
+def test_endpoint_tables_name_real_endpoints(module, endpoint):
+    assert endpoint in CALL_SCHEMA[module]
+
+
+def test_backoff_doubles_up_to_the_maximum():
+    policy = RetryPolicy(backoff_factor=1, max_backoff=5, jitter=False)
+
+    assert [policy.backoff(n) for n in range(1, 6)] == [1, 2, 4, 5, 5]
+    assert policy.backoff(1, retry_after="30") == 5
+    assert policy.backoff(1, retry_after="soon") == 1
+
+
+def test_jitter_stays_within_the_backoff():
+    policy = RetryPolicy(backoff_factor=1)
+
+    assert all(0 <= policy.backoff(3) <= 4 for _ in range(100))
+
+
+@pytest.mark.parametrize("status", [502, 503, 504])
+def test_retries_transient_statuses(status):
+    assert delay(response=make_response(status)) == 1
+
+
+@pytest.mark.parametrize("status", [200, 400, 401, 409, 429, 500])
+def test_does_not_retry_other_statuses(status):
+    assert delay(response=make_response(status)) is None
+
+
+def test_retry_after_header_sets_the_delay():
+    assert delay(response=make_response(503, {"Retry-After": "7"})) == 7
+
+
+@pytest.mark.parametrize(
+    "error, retried",
+    [
+        (ConnectionError(), True),
+        (ReadTimeout(), True),
+        (ValueError(), False),
+    ],
+    ids=["connection error", "timeout", "other"],
+)
+def test_retries_transient_errors(error, retried):
+    assert (delay(error=error) is not None) is retried
+
+
+def test_gives_up_after_max_attempts():
+    policy = RetryPolicy(max_attempts=3, jitter=False)
+    error = ConnectionError()
+
+    assert delay(attempts=2, policy=policy, error=error) == 2
+    assert delay(attempts=3, policy=policy, error=error) is None
+
+
+def test_non_idempotent_calls_retried_only_if_never_sent():
+    launch = {"method": "POST", "endpoint": "launch_scan"}
+
+    assert delay(**launch, response=make_response(503)) is None
+    assert delay(**launch, error=ReadTimeout()) is None
+    # The connection was never opened, so the scan was not launched:
+    assert delay(**launch, error=ConnectTimeout()) == 1
+
+
+def test_next_delay_records_the_retry():
+    policy = RetryPolicy(jitter=False)
+    stats = RetryStats(attempts=2)
+    request = {"method": "GET", "url": URL}
+
+    policy.next_delay(
+        request, "vmdr", "get_scanner_list", stats, response=make_response(503)
+    )
+
+    assert (stats.retries, stats.backoff, stats.errors) == (1, 2, ["503"])
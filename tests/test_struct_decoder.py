@@ -0,0 +1,145 @@
+from dataclasses import fields, is_dataclass
+from json import dumps
+
+import pytest
+
+pytest.importorskip("msgspec")
+
+from qualysdk.gav.hosts import HOST_DECODER
+from qualysdk.pm.base.assets_patches_threading_backend import (
+    ASSET_DECODER,
+    PATCH_DECODER,
+)
+from qualysdk.totalcloud.data_classes.resource_mappings import resource_map
+from qualysdk.totalcloud.get_inventory import resource_decoder
+
+# A GAV asset with the nested dicts Host.__post_init__ flattens, and the dates
+# the decoder converts itself:
+HOST = {
+    "assetId": 1,
+    "assetUUID": "00000001-0000-4000-8000-000000000000",
+    "hostId": 1001,
+    "lastModifiedDate": "2024-02-01T10:20:30.123Z",
+    "createdDate": "2023-05-06T07:08:09.000Z",
+    "sensorLastUpdatedDate": "2024-02-01T10:00:00.000Z",
+    "lastBoot": "2024-01-30T06:00:00.000Z",
+    "assetType": "HOST",
+    "address": "10.0.0.1",
+    "assetName": "host1",
+    "totalMemory": 16384,
+    "isContainerHost": False,
+    "operatingSystem": {
+        "osName": "Windows Server 2019",
+        "publisher": "Microsoft",
+        "installDate": "2023-05-06T07:08:09.000Z",
+    },
+    "hardware": {"fullName": "Example Server", "manufacturer": "Example"},
+    "agent": {
+        "version": "5.0.0.1",
+        "activations": [{"key": "abc", "status": "ACTIVE"}],
+        "lastActivity": 1706781630123,
+    },
+    "tagList": {"tag": [{"tagId": 1, "tagName": "tag1"}]},
+    "openPortListData": {"openPort": [{"port": 443, "protocol": "TCP"}]},
+    "softwareListData": {
+        "software": [
+            {
+                "fullName": "Vendor Product 1.0",
+                "lastUpdated": "2024-02-01T00:00:00.000Z",
+            }
+        ]
+    },
+}
+
+PATCH = {
+    "id": "00000001-2222-4000-8000-000000000000",
+    "title": "Cumulative Update",
+    "vendor": "Microsoft",
+    "kb": "KB5000001",
+    "isSecurity": True,
+    "missingCount": 3,
+    "modifiedDate": 1706781630123,
+    "publishedDate": 1706781630123,
+    "architecture": ["X64"],
+    "qid": ["90001"],
+    "cve": ["CVE-2024-1234"],
+    "packageDetails": [{"packageName": "pkg", "architecture": "X64"}],
+}
+
+ASSET = {
+    "id": "00000001-3333-4000-8000-000000000000",
+    "name": "host1",
+    "operatingSystem": "Windows Server 2019",
+    "status": "Active",
+    "missingPatchCount": 4,
+    "scanDateTime": 1706781630123,
+    "activatedModules": ["PM", "VM"],
+}
+
+# The BaseResource fields of both providers. Each resource class gets those it has:
+RESOURCE = {
+    "resourceId": "r-1",
+    "name": "resource1",
+    "created": "2024-02-01T10:20:30.123+00:00",
+    "createdOn": "2024-02-01T10:20:30.123+00:00",
+    "lastUpdated": "2024-02-02T10:20:30.123+00:00",
+    "updated": "2024-02-02T10:20:30.123+00:00",
+    "cloudAccountId": "123456789012",
+    "connectorUuids": ["conn-1", "conn-2"],
+    "tags": [{"key": "env", "value": "prod"}],
+    "qualysTags": [{"tagName": "tag1"}],
+    "remediationEnabled": "true",
+    "additionalDetails": {"detail": 1},
+    "region": "us-east-1",
+    "type": "resource",
+}
+
+RESOURCE_CLASSES = sorted(
+    set(resource_map.values()), key=lambda cls: (cls.__module__, cls.__name__)
+)
+
+
+def contents(value):
+    # Data classes compare only some of their fields, so compare every field:
+    if is_dataclass(value):
+        return (
+            type(value),
+            tuple((f.name, contents(getattr(value, f.name))) for f in fields(value)),
+        )
+    if isinstance(value, list):
+        return (type(value), tuple(contents(item) for item in value))
+    if isinstance(value, dict):
+        return tuple((key, contents(item)) for key, item in value.items())
+    return (type(value), value)
+
+
+def check(decoder, page, record: dict, **values):
+    # decode, rather than calling the decoder, so a fallback fails the test:
+    (decoded,), _ = decoder.decode(dumps(page).encode(), values)
+    assert contents(decoded) == contents(decoder.model(**record, **values))
+
+
+def test_gav_host_decoder():
+    check(HOST_DECODER, {"assetListData": {"asset": [HOST]}}, HOST)
+
+
+@pytest.mark.parametrize(
+    "decoder, record",
+    [(PATCH_DECODER, PATCH), (ASSET_DECODER, ASSET)],
+    ids=["patch", "asset"],
+)
+def test_pm_decoders(decoder, record):
+    check(decoder, [record], record, platform="Windows")
+
+
+@pytest.mark.parametrize("resource_class", RESOURCE_CLASSES, ids=lambda c: c.__name__)
+def test_resource_decoders(resource_class):
+    names = {f.name for f in fields(resource_class)}
+    page = {
+        key: value
+        for key, value in RESOURCE.items()
+        if ("_" + key if key == "type" else key) in names
+    }
+    record = {"_type" if key == "type" else key: value for key, value in page.items()}
+
+    check(resource_decoder(resource_class), {"content": [page]}, record)
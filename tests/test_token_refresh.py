@@ -0,0 +1,123 @@
+import pickle
+from base64 import urlsafe_b64encode
+from datetime import datetime, timedelta
+from json import dumps
+from threading import Barrier, Thread
+from time import sleep, time
+from uuid import uuid4
+
+from requests import Response
+
+from qualysdk.auth.token import TOKEN_LIFETIME, TokenAuth, _token_expiry
+from qualysdk.base.call_api import _refresh_token_if_needed
+from qualysdk.base.session import Transport
+
+
+def jwt(expires_in: float) -> str:
+    claims = urlsafe_b64encode(dumps({"exp": int(time() + expires_in)}).encode())
+    return f"header.{claims.decode().rstrip('=')}.signature"
+
+
+class TokenServer(Transport):
+    """
+    Hands out a new token for each login, valid for the next of lifetimes.
+    """
+
+    def __init__(self, *lifetimes: float, delay: float = 0):
+        self.lifetimes = list(lifetimes)
+        self.delay = delay
+        self.tokens = []
+
+    def request(self, url_type, method, url, **kwargs):
+        # Slow enough for every thread to find the token expiring:
+        sleep(self.delay)
+        token = jwt(self.lifetimes.pop(0))
+        self.tokens.append(token)
+        response = Response()
+        response.status_code = 201
+        response._content = token.encode()
+        response.encoding = "utf-8"
+        return response
+
+
+def token_auth(server: TokenServer, **kwargs) -> TokenAuth:
+    return TokenAuth(f"user-{uuid4()}", "password", transport=server, **kwargs)
+
+
+def test_expiry_from_exp_claim():
+    token = jwt(60)
+    generated = datetime.now()
+
+    expected = generated + timedelta(seconds=60)
+    assert abs(_token_expiry(token, generated) - expected) < timedelta(seconds=2)
+    assert _token_expiry("not-a-jwt", generated) == generated + TOKEN_LIFETIME
+
+
+def test_fresh_token_is_not_refreshed():
+    server = TokenServer(3600)
+    auth = token_auth(server, auto_refresh=False)
+
+    assert not auth.token_expiring()
+    assert not auth.refresh_if_needed()
+    assert len(server.tokens) == 1
+
+
+def test_concurrent_refreshes_are_single_flight():
+    # The first token expires inside the refresh margin:
+    server = TokenServer(60, 3600, 3600, delay=0.05)
+    auth = token_auth(server, auto_refresh=False)
+    threads = 20
+    barrier = Barrier(threads)
+    refreshed = []
+    seen = []
+
+    def refresh():
+        barrier.wait()
+        refreshed.append(auth.refresh_if_needed())
+        seen.append(auth.token)
+
+    workers = [Thread(target=refresh) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert len(server.tokens) == 2
+    assert refreshed.count(True) == 1
+    assert set(seen) == {server.tokens[1]}
+
+
+def test_request_gets_the_new_token():
+    server = TokenServer(60, 3600)
+    auth = token_auth(server, auto_refresh=False)
+    request = {"headers": {"Authorization": f"Bearer {auth.token}"}}
+
+    _refresh_token_if_needed(auth, request)
+
+    assert request["headers"]["Authorization"] == f"Bearer {server.tokens[1]}"
+
+
+def test_background_refresh_before_expiry():
+    # Due for refresh 0-1 seconds after login, given exp's whole seconds:
+    server = TokenServer(11, 3600)
+    auth = token_auth(server, refresh_margin=10)
+
+    try:
+        for _ in range(40):
+            if len(server.tokens) == 2:
+                break
+            sleep(0.05)
+        assert auth.token == server.tokens[1]
+    finally:
+        auth.close()
+
+
+def test_copies_do_not_share_the_timer():
+    auth = token_auth(TokenServer(3600))
+
+    copy = pickle.loads(pickle.dumps(auth))
+
+    assert auth._refresh_timer is not None
+    assert copy._refresh_timer is None
+    assert copy.token == auth.token
+    auth.close()
@@ -0,0 +1,185 @@
+from dataclasses import fields, is_dataclass
+
+import pytest
+from lxml import etree
+
+from qualysdk.base.xml_parser import element_to_dict
+from qualysdk.vmdr.base.helpers import (
+    CVE_HOST_DECODER,
+    HOST_DECODER,
+    HOST_SPEC,
+    _cve_host_from_dict,
+)
+from qualysdk.vmdr.data_classes.hosts import VMDRHost
+
+# A HOST element with the fields the decoders convert themselves, those left to
+# VMDRHost.__post_init__, and nested tags, QDS and QDS factors:
+HOST = """
+<HOST>
+  <ID>101</ID>
+  <ASSET_ID>5101</ASSET_ID>
+  <IP>10.0.0.101</IP>
+  <IPV6>::1</IPV6>
+  <TRACKING_METHOD>IP</TRACKING_METHOD>
+  <OS><![CDATA[Windows Server 2019]]></OS>
+  <DNS><![CDATA[host101.example.com]]></DNS>
+  <DNS_DATA>
+    <HOSTNAME><![CDATA[host101]]></HOSTNAME>
+    <DOMAIN><![CDATA[example.com]]></DOMAIN>
+    <FQDN><![CDATA[host101.example.com]]></FQDN>
+  </DNS_DATA>
+  <CLOUD_PROVIDER>AWS</CLOUD_PROVIDER>
+  <CLOUD_SERVICE>EC2</CLOUD_SERVICE>
+  <CLOUD_RESOURCE_ID>i-0123456789</CLOUD_RESOURCE_ID>
+  <NETBIOS><![CDATA[HOST101]]></NETBIOS>
+  <OWNER>owner</OWNER>
+  <LAST_BOOT>2024-01-01T00:00:00Z</LAST_BOOT>
+  <LAST_SCAN_DATETIME>2024-02-01T00:00:00Z</LAST_SCAN_DATETIME>
+  <LAST_VM_SCANNED_DATE>2024-02-01T00:00:00Z</LAST_VM_SCANNED_DATE>
+  <LAST_VM_SCANNED_DURATION>12</LAST_VM_SCANNED_DURATION>
+  <TRURISK_SCORE>512</TRURISK_SCORE>
+  <ASSET_CRITICALITY_SCORE>3</ASSET_CRITICALITY_SCORE>
+  <TRURISK_SCORE_FACTORS>
+    <TRURISK_SCORE_FORMULA>x</TRURISK_SCORE_FORMULA>
+    <VULN_COUNT qds_severity="HIGH">3</VULN_COUNT>
+    <VULN_COUNT qds_severity="LOW">1</VULN_COUNT>
+  </TRURISK_SCORE_FACTORS>
+  <METADATA>
+    <EC2>
+      <ATTRIBUTE>
+        <NAME>latest/dynamic/instance-identity/document/region</NAME>
+        <VALUE>us-east-1</VALUE>
+        <LAST_STATUS>Success</LAST_STATUS>
+        <LAST_SUCCESS_DATE>2024-01-01T00:00:00Z</LAST_SUCCESS_DATE>
+      </ATTRIBUTE>
+      <ATTRIBUTE>
+        <NAME>latest/meta-data/instance-type</NAME>
+        <VALUE>t2.micro</VALUE>
+        <LAST_STATUS>Success</LAST_STATUS>
+      </ATTRIBUTE>
+    </EC2>
+  </METADATA>
+  <CLOUD_PROVIDER_TAGS>
+    <CLOUD_TAG>
+      <NAME>env</NAME>
+      <VALUE>prod</VALUE>
+      <LAST_SUCCESS_DATE>2024-01-01T00:00:00Z</LAST_SUCCESS_DATE>
+    </CLOUD_TAG>
+  </CLOUD_PROVIDER_TAGS>
+  <TAGS>
+    <TAG><TAG_ID>1</TAG_ID><NAME><![CDATA[Tag 1]]></NAME></TAG>
+    <TAG><TAG_ID>2</TAG_ID><NAME><![CDATA[Tag 2]]></NAME></TAG>
+  </TAGS>
+  {detection_list}
+</HOST>
+"""
+
+DETECTION = """
+<DETECTION>
+  <UNIQUE_VULN_ID>9001</UNIQUE_VULN_ID>
+  <QID>38170</QID>
+  <TYPE>Confirmed</TYPE>
+  <SEVERITY>3</SEVERITY>
+  <PORT>443</PORT>
+  <PROTOCOL>tcp</PROTOCOL>
+  <SSL>1</SSL>
+  <RESULTS><![CDATA[Some result text &amp; <b>markup</b>
+line2]]></RESULTS>
+  <STATUS>Active</STATUS>
+  <FIRST_FOUND_DATETIME>2024-01-02T00:00:00Z</FIRST_FOUND_DATETIME>
+  <LAST_FOUND_DATETIME>2024-02-01T00:00:00Z</LAST_FOUND_DATETIME>
+  <QDS severity="HIGH">70</QDS>
+  <QDS_FACTORS>
+    <QDS_FACTOR name="CVSS">7.5</QDS_FACTOR>
+    <QDS_FACTOR name="epss">0.1</QDS_FACTOR>
+  </QDS_FACTORS>
+  <TIMES_FOUND>14</TIMES_FOUND>
+  <LAST_TEST_DATETIME>2024-02-01T00:00:00Z</LAST_TEST_DATETIME>
+  <LAST_UPDATE_DATETIME>2024-02-01T00:00:00Z</LAST_UPDATE_DATETIME>
+  <IS_IGNORED>0</IS_IGNORED>
+  <IS_DISABLED>0</IS_DISABLED>
+  <LAST_PROCESSED_DATETIME>2024-02-01T00:00:00Z</LAST_PROCESSED_DATETIME>
+</DETECTION>
+"""
+
+CVE_DETECTION = """
+<CVE_DETECTION>
+  <UNIQUE_VULN_ID>9002</UNIQUE_VULN_ID>
+  <VULN_CVE>CVE-2024-1234</VULN_CVE>
+  <ASSOCIATED_QID>38170</ASSOCIATED_QID>
+  <QVS>30</QVS>
+  <CVSS>7.5</CVSS>
+  <CVSS3.1>9.1</CVSS3.1>
+  <CVSS3.1_BASE>9.1</CVSS3.1_BASE>
+  <TYPE>Confirmed</TYPE>
+  <PORT>443</PORT>
+  <PROTOCOL>tcp</PROTOCOL>
+  <SSL>0</SSL>
+  <RESULTS>plain</RESULTS>
+  <STATUS>Fixed</STATUS>
+  <FIRST_FOUND_DATETIME>2024-01-02T00:00:00Z</FIRST_FOUND_DATETIME>
+  <LAST_FOUND_DATETIME>2024-02-01T00:00:00Z</LAST_FOUND_DATETIME>
+  <LAST_FIXED_DATETIME>2024-02-03T00:00:00Z</LAST_FIXED_DATETIME>
+  <TIMES_FOUND>2</TIMES_FOUND>
+  <IS_IGNORED>0</IS_IGNORED>
+  <IS_DISABLED>1</IS_DISABLED>
+</CVE_DETECTION>
+"""
+
+
+def contents(value):
+    # Data classes compare only some of their fields, so compare every field:
+    if is_dataclass(value):
+        return (
+            type(value),
+            tuple((f.name, contents(getattr(value, f.name))) for f in fields(value)),
+        )
+    if isinstance(value, list):
+        return (type(value), tuple(contents(item) for item in value))
+    if isinstance(value, dict):
+        return tuple((key, contents(item)) for key, item in value.items())
+    return (type(value), value)
+
+
+def host_element(detection: str, cve: bool = False):
+    # Hosts without detections have no DETECTION_LIST:
+    detection_list = ""
+    if detection:
+        tag = "CVE_DETECTION_LIST" if cve else "DETECTION_LIST"
+        detection_list = f"<{tag}>{detection * 2}</{tag}>"
+    return etree.fromstring(HOST.format(detection_list=detection_list))
+
+
+@pytest.mark.parametrize(
+    "detection",
+    [DETECTION, ""],
+    ids=["detections", "no detections"],
+)
+def test_host_decoder_matches_from_dict(detection):
+    element = host_element(detection)
+
+    # decode, rather than calling the decoder, so a fallback fails the test:
+    decoded = HOST_DECODER.decode(element)
+    via_dicts = VMDRHost.from_dict(element_to_dict(element, spec=HOST_SPEC))
+
+    assert contents(decoded) == contents(via_dicts)
+
+
+def test_cve_host_decoder_matches_from_dict():
+    element = host_element(CVE_DETECTION, cve=True)
+
+    decoded = CVE_HOST_DECODER.decode(element)
+    via_dicts = _cve_host_from_dict(element_to_dict(element, spec=HOST_SPEC))
+
+    assert contents(decoded) == contents(via_dicts)
+
+
+def test_decoder_falls_back_on_unknown_tags():
+    element = host_element(DETECTION)
+    etree.SubElement(element, "NOT_A_FIELD").text = "1"
+
+    # An unknown tag goes through from_dict, which raises as it did before:
+    with pytest.raises(TypeError):
+        VMDRHost.from_dict(element_to_dict(element, spec=HOST_SPEC))
+    with pytest.raises(TypeError):
+        HOST_DECODER(element)